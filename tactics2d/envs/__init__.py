@@ -6,6 +6,7 @@
 # @Version: 1.0.0
 
 from .parking import ParkingEnv
+from .profiler import StepProfiler
 from .racing import RacingEnv
 
-__all__ = ["RacingEnv", "ParkingEnv"]
+__all__ = ["RacingEnv", "ParkingEnv", "StepProfiler"]
@@ -23,12 +23,15 @@ from tactics2d.sensor import RenderManager, SingleLineLidar, TopDownCamera
 from tactics2d.traffic import ScenarioManager, ScenarioStatus, TrafficStatus
 from tactics2d.traffic.event_detection import (
     Arrival,
+    EventContext,
     NoAction,
     OutBound,
     StaticCollision,
     TimeExceed,
 )
 
+from .profiler import StepProfiler
+
 MAX_STEER = 0.524  # 0.75
 MAX_ACCEL = 2.0
 
@@ -103,6 +106,8 @@ class ParkingEnv(gym.Env):
         render_fps: int = 60,
         max_step: int = int(2e4),
         continuous: bool = True,
+        continuous_collision: bool = False,
+        profile: bool = False,
     ):
         """Initialize the parking environment.
 
@@ -112,6 +117,8 @@ class ParkingEnv(gym.Env):
             render_fps (int, optional): The frame rate of the rendering.
             max_step (int, optional): The maximum time step of the scenario.
             continuous (bool, optional): Whether to use continuous action space.
+            continuous_collision (bool, optional): Whether to check the collision with the volume swept by the agent vehicle between two steps. It prevents the agent from tunnelling through thin obstacles when it moves fast.
+            profile (bool, optional): Whether to record the time cost of the phases in every step. The records are accessible by `self.profiler`.
 
         Raises:
             NotImplementedError: If the render mode is not supported.
@@ -142,9 +149,16 @@ class ParkingEnv(gym.Env):
 
         self._max_iou = -np.inf
         self._min_dist_to_target = np.inf
+        self.profiler = StepProfiler(profile)
 
         self.scenario_manager = self._ParkingScenarioManager(
-            type_proportion, self.max_step, 100, self.render_fps, self.render_mode != "human"
+            type_proportion,
+            self.max_step,
+            100,
+            self.render_fps,
+            self.render_mode != "human",
+            continuous_collision,
+            self.profiler,
         )
 
     def _get_reward(
@@ -239,21 +253,30 @@ class ParkingEnv(gym.Env):
         action = action if self.continuous else self._discrete_action[action]
 
         steering, accel = action
-        observations = self.scenario_manager.update(steering, accel)
-        scenario_status, traffic_status, iou = self.scenario_manager.check_status(action)
-
-        terminated = False
-        truncated = False
-        if scenario_status == ScenarioStatus.COMPLETED:
-            terminated = True
-        elif (scenario_status != ScenarioStatus.NORMAL) or (traffic_status != TrafficStatus.NORMAL):
-            truncated = True
-
-        reward = self._get_reward(scenario_status, traffic_status, iou)
-
-        infos = self._get_infos(
-            self.scenario_manager.agent.current_state, observations, scenario_status, traffic_status
-        )
+        with self.profiler.step():
+            observations = self.scenario_manager.update(steering, accel)
+            with self.profiler.phase("check_status"):
+                scenario_status, traffic_status, iou = self.scenario_manager.check_status(action)
+
+            terminated = False
+            truncated = False
+            if scenario_status == ScenarioStatus.COMPLETED:
+                terminated = True
+            elif (scenario_status != ScenarioStatus.NORMAL) or (
+                traffic_status != TrafficStatus.NORMAL
+            ):
+                truncated = True
+
+            with self.profiler.phase("reward"):
+                reward = self._get_reward(scenario_status, traffic_status, iou)
+
+            with self.profiler.phase("infos"):
+                infos = self._get_infos(
+                    self.scenario_manager.agent.current_state,
+                    observations,
+                    scenario_status,
+                    traffic_status,
+                )
 
         return observations[0], reward, terminated, truncated, infos
 
@@ -314,8 +337,13 @@ class ParkingEnv(gym.Env):
             step_size: int = None,
             render_fps: int = 60,
             off_screen: bool = False,
+            continuous_collision: bool = False,
+            profiler: StepProfiler = None,
         ):
             super().__init__(max_step, step_size, render_fps, off_screen)
+            self.continuous_collision = continuous_collision
+            self.profiler = StepProfiler() if profiler is None else profiler
+            self.swept_poses = None
 
             self.agent = Vehicle(id_=0)
             self.agent.load_from_template("medium_car")
@@ -347,46 +375,70 @@ class ParkingEnv(gym.Env):
                 "time_exceed": TimeExceed(self.max_step),
                 "no_action": NoAction(100),
                 "out_bound": OutBound(),
-                "collision": StaticCollision(),
+                "collision": StaticCollision(continuous=self.continuous_collision),
                 "completed": Arrival(),
             }
 
         def update(self, steering: float, accel: float):
             self.cnt_step += 1
             current_state = self.agent.current_state
-            next_state, _, _ = self.agent.physics_model.step(current_state, accel, steering)
-            self.agent.add_state(next_state)
-            self.render_manager.update(self.participants, [0], self.agent.current_state.frame)
-
-            return self.get_observation()
+            with self.profiler.phase("physics"):
+                if self.continuous_collision:
+                    next_state, path, _, _ = self.agent.physics_model.step_with_path(
+                        current_state, accel, steering
+                    )
+                    self.swept_poses = self._get_swept_poses(path)
+                    self.profiler.count("swept_poses", len(path))
+                else:
+                    next_state, _, _ = self.agent.physics_model.step(current_state, accel, steering)
+                self.agent.add_state(next_state)
+                self.profiler.count("states")
+
+            with self.profiler.phase("render_update"):
+                self.render_manager.update(self.participants, [0], self.agent.current_state.frame)
+
+            with self.profiler.phase("observation"):
+                return self.get_observation()
+
+        def _get_swept_poses(self, path: np.ndarray) -> np.ndarray:
+            # transform the bounding box of the agent to every pose in the path in a batch
+            bbox = np.array(self.agent.geometry.coords)[:4]
+            cos, sin = np.cos(path[:, 2]), np.sin(path[:, 2])
+            x = cos[:, None] * bbox[:, 0] - sin[:, None] * bbox[:, 1] + path[:, 0:1]
+            y = sin[:, None] * bbox[:, 0] + cos[:, None] * bbox[:, 1] + path[:, 1:2]
+
+            return np.stack([x, y], axis=-1)
 
         def check_status(self, action: np.ndarray):
             scenario_status = ScenarioStatus.NORMAL
             traffic_status = TrafficStatus.NORMAL
-            agent_pose = Polygon(self.agent.get_pose())
+            context = EventContext(
+                Polygon(self.agent.get_pose()), self.swept_poses, profiler=self.profiler
+            )
 
             is_time_exceed = self.status_checklist["time_exceed"].update()
             if is_time_exceed:
                 scenario_status = ScenarioStatus.TIME_EXCEEDED
                 return scenario_status, traffic_status, None
 
-            is_no_action = self.status_checklist["no_action"].update(agent_pose)
+            is_no_action = self.status_checklist["no_action"].evaluate(context)[0]
             if is_no_action:
                 traffic_status = ScenarioStatus.NO_ACTION
                 return scenario_status, traffic_status, None
 
-            is_out_bound = self.status_checklist["out_bound"].update(agent_pose)
+            is_out_bound = self.status_checklist["out_bound"].evaluate(context)[0]
             if is_out_bound:
                 scenario_status = ScenarioStatus.OUT_BOUND
                 return scenario_status, traffic_status, None
 
-            is_collision = self.status_checklist["collision"].update(agent_pose)
+            is_collision = self.status_checklist["collision"].evaluate(context)[0]
             if is_collision:
                 scenario_status = ScenarioStatus.FAILED
                 traffic_status = TrafficStatus.COLLISION_STATIC
                 return scenario_status, traffic_status, None
 
-            is_completed, iou = self.status_checklist["completed"].update(agent_pose)
+            is_completed, iou = self.status_checklist["completed"].evaluate(context)
+            is_completed, iou = is_completed[0], float(iou[0])
             if is_completed:
                 scenario_status = ScenarioStatus.COMPLETED
                 return scenario_status, traffic_status, iou
@@ -398,6 +450,7 @@ class ParkingEnv(gym.Env):
 
         def reset(self):
             self.cnt_step = 0
+            self.swept_poses = None
 
             # reset map
             self.map_.reset()
@@ -0,0 +1,257 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: profiler.py
+# @Description: This script defines an opt-in profiler for the phases of an environment step.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+
+import numpy as np
+
+_NULL_PHASE = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler._record(self.name, self.start, time.perf_counter_ns() - self.start)
+
+
+class StepProfiler:
+    """This class records the time cost of the phases in the environment steps, such as the physics update, the rendering, and the status check.
+
+    The profiler is disabled by default. When it is disabled, a phase is a shared empty context manager and a counter update returns immediately, so the instrumentation in the environments costs almost nothing. When it is enabled, only the records of the latest steps are kept, so that the memory of a long-running environment is bounded.
+
+    Example:
+        ```python
+        env = ParkingEnv(render_mode="rgb_array", profile=True)
+        env.reset()
+        for _ in range(100):
+            env.step(env.action_space.sample())
+        print(env.profiler.summary())
+        env.profiler.to_chrome_trace("trace.json")  # open it in chrome://tracing or Perfetto
+        ```
+
+    Attributes:
+        enabled (bool): Whether the profiler is recording. Defaults to False.
+        max_steps (int): The maximum number of the latest steps whose records are kept. Defaults to 10000.
+        n_step (int): The number of the recorded steps since the last reset, including the dropped ones. This attribute is **read-only**.
+        steps (Deque[dict]): The records of the latest steps. Each record contains the index, start time, duration, phase durations, and counters of a step. The unit of time is nanosecond.
+    """
+
+    def __init__(self, enabled: bool = False, max_steps: int = 10000):
+        """Initialize an instance for the class.
+
+        Args:
+            enabled (bool, optional): Whether the profiler is recording.
+            max_steps (int, optional): The maximum number of the latest steps whose records are kept.
+        """
+        self.enabled = enabled
+        self.max_steps = max_steps
+        self.reset()
+
+    @property
+    def n_step(self) -> int:
+        return self._n_step
+
+    def _record(self, name: str, start: int, duration: int):
+        self._durations[name].append(duration)
+        self._step_events.append((name, start, duration, self._n_step))
+        if name == "step":
+            self.steps.append(
+                {
+                    "step": self._n_step,
+                    "ts": start,
+                    "dur": duration,
+                    "phases": self._step_phases,
+                    "counters": self._step_counters,
+                }
+            )
+            # the events are kept by steps, so that they are dropped with the old steps
+            self._events.append(self._step_events)
+            self._n_step += 1
+            self._step_events = []
+            self._step_phases = defaultdict(int)
+            self._step_counters = defaultdict(int)
+        else:
+            self._step_phases[name] += duration
+
+    def step(self):
+        """This function returns a context manager that measures a whole environment step. The phases and counters recorded inside it are attributed to the step.
+
+        Returns:
+            The context manager of the step.
+        """
+        return _Phase(self, "step") if self.enabled else _NULL_PHASE
+
+    def phase(self, name: str):
+        """This function returns a context manager that measures a phase of the environment step. Phases can be nested.
+
+        Args:
+            name (str): The name of the phase.
+
+        Returns:
+            The context manager of the phase.
+        """
+        return _Phase(self, name) if self.enabled else _NULL_PHASE
+
+    def count(self, name: str, value: int = 1):
+        """This function increases a counter of the current step.
+
+        Args:
+            name (str): The name of the counter.
+            value (int, optional): The increment of the counter.
+        """
+        if not self.enabled:
+            return
+        self._step_counters[name] += value
+
+    def get_durations(self, name: str) -> np.ndarray:
+        """This function gets the recorded durations of a phase in the latest steps.
+
+        Args:
+            name (str): The name of the phase. The whole step is named "step".
+
+        Returns:
+            The durations of the phase. The unit is millisecond (ms).
+        """
+        return np.array(self._durations.get(name, []), dtype=float) / 1e6
+
+    def histogram(self, name: str, bins: int = 20):
+        """This function aggregates the durations of a phase into a histogram.
+
+        Args:
+            name (str): The name of the phase.
+            bins (int, optional): The number of bins.
+
+        Returns:
+            counts (np.ndarray): The number of records in each bin.
+            bin_edges (np.ndarray): The edges of the bins. The unit is millisecond (ms).
+        """
+        return np.histogram(self.get_durations(name), bins=bins)
+
+    def summary(self) -> dict:
+        """This function summarizes the recorded phases and counters.
+
+        Returns:
+            The statistics of the phases and counters in the kept steps. The statistics of a phase include the count, total, mean, minimum, median, 95th percentile, and maximum of its durations in millisecond. The statistics of a counter include its total and mean value per step. The number of all the recorded steps is given by "n_step".
+        """
+        phases = dict()
+        for name in self._durations:
+            durations = self.get_durations(name)
+            phases[name] = {
+                "count": len(durations),
+                "total": float(np.sum(durations)),
+                "mean": float(np.mean(durations)),
+                "min": float(np.min(durations)),
+                "p50": float(np.percentile(durations, 50)),
+                "p95": float(np.percentile(durations, 95)),
+                "max": float(np.max(durations)),
+            }
+
+        counters = defaultdict(int)
+        for step in self.steps:
+            for name, value in step["counters"].items():
+                counters[name] += value
+        n_step = max(len(self.steps), 1)
+        counters = {
+            name: {"total": total, "mean": total / n_step} for name, total in counters.items()
+        }
+
+        return {
+            "n_step": self._n_step,
+            "n_kept_step": len(self.steps),
+            "phases": phases,
+            "counters": counters,
+        }
+
+    def to_json(self, file_path: str = None, bins: int = 20) -> str:
+        """This function exports the summary, histograms, and step records as JSON.
+
+        Args:
+            file_path (str, optional): The path to save the JSON file. If not specified, the JSON string is only returned.
+            bins (int, optional): The number of bins of the histograms.
+
+        Returns:
+            The JSON string.
+        """
+        histograms = dict()
+        for name in self._durations:
+            counts, bin_edges = self.histogram(name, bins)
+            histograms[name] = {"counts": counts.tolist(), "bin_edges": bin_edges.tolist()}
+
+        content = json.dumps(
+            {"summary": self.summary(), "histograms": histograms, "steps": list(self.steps)}
+        )
+        if file_path is not None:
+            with open(file_path, "w") as f:
+                f.write(content)
+
+        return content
+
+    def to_chrome_trace(self, file_path: str = None) -> dict:
+        """This function exports the records in the Chrome trace event format, which can be viewed in chrome://tracing or Perfetto.
+
+        Args:
+            file_path (str, optional): The path to save the trace file. If not specified, the trace is only returned.
+
+        Returns:
+            The trace events.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": 0,
+                "args": {"step": step},
+            }
+            for step_events in self._events
+            for name, start, duration, step in step_events
+        ]
+        for step in self.steps:
+            if len(step["counters"]) > 0:
+                events.append(
+                    {
+                        "name": "counters",
+                        "ph": "C",
+                        "ts": (step["ts"] + step["dur"]) / 1e3,
+                        "pid": pid,
+                        "tid": 0,
+                        "args": dict(step["counters"]),
+                    }
+                )
+
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if file_path is not None:
+            with open(file_path, "w") as f:
+                json.dump(trace, f)
+
+        return trace
+
+    def reset(self):
+        """This function clears all the records."""
+        self.steps = deque(maxlen=self.max_steps)
+        self._n_step = 0
+        self._durations = defaultdict(lambda: deque(maxlen=self.max_steps))
+        self._events = deque(maxlen=self.max_steps)
+        self._step_events = []
+        self._step_phases = defaultdict(int)
+        self._step_counters = defaultdict(int)
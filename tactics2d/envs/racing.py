@@ -22,7 +22,9 @@ from tactics2d.participant.trajectory import State
 from tactics2d.physics import SingleTrackKinematics
 from tactics2d.sensor import RenderManager, TopDownCamera
 from tactics2d.traffic import ScenarioManager, ScenarioStatus, TrafficStatus
-from tactics2d.traffic.event_detection import NoAction, OffLane, OutBound, TimeExceed
+from tactics2d.traffic.event_detection import EventContext, NoAction, OffLane, OutBound, TimeExceed
+
+from .profiler import StepProfiler
 
 MAX_STEER = 0.75
 MAX_ACCEL = 2.0
@@ -81,6 +83,7 @@ class RacingEnv(gym.Env):
         render_fps: int = 60,
         max_step: int = int(1e5),
         continuous: bool = True,
+        profile: bool = False,
     ):
         """Initialize the racing environment.
 
@@ -89,6 +92,7 @@ class RacingEnv(gym.Env):
             render_fps (int, optional): The frame rate of the rendering.
             max_step (int, optional): The maximum time step of the scenario.
             continuous (bool, optional): Whether to use continuous action space.
+            profile (bool, optional): Whether to record the time cost of the phases in every step. The records are accessible by `self.profiler`.
 
         Raises:
             NotImplementedError: If the render mode is not supported.
@@ -117,8 +121,14 @@ class RacingEnv(gym.Env):
         else:
             self.action_space = spaces.Discrete(5)
 
+        self.profiler = StepProfiler(profile)
+
         self.scenario_manager = self._RacingScenarioManager(
-            self.max_step, 100, self.render_fps, off_screen=self.render_mode != "human"
+            self.max_step,
+            100,
+            self.render_fps,
+            off_screen=self.render_mode != "human",
+            profiler=self.profiler,
         )
 
     def _get_rewards(self, scenario_status: ScenarioStatus, traffic_status: TrafficStatus):
@@ -162,23 +172,29 @@ class RacingEnv(gym.Env):
         action = action if self.continuous else self._discrete_action[action]
 
         steering, accel = action
-        observation = self.scenario_manager.update(steering, accel)
-        scenario_status, traffic_status = self.scenario_manager.check_status(action)
-
-        terminated = False
-        truncated = False
-        if scenario_status == ScenarioStatus.COMPLETED:
-            terminated = True
-        elif (scenario_status != ScenarioStatus.NORMAL) or (traffic_status != TrafficStatus.NORMAL):
-            truncated = True
-
-        reward = self._get_rewards(scenario_status, traffic_status)
-
-        infos = {
-            "state": self.scenario_manager.agent.current_state,
-            "traffic_status": traffic_status,
-            "scenario_status": scenario_status,
-        }
+        with self.profiler.step():
+            observation = self.scenario_manager.update(steering, accel)
+            with self.profiler.phase("check_status"):
+                scenario_status, traffic_status = self.scenario_manager.check_status(action)
+
+            terminated = False
+            truncated = False
+            if scenario_status == ScenarioStatus.COMPLETED:
+                terminated = True
+            elif (scenario_status != ScenarioStatus.NORMAL) or (
+                traffic_status != TrafficStatus.NORMAL
+            ):
+                truncated = True
+
+            with self.profiler.phase("reward"):
+                reward = self._get_rewards(scenario_status, traffic_status)
+
+            with self.profiler.phase("infos"):
+                infos = {
+                    "state": self.scenario_manager.agent.current_state,
+                    "traffic_status": traffic_status,
+                    "scenario_status": scenario_status,
+                }
 
         return observation, reward, terminated, truncated, infos
 
@@ -212,8 +228,10 @@ class RacingEnv(gym.Env):
             step_size: float = None,
             render_fps: int = 60,
             off_screen: bool = False,
+            profiler: StepProfiler = None,
         ):
             super().__init__(max_step, step_size, render_fps, off_screen)
+            self.profiler = StepProfiler() if profiler is None else profiler
 
             self.agent = Vehicle(id_=0)
             self.agent.load_from_template("medium_car")
@@ -326,37 +344,43 @@ class RacingEnv(gym.Env):
         def update(self, steering: float, accel: float):
             self.cnt_step += 1
             current_state = self.agent.current_state
-            next_state, _, _ = self.agent.physics_model.step(current_state, accel, steering)
-            self.agent.add_state(next_state)
+            with self.profiler.phase("physics"):
+                next_state, _, _ = self.agent.physics_model.step(current_state, accel, steering)
+                self.agent.add_state(next_state)
+                self.profiler.count("states")
 
-            self._locate_agent()
-            self.render_manager.update(self.participants, [0], self.agent.current_state.frame)
+            with self.profiler.phase("locate_agent"):
+                self._locate_agent()
 
-            return self.get_observation()
+            with self.profiler.phase("render_update"):
+                self.render_manager.update(self.participants, [0], self.agent.current_state.frame)
+
+            with self.profiler.phase("observation"):
+                return self.get_observation()
 
         def check_status(self, action: np.ndarray):
             scenario_status = ScenarioStatus.NORMAL
             traffic_status = TrafficStatus.NORMAL
-            agent_pose = Polygon(self.agent.get_pose())
+            context = EventContext(Polygon(self.agent.get_pose()), profiler=self.profiler)
 
             is_time_exceed = self.status_checklist["time_exceed"].update()
             if is_time_exceed:
                 scenario_status = ScenarioStatus.TIME_EXCEEDED
                 return scenario_status, traffic_status
 
-            is_no_action = self.status_checklist["no_action"].update(agent_pose)
+            is_no_action = self.status_checklist["no_action"].evaluate(context)[0]
             if is_no_action:
                 traffic_status = ScenarioStatus.NO_ACTION
                 return scenario_status, traffic_status
 
-            is_out_bound = self.status_checklist["out_bound"].update(agent_pose)
+            is_out_bound = self.status_checklist["out_bound"].evaluate(context)[0]
             if is_out_bound:
                 traffic_status = ScenarioStatus.OUT_BOUND
                 return scenario_status, traffic_status
 
-            is_off_road = self.status_checklist["off_road"].update(agent_pose)
+            is_off_road = self.status_checklist["off_road"].evaluate(context)[0]
             if is_off_road:
-                traffic_status = TrafficStatus.OFF_ROAD
+                traffic_status = TrafficStatus.OFF_LANE
                 return scenario_status, traffic_status
 
             # regard the scenario as accomplished if all the tiles are visited
@@ -395,6 +419,6 @@ class RacingEnv(gym.Env):
             self.status_checklist["time_exceed"].reset()
             self.status_checklist["no_action"].reset()
             self.status_checklist["out_bound"].reset(self.map_.boundary)
-            self.status_checklist["off_road"].reset(self.map_.lanes)
+            self.status_checklist["off_road"].reset(self.map_)
 
             return self.scenario_status, self.traffic_status
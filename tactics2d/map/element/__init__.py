@@ -13,6 +13,7 @@ from .map import Map
 from .node import Node
 from .regulatory import Regulatory, RegulatoryMember
 from .roadline import RoadLine
+from .tiled_map import TiledMap
 
 __all__ = [
     "Node",
@@ -23,6 +24,7 @@ __all__ = [
     "Junction",
     "Area",
     "Map",
+    "TiledMap",
     "Regulatory",
     "RegulatoryMember",
 ]
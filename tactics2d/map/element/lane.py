@@ -10,8 +10,12 @@ import logging
 from enum import IntEnum
 from typing import Any, Union
 
+import numpy as np
+import shapely
 from shapely.geometry import LinearRing, LineString
 
+from tactics2d.math.geometry import FrenetFrame
+
 
 class LaneRelationship(IntEnum):
     PREDECESSOR = 1
@@ -48,6 +52,8 @@ class Lane:
         starts (list): The start points of the lane.
         ends (list): The end points of the lane.
         geometry (LinearRing): The geometry representation of the lane. This attribute will be automatically obtained during the initialization if there is no None in left_side and right_side.
+        centerline (LineString): The centerline of the lane. It is the average of the two sides sampled at the same normalized arc lengths. This attribute is computed at the first access and **read-only**.
+        frenet_frame (FrenetFrame): The Frenet frame along the centerline of the lane. This attribute is computed at the first access and **read-only**.
         shape (list): The shape of the lane. This attribute is **read-only**.
     """
 
@@ -103,7 +109,7 @@ class Lane:
 
         if not None in [left_side, right_side]:
             self.geometry = LinearRing(
-                list(left_side.coords) + list(reversed(list(right_side.coords)))
+                np.concatenate([np.asarray(left_side.coords), np.asarray(right_side.coords)[::-1]])
             )
         else:
             self.geometry = None
@@ -115,6 +121,9 @@ class Lane:
         self.left_neighbors = set()
         self.right_neighbors = set()
 
+        self._centerline = None
+        self._frenet_frame = None
+
     def _set_speed_limit_unit(self, speed_limit: float, speed_limit_unit: str):
         if not speed_limit_unit in self._speed_units:
             logging.warning(
@@ -144,6 +153,38 @@ class Lane:
     def shape(self) -> list:
         return list(self.geometry.coords)
 
+    @property
+    def centerline(self) -> LineString:
+        if self._centerline is None:
+            if self.geometry is None:
+                return None
+
+            # sample both sides at the union of their normalized vertex positions
+            params = []
+            for side in [self.left_side, self.right_side]:
+                coords = np.array(side.coords)[:, :2]
+                cumulative = np.concatenate(
+                    [[0], np.cumsum(np.linalg.norm(np.diff(coords, axis=0), axis=1))]
+                )
+                params.append(cumulative / max(cumulative[-1], np.finfo(float).tiny))
+            params = np.unique(np.clip(np.concatenate(params), 0, 1))
+
+            left = shapely.get_coordinates(
+                shapely.line_interpolate_point(self.left_side, params, normalized=True)
+            )
+            right = shapely.get_coordinates(
+                shapely.line_interpolate_point(self.right_side, params, normalized=True)
+            )
+            self._centerline = LineString((left + right) / 2)
+
+        return self._centerline
+
+    @property
+    def frenet_frame(self) -> FrenetFrame:
+        if self._frenet_frame is None and self.centerline is not None:
+            self._frenet_frame = FrenetFrame(np.array(self.centerline.coords))
+        return self._frenet_frame
+
     def is_related(self, id_: str) -> LaneRelationship:
         """Check if a given lane is related to the lane
 
@@ -8,8 +8,12 @@
 
 import enum
 import warnings
+from typing import List, Tuple, Union
 
 import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from shapely.strtree import STRtree
 
 from .area import Area
 from .junction import Junction
@@ -42,7 +46,9 @@ class Map:
         areas (dict): The areas in the map. Defaults to an empty dictionary. This attribute needs to be set manually by trigger the [add_area](#tactics2d.map.element.Map.add_area) method.
         roadlines (dict): The roadlines in the map. Defaults to an empty dictionary. This attribute needs to be set manually by trigger the [add_roadline](#tactics2d.map.element.Map.add_roadline) method.
         regulations (dict): The regulations in the map. Defaults to an empty dictionary. This attribute needs to be set manually by trigger the [add_regulatory](#tactics2d.map.element.Map.add_regulatory) method.
-        boundary (tuple): The boundary of the map expressed in the form of (min_x, max_x, min_y, max_y). This attribute is **read-only**.
+        boundary (tuple): The boundary of the map expressed in the form of (min_x, max_x, min_y, max_y). Unless it is set by [set_boundary](#tactics2d.map.element.Map.set_boundary), it is the extent of the nodes, lanes, areas, and roadlines with a margin of 10, which is updated incrementally when an element is added. Replacing an element does not shrink the boundary. This attribute is **read-only**.
+
+    The map maintains a spatial index (STRtree) for each type of the elements with geometry, i.e., `"node"`, `"lane"`, `"area"`, and `"roadline"`. An index is built at the first query on its type and dropped when an element of the type is added or the map is reset.
     """
 
     def __init__(self, name: str = None, scenario_type: str = None, country: str = None):
@@ -66,42 +72,30 @@ class Map:
         self.regulations = dict()
         self.customs = dict()
         self._boundary = None
+        self._bounds = (float("inf"), float("-inf"), float("inf"), float("-inf"))
+        self._spatial_indexes = dict()
+        self._index_sources = dict()
 
     @property
     def boundary(self):
-        if self._boundary is None:
-            x_min, x_max, y_min, y_max = (float("inf"), float("-inf"), float("inf"), float("-inf"))
-
-            for node in self.nodes.values():
-                x_min = min(x_min, node.x)
-                x_max = max(x_max, node.x)
-                y_min = min(y_min, node.y)
-                y_max = max(y_max, node.y)
-
-            for lane in self.lanes.values():
-                lane_coords = np.array(lane.geometry.coords)
-                x_min = min(x_min, np.min(lane_coords[:, 0]))
-                x_max = max(x_max, np.max(lane_coords[:, 0]))
-                y_min = min(y_min, np.min(lane_coords[:, 1]))
-                y_max = max(y_max, np.max(lane_coords[:, 1]))
-
-            for area in self.areas.values():
-                area_coords = np.array(area.geometry.exterior.coords)
-                x_min = min(x_min, np.min(area_coords[:, 0]))
-                x_max = max(x_max, np.max(area_coords[:, 0]))
-                y_min = min(y_min, np.min(area_coords[:, 1]))
-                y_max = max(y_max, np.max(area_coords[:, 1]))
-
-            for roadline in self.roadlines.values():
-                roadline_coords = np.array(roadline.geometry.coords)
-                x_min = min(x_min, np.min(roadline_coords[:, 0]))
-                x_max = max(x_max, np.max(roadline_coords[:, 0]))
-                y_min = min(y_min, np.min(roadline_coords[:, 1]))
-                y_max = max(y_max, np.max(roadline_coords[:, 1]))
-
-            self._boundary = (x_min - 10, x_max + 10, y_min - 10, y_max + 10)
-
-        return self._boundary
+        if self._boundary is not None:
+            return self._boundary
+
+        x_min, x_max, y_min, y_max = self._bounds
+        return (x_min - 10, x_max + 10, y_min - 10, y_max + 10)
+
+    def _update_bounds(self, bounds: tuple):
+        # bounds in the shapely format (min_x, min_y, max_x, max_y)
+        self._bounds = (
+            min(self._bounds[0], bounds[0]),
+            max(self._bounds[1], bounds[2]),
+            min(self._bounds[2], bounds[1]),
+            max(self._bounds[3], bounds[3]),
+        )
+
+    def _drop_spatial_index(self, element_type: str):
+        self._spatial_indexes.pop(element_type, None)
+        self._index_sources.pop(element_type, None)
 
     def add_node(self, node: Node):
         """This function adds a node to the map.
@@ -118,6 +112,8 @@ class Map:
             else:
                 raise KeyError(f"The id of Node {node.id_} is used by the other road element.")
         self.nodes[node.id_] = node
+        self._update_bounds((node.x, node.y, node.x, node.y))
+        self._drop_spatial_index("node")
         self.ids[node.id_] = MapElement.NODE
 
     def add_roadline(self, roadline: RoadLine):
@@ -140,6 +136,8 @@ class Map:
                 )
 
         self.roadlines[roadline.id_] = roadline
+        self._update_bounds(roadline.geometry.bounds)
+        self._drop_spatial_index("roadline")
         self.ids[roadline.id_] = MapElement.ROADLINE
 
     def add_junction(self, junction: Junction):
@@ -177,6 +175,9 @@ class Map:
                 raise KeyError(f"The id of Lane {lane.id_} is used by the other road element.")
 
         self.lanes[lane.id_] = lane
+        if lane.geometry is not None:
+            self._update_bounds(lane.geometry.bounds)
+        self._drop_spatial_index("lane")
         self.ids[lane.id_] = MapElement.LANE
 
     def add_area(self, area: Area):
@@ -195,6 +196,8 @@ class Map:
                 raise KeyError(f"The id of Area {area.id_} is used by the other road element.")
 
         self.areas[area.id_] = area
+        self._update_bounds(area.geometry.bounds)
+        self._drop_spatial_index("area")
         self.ids[area.id_] = MapElement.AREA
 
     def add_regulatory(self, regulatory: Regulatory):
@@ -219,8 +222,227 @@ class Map:
         self.regulations[regulatory.id_] = regulatory
         self.ids[regulatory.id_] = MapElement.REGULATORY
 
+    def get_spatial_index(self, element_type: str = "lane") -> Tuple[list, STRtree]:
+        """This function returns the spatial index of a type of the elements. The index is built lazily at the first call and reused until an element of the type is added or the map is reset.
+
+        Args:
+            element_type (str, optional): The type of the elements. It can be "node", "lane", "area", or "roadline". The lanes are indexed by their polygons.
+
+        Returns:
+            ids (list): The ids of the indexed elements. The order is the same as the indices in the STRtree.
+            tree (STRtree): The spatial index of the elements.
+
+        Raises:
+            KeyError: If the element type is not supported.
+        """
+        if element_type not in self._spatial_indexes and element_type in self._index_sources:
+            ids, geometries = self._index_sources[element_type]()
+            self._spatial_indexes[element_type] = (ids, STRtree(geometries))
+
+        if element_type not in self._spatial_indexes:
+            if element_type == "node":
+                elements = self.nodes.values()
+                geometries = [node.location for node in elements]
+            elif element_type == "lane":
+                elements = [lane for lane in self.lanes.values() if lane.geometry is not None]
+                geometries = [Polygon(lane.geometry) for lane in elements]
+            elif element_type == "area":
+                elements = self.areas.values()
+                geometries = [area.geometry for area in elements]
+            elif element_type == "roadline":
+                elements = self.roadlines.values()
+                geometries = [roadline.geometry for roadline in elements]
+            else:
+                raise KeyError(f"Spatial index is not supported for {element_type}.")
+
+            ids = [element.id_ for element in elements]
+            self._spatial_indexes[element_type] = (ids, STRtree(geometries))
+
+        return self._spatial_indexes[element_type]
+
+    @staticmethod
+    def _to_points(points: np.ndarray) -> Tuple[np.ndarray, bool]:
+        points = np.asarray(points, dtype=float)
+        single = points.ndim == 1
+        return shapely.points(points.reshape(-1, 2)), single
+
+    @staticmethod
+    def _group_ids(ids: list, pairs: np.ndarray, n: int) -> List[list]:
+        groups = [[] for _ in range(n)]
+        for i, j in zip(*pairs.tolist()):
+            groups[i].append(ids[j])
+        return groups
+
+    def query_bbox(self, bbox: tuple, element_type: str = "lane") -> list:
+        """This function finds the elements whose geometries intersect with a bounding box.
+
+        Args:
+            bbox (tuple): The bounding box in the form of (min_x, max_x, min_y, max_y).
+            element_type (str, optional): The type of the elements. It can be "node", "lane", "area", or "roadline".
+
+        Returns:
+            The ids of the elements.
+        """
+        ids, tree = self.get_spatial_index(element_type)
+        box = shapely.box(bbox[0], bbox[2], bbox[1], bbox[3])
+        return [ids[i] for i in tree.query(box, predicate="intersects")]
+
+    def query_radius(
+        self, points: np.ndarray, radius: float, element_type: str = "lane"
+    ) -> Union[list, List[list]]:
+        """This function finds the elements within a radius of points.
+
+        Args:
+            points (np.ndarray): A point with the shape of (2,) or a batch of points with the shape of (n, 2).
+            radius (float): The search radius.
+            element_type (str, optional): The type of the elements. It can be "node", "lane", "area", or "roadline".
+
+        Returns:
+            The ids of the elements within the radius. If a batch of points is given, a list of ids is returned for each point.
+        """
+        ids, tree = self.get_spatial_index(element_type)
+        geometries, single = self._to_points(points)
+        pairs = tree.query(geometries, predicate="dwithin", distance=radius)
+        groups = self._group_ids(ids, pairs, len(geometries))
+        return groups[0] if single else groups
+
+    def query_nearest(
+        self, points: np.ndarray, element_type: str = "lane", max_distance: float = None
+    ) -> Union[str, list]:
+        """This function finds the nearest element to points.
+
+        Args:
+            points (np.ndarray): A point with the shape of (2,) or a batch of points with the shape of (n, 2).
+            element_type (str, optional): The type of the elements. It can be "node", "lane", "area", or "roadline".
+            max_distance (float, optional): The maximum distance to search. If not specified, the search is unbounded.
+
+        Returns:
+            The id of the nearest element. If no element is found, it is None. If a batch of points is given, a list of ids is returned.
+        """
+        ids, tree = self.get_spatial_index(element_type)
+        geometries, single = self._to_points(points)
+        nearest_ids = [None] * len(geometries)
+        if len(ids) > 0:
+            point_indices, tree_indices = tree.query_nearest(
+                geometries, max_distance=max_distance, all_matches=False
+            )
+            for i, j in zip(point_indices.tolist(), tree_indices.tolist()):
+                nearest_ids[i] = ids[j]
+
+        return nearest_ids[0] if single else nearest_ids
+
+    def locate(self, points: np.ndarray) -> Union[list, List[list]]:
+        """This function finds the lanes that cover points.
+
+        Args:
+            points (np.ndarray): A point with the shape of (2,) or a batch of points with the shape of (n, 2).
+
+        Returns:
+            The ids of the lanes covering the point. If a batch of points is given, a list of ids is returned for each point.
+        """
+        ids, tree = self.get_spatial_index("lane")
+        geometries, single = self._to_points(points)
+        pairs = tree.query(geometries, predicate="covered_by")
+        groups = self._group_ids(ids, pairs, len(geometries))
+        return groups[0] if single else groups
+
+    def project_frenet(
+        self, points: np.ndarray, headings: np.ndarray = None, lane_ids: list = None
+    ) -> Tuple[list, np.ndarray, np.ndarray, np.ndarray]:
+        """This function projects points to the Frenet coordinates along the centerlines of the lanes.
+
+        Args:
+            points (np.ndarray): A point with the shape of (2,) or a batch of points with the shape of (n, 2).
+            headings (np.ndarray, optional): The headings of the points. The shape is (n,). If specified, the heading errors relative to the lanes are computed.
+            lane_ids (list, optional): The ids of the reference lanes of the points. If not specified, the nearest lane of every point is used.
+
+        Returns:
+            lane_ids (list): The ids of the reference lanes. It is None for a point if the map has no lane.
+            s (np.ndarray): The arc lengths along the centerlines of the reference lanes. The shape is (n,).
+            d (np.ndarray): The signed lateral offsets from the centerlines. The offset is positive on the left side. The shape is (n,).
+            heading_error (np.ndarray): The headings of the points minus the headings of the centerlines, wrapped to [-pi, pi). If the headings are not specified, it is filled with NaN. The shape is (n,).
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if lane_ids is None:
+            lane_ids = self.query_nearest(points)
+        else:
+            lane_ids = list(lane_ids)
+
+        n_point = len(points)
+        s = np.full(n_point, np.nan)
+        d = np.full(n_point, np.nan)
+        lane_headings = np.full(n_point, np.nan)
+
+        groups = dict()
+        for i, lane_id in enumerate(lane_ids):
+            if lane_id is not None:
+                groups.setdefault(lane_id, []).append(i)
+        for lane_id, indices in groups.items():
+            s[indices], d[indices], lane_headings[indices] = self.lanes[
+                lane_id
+            ].frenet_frame.project(points[indices])
+
+        heading_error = np.full(n_point, np.nan)
+        if headings is not None:
+            heading_error = np.mod(np.asarray(headings) - lane_headings + np.pi, 2 * np.pi) - np.pi
+
+        return lane_ids, s, d, heading_error
+
+    def from_frenet(
+        self, lane_ids: list, s: np.ndarray, d: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """This function maps the Frenet coordinates along the centerlines of the lanes back to Cartesian coordinates.
+
+        Args:
+            lane_ids (list): The ids of the reference lanes.
+            s (np.ndarray): The arc lengths along the centerlines. The shape is (n,).
+            d (np.ndarray): The signed lateral offsets from the centerlines. The shape is (n,).
+
+        Returns:
+            points (np.ndarray): The Cartesian coordinates. The shape is (n, 2).
+            headings (np.ndarray): The headings of the centerlines at the arc lengths. The shape is (n,).
+        """
+        s = np.asarray(s, dtype=float).reshape(-1)
+        d = np.asarray(d, dtype=float).reshape(-1)
+        points = np.full((len(s), 2), np.nan)
+        headings = np.full(len(s), np.nan)
+
+        groups = dict()
+        for i, lane_id in enumerate(lane_ids):
+            groups.setdefault(lane_id, []).append(i)
+        for lane_id, indices in groups.items():
+            points[indices], headings[indices] = self.lanes[lane_id].frenet_frame.to_cartesian(
+                s[indices], d[indices]
+            )
+
+        return points, headings
+
+    def save(self, file_path: str):
+        """This function saves the map to a compiled binary file, which can be loaded by [load](#tactics2d.map.element.Map.load) much faster than parsing the original map file. The format is described in `MapFile`.
+
+        Args:
+            file_path (str): The path to the file.
+        """
+        from .map_file import MapFile
+
+        MapFile.save(self, file_path)
+
+    @staticmethod
+    def load(file_path: str) -> "Map":
+        """This function loads a map from a compiled binary file saved by [save](#tactics2d.map.element.Map.save). The file is memory-mapped, and the elements are created at the first access.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Returns:
+            The loaded map.
+        """
+        from .map_file import MapFile
+
+        return MapFile.load(file_path)
+
     def set_boundary(self, boundary: tuple):
-        """This function sets the boundary of the map.
+        """This function sets the boundary of the map manually. The boundary will not be updated by the elements added later until the map is reset.
 
         Args:
             boundary (tuple): The boundary of the map expressed in the form of (min_x, max_x, min_y, max_y).
@@ -260,3 +482,6 @@ class Map:
         self.regulations.clear()
         self.customs.clear()
         self._boundary = None
+        self._bounds = (float("inf"), float("-inf"), float("inf"), float("-inf"))
+        self._spatial_indexes.clear()
+        self._index_sources.clear()
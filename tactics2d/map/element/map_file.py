@@ -0,0 +1,568 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: map_file.py
+# @Description: This file implements a compiled binary file format for the map.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+import enum
+import importlib
+import json
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import LinearRing
+
+from .area import Area
+from .junction import Junction
+from .lane import Lane
+from .node import Node
+from .regulatory import Regulatory
+from .roadline import RoadLine
+
+_MAGIC = b"TACTICS2D-MAP\x00\x00\x01"
+_ALIGNMENT = 64
+
+
+class LazyElements(MutableMapping):
+    """This class implements a dictionary of map elements that are created at the first access.
+
+    The loaded elements are kept in the order of the file. The elements assigned later are stored as they are, the same as a plain dictionary.
+    """
+
+    def __init__(self, ids: list = None, factory: Callable = None):
+        """Initialize an instance for the class.
+
+        Args:
+            ids (list, optional): The ids of the elements that can be created.
+            factory (Callable, optional): The function to create the element from its index in `ids`.
+        """
+        self._index = {id_: i for i, id_ in enumerate(ids or [])}
+        self._factory = factory
+        self._elements = dict.fromkeys(ids or [])
+        self._pending = set(self._index)
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            self._elements[key] = self._factory(self._index[key])
+            self._pending.discard(key)
+        return self._elements[key]
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        self._elements[key] = value
+
+    def __delitem__(self, key):
+        self._pending.discard(key)
+        del self._elements[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._elements)
+
+    def __len__(self) -> int:
+        return len(self._elements)
+
+    def __contains__(self, key) -> bool:
+        return key in self._elements
+
+    def clear(self):
+        self._pending.clear()
+        self._elements.clear()
+
+    @property
+    def n_created(self) -> int:
+        return len(self._elements) - len(self._pending)
+
+
+def _encode(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {"__dict__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, enum.Enum):
+        cls = type(value)
+        return {"__enum__": f"{cls.__module__}:{cls.__qualname__}", "name": value.name}
+    if type(value).__module__.startswith("tactics2d.") and hasattr(value, "__dict__"):
+        cls = type(value)
+        return {"__object__": f"{cls.__module__}:{cls.__qualname__}", "state": _encode(vars(value))}
+
+    raise TypeError(f"Cannot save the attribute of type {type(value)} in the map file.")
+
+
+def _import_class(path: str) -> type:
+    module_name, class_name = path.split(":")
+    if not module_name.startswith("tactics2d."):
+        raise ValueError(f"Class {path} is not allowed in the map file.")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__tuple__" in value:
+        return tuple(_decode(item) for item in value["__tuple__"])
+    if "__set__" in value:
+        return set(_decode(item) for item in value["__set__"])
+    if "__dict__" in value:
+        return {_decode(k): _decode(v) for k, v in value["__dict__"]}
+    if "__enum__" in value:
+        return _import_class(value["__enum__"])[value["name"]]
+    if "__object__" in value:
+        instance = object.__new__(_import_class(value["__object__"]))
+        instance.__dict__.update(_decode(value["state"]))
+        return instance
+
+    return value
+
+
+def _ragged_range(starts: np.ndarray, lengths: np.ndarray, step: int = 1) -> np.ndarray:
+    # concatenate the ranges starts[i] + step * arange(lengths[i]) without a loop
+    lengths = np.asarray(lengths, dtype=np.int64)
+    group_starts = np.cumsum(lengths) - lengths
+    steps = np.arange(int(np.sum(lengths))) - np.repeat(group_starts, lengths)
+    return np.repeat(np.asarray(starts, dtype=np.int64), lengths) + step * steps
+
+
+class MapFile:
+    """This class implements a compiled binary file format for the map, which is much faster to load than parsing the original map files.
+
+    The file starts with a JSON header, followed by the arrays aligned to 64 bytes:
+
+    - The coordinates of the nodes, roadlines, and lane sides are stored in contiguous arrays with offset tables. The areas are stored as WKB blobs with an offset table.
+    - The other attributes of the elements are stored by columns. A column of floats or booleans is stored as a typed array, and the other columns are stored in the header.
+    - The lane relationships are stored as an adjacency in the compressed sparse row (CSR) format.
+
+    When the file is loaded, it is memory-mapped and the elements are created at the first access. The spatial indexes are built from the arrays in bulk without creating the elements.
+
+    Example:
+        ```python
+        map_ = parser.parse(...)
+        map_.save("map.t2dmap")
+        map_ = Map.load("map.t2dmap")
+        ```
+    """
+
+    _geometry_attributes = {
+        "node": {"x", "y"},
+        "roadline": {"geometry"},
+        "lane": {"left_side", "right_side", "geometry", "_centerline", "_frenet_frame"},
+        "area": {"geometry"},
+        "regulatory": set(),
+        "junction": set(),
+    }
+    _relationships = ["predecessors", "successors", "left_neighbors", "right_neighbors"]
+
+    @staticmethod
+    def _pack_lines(geometries: list) -> Dict[str, np.ndarray]:
+        geometries = np.array(geometries, dtype=object)
+        is_valid = ~shapely.is_missing(geometries)
+        include_z = bool(np.any(shapely.has_z(geometries[is_valid])))
+        coords = shapely.get_coordinates(geometries, include_z=include_z)
+        offsets = np.zeros(len(geometries) + 1, dtype=np.int64)
+        offsets[1:][is_valid] = shapely.get_num_coordinates(geometries[is_valid])
+        np.cumsum(offsets, out=offsets)
+        return {"coords": coords, "offsets": offsets, "valid": is_valid.astype(np.uint8)}
+
+    @staticmethod
+    def _pack_wkb(geometries: list) -> Dict[str, np.ndarray]:
+        blobs = shapely.to_wkb(np.array(geometries, dtype=object))
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        offsets[1:] = [0 if blob is None else len(blob) for blob in blobs]
+        np.cumsum(offsets, out=offsets)
+        data = np.frombuffer(b"".join(blob for blob in blobs if blob is not None), dtype=np.uint8)
+        return {"wkb": data, "offsets": offsets}
+
+    @staticmethod
+    def _pack_columns(elements: list, excluded: set) -> Tuple[dict, Dict[str, np.ndarray]]:
+        names = []
+        for element in elements:
+            for name in vars(element):
+                if name not in excluded and name not in names:
+                    names.append(name)
+
+        columns = dict()
+        arrays = dict()
+        for name in names:
+            values = [vars(element).get(name) for element in elements]
+            present = [value is not None for value in values]
+            types = {type(value) for value in values if value is not None}
+            if types == {float}:
+                arrays[f"{name}/values"] = np.array(
+                    [value if value is not None else 0 for value in values], dtype=float
+                )
+                arrays[f"{name}/present"] = np.array(present, dtype=np.uint8)
+                columns[name] = {"kind": "float"}
+            elif types == {bool}:
+                arrays[f"{name}/values"] = np.array([bool(value) for value in values], np.uint8)
+                arrays[f"{name}/present"] = np.array(present, dtype=np.uint8)
+                columns[name] = {"kind": "bool"}
+            else:
+                # every value is kept as a JSON string, so that an element is decoded on its own
+                blobs = [json.dumps(_encode(value)).encode("utf-8") for value in values]
+                offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+                arrays[f"{name}/json"] = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+                arrays[f"{name}/offsets"] = offsets
+                columns[name] = {"kind": "json"}
+
+        return columns, arrays
+
+    @staticmethod
+    def save(map_, file_path: str):
+        """This function saves a map to a compiled binary file.
+
+        Args:
+            map_ (Map): The map to save.
+            file_path (str): The path to the file.
+
+        Raises:
+            TypeError: If an attribute of an element cannot be saved.
+        """
+        groups = {
+            "node": list(map_.nodes.values()),
+            "roadline": list(map_.roadlines.values()),
+            "lane": list(map_.lanes.values()),
+            "area": list(map_.areas.values()),
+            "regulatory": list(map_.regulations.values()),
+            "junction": list(map_.junctions.values()),
+        }
+        header = {
+            "name": map_.name,
+            "scenario_type": map_.scenario_type,
+            "country": map_.country,
+            "boundary": _encode(map_._boundary),
+            "bounds": list(map_._bounds),
+            "elements": dict(),
+        }
+        arrays = dict()
+
+        for element_type, elements in groups.items():
+            columns, column_arrays = MapFile._pack_columns(
+                elements, MapFile._geometry_attributes[element_type] | {"id_"}
+            )
+            header["elements"][element_type] = {
+                "ids": [_encode(element.id_) for element in elements],
+                "columns": columns,
+            }
+            for name, array in column_arrays.items():
+                arrays[f"{element_type}/column/{name}"] = array
+
+        arrays["node/coords"] = np.array(
+            [(node.x, node.y) for node in groups["node"]], dtype=float
+        ).reshape(-1, 2)
+        for name, array in MapFile._pack_lines(
+            [line.geometry for line in groups["roadline"]]
+        ).items():
+            arrays[f"roadline/{name}"] = array
+        for side in ["left_side", "right_side"]:
+            lines = [getattr(lane, side) for lane in groups["lane"]]
+            for name, array in MapFile._pack_lines(lines).items():
+                arrays[f"lane/{side}/{name}"] = array
+        for name, array in MapFile._pack_wkb([area.geometry for area in groups["area"]]).items():
+            arrays[f"area/{name}"] = array
+
+        # The lane relationships are indices to the lane ids followed by the ids out of the map.
+        lane_index = {lane.id_: i for i, lane in enumerate(groups["lane"])}
+        external_ids = []
+        for relationship in MapFile._relationships:
+            indptr = np.zeros(len(groups["lane"]) + 1, dtype=np.int64)
+            indices = []
+            for i, lane in enumerate(groups["lane"]):
+                related = getattr(lane, relationship)
+                indptr[i + 1] = indptr[i] + len(related)
+                for id_ in related:
+                    if id_ not in lane_index:
+                        lane_index[id_] = len(lane_index)
+                        external_ids.append(id_)
+                    indices.append(lane_index[id_])
+            arrays[f"lane/{relationship}/indptr"] = indptr
+            arrays[f"lane/{relationship}/indices"] = np.array(indices, dtype=np.int64)
+        header["elements"]["lane"]["external_ids"] = [_encode(id_) for id_ in external_ids]
+
+        # lay out the arrays after the header
+        header["arrays"] = dict()
+        offset = 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            arrays[name] = array
+            header["arrays"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = len(_MAGIC) + 8 + len(header_bytes)
+        data_start = -(-data_start // _ALIGNMENT) * _ALIGNMENT
+
+        with open(file_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            f.write(b"\x00" * (data_start - f.tell()))
+            for name, array in arrays.items():
+                f.write(array.tobytes())
+                f.write(b"\x00" * (-array.nbytes % _ALIGNMENT))
+
+    @staticmethod
+    def _read_header(file_path: str) -> Tuple[dict, int]:
+        with open(file_path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{file_path} is not a compiled map file.")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_size).decode("utf-8"))
+
+        data_start = len(_MAGIC) + 8 + header_size
+        return header, -(-data_start // _ALIGNMENT) * _ALIGNMENT
+
+    @staticmethod
+    def load(file_path: str):
+        """This function loads a map from a compiled binary file. The file is memory-mapped, and the elements are created at the first access.
+
+        Args:
+            file_path (str): The path to the file.
+
+        Returns:
+            map_ (Map): The loaded map.
+
+        Raises:
+            ValueError: If the file is not a compiled map file.
+        """
+        from .map import Map, MapElement
+
+        header, data_start = MapFile._read_header(file_path)
+        buffer = np.memmap(file_path, dtype=np.uint8, mode="r")
+
+        def get_array(name: str) -> np.ndarray:
+            info = header["arrays"][name]
+            dtype = np.dtype(info["dtype"])
+            count = int(np.prod(info["shape"]))
+            if count == 0:
+                return np.empty(info["shape"], dtype=dtype)
+            array = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=data_start + info["offset"]
+            )
+            return array.reshape(info["shape"])
+
+        map_ = Map(header["name"], header["scenario_type"], header["country"])
+        map_._boundary = _decode(header["boundary"])
+        map_._bounds = tuple(header["bounds"])
+
+        element_ids = dict()
+        for element_type, group in header["elements"].items():
+            element_ids[element_type] = [_decode(id_) for id_ in group["ids"]]
+
+        def get_columns(element_type: str) -> Callable:
+            columns = dict()
+            ids = element_ids[element_type]
+            for name, column in header["elements"][element_type]["columns"].items():
+                prefix = f"{element_type}/column/{name}"
+                if column["kind"] == "json":
+                    columns[name] = (
+                        "json",
+                        (get_array(f"{prefix}/json"), get_array(f"{prefix}/offsets")),
+                    )
+                else:
+                    columns[name] = (
+                        column["kind"],
+                        (get_array(f"{prefix}/values"), get_array(f"{prefix}/present")),
+                    )
+
+            def get_state(i: int) -> dict:
+                state = {"id_": ids[i]}
+                for name, (kind, values) in columns.items():
+                    if kind == "json":
+                        blob = values[0][values[1][i] : values[1][i + 1]]
+                        state[name] = _decode(json.loads(blob.tobytes()))
+                    elif not values[1][i]:
+                        state[name] = None
+                    elif kind == "float":
+                        state[name] = float(values[0][i])
+                    else:
+                        state[name] = bool(values[0][i])
+                return state
+
+            return get_state
+
+        def get_lines(prefix: str) -> Callable:
+            coords = get_array(f"{prefix}/coords")
+            offsets = get_array(f"{prefix}/offsets")
+            is_valid = get_array(f"{prefix}/valid")
+
+            def get_line(i: int):
+                if not is_valid[i]:
+                    return None
+                return shapely.linestrings(np.array(coords[offsets[i] : offsets[i + 1]]))
+
+            return get_line
+
+        def create(cls: type, state: dict):
+            element = object.__new__(cls)
+            element.__dict__.update(state)
+            return element
+
+        # nodes
+        node_coords = get_array("node/coords")
+        node_state = get_columns("node")
+
+        def create_node(i: int) -> Node:
+            x, y = node_coords[i].tolist()
+            return create(Node, {**node_state(i), "x": x, "y": y})
+
+        # roadlines
+        roadline_state = get_columns("roadline")
+        roadline_line = get_lines("roadline")
+
+        def create_roadline(i: int) -> RoadLine:
+            return create(RoadLine, {**roadline_state(i), "geometry": roadline_line(i)})
+
+        # lanes
+        lane_state = get_columns("lane")
+        left_line = get_lines("lane/left_side")
+        right_line = get_lines("lane/right_side")
+        related_ids = element_ids["lane"] + [
+            _decode(id_) for id_ in header["elements"]["lane"]["external_ids"]
+        ]
+        relationships = {
+            name: (get_array(f"lane/{name}/indptr"), get_array(f"lane/{name}/indices"))
+            for name in MapFile._relationships
+        }
+
+        def create_lane(i: int) -> Lane:
+            state = lane_state(i)
+            for name, (indptr, indices) in relationships.items():
+                state[name] = set(related_ids[j] for j in indices[indptr[i] : indptr[i + 1]])
+            left_side, right_side = left_line(i), right_line(i)
+            geometry = None
+            if not None in [left_side, right_side]:
+                geometry = LinearRing(
+                    np.concatenate(
+                        [
+                            shapely.get_coordinates(left_side),
+                            shapely.get_coordinates(right_side)[::-1],
+                        ]
+                    )
+                )
+            state.update(
+                left_side=left_side,
+                right_side=right_side,
+                geometry=geometry,
+                _centerline=None,
+                _frenet_frame=None,
+            )
+            return create(Lane, state)
+
+        # areas
+        area_state = get_columns("area")
+        area_wkb = get_array("area/wkb")
+        area_offsets = get_array("area/offsets")
+
+        def get_area_geometry(i: int):
+            if area_offsets[i] == area_offsets[i + 1]:
+                return None
+            return shapely.from_wkb(area_wkb[area_offsets[i] : area_offsets[i + 1]].tobytes())
+
+        def create_area(i: int) -> Area:
+            return create(Area, {**area_state(i), "geometry": get_area_geometry(i)})
+
+        regulatory_state = get_columns("regulatory")
+        junction_state = get_columns("junction")
+
+        map_.nodes = LazyElements(element_ids["node"], create_node)
+        map_.roadlines = LazyElements(element_ids["roadline"], create_roadline)
+        map_.lanes = LazyElements(element_ids["lane"], create_lane)
+        map_.areas = LazyElements(element_ids["area"], create_area)
+        map_.regulations = LazyElements(
+            element_ids["regulatory"], lambda i: create(Regulatory, regulatory_state(i))
+        )
+        map_.junctions = LazyElements(
+            element_ids["junction"], lambda i: create(Junction, junction_state(i))
+        )
+
+        for element_type, map_element in [
+            ("node", MapElement.NODE),
+            ("roadline", MapElement.ROADLINE),
+            ("lane", MapElement.LANE),
+            ("area", MapElement.AREA),
+            ("regulatory", MapElement.REGULATORY),
+            ("junction", MapElement.JUNCTION),
+        ]:
+            for id_ in element_ids[element_type]:
+                map_.ids[id_] = map_element
+
+        # the spatial indexes are built from the arrays without creating the elements
+        def index_nodes() -> Tuple[list, list]:
+            return element_ids["node"], shapely.points(np.array(node_coords))
+
+        def index_lines(prefix: str, ids: list) -> Tuple[list, np.ndarray]:
+            coords = np.array(get_array(f"{prefix}/coords"))
+            offsets = get_array(f"{prefix}/offsets")
+            is_valid = get_array(f"{prefix}/valid").astype(bool)
+            lengths = np.diff(offsets)
+            geometries = np.full(len(ids), None, dtype=object)
+            geometries[is_valid] = shapely.linestrings(
+                coords, indices=np.repeat(np.arange(int(is_valid.sum())), lengths[is_valid])
+            )
+            return ids, geometries
+
+        def index_roadlines() -> Tuple[list, np.ndarray]:
+            return index_lines("roadline", element_ids["roadline"])
+
+        def index_lanes() -> Tuple[list, np.ndarray]:
+            # The ring of a lane is its left side followed by the reversed right side. The rings
+            # are gathered from the coordinate arrays with index arithmetic.
+            sides = []
+            for prefix in ["lane/left_side", "lane/right_side"]:
+                offsets = get_array(f"{prefix}/offsets")
+                sides.append((get_array(f"{prefix}/coords"), offsets[:-1], np.diff(offsets)))
+            is_valid = get_array("lane/left_side/valid") & get_array("lane/right_side/valid")
+            is_valid = is_valid.astype(bool)
+            ids = [id_ for id_, valid in zip(element_ids["lane"], is_valid) if valid]
+
+            (left_coords, left_starts, left_lengths), (
+                right_coords,
+                right_starts,
+                right_lengths,
+            ) = [(coords, starts[is_valid], lengths[is_valid]) for coords, starts, lengths in sides]
+            ring_lengths = left_lengths + right_lengths
+            ring_starts = np.cumsum(ring_lengths) - ring_lengths
+            ring_coords = np.empty((int(np.sum(ring_lengths)), 2))
+            ring_coords[_ragged_range(ring_starts, left_lengths)] = left_coords[
+                _ragged_range(left_starts, left_lengths), :2
+            ]
+            ring_coords[_ragged_range(ring_starts + left_lengths, right_lengths)] = right_coords[
+                _ragged_range(right_starts + right_lengths - 1, right_lengths, -1), :2
+            ]
+            rings = shapely.linearrings(
+                ring_coords, indices=np.repeat(np.arange(len(ids)), ring_lengths)
+            )
+            return ids, shapely.polygons(rings)
+
+        def index_areas() -> Tuple[list, np.ndarray]:
+            blobs = [
+                area_wkb[area_offsets[i] : area_offsets[i + 1]].tobytes()
+                for i in range(len(element_ids["area"]))
+            ]
+            return element_ids["area"], shapely.from_wkb(blobs)
+
+        map_._index_sources = {
+            "node": index_nodes,
+            "roadline": index_roadlines,
+            "lane": index_lanes,
+            "area": index_areas,
+        }
+
+        return map_
@@ -0,0 +1,286 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: tiled_map.py
+# @Description: This file defines a map that streams its elements from spatial tiles on disk.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+from shapely.geometry import box
+
+from .map import Map
+
+
+class TiledMap(Map):
+    """This class implements a map whose elements are partitioned into square tiles stored on disk. Only the tiles around the active agents are kept in memory, so that a region-scale map can be used with bounded memory.
+
+    A tiled map is created by [build](#tactics2d.map.element.TiledMap.build) from a complete map. Every node belongs to the tile containing it. Every roadline, lane, and area is stored in all the tiles it overlaps, so that an element crossing the tile borders, such as a long lane of a highway, is loaded as long as any of its tiles is loaded. Every tile is saved in the compiled binary map format. The regulations, junctions, and lanes without geometry have no location, so they are always loaded. [update](#tactics2d.map.element.TiledMap.update) loads the tiles around the given positions and unloads the least recently used tiles beyond the cache size. The accessors and spatial queries of `Map` work on the loaded elements.
+
+    Example:
+        ```python
+        TiledMap.build(map_, "./tiles", tile_size=200)
+        tiled_map = TiledMap("./tiles", cache_size=16)
+        tiled_map.update(agent_positions, radius=100)
+        lane_ids = tiled_map.locate(agent_positions)
+        ```
+
+    Attributes:
+        directory (str): The directory of the tiles.
+        tile_size (float): The side length of the tiles.
+        cache_size (int): The maximum number of loaded tiles. The tiles required by the latest update are kept even if they exceed the cache size.
+        tiles (List[Tuple[int, int]]): The keys of all the tiles. The key of a tile is its column and row index. This attribute is **read-only**.
+        loaded_tiles (List[Tuple[int, int]]): The keys of the loaded tiles from the least to the most recently used. This attribute is **read-only**.
+    """
+
+    _index_file = "tiles.json"
+
+    def __init__(self, directory: str, cache_size: int = 16):
+        """Initialize an instance for the class.
+
+        Args:
+            directory (str): The directory of the tiles created by [build](#tactics2d.map.element.TiledMap.build).
+            cache_size (int, optional): The maximum number of loaded tiles.
+        """
+        with open(os.path.join(directory, self._index_file)) as f:
+            index = json.load(f)
+
+        super().__init__(index["name"], index["scenario_type"], index["country"])
+        self.directory = directory
+        self.tile_size = index["tile_size"]
+        self.cache_size = cache_size
+        self._tile_files = {tuple(key): file_name for *key, file_name in index["tiles"]}
+        self._global_file = index["global"]
+        self._tiled_boundary = tuple(index["boundary"])
+        self._loaded = OrderedDict()
+        # the number of loaded tiles holding every element, keyed by the element type and id
+        self._ref_counts = dict()
+
+        self._load_global()
+
+    @property
+    def tiles(self) -> List[Tuple[int, int]]:
+        return list(self._tile_files)
+
+    @property
+    def loaded_tiles(self) -> List[Tuple[int, int]]:
+        return list(self._loaded)
+
+    @staticmethod
+    def _get_key(x: float, y: float, tile_size: float) -> Tuple[int, int]:
+        return (math.floor(x / tile_size), math.floor(y / tile_size))
+
+    @staticmethod
+    def build(map_: Map, directory: str, tile_size: float = 200.0) -> List[Tuple[int, int]]:
+        """This function partitions a map into tiles and saves them to a directory.
+
+        Args:
+            map_ (Map): The complete map.
+            directory (str): The directory to save the tiles. It is created if it does not exist.
+            tile_size (float, optional): The side length of the tiles.
+
+        Returns:
+            The keys of the created tiles.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        tiles = dict()
+
+        def get_tile(key: Tuple[int, int]) -> Map:
+            if key not in tiles:
+                tiles[key] = Map(map_.name, map_.scenario_type, map_.country)
+            return tiles[key]
+
+        def get_tiles(geometry) -> List[Map]:
+            # the tiles overlapping the bounding box are filtered by the geometry itself
+            min_x, min_y, max_x, max_y = geometry.bounds
+            i_min, j_min = TiledMap._get_key(min_x, min_y, tile_size)
+            i_max = max(math.ceil(max_x / tile_size) - 1, i_min)
+            j_max = max(math.ceil(max_y / tile_size) - 1, j_min)
+            if i_min == i_max and j_min == j_max:
+                return [get_tile((i_min, j_min))]
+
+            return [
+                get_tile((i, j))
+                for i in range(i_min, i_max + 1)
+                for j in range(j_min, j_max + 1)
+                if geometry.intersects(
+                    box(i * tile_size, j * tile_size, (i + 1) * tile_size, (j + 1) * tile_size)
+                )
+            ]
+
+        for node in map_.nodes.values():
+            get_tile(TiledMap._get_key(node.x, node.y, tile_size)).add_node(node)
+        for roadline in map_.roadlines.values():
+            for tile in get_tiles(roadline.geometry):
+                tile.add_roadline(roadline)
+        global_map = Map(map_.name, map_.scenario_type, map_.country)
+        for lane in map_.lanes.values():
+            if lane.geometry is None:
+                global_map.add_lane(lane)
+            else:
+                for tile in get_tiles(lane.geometry):
+                    tile.add_lane(lane)
+        for area in map_.areas.values():
+            for tile in get_tiles(area.geometry):
+                tile.add_area(area)
+
+        for regulatory in map_.regulations.values():
+            global_map.add_regulatory(regulatory)
+        for junction in map_.junctions.values():
+            global_map.add_junction(junction)
+        global_map.save(os.path.join(directory, "global.t2dmap"))
+
+        index_tiles = []
+        for (i, j), tile in tiles.items():
+            file_name = f"tile_{i}_{j}.t2dmap"
+            tile.save(os.path.join(directory, file_name))
+            index_tiles.append([i, j, file_name])
+
+        index = {
+            "name": map_.name,
+            "scenario_type": map_.scenario_type,
+            "country": map_.country,
+            "boundary": [float(value) for value in map_.boundary],
+            "tile_size": tile_size,
+            "global": "global.t2dmap",
+            "tiles": index_tiles,
+        }
+        with open(os.path.join(directory, TiledMap._index_file), "w") as f:
+            json.dump(index, f)
+
+        return list(tiles)
+
+    def _load_global(self):
+        global_map = Map.load(os.path.join(self.directory, self._global_file))
+        for lane in global_map.lanes.values():
+            self.add_lane(lane)
+        for regulatory in global_map.regulations.values():
+            self.add_regulatory(regulatory)
+        for junction in global_map.junctions.values():
+            self.add_junction(junction)
+        self.set_boundary(self._tiled_boundary)
+
+    def load_tile(self, key: Tuple[int, int]):
+        """This function loads a tile and adds its elements to the map. If the tile is loaded, it is marked as the most recently used.
+
+        Args:
+            key (Tuple[int, int]): The key of the tile.
+
+        Raises:
+            KeyError: If the tile does not exist.
+        """
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return
+        if key not in self._tile_files:
+            raise KeyError(f"Tile {key} does not exist.")
+
+        tile = Map.load(os.path.join(self.directory, self._tile_files[key]))
+        # an element shared with a loaded tile is only added once
+        for element_type, elements, add in [
+            ("node", tile.nodes, self.add_node),
+            ("roadline", tile.roadlines, self.add_roadline),
+            ("lane", tile.lanes, self.add_lane),
+            ("area", tile.areas, self.add_area),
+        ]:
+            for id_, element in elements.items():
+                count = self._ref_counts.get((element_type, id_), 0)
+                if count == 0:
+                    add(element)
+                self._ref_counts[(element_type, id_)] = count + 1
+
+        self._loaded[key] = {
+            "node": list(tile.nodes),
+            "roadline": list(tile.roadlines),
+            "lane": list(tile.lanes),
+            "area": list(tile.areas),
+        }
+
+    def unload_tile(self, key: Tuple[int, int]):
+        """This function removes the elements of a tile from the map.
+
+        Args:
+            key (Tuple[int, int]): The key of the tile. Nothing happens if the tile is not loaded.
+        """
+        tile_ids = self._loaded.pop(key, None)
+        if tile_ids is None:
+            return
+
+        elements = {
+            "node": self.nodes,
+            "roadline": self.roadlines,
+            "lane": self.lanes,
+            "area": self.areas,
+        }
+        for element_type, ids in tile_ids.items():
+            removed = False
+            for id_ in ids:
+                # an element shared with another loaded tile is kept
+                count = self._ref_counts.pop((element_type, id_), 1) - 1
+                if count > 0:
+                    self._ref_counts[(element_type, id_)] = count
+                    continue
+                elements[element_type].pop(id_, None)
+                self.ids.pop(id_, None)
+                removed = True
+            if removed:
+                self._drop_spatial_index(element_type)
+
+    def get_tiles_around(self, positions: np.ndarray, radius: float = 0.0) -> List[Tuple[int, int]]:
+        """This function finds the existing tiles within a radius of the positions.
+
+        Args:
+            positions (np.ndarray): A position with the shape of (2,) or a batch of positions with the shape of (n, 2).
+            radius (float, optional): The radius around the positions.
+
+        Returns:
+            The keys of the tiles overlapping with the square windows around the positions.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        lower = np.floor((positions - radius) / self.tile_size).astype(int)
+        upper = np.floor((positions + radius) / self.tile_size).astype(int)
+
+        keys = []
+        for (i_min, j_min), (i_max, j_max) in zip(lower.tolist(), upper.tolist()):
+            for i in range(i_min, i_max + 1):
+                for j in range(j_min, j_max + 1):
+                    if (i, j) in self._tile_files and (i, j) not in keys:
+                        keys.append((i, j))
+
+        return keys
+
+    def update(self, positions: np.ndarray, radius: float = 0.0) -> List[Tuple[int, int]]:
+        """This function loads the tiles around the positions, and then unloads the least recently used tiles until the number of loaded tiles is within the cache size.
+
+        Args:
+            positions (np.ndarray): A position with the shape of (2,) or a batch of positions with the shape of (n, 2), such as the locations of the active agents.
+            radius (float, optional): The radius around the positions to load, such as the sensor range.
+
+        Returns:
+            The keys of the tiles required by the positions.
+        """
+        required = self.get_tiles_around(positions, radius)
+        for key in required:
+            self.load_tile(key)
+
+        for key in list(self._loaded):
+            if len(self._loaded) <= self.cache_size:
+                break
+            if key not in required:
+                self.unload_tile(key)
+
+        return required
+
+    def reset(self):
+        """This function unloads all the tiles. The elements without location are kept."""
+        super().reset()
+        self.junctions.clear()
+        self._loaded.clear()
+        self._ref_counts.clear()
+        self._load_global()
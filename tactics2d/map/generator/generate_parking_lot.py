@@ -265,7 +265,6 @@ class ParkingLotGenerator:
         while not valid_obstacles:
             # get the target area
             target_area, target_heading = self._get_target_area()
-            map_.areas = {target_area.id_: target_area}
 
             back_wall = self._get_back_wall()
 
@@ -431,7 +430,9 @@ class ParkingLotGenerator:
                 target_area = Area(
                     id_=0, geometry=target_shape, subtype="target_area", color=self._target_color
                 )
-                map_.add_area(target_area)
+
+        # store the final target area in map
+        map_.add_area(target_area)
 
         xmin = np.floor(min(start_state.x, target_x) - self._margin)
         xmax = np.ceil(max(start_state.x, target_x) + self._margin)
@@ -136,20 +136,18 @@ class RacingTrackGenerator:
         checkpoints: List[np.ndarray],
         control_points: List[np.ndarray],
     ) -> LineString:
-        points = []
-        # get the center line by Bezier curve generator
-        for i in range(checkpoints.shape[1]):
-            new_points = self.bezier_generator.get_curve(
-                np.array(
-                    [
-                        control_points[start_id - i - 1][1],
-                        checkpoints[:, start_id - i - 1],
-                        control_points[start_id - i - 1][0],
-                    ]
-                ),
-                self.bezier_interpolation,
-            )
-            points.extend(new_points)
+        # get the center line by Bezier curve generator, all the curves are interpolated in a batch
+        control_points = np.array(control_points)
+        indices = start_id - np.arange(checkpoints.shape[1]) - 1
+        curve_control_points = np.stack(
+            [control_points[indices, 1], checkpoints[:, indices].T, control_points[indices, 0]],
+            axis=1,
+        )
+        points = list(
+            self.bezier_generator.get_curve(
+                curve_control_points, self.bezier_interpolation
+            ).reshape(-1, 2)
+        )
 
         # create the new map by the centerline
         center_line = LineString([start_point] + points + [start_point])
@@ -221,24 +219,27 @@ class RacingTrackGenerator:
         # generate tiles
         distance = center_line.length
         n_tile = int(np.ceil(distance / self._tile_length))
-        map_.lanes = self._get_tiles(n_tile, center_line)
+        for tile in self._get_tiles(n_tile, center_line).values():
+            map_.add_lane(tile)
 
-        map_.roadlines = {
-            "start_line": RoadLine(
-                id_="0",
+        map_.add_roadline(
+            RoadLine(
+                id_="start_line",
                 geometry=LineString(map_.lanes["0000"].ends),
                 type_="line_thin",
                 subtype="solid",
                 color=(255, 0, 0),
-            ),
-            "end_line": RoadLine(
-                id_="1",
+            )
+        )
+        map_.add_roadline(
+            RoadLine(
+                id_="end_line",
                 geometry=LineString(map_.lanes["0000"].starts),
                 type_="solid",
                 color=(0, 255, 0),
-            ),
-            "center_line": RoadLine(id_="2", geometry=center_line),
-        }
+            )
+        )
+        map_.add_roadline(RoadLine(id_="center_line", geometry=center_line))
 
         logging.info(f"The track is {int(distance)}m long and has {n_tile} tiles.")
 
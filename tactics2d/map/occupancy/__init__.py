@@ -0,0 +1,11 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: __init__.py
+# @Description: Initialize the map occupancy module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+from .occupancy_grid import OccupancyGrid
+
+__all__ = ["OccupancyGrid"]
@@ -0,0 +1,200 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: occupancy_grid.py
+# @Description: This file implements an occupancy grid and a distance field of the obstacles in a map.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+from typing import List
+
+import numpy as np
+import shapely
+from scipy.ndimage import distance_transform_edt
+
+from tactics2d.map.element import Area, Map
+
+
+class OccupancyGrid:
+    """This class implements an occupancy grid of the obstacles in a map and the distance field derived from it.
+
+    The map is rasterized when the grid is reset. A cell is occupied if its center is in an obstacle or an obstacle boundary crosses it, so that the thin obstacles are not missed. The Euclidean distance transform of the grid is computed at the same time, which gives the distance from every cell center to the nearest occupied cell center. After that, the distance from any point to the nearest obstacle is looked up in O(1) by bilinear interpolation, instead of querying the geometries.
+
+    The distance field is accurate up to about the resolution. It fits the consumers who call it many times and do not need the exact value, such as the collision check in planning and the reward shaping. The region out of the grid is regarded as occupied, so the distances are also bounded by the distance to the edge of the grid.
+
+    Attributes:
+        resolution (float): The size of the cells. The unit is meter.
+        include_lanes (bool): Whether the region out of the lanes is regarded as occupied. It only takes effect on the maps with lanes.
+        origin (np.ndarray): The lower left corner of the grid in the form of (x, y). The shape is (2,). This attribute is **read-only**.
+        shape (Tuple[int, int]): The number of rows and columns of the grid. The rows go along the y axis. This attribute is **read-only**.
+        occupied (np.ndarray): Whether every cell is occupied. The shape is (n_row, n_column). This attribute is **read-only**.
+        distances (np.ndarray): The distance from every cell center to the nearest occupied cell center. The shape is (n_row, n_column). This attribute is **read-only**.
+    """
+
+    def __init__(self, resolution: float = 0.1, include_lanes: bool = False):
+        """Initialize an instance for the class.
+
+        Args:
+            resolution (float, optional): The size of the cells. The unit is meter.
+            include_lanes (bool, optional): Whether the region out of the lanes is regarded as occupied.
+
+        Raises:
+            ValueError: If the resolution is not positive.
+        """
+        if resolution <= 0:
+            raise ValueError("The resolution should be positive.")
+
+        self.resolution = resolution
+        self.include_lanes = include_lanes
+
+        self._origin = None
+        self._occupied = None
+        self._distances = None
+
+    @property
+    def origin(self) -> np.ndarray:
+        return self._origin
+
+    @property
+    def shape(self) -> tuple:
+        return None if self._occupied is None else self._occupied.shape
+
+    @property
+    def occupied(self) -> np.ndarray:
+        return self._occupied
+
+    @property
+    def distances(self) -> np.ndarray:
+        # the field is stored with a ring of zeros out of the grid
+        return None if self._distances is None else self._distances[1:-1, 1:-1]
+
+    def _get_window(self, geometry):
+        # the rows and columns of the cells overlapping the bounding box of a geometry
+        n_y, n_x = self._occupied.shape
+        bounds = np.asarray(geometry.bounds)
+        j0, i0 = np.clip(np.floor((bounds[:2] - self._origin) / self.resolution), 0, (n_x, n_y))
+        j1, i1 = np.clip(np.ceil((bounds[2:] - self._origin) / self.resolution), 0, (n_x, n_y))
+
+        return slice(int(i0), int(i1)), slice(int(j0), int(j1))
+
+    def _get_cell_centers(self, rows: slice, columns: slice):
+        xs = self._origin[0] + (np.arange(columns.start, columns.stop) + 0.5) * self.resolution
+        ys = self._origin[1] + (np.arange(rows.start, rows.stop) + 0.5) * self.resolution
+
+        return np.meshgrid(xs, ys)
+
+    def _fill(self, geometry) -> None:
+        rows, columns = self._get_window(geometry)
+        if rows.start < rows.stop and columns.start < columns.stop:
+            x, y = self._get_cell_centers(rows, columns)
+            self._occupied[rows, columns] |= shapely.contains_xy(geometry, x, y)
+
+        points = shapely.get_coordinates(shapely.segmentize(geometry.boundary, self.resolution / 2))
+        self._occupied[self.get_cells(points, clip=False)[1]] = True
+
+    def _fill_out_of_lanes(self, lanes: list) -> None:
+        inside = np.zeros(self._occupied.shape, dtype=bool)
+        for lane in lanes:
+            polygon = shapely.Polygon(lane.geometry)
+            rows, columns = self._get_window(polygon)
+            if rows.start < rows.stop and columns.start < columns.stop:
+                x, y = self._get_cell_centers(rows, columns)
+                inside[rows, columns] |= shapely.intersects_xy(polygon, x, y)
+
+        self._occupied |= ~inside
+
+    def reset(self, map_: Map, obstacles: List[Area] = None, boundary: tuple = None):
+        """This function rasterizes the obstacles in a map and computes the distance field. It should be called when the map changes.
+
+        Args:
+            map_ (Map): The map to rasterize.
+            obstacles (List[Area], optional): The obstacles in the map. Defaults to None, which uses the areas whose type is "obstacle".
+            boundary (tuple, optional): The region covered by the grid in the form of (min_x, max_x, min_y, max_y). Defaults to None, which uses the boundary of the map.
+        """
+        if obstacles is None:
+            obstacles = [area for area in map_.areas.values() if area.type_ == "obstacle"]
+
+        min_x, max_x, min_y, max_y = map_.boundary if boundary is None else boundary
+        n_x = max(int(np.ceil((max_x - min_x) / self.resolution)), 1)
+        n_y = max(int(np.ceil((max_y - min_y) / self.resolution)), 1)
+        self._origin = np.array([min_x, min_y], dtype=float)
+        self._occupied = np.zeros((n_y, n_x), dtype=bool)
+
+        for obstacle in obstacles:
+            self._fill(obstacle.geometry)
+
+        lanes = [lane for lane in map_.lanes.values() if lane.geometry is not None]
+        if self.include_lanes and len(lanes) > 0:
+            self._fill_out_of_lanes(lanes)
+
+        # The grid is padded by a ring of occupied cells for the region out of it. The ring keeps
+        # zero in the distance field, so that the points out of the grid get zero after clipping,
+        # and the four neighbors of every point are gathered from the flat array.
+        occupied = np.pad(self._occupied, 1, constant_values=True)
+        self._distances = distance_transform_edt(~occupied) * self.resolution
+        self._flat_distances = self._distances.ravel()
+
+    def get_cells(self, points: np.ndarray, clip: bool = True) -> tuple:
+        """This function gets the cells containing the points.
+
+        Args:
+            points (np.ndarray): The points. The shape is (..., 2).
+            clip (bool, optional): Whether to clip the cells of the points out of the grid to the nearest cells in the grid. If it is False, the points out of the grid are dropped.
+
+        Returns:
+            inside (np.ndarray): Whether every point is in the grid. The shape is (...).
+            cells (Tuple[np.ndarray, np.ndarray]): The rows and columns of the cells, which can index the grid directly. The shape of both is (...) if clip is True, otherwise (m,) for the m points in the grid.
+        """
+        if self._occupied is None:
+            raise RuntimeError("The occupancy grid should be reset with a map before the query.")
+
+        points = np.asarray(points, dtype=float)
+        n_y, n_x = self._occupied.shape
+        columns = np.floor((points[..., 0] - self._origin[0]) / self.resolution).astype(int)
+        rows = np.floor((points[..., 1] - self._origin[1]) / self.resolution).astype(int)
+        inside = (columns >= 0) & (columns < n_x) & (rows >= 0) & (rows < n_y)
+
+        if clip:
+            return inside, (np.clip(rows, 0, n_y - 1), np.clip(columns, 0, n_x - 1))
+
+        return inside, (rows[inside], columns[inside])
+
+    def is_occupied(self, points: np.ndarray) -> np.ndarray:
+        """This function checks whether the cells containing the points are occupied.
+
+        Args:
+            points (np.ndarray): The points. The shape is (..., 2).
+
+        Returns:
+            is_occupied (np.ndarray): Whether every point is in an occupied cell or out of the grid. The shape is (...).
+        """
+        inside, cells = self.get_cells(points)
+
+        return ~inside | self._occupied[cells]
+
+    def get_distance(self, points: np.ndarray) -> np.ndarray:
+        """This function looks up the distance from the points to the nearest obstacle by bilinear interpolation of the distance field.
+
+        Args:
+            points (np.ndarray): The points. The shape is (..., 2).
+
+        Returns:
+            distances (np.ndarray): The distances to the nearest obstacle. It is zero in the occupied cells and out of the grid. The shape is (...).
+        """
+        if self._distances is None:
+            raise RuntimeError("The occupancy grid should be reset with a map before the query.")
+
+        points = np.asarray(points, dtype=float)
+        n_y, n_x = self._distances.shape
+        u = np.clip((points[..., 0] - self._origin[0]) / self.resolution + 0.5, 0, n_x - 1)
+        v = np.clip((points[..., 1] - self._origin[1]) / self.resolution + 0.5, 0, n_y - 1)
+        j = np.minimum(u.astype(int), n_x - 2)
+        i = np.minimum(v.astype(int), n_y - 2)
+        fu = u - j
+        fv = v - i
+
+        distances = self._flat_distances
+        index = i * n_x + j
+        bottom = distances[index] + fu * (distances[index + 1] - distances[index])
+        top = distances[index + n_x] + fu * (distances[index + n_x + 1] - distances[index + n_x])
+
+        return bottom + fv * (top - bottom)
@@ -8,22 +8,120 @@
 
 import logging
 import xml.etree.ElementTree as ET
-from typing import Tuple
+from functools import lru_cache
+from typing import Iterator, List, Tuple
 
-from pyproj import Proj
+import numpy as np
+from pyproj import Proj, Transformer
 from shapely.geometry import LineString, Polygon
 
 from tactics2d.map.element import Area, Lane, Map, Node, Regulatory, RoadLine
 
 
+@lru_cache(maxsize=32)
+def _get_transformer(project_rule: tuple) -> Transformer:
+    # A Proj instance is a transformer of the projection pipeline. Building it parses the CRS,
+    # so the transformer is shared by all the parses with the same rule.
+    return Transformer.from_pipeline(Proj(**dict(project_rule)).srs)
+
+
 class OSMParser:
     """This class implements a parser for the original OpenStreetMap format map.
 
     The parser is tested with data generated by [the official website](https://www.openstreetmap.org/) of OpenStreetMap and the software application [JOSM](https://josm.openstreetmap.de/).
+
+    The elements are handled in a single pass in the order of the file, which is nodes, ways, and relations in the OSM format. The coordinates of the nodes are buffered and projected in one array call through a cached `pyproj.Transformer` before the first way. The ways then resolve their node references through a sorted id table, so that a line is built from an array slice instead of looking up the nodes one by one. [parse_file](#tactics2d.map.parser.OSMParser.parse_file) streams the file with `iterparse` and clears every element after it is handled, so that the memory is bounded by the map instead of the XML tree.
     """
 
     def __init__(self, lanelet2: bool = False):
         self.lanelet2 = lanelet2
+        self._reset_node_table()
+
+    def _reset_node_table(self):
+        self._node_keys = None
+        self._node_order = None
+        self._node_coords = None
+        self._node_index = None
+        self._pending_nodes = ([], [], [])
+
+    def get_transformer(self, project_rule: dict) -> Transformer:
+        """This function gets the transformer from the GPS coordinates to the x-y coordinates. The transformers are cached by the projection rules, so that they are only built once.
+
+        Args:
+            project_rule (dict): The projection rule of the map, which is the keyword arguments of `pyproj.Proj`.
+
+        Returns:
+            The transformer of the projection rule.
+        """
+        try:
+            return _get_transformer(tuple(sorted(project_rule.items())))
+        except TypeError:
+            # the rule has unhashable values
+            return _get_transformer.__wrapped__(tuple(project_rule.items()))
+
+    def _flush_nodes(self, map_: Map, projector: Transformer, origin: tuple):
+        node_ids, lons, lats = self._pending_nodes
+        if len(node_ids) == 0:
+            return
+
+        lons = np.array(lons, dtype=float)
+        lats = np.array(lats, dtype=float)
+        if projector is not None:
+            xs, ys = projector.transform(lons, lats)
+            coords = np.column_stack([xs - origin[0], ys - origin[1]])
+        else:
+            coords = np.column_stack([lons, lats])
+
+        for node_id, (x, y) in zip(node_ids, coords.tolist()):
+            map_.add_node(Node(id_=node_id, x=x, y=y))
+
+        if self._node_coords is not None:
+            coords = np.concatenate([self._node_coords, coords])
+        self._node_coords = coords
+
+        # OSM ids are integers, so the references are resolved by a binary search over the sorted
+        # ids. The other ids fall back to a dictionary.
+        if self._node_index is None:
+            try:
+                keys = np.array(node_ids, dtype=np.int64)
+                if self._node_keys is not None:
+                    keys = np.concatenate([self._node_keys[np.argsort(self._node_order)], keys])
+                self._node_order = np.argsort(keys, kind="stable")
+                self._node_keys = keys[self._node_order]
+            except ValueError:
+                self._node_index = dict()
+                if self._node_keys is not None:
+                    for key, i in zip(self._node_keys.tolist(), self._node_order.tolist()):
+                        self._node_index[str(key)] = i
+                self._node_keys = None
+                self._node_order = None
+
+        if self._node_index is not None:
+            start = len(self._node_coords) - len(node_ids)
+            for i, node_id in enumerate(node_ids):
+                self._node_index[node_id] = start + i
+
+        self._pending_nodes = ([], [], [])
+
+    def _get_way_points(self, xml_node: ET.Element, map_: Map) -> Tuple[np.ndarray, List[str]]:
+        refs = [node.attrib["ref"] for node in xml_node.findall("nd")]
+
+        if self._node_coords is None:
+            points = [(map_.nodes[ref].x, map_.nodes[ref].y) for ref in refs]
+            return np.array(points, dtype=float).reshape(-1, 2), refs
+
+        if self._node_index is not None:
+            indices = [self._node_index[ref] for ref in refs]
+        else:
+            keys = np.array(refs, dtype=np.int64)
+            positions = np.searchsorted(self._node_keys, keys)
+            positions = np.minimum(positions, len(self._node_keys) - 1)
+            missing = self._node_keys[positions] != keys
+            if np.any(missing):
+                raise KeyError(refs[int(np.argmax(missing))])
+            indices = self._node_order[positions]
+
+        return self._node_coords[indices], refs
 
     def _append_point_list(self, point_list, new_points, component_id):
         if point_list[-1] == new_points[0]:
@@ -178,12 +276,12 @@ class OSMParser:
 
         return None
 
-    def load_bounds(self, xml_node: ET.Element, projector: Proj, origin: tuple) -> tuple:
+    def load_bounds(self, xml_node: ET.Element, projector: Transformer, origin: tuple) -> tuple:
         """This function loads the boundary of the map from the XML node. The coordinates will be projected.
 
         Args:
             xml_node (ET.Element): The XML node of the boundary.
-            projector (Proj): The projection rule of the map.
+            projector (Transformer): The projection rule of the map. It can be a `pyproj.Proj` or a `pyproj.Transformer`.
             origin (tuple): The origin of the GPS coordinates.
 
         Returns:
@@ -195,8 +293,9 @@ class OSMParser:
         max_lat = float(xml_node.get("maxlat"))
 
         if not None in [min_lat, max_lat, min_lon, max_lon]:
-            min_x, min_y = projector(min_lon, min_lat)
-            max_x, max_y = projector(max_lon, max_lat)
+            (min_x, max_x), (min_y, max_y) = projector.transform(
+                np.array([min_lon, max_lon]), np.array([min_lat, max_lat])
+            )
             return (min_x - origin[0], max_x - origin[0], min_y - origin[1], max_y - origin[1])
 
         return None
@@ -216,19 +315,19 @@ class OSMParser:
 
         return Node(id_=node_id, x=lon, y=lat)
 
-    def load_nodes(self, xml_node: ET.Element, projector: Proj, origin: tuple) -> Node:
-        """This function loads the nodes from the XML node. The coordinates will be projected.
+    def load_nodes(self, xml_node: ET.Element, projector: Transformer, origin: tuple) -> Node:
+        """This function loads the nodes from the XML node. The coordinates will be projected. When a whole map is parsed, the nodes are projected in a batch instead.
 
         Args:
             xml_node (ET.Element): The XML node of the nodes.
-            projector (Proj): The projection rule of the map.
+            projector (Transformer): The projection rule of the map. It can be a `pyproj.Proj` or a `pyproj.Transformer`.
             origin (tuple): The origin of the GPS coordinates.
 
         Returns:
             A node under the x-y coordinates.
         """
         node_id = xml_node.attrib["id"]
-        x, y = projector(xml_node.attrib["lon"], xml_node.attrib["lat"])
+        x, y = projector.transform(float(xml_node.attrib["lon"]), float(xml_node.attrib["lat"]))
 
         return Node(id_=node_id, x=x - origin[0], y=y - origin[1])
 
@@ -243,12 +342,7 @@ class OSMParser:
             A road element.
         """
         id_ = xml_node.attrib["id"]
-        point_list = []
-        point_ids = []
-
-        for node in xml_node.findall("nd"):
-            point_list.append(map_.nodes[node.attrib["ref"]].location)
-            point_ids.append(node.attrib["ref"])
+        point_list, point_ids = self._get_way_points(xml_node, map_)
 
         tags = self._get_tags(xml_node)
         is_area = tags.pop("area", False)
@@ -328,10 +422,7 @@ class OSMParser:
             A roadline labeled with Lanelet 2 tags.
         """
         line_id = xml_node.attrib["id"]
-        point_list = []
-
-        for node in xml_node.findall("nd"):
-            point_list.append(map_.nodes[node.attrib["ref"]].location)
+        point_list, _ = self._get_way_points(xml_node, map_)
         linestring = LineString(point_list)
 
         tags = self._get_lanelet2_tags(xml_node)
@@ -440,27 +531,38 @@ class OSMParser:
         regulatory_tags = self._get_lanelet2_tags(xml_node)
         return Regulatory(regulatory_id, relations, ways, **regulatory_tags)
 
-    def parse(
+    def _iterparse(self, file_path: str) -> Iterator[ET.Element]:
+        depth = 0
+        root = None
+        for event, xml_node in ET.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = xml_node
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                yield xml_node
+                # drop the handled element and its children from the partial tree
+                root.clear()
+
+    def _parse_elements(
         self,
-        xml_root: ET.Element,
+        xml_nodes: Iterator[ET.Element],
         project_rule: dict = None,
         gps_origin: tuple = None,
         configs: dict = None,
     ) -> Map:
-        """This function parses the OpenStreetMap format map.
-
-        Args:
-            xml_root (ET.Element): The root of the XML tree.
-            project_rule (dict): The projection rule of the map.
-            gps_origin (tuple): The origin of the GPS coordinates.
-            configs (dict): The configurations of the map.
-        """
-        projector = Proj(**project_rule) if project_rule else None
+        projector = self.get_transformer(project_rule) if project_rule else None
         gps_origin = gps_origin if gps_origin else None
         to_project = not None in [projector, gps_origin]
 
         if to_project:
-            origin = projector(*gps_origin)
+            origin = projector.transform(*gps_origin)
+        else:
+            projector = None
+            origin = None
 
         if configs is None:
             map_ = Map()
@@ -471,69 +573,103 @@ class OSMParser:
                 country=configs.get("country"),
             )
 
-        node_boundary = xml_root.find("bounds")
-        if node_boundary is not None:
-            map_.set_boundary(
-                self.load_bounds(node_boundary, projector, origin)
-                if to_project
-                else self.load_bounds_no_proj(node_boundary)
-            )
-
-        if to_project:
-            for xml_node in xml_root.findall("node"):
-                if xml_node.get("action") == "delete":
-                    continue
-                map_.add_node(self.load_nodes(xml_node, projector, origin))
-        else:
-            for xml_node in xml_root.findall("node"):
-                if xml_node.get("action") == "delete":
-                    continue
-                map_.add_node(self.load_nodes_no_proj(xml_node))
-
-        if self.lanelet2:
-            for xml_node in xml_root.findall("way"):
-                if xml_node.get("action") == "delete":
+        self._reset_node_table()
+        node_ids, lons, lats = self._pending_nodes
+
+        try:
+            for xml_node in xml_nodes:
+                if xml_node.tag == "bounds":
+                    map_.set_boundary(
+                        self.load_bounds(xml_node, projector, origin)
+                        if to_project
+                        else self.load_bounds_no_proj(xml_node)
+                    )
                     continue
-                map_.add_roadline(self.load_roadline_lanelet2(xml_node, map_))
 
-            for xml_node in xml_root.findall("relation"):
                 if xml_node.get("action") == "delete":
                     continue
-                for tag in xml_node.findall("tag"):
-                    if tag.attrib["v"] == "lanelet":
-                        map_.add_lane(self.load_lane_lanelet2(xml_node, map_))
-                    elif tag.attrib["v"] in ["multipolygon", "area"]:
-                        map_.add_area(self.load_area_lanelet2(xml_node, map_))
 
-            for xml_node in xml_root.findall("relation"):
-                if xml_node.get("action") == "delete":
+                if xml_node.tag == "node":
+                    node_ids.append(xml_node.attrib["id"])
+                    lons.append(xml_node.attrib["lon"])
+                    lats.append(xml_node.attrib["lat"])
                     continue
-                if self.lanelet2:
-                    for tag in xml_node.findall("tag"):
-                        if tag.attrib["v"] == "regulatory_element":
-                            map_.add_regulatory(self.load_regulatory_lanelet2(xml_node))
 
-        else:
-            for xml_node in xml_root.findall("way"):
-                if xml_node.get("action") == "delete":
+                if xml_node.tag not in ["way", "relation"]:
                     continue
-                road_element = self.load_way(xml_node, map_)
 
-                if isinstance(road_element, RoadLine):
-                    map_.add_roadline(road_element)
-                elif isinstance(road_element, Area):
-                    map_.add_area(road_element)
-
-            for xml_node in xml_root.findall("relation"):
-                if xml_node.get("action") == "delete":
-                    continue
-                road_element = self.load_relation(xml_node, map_)
+                if len(node_ids) > 0:
+                    self._flush_nodes(map_, projector, origin)
+                    node_ids, lons, lats = self._pending_nodes
+
+                if xml_node.tag == "way":
+                    if self.lanelet2:
+                        road_element = self.load_roadline_lanelet2(xml_node, map_)
+                    else:
+                        road_element = self.load_way(xml_node, map_)
+                elif self.lanelet2:
+                    road_element = None
+                    for tag in xml_node.findall("tag"):
+                        if tag.attrib["v"] == "lanelet":
+                            road_element = self.load_lane_lanelet2(xml_node, map_)
+                        elif tag.attrib["v"] in ["multipolygon", "area"]:
+                            road_element = self.load_area_lanelet2(xml_node, map_)
+                        elif tag.attrib["v"] == "regulatory_element":
+                            road_element = self.load_regulatory_lanelet2(xml_node)
+                else:
+                    road_element = self.load_relation(xml_node, map_)
 
                 if isinstance(road_element, RoadLine):
                     map_.add_roadline(road_element)
+                elif isinstance(road_element, Lane):
+                    map_.add_lane(road_element)
                 elif isinstance(road_element, Area):
                     map_.add_area(road_element)
                 elif isinstance(road_element, Regulatory):
                     map_.add_regulatory(road_element)
 
+            self._flush_nodes(map_, projector, origin)
+        finally:
+            self._reset_node_table()
+
         return map_
+
+    def parse(
+        self,
+        xml_root: ET.Element,
+        project_rule: dict = None,
+        gps_origin: tuple = None,
+        configs: dict = None,
+    ) -> Map:
+        """This function parses the OpenStreetMap format map from a loaded XML tree.
+
+        Args:
+            xml_root (ET.Element): The root of the XML tree.
+            project_rule (dict): The projection rule of the map.
+            gps_origin (tuple): The origin of the GPS coordinates.
+            configs (dict): The configurations of the map.
+
+        Returns:
+            The parsed map.
+        """
+        return self._parse_elements(iter(xml_root), project_rule, gps_origin, configs)
+
+    def parse_file(
+        self,
+        file_path: str,
+        project_rule: dict = None,
+        gps_origin: tuple = None,
+        configs: dict = None,
+    ) -> Map:
+        """This function parses the OpenStreetMap format map by streaming the file. It is preferred for large maps because the XML tree is never built as a whole.
+
+        Args:
+            file_path (str): The path to the OSM file.
+            project_rule (dict): The projection rule of the map.
+            gps_origin (tuple): The origin of the GPS coordinates.
+            configs (dict): The configurations of the map.
+
+        Returns:
+            The parsed map.
+        """
+        return self._parse_elements(self._iterparse(file_path), project_rule, gps_origin, configs)
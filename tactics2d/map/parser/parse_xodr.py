@@ -8,6 +8,7 @@
 
 import logging
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from typing import Tuple, Union
 
@@ -17,10 +18,18 @@ from shapely.affinity import affine_transform, rotate
 from shapely.geometry import LineString, Point, Polygon
 
 from tactics2d.map.element import Area, Connection, Junction, Lane, Map, Node, Regulatory, RoadLine
-from tactics2d.math.geometry import Circle
+from tactics2d.math.geometry import AdaptiveSampler, Circle
 from tactics2d.math.interpolate import Spiral
 
 
+def _load_road_block(args: Tuple[bytes, int, float]) -> tuple:
+    # run in a worker process: the road is parsed with the ids starting from its own block
+    road_string, id_start, tolerance = args
+    parser = XODRParser(tolerance)
+    parser.id_counter = id_start
+    return parser.load_road(ET.fromstring(road_string))
+
+
 class XODRParser:
     """This class implements a parser for the OpenDRIVE format map.
 
@@ -63,35 +72,45 @@ class XODRParser:
         "solid": "solid",
     }
 
-    def __init__(self):
+    def __init__(self, tolerance: float = None):
+        """Initialize the parser.
+
+        Args:
+            tolerance (float, optional): The maximum distance from a geometry of the reference line to the chord between two adjacent sampled points. If it is given, the geometries are sampled by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler), so that the straight and gentle parts of the roads get much fewer points. The arcs and spirals are sampled by the curvature of the outermost lane side, so that the tolerance holds on the lane sides as well, while it only bounds the reference line on the cubic polynomials. The starts of the lane sections, widths, road marks, and objects are always kept as sampled points, and the cubic widths are sampled by the same tolerance. Otherwise, the geometries are sampled about every 0.1 meter. Defaults to None.
+        """
         self.id_counter = 0
+        self.tolerance = tolerance
 
-    def get_headings(self, points):
-        diff = np.diff(np.array(points), axis=0)
-        headings = np.arctan2(diff[:, 1], diff[:, 0]).tolist()
-        headings.append(headings[-1])
-        return headings
+    def get_headings(self, points: np.ndarray) -> np.ndarray:
+        diff = np.diff(np.asarray(points, dtype=float).reshape(-1, 2), axis=0)
+        headings = np.arctan2(diff[:, 1], diff[:, 0])
+        return np.append(headings, headings[-1]) if len(headings) > 0 else np.zeros(1)
 
-    def _get_line(self, xml_node: ET.Element) -> list:
+    def _transform_uv(self, u: np.ndarray, v: np.ndarray, xml_node: ET.Element) -> np.ndarray:
         x_start = float(xml_node.attrib["x"])
         y_start = float(xml_node.attrib["y"])
         heading = float(xml_node.attrib["hdg"])
-        length = float(xml_node.attrib["length"])
+        cos, sin = np.cos(heading), np.sin(heading)
 
-        points = [(x_start, y_start)]
+        # the u axis goes along the heading and the v axis points to its left
+        return np.column_stack([x_start + u * cos - v * sin, y_start + u * sin + v * cos])
 
-        if length > 0.1:
-            n_interpolate = int(length / 0.1)
+    def _get_line(self, xml_node: ET.Element, breakpoints: np.ndarray = None) -> np.ndarray:
+        length = float(xml_node.attrib["length"])
+        n_interpolate = int(length / 0.1)
 
-            for i in np.linspace(0.1, length, n_interpolate - 1):
-                x_end = x_start + i * np.cos(heading)
-                y_end = y_start + i * np.sin(heading)
-                points.append((x_end, y_end))
+        if self.tolerance is not None:
+            u = np.union1d([0, length], breakpoints)
+        elif length > 0.1:
+            u = np.concatenate([[0], np.linspace(0.1, length, n_interpolate - 1), [length]])
+        else:
+            u = np.array([0, length])
 
-        points.append((x_start + length * np.cos(heading), y_start + length * np.sin(heading)))
-        return points
+        return self._transform_uv(u, np.zeros_like(u), xml_node)
 
-    def _get_spiral(self, xml_node: ET.Element) -> list:
+    def _get_spiral(
+        self, xml_node: ET.Element, breakpoints: np.ndarray = None, max_offset: float = 0
+    ) -> np.ndarray:
         x_start = float(xml_node.attrib["x"])
         y_start = float(xml_node.attrib["y"])
         heading = float(xml_node.attrib["hdg"])
@@ -100,112 +119,351 @@ class XODRParser:
         curv_end = float(xml_node.find("spiral").attrib["curvEnd"])
 
         if length < 0.1:  # TODO: check the threshold/precision 0.1
-            points = [(x_start, y_start)]
+            return np.array([[x_start, y_start]])
+
+        gamma = (curv_end - curv_start) / length
+        if self.tolerance is not None:
+            tolerance = self._get_offset_tolerance(max(abs(curv_start), abs(curv_end)), max_offset)
+            s = np.union1d(
+                AdaptiveSampler.sample_by_curvature(length, tolerance, curv_start, curv_end),
+                breakpoints,
+            )
+            points = Spiral.evaluate(s, [x_start, y_start], heading, curv_start, gamma)
         else:
-            gamma = (curv_end - curv_start) / length
             points = Spiral.get_spiral(length, [x_start, y_start], heading, curv_start, gamma)
-            points = [(x, y) for x, y in points]
-        return points
-
-    def _get_arc(self, xml_node: ET.Element) -> list:
-        x_start = float(xml_node.attrib["x"])
-        y_start = float(xml_node.attrib["y"])
-        heading = float(xml_node.attrib["hdg"])
-        length = float(xml_node.attrib["length"])
-        curvature = float(xml_node.find("arc").attrib["curvature"])
-
-        center, radius = Circle.get_circle_by_tangent_vector(
-            [x_start, y_start], heading, abs(1 / curvature), "L" if curvature > 0 else "R"
+        return np.asarray(points, dtype=float).reshape(-1, 2)
+
+    def _get_arcs(self, xml_nodes: list, breakpoints: list = None, max_offset: float = 0) -> list:
+        # The arcs of a road are sampled together. The circles are derived by one batched call,
+        # and the points of all the arcs are computed in one ragged array.
+        n_arc = len(xml_nodes)
+        if n_arc == 0:
+            return []
+        breakpoints = [None] * n_arc if breakpoints is None else breakpoints
+
+        start_points = np.array(
+            [[float(node.attrib["x"]), float(node.attrib["y"])] for node in xml_nodes]
         )
+        headings = np.array([float(node.attrib["hdg"]) for node in xml_nodes])
+        lengths = np.array([float(node.attrib["length"]) for node in xml_nodes])
+        curvatures = np.array([float(node.find("arc").attrib["curvature"]) for node in xml_nodes])
 
-        n_interpolate = int(length / 0.1)
-        points = []
+        centers, radii = Circle.get_circle_by_tangent_vector_batch(
+            start_points, headings, np.abs(1 / curvatures), np.where(curvatures > 0, "L", "R")
+        )
+        start_angles = headings - np.pi / 2 * np.sign(curvatures)
+
+        if self.tolerance is not None:
+            s = [
+                np.union1d(
+                    AdaptiveSampler.sample_by_curvature(
+                        length, self._get_offset_tolerance(curvature, max_offset), curvature
+                    ),
+                    np.empty(0) if local_breakpoints is None else local_breakpoints,
+                )
+                for length, curvature, local_breakpoints in zip(lengths, curvatures, breakpoints)
+            ]
+            offsets = np.concatenate([[0], np.cumsum([len(s_) for s_ in s])])
+            arc_ids = np.repeat(np.arange(n_arc), np.diff(offsets))
+            angles = start_angles[arc_ids] + np.concatenate(s) * curvatures[arc_ids]
+            arc_points = centers[arc_ids] + radii[arc_ids, None] * np.column_stack(
+                [np.cos(angles), np.sin(angles)]
+            )
+        else:
+            arc_points, _, offsets = Circle.get_arc_batch(
+                centers,
+                radii,
+                lengths / radii,
+                start_angles,
+                curvatures < 0,
+                n_points=np.maximum((lengths / 0.1).astype(int), 2),
+            )
 
-        arc_angle = length / radius * np.sign(curvature)
-        start_heading = heading - np.pi / 2 * np.sign(curvature)
+        return [arc_points[offsets[i] : offsets[i + 1]] for i in range(n_arc)]
 
-        for i in np.linspace(start_heading, start_heading + arc_angle, n_interpolate):
-            x = center[0] + radius * np.cos(i)
-            y = center[1] + radius * np.sin(i)
-            points.append((x, y))
-        return points
+    def _get_arc(
+        self, xml_node: ET.Element, breakpoints: np.ndarray = None, max_offset: float = 0
+    ) -> np.ndarray:
+        return self._get_arcs([xml_node], [breakpoints], max_offset)[0]
 
-    def _get_poly3(self, xml_node: ET.Element) -> list:
-        x_start = float(xml_node.attrib["x"])
-        y_start = float(xml_node.attrib["y"])
-        heading = float(xml_node.attrib["hdg"])
+    def _get_poly3(self, xml_node: ET.Element, breakpoints: np.ndarray = None) -> np.ndarray:
         length = float(xml_node.attrib["length"])
-        a = float(xml_node.find("poly3").attrib["a"])
-        b = float(xml_node.find("poly3").attrib["b"])
-        c = float(xml_node.find("poly3").attrib["c"])
-        d = float(xml_node.find("poly3").attrib["d"])
+        # np.polyval takes the coefficients from the highest order, v = a + b u + c u^2 + d u^3
+        coeffs = [float(xml_node.find("poly3").attrib[key]) for key in ["d", "c", "b", "a"]]
+
+        if self.tolerance is not None:
+            u = np.union1d(
+                AdaptiveSampler.sample_by_subdivision(
+                    lambda u: np.column_stack([u, np.polyval(coeffs, u)]),
+                    0,
+                    length,
+                    self.tolerance,
+                ),
+                breakpoints,
+            )
+        else:
+            n_interpolate = int(length / 0.1)
+            u = np.linspace(0, length, n_interpolate + 1)
+        return self._transform_uv(u, np.polyval(coeffs, u), xml_node)
 
-        n_interpolate = int(length / 0.1)
-        u_interpolate = np.linspace(0, length, n_interpolate + 1)
-        v_interpolate = a * u_interpolate**3 + b * u_interpolate**2 + c * u_interpolate + d
-        coords_uv = np.array([u_interpolate, v_interpolate]).T
-        transform = np.array(
-            [[np.cos(heading), np.sin(heading)], [-np.sin(heading), np.cos(heading)]]
-        )  # TODO: check the rotation direction
-        coords_xy = np.dot(coords_uv, transform.T) + np.array([x_start, y_start])
-        points = [(x, y) for x, y in coords_xy]
-
-        return points
-
-    def _get_param_poly3(self, xml_node: ET.Element) -> list:
-        x_start = float(xml_node.attrib["x"])
-        y_start = float(xml_node.attrib["y"])
-        heading = float(xml_node.attrib["hdg"])
+    def _get_param_poly3(self, xml_node: ET.Element, breakpoints: np.ndarray = None) -> np.ndarray:
         length = float(xml_node.attrib["length"])
-        if xml_node.find("paramPoly3").attrib["pRange"]:
-            p_range = float(xml_node.find("paramPoly3").attrib["pRange"])
+        param_poly3 = xml_node.find("paramPoly3")
+        # the parameter goes to the length of the geometry for "arcLength", otherwise to 1
+        p_range = length if param_poly3.attrib.get("pRange") == "arcLength" else 1
+        u_coeffs = [float(param_poly3.attrib[key]) for key in ["dU", "cU", "bU", "aU"]]
+        v_coeffs = [float(param_poly3.attrib[key]) for key in ["dV", "cV", "bV", "aV"]]
+
+        if self.tolerance is not None:
+            p = np.union1d(
+                AdaptiveSampler.sample_by_subdivision(
+                    lambda p: np.column_stack([np.polyval(u_coeffs, p), np.polyval(v_coeffs, p)]),
+                    0,
+                    p_range,
+                    self.tolerance,
+                ),
+                np.asarray(breakpoints) / length * p_range,
+            )
         else:
-            p_range = 1
-        aU = float(xml_node.find("paramPoly3").attrib["aU"])
-        bU = float(xml_node.find("paramPoly3").attrib["bU"])
-        cU = float(xml_node.find("paramPoly3").attrib["cU"])
-        dU = float(xml_node.find("paramPoly3").attrib["dU"])
-        aV = float(xml_node.find("paramPoly3").attrib["aV"])
-        bV = float(xml_node.find("paramPoly3").attrib["bV"])
-        cV = float(xml_node.find("paramPoly3").attrib["cV"])
-        dV = float(xml_node.find("paramPoly3").attrib["dV"])
-
-        n_interpolate = int(length / 0.1)
-        p_interpolate = np.linspace(0, p_range, n_interpolate + 1)
-        u_interpolate = aU * p_interpolate**3 + bU * p_interpolate**2 + cU * p_interpolate + dU
-        v_interpolate = aV * p_interpolate**3 + bV * p_interpolate**2 + cV * p_interpolate + dV
-        coords_uv = np.array([u_interpolate, v_interpolate]).T
-        transform = np.array(
-            [[np.cos(heading), np.sin(heading)], [-np.sin(heading), np.cos(heading)]]
-        )  # TODO: check the rotation direction
-        coords_xy = np.dot(coords_uv, transform.T) + np.array([x_start, y_start])
-        points = [(x, y) for x, y in coords_xy]
-
-        return points
-
-    def _get_geometry(self, xml_node: ET.Element) -> list:
+            n_interpolate = int(length / 0.1)
+            p = np.linspace(0, p_range, n_interpolate + 1)
+        return self._transform_uv(np.polyval(u_coeffs, p), np.polyval(v_coeffs, p), xml_node)
+
+    def _get_geometry(
+        self,
+        xml_node: ET.Element,
+        breakpoints: np.ndarray = None,
+        arc_points: np.ndarray = None,
+        max_offset: float = 0,
+    ) -> np.ndarray:
         """
-        Road Reference line
+        Road Reference line. The points of an arc can be sampled in advance by `_get_arcs`.
         """
-        geometry = []
+        geometry = np.empty((0, 2))
+        breakpoints = np.empty(0) if breakpoints is None else breakpoints
 
         if not xml_node.find("line") is None:
-            geometry = self._get_line(xml_node)
+            geometry = self._get_line(xml_node, breakpoints)
         elif not xml_node.find("spiral") is None:
-            geometry = self._get_spiral(xml_node)
+            geometry = self._get_spiral(xml_node, breakpoints, max_offset)
         elif not xml_node.find("arc") is None:
-            geometry = self._get_arc(xml_node)
-            # geometry = []
+            if arc_points is None:
+                arc_points = self._get_arc(xml_node, breakpoints, max_offset)
+            geometry = arc_points
         elif not xml_node.find("poly3") is None:
-            geometry = self._get_poly3(xml_node)
+            geometry = self._get_poly3(xml_node, breakpoints)
         elif not xml_node.find("paramPoly3") is None:
-            geometry = self._get_param_poly3(xml_node)
+            geometry = self._get_param_poly3(xml_node, breakpoints)
 
-        if len(geometry) >= 2:
-            if geometry[-2] == geometry[-1]:
-                geometry.pop(-1)
+        if len(geometry) >= 2 and np.all(geometry[-2] == geometry[-1]):
+            geometry = geometry[:-1]
         return geometry
 
+    def _get_breakpoints(self, xml_node: ET.Element) -> np.ndarray:
+        # The arc lengths on the reference line that must be sampled when the geometries are sampled adaptively. The lane sections, widths, road marks, and objects start at these points, and the lanes are cut at them. The cubic widths are sampled by the tolerance as well, because the lane sides are offset from the sampled points.
+        breakpoints = []
+        lanes_node = xml_node.find("lanes")
+        lane_section_nodes = [] if lanes_node is None else lanes_node.findall("laneSection")
+        geometry_nodes = xml_node.find("planView").findall("geometry")
+        road_length = max(
+            [float(node.attrib["s"]) + float(node.attrib["length"]) for node in geometry_nodes]
+        )
+        section_starts = [float(node.attrib["s"]) for node in lane_section_nodes] + [road_length]
+
+        for i, lane_section_node in enumerate(lane_section_nodes):
+            section_start, section_end = section_starts[i], section_starts[i + 1]
+            breakpoints.append([section_start])
+
+            center_node = lane_section_node.find("center")
+            if center_node is not None and center_node.find("lane") is not None:
+                breakpoints.append(
+                    [
+                        float(node.attrib["sOffset"])
+                        for node in center_node.find("lane").findall("roadMark")
+                    ]
+                )
+
+            for side in ["left", "right"]:
+                if lane_section_node.find(side) is None:
+                    continue
+
+                for lane_node in lane_section_node.find(side).findall("lane"):
+                    width_nodes = sorted(
+                        lane_node.findall("width"), key=lambda node: float(node.attrib["sOffset"])
+                    )
+                    width_starts = [
+                        section_start + float(node.attrib["sOffset"]) for node in width_nodes
+                    ] + [section_end]
+                    for j, width_node in enumerate(width_nodes):
+                        breakpoints.append([width_starts[j]])
+                        c, d = float(width_node.attrib["c"]), float(width_node.attrib["d"])
+                        if (c == 0 and d == 0) or width_starts[j + 1] <= width_starts[j]:
+                            continue
+
+                        coeffs = [
+                            d,
+                            c,
+                            float(width_node.attrib["b"]),
+                            float(width_node.attrib["a"]),
+                        ]
+                        u = AdaptiveSampler.sample_by_subdivision(
+                            lambda u: np.column_stack([u, np.polyval(coeffs, u)]),
+                            0,
+                            width_starts[j + 1] - width_starts[j],
+                            self.tolerance,
+                        )
+                        breakpoints.append(width_starts[j] + u)
+
+        objects_node = xml_node.find("objects")
+        if objects_node is not None:
+            breakpoints.append([float(node.attrib["s"]) for node in objects_node.findall("object")])
+
+        breakpoints = np.concatenate([np.asarray(b, dtype=float) for b in breakpoints] + [[]])
+
+        return np.unique(breakpoints)
+
+    def _get_offset_tolerance(self, curvature: float, max_offset: float) -> float:
+        # A lane side offset by `max_offset` to the outside of a curve deviates from its chord by
+        # (1 + max_offset * |curvature|) times the deviation of the reference line.
+        return self.tolerance / (1 + max_offset * abs(curvature))
+
+    def _get_max_offset(self, xml_node: ET.Element) -> float:
+        # The largest lateral offset of the lane sides from the reference line. The widths of the
+        # lanes on one side are summed at the starts of the width entries and a few points between.
+        lanes_node = xml_node.find("lanes")
+        if lanes_node is None:
+            return 0
+
+        geometry_nodes = xml_node.find("planView").findall("geometry")
+        road_length = max(
+            [float(node.attrib["s"]) + float(node.attrib["length"]) for node in geometry_nodes]
+        )
+        lane_section_nodes = lanes_node.findall("laneSection")
+        section_starts = [float(node.attrib["s"]) for node in lane_section_nodes] + [road_length]
+
+        max_offset = 0
+        for i, lane_section_node in enumerate(lane_section_nodes):
+            section_length = max(section_starts[i + 1] - section_starts[i], 0)
+            for side in ["left", "right"]:
+                if lane_section_node.find(side) is None:
+                    continue
+
+                lane_nodes = lane_section_node.find(side).findall("lane")
+                s_offsets = [
+                    float(node.attrib["sOffset"])
+                    for lane_node in lane_nodes
+                    for node in lane_node.findall("width")
+                ]
+                ds = np.union1d(np.linspace(0, section_length, 9), s_offsets)
+                ds = ds[ds <= section_length]
+                offset = sum(
+                    np.max(np.abs(self._get_widths(lane_node, ds)))
+                    for lane_node in lane_nodes
+                    if len(lane_node.findall("width")) > 0
+                )
+                max_offset = max(max_offset, offset)
+
+        return max_offset
+
+    def _get_reference_line(
+        self, xml_node: ET.Element
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """This function samples the reference line of a road into one contiguous buffer.
+
+        Args:
+            xml_node (ET.Element): The XML node of the road.
+
+        Returns:
+            points (np.ndarray): The sampled points on the reference line. The shape is (n, 2).
+            s_points (np.ndarray): The arc lengths of the points. The shape is (n,).
+            headings (np.ndarray): The headings of the reference line at the points. The shape is (n,).
+            normals (np.ndarray): The offset directions at the points. A point with the lateral offset `t` is `points + t * normals`. The normals are scaled at the vertices so that the offset segments keep parallel to the reference line. The shape is (n, 2).
+        """
+        geometry_nodes = xml_node.find("planView").findall("geometry")
+        start_heading = float(geometry_nodes[0].attrib["hdg"])
+        breakpoints = self._get_breakpoints(xml_node) if self.tolerance is not None else None
+        max_offset = self._get_max_offset(xml_node) if self.tolerance is not None else 0
+
+        local_breakpoints = []
+        for geometry_node in geometry_nodes:
+            if breakpoints is None:
+                local_breakpoints.append(None)
+                continue
+            s_start = float(geometry_node.attrib["s"])
+            length = float(geometry_node.attrib["length"])
+            inside = (breakpoints > s_start) & (breakpoints < s_start + length)
+            local_breakpoints.append(breakpoints[inside] - s_start)
+
+        arc_ids = [i for i, node in enumerate(geometry_nodes) if node.find("arc") is not None]
+        arcs = self._get_arcs(
+            [geometry_nodes[i] for i in arc_ids],
+            [local_breakpoints[i] for i in arc_ids],
+            max_offset,
+        )
+        arcs = dict(zip(arc_ids, arcs))
+
+        parts = []
+        for i, geometry_node in enumerate(geometry_nodes):
+            new_points = self._get_geometry(
+                geometry_node, local_breakpoints[i], arcs.get(i), max_offset
+            )
+            if len(parts) > 0 and not self._check_continuity(new_points, parts[-1]):
+                logging.warning("The geometry is not continuous.")
+            parts.append(new_points)
+        points = np.concatenate(parts) if len(parts) > 0 else np.empty((0, 2))
+
+        # the adjacent geometries share their end points
+        segments = np.diff(points, axis=0)
+        lengths = np.linalg.norm(segments, axis=1)
+        keep = np.concatenate([[True], lengths > 1e-9])
+        points = points[keep]
+        segments = segments[keep[1:]]
+        lengths = lengths[keep[1:]]
+        s_points = np.concatenate([[0], np.cumsum(lengths)])
+
+        if len(points) < 2:
+            headings = np.full(len(points), start_heading)
+            normals = np.column_stack([-np.sin(headings), np.cos(headings)])
+            return points, s_points, headings, normals
+
+        tangents = segments / lengths[:, None]
+        vertex_tangents = np.concatenate(
+            [tangents[:1], tangents[:-1] + tangents[1:], tangents[-1:]]
+        )
+        norms = np.linalg.norm(vertex_tangents, axis=1)
+        # a cusp has no bisector, so the tangent of the incoming segment is used
+        cusp = norms < 1e-9
+        vertex_tangents[cusp] = np.concatenate([tangents[:1], tangents])[cusp]
+        norms[cusp] = 1
+        vertex_tangents /= norms[:, None]
+
+        headings = np.arctan2(vertex_tangents[:, 1], vertex_tangents[:, 0])
+        normals = np.column_stack([-vertex_tangents[:, 1], vertex_tangents[:, 0]])
+        # miter the interior vertices, with the scale bounded at sharp corners
+        cos_half = np.einsum("ij,ij->i", vertex_tangents[1:-1], tangents[:-1])
+        normals[1:-1] /= np.clip(cos_half, 0.5, 1)[:, None]
+
+        return points, s_points, headings, normals
+
+    def _get_widths(self, xml_node: ET.Element, ds: np.ndarray) -> np.ndarray:
+        width_nodes = xml_node.findall("width")
+        if len(width_nodes) == 0:
+            logging.warning(f"The width of lane {xml_node.attrib['id']} is not defined.")
+            return np.zeros_like(ds)
+
+        s_offsets = np.array([float(node.attrib["sOffset"]) for node in width_nodes])
+        coeffs = np.array(
+            [[float(node.attrib[key]) for key in ["d", "c", "b", "a"]] for node in width_nodes]
+        )
+        order = np.argsort(s_offsets, kind="stable")
+        s_offsets, coeffs = s_offsets[order], coeffs[order]
+
+        # the polynomial of a width entry holds until the next entry
+        idx = np.clip(np.searchsorted(s_offsets, ds, side="right") - 1, 0, len(s_offsets) - 1)
+        u = ds - s_offsets[idx]
+        coeffs = coeffs[idx]
+        return ((coeffs[:, 0] * u + coeffs[:, 1]) * u + coeffs[:, 2]) * u + coeffs[:, 3]
+
     def _check_continuity(self, new_points, points):
         if len(points) == 0:
             return True
@@ -213,7 +471,7 @@ class XODRParser:
         if len(new_points) == 0:
             return True
 
-        return np.linalg.norm(np.array(new_points[0]) - np.array(points[-1])) < 0.1
+        return np.linalg.norm(np.asarray(new_points[0]) - np.asarray(points[-1])) < 0.1
 
     def load_header(self, xml_node: ET.Element):
         """This function loads the header of the OpenDRIVE map.
@@ -312,7 +570,16 @@ class XODRParser:
 
         return roadline
 
-    def load_lane(self, ref_line, xml_node: ET.Element, type_node: ET.Element):
+    def load_lane(
+        self,
+        ref_line: RoadLine,
+        ref_offsets: np.ndarray,
+        center_points: np.ndarray,
+        normals: np.ndarray,
+        ds: np.ndarray,
+        xml_node: ET.Element,
+        type_node: ET.Element,
+    ) -> Tuple[Lane, RoadLine, np.ndarray]:
         # ref_value should always be a positive value
         sign = np.sign(int(xml_node.attrib["id"]))
 
@@ -332,15 +599,17 @@ class XODRParser:
             else type_node.attrib["unit"]
         )
 
+        # the outer side is offset from the lane section center line by the accumulated widths
+        offsets = ref_offsets + sign * self._get_widths(xml_node, ds)
+        new_ref_line = LineString(center_points + offsets[:, None] * normals)
+
         if sign > 0:
             right_side = ref_line.geometry
-            left_side = ref_line.geometry.offset_curve(float(xml_node.find("width").attrib["a"]))
-            new_ref_line = left_side
+            left_side = new_ref_line
             line_ids = {"left": [self.id_counter], "right": [ref_line.id_]}
         else:
             left_side = ref_line.geometry
-            right_side = ref_line.geometry.offset_curve(-float(xml_node.find("width").attrib["a"]))
-            new_ref_line = right_side
+            right_side = new_ref_line
             line_ids = {"left": [ref_line.id_], "right": [self.id_counter]}
 
         roadline = self.load_roadmark(new_ref_line, xml_node.find("roadMark"))
@@ -365,7 +634,7 @@ class XODRParser:
         )
         self.id_counter += 1
 
-        return lane, roadline
+        return lane, roadline, offsets
 
     def load_object(self, points, s_points, headings, xml_node: ET.Element):
         s = float(xml_node.attrib["s"])
@@ -438,32 +707,13 @@ class XODRParser:
         lanes = []
         roadlines = []
 
-        # refline points
-        points = []
-
         link_node = xml_node.find("link")
 
         # type
         type_node = xml_node.find("type")
 
         # plan view
-        first_geometry = xml_node.find("planView").find("geometry")
-        x = float(first_geometry.attrib["x"])
-        y = float(first_geometry.attrib["y"])
-        heading = float(first_geometry.attrib["hdg"])
-        for geometry_node in xml_node.find("planView").findall("geometry"):
-            new_points = self._get_geometry(geometry_node)
-            if self._check_continuity(new_points, points):
-                points.extend(new_points)
-            else:
-                logging.warning("The geometry is not continuous.")
-                points.extend(new_points)
-
-        s_points = np.sqrt(
-            np.sum((np.array(points) - np.array([points[0]] + points)[:-1, :]) ** 2, axis=1)
-        )
-        # I suggest you to put forward an issue to numpy to change this function name
-        s_points = np.cumsum(s_points)
+        points, s_points, headings, normals = self._get_reference_line(xml_node)
 
         # elevation profile
         elevation_profile_node = xml_node.find("elevationProfile")
@@ -482,11 +732,12 @@ class XODRParser:
                 lane_sections_offset[ls_idx],
                 lane_sections_offset[ls_idx + 1],
             )
-            center_points = np.array(points)[
-                (s_points >= ls_start_offset - 0.1) & (s_points <= ls_end_offset + 0.1)
-            ].tolist()
-            if len(center_points) == 1:
-                center_points.append(center_points[0])
+            mask = (s_points >= ls_start_offset - 0.1) & (s_points <= ls_end_offset + 0.1)
+            if np.sum(mask) == 1:
+                mask = np.repeat(np.flatnonzero(mask), 2)
+            center_points = points[mask]
+            center_normals = normals[mask]
+            ds = np.maximum(s_points[mask] - ls_start_offset, 0)
 
             center_line = RoadLine(
                 id_=self.id_counter,
@@ -504,36 +755,37 @@ class XODRParser:
                     road_mark_offsets[road_mark_idx],
                     road_mark_offsets[road_mark_idx + 1],
                 )
-                part_refline = np.array(points)[
-                    (s_points >= s_offset - 0.1) & (s_points <= e_offset + 0.1)
-                ].tolist()
+                part_refline = points[(s_points >= s_offset - 0.1) & (s_points <= e_offset + 0.1)]
 
                 if len(part_refline) == 1:
-                    part_refline.append(part_refline[0])
+                    part_refline = np.repeat(part_refline, 2, axis=0)
 
                 part_refline = self.load_roadmark(part_refline, road_mark)  # RoadLine
                 if part_refline is None:
                     raise ValueError("Center line must be defined.")
                 roadlines.append(part_refline)
 
-            if not lane_section_node.find("left") is None:
-                lane_nodes = sorted(
-                    lane_section_node.find("left").findall("lane"), key=lambda x: x.attrib["id"]
-                )
-
-                ref_line = center_line
-                for lane_node in lane_nodes:
-                    lane, ref_line = self.load_lane(ref_line, lane_node, type_node)
-                    lanes.append(lane)
-                    roadlines.append(ref_line)
+            for side in ["left", "right"]:
+                if lane_section_node.find(side) is None:
+                    continue
 
-            if not lane_section_node.find("right") is None:
+                # the lanes are offset outward from the center line one after another
                 lane_nodes = sorted(
-                    lane_section_node.find("right").findall("lane"), key=lambda x: x.attrib["id"]
+                    lane_section_node.find(side).findall("lane"),
+                    key=lambda x: abs(int(x.attrib["id"])),
                 )
                 ref_line = center_line
+                ref_offsets = np.zeros(len(center_points))
                 for lane_node in lane_nodes:
-                    lane, ref_line = self.load_lane(ref_line, lane_node, type_node)
+                    lane, ref_line, ref_offsets = self.load_lane(
+                        ref_line,
+                        ref_offsets,
+                        center_points,
+                        center_normals,
+                        ds,
+                        lane_node,
+                        type_node,
+                    )
                     lanes.append(lane)
                     roadlines.append(ref_line)
 
@@ -542,7 +794,6 @@ class XODRParser:
 
         objects_node = xml_node.find("objects")
         if not objects_node is None:
-            headings = self.get_headings(points)
             for object_node in objects_node.findall("object"):
                 area = self.load_object(points, s_points, headings, object_node)
                 objects.append(area)
@@ -569,11 +820,38 @@ class XODRParser:
 
         return junction
 
-    def parse(self, xml_root: ET.Element):
+    def get_id_block_size(self, xml_node: ET.Element) -> int:
+        """This function counts the ids that a road consumes when it is loaded. Every lane section takes one id for its center line, and every center road mark, lane, lane side, and object takes one id.
+
+        Args:
+            xml_node (ET.Element): The XML node of the road.
+
+        Returns:
+            The number of ids of the road.
+        """
+        size = 0
+        lanes_node = xml_node.find("lanes")
+        if lanes_node is not None:
+            for lane_section_node in lanes_node.findall("laneSection"):
+                size += 1 + len(lane_section_node.find("center").find("lane").findall("roadMark"))
+                for side in ["left", "right"]:
+                    if lane_section_node.find(side) is not None:
+                        size += 2 * len(lane_section_node.find(side).findall("lane"))
+
+        objects_node = xml_node.find("objects")
+        if objects_node is not None:
+            size += len(objects_node.findall("object"))
+
+        return size
+
+    def parse(self, xml_root: ET.Element, n_workers: int = 1):
         """This function parses the OpenDRIVE format map. To ensure that all road elements have an unique id, the function automatically reassign the id of the road elements.
 
+        Every road is assigned a block of ids in the order of the file, so the roads are independent from each other and can be parsed in parallel. The ids do not depend on the number of workers.
+
         Args:
             xml_root (ET.Element): The root of the XML tree.
+            n_workers (int, optional): The number of processes to parse the roads. If it is 1, the roads are parsed in the current process.
 
         Returns:
             map_ (Map): The parsed map.
@@ -587,8 +865,25 @@ class XODRParser:
         if not projector is None:
             to_project = True
 
-        for road in xml_root.findall("road"):
-            lanes, roadlines, objects = self.load_road(road)
+        road_nodes = xml_root.findall("road")
+        block_sizes = [self.get_id_block_size(road) for road in road_nodes]
+        id_starts = (self.id_counter + np.cumsum([0] + block_sizes)).tolist()
+
+        if n_workers > 1 and len(road_nodes) > 1:
+            tasks = [
+                (ET.tostring(road), id_start, self.tolerance)
+                for road, id_start in zip(road_nodes, id_starts)
+            ]
+            chunk_size = max(1, len(tasks) // (4 * n_workers))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(_load_road_block, tasks, chunksize=chunk_size))
+        else:
+            results = []
+            for road, id_start in zip(road_nodes, id_starts):
+                self.id_counter = id_start
+                results.append(self.load_road(road))
+
+        for lanes, roadlines, objects in results:
             for lane in lanes:
                 map_.add_lane(lane)
             for roadline in roadlines:
@@ -596,6 +891,7 @@ class XODRParser:
             for obj in objects:
                 map_.add_area(obj)
 
+        self.id_counter = id_starts[-1]
         for junction in xml_root.findall("junction"):
             map_.add_junction(self.load_junction(junction))
 
@@ -0,0 +1,11 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: __init__.py
+# @Description: Initialize the map routing module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+from .lane_graph import LaneGraph
+
+__all__ = ["LaneGraph"]
@@ -0,0 +1,257 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: lane_graph.py
+# @Description: This file implements a lane graph in the compressed sparse row format and a router on it.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+import heapq
+import math
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from tactics2d.map.element import Map
+
+
+class LaneGraph:
+    """This class implements a directed graph of the lanes in a map and a router on it.
+
+    Every lane is a vertex. An edge from a lane to its successor costs the length of the successor, and an edge from a lane to its left or right neighbor costs the lane change penalty. The cost of a route is the total cost of its edges, i.e., the length of the lanes after the origin lane plus the penalties of the lane changes.
+
+    The edges are stored in the compressed sparse row (CSR) format: the outgoing edges of the i-th lane are `indices[indptr[i]:indptr[i + 1]]` with the costs `costs[indptr[i]:indptr[i + 1]]`. The routes found by [shortest_path](#tactics2d.map.routing.LaneGraph.shortest_path) are kept in an LRU cache.
+
+    Attributes:
+        lane_ids (List[str]): The ids of the lanes. The index of a lane in this list is its vertex index.
+        lengths (np.ndarray): The lengths of the lanes, which is the average length of the two sides. The shape is (n,).
+        indptr (np.ndarray): The index pointers of the CSR adjacency. The shape is (n + 1,).
+        indices (np.ndarray): The target vertices of the edges. The shape is (m,).
+        costs (np.ndarray): The costs of the edges. The shape is (m,).
+        edge_types (np.ndarray): The types of the edges. 0 for successor, 1 for left lane change, and 2 for right lane change. The shape is (m,).
+        lane_change_cost (float): The penalty of a lane change.
+        cache_size (int): The maximum number of cached routes.
+    """
+
+    SUCCESSOR = 0
+    LEFT_CHANGE = 1
+    RIGHT_CHANGE = 2
+
+    def __init__(self, map_: Map, lane_change_cost: float = 10.0, cache_size: int = 1024):
+        """Initialize an instance for the class.
+
+        Args:
+            map_ (Map): The map to build the lane graph from.
+            lane_change_cost (float, optional): The penalty of a lane change. It should be positive.
+            cache_size (int, optional): The maximum number of cached routes.
+
+        Raises:
+            ValueError: If the lane change cost is not positive.
+        """
+        if lane_change_cost <= 0:
+            raise ValueError("The lane change cost should be positive.")
+
+        self.lane_change_cost = lane_change_cost
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        lanes = [lane for lane in map_.lanes.values() if lane.geometry is not None]
+        self.lane_ids = [lane.id_ for lane in lanes]
+        self._lane_index = {id_: i for i, id_ in enumerate(self.lane_ids)}
+        n_lane = len(lanes)
+
+        self.lengths = np.array(
+            [(lane.left_side.length + lane.right_side.length) / 2 for lane in lanes], dtype=float
+        ).reshape(n_lane)
+        # the end of a lane is the midpoint of its end points
+        self._ends = np.array([np.mean(lane.ends, axis=0)[:2] for lane in lanes]).reshape(n_lane, 2)
+
+        # keep the cheapest edge if two lanes are related in more than one way
+        edges = dict()
+        for i, lane in enumerate(lanes):
+            related = [(id_, self.SUCCESSOR) for id_ in lane.successors]
+            related += [(id_, self.LEFT_CHANGE) for id_ in lane.left_neighbors]
+            related += [(id_, self.RIGHT_CHANGE) for id_ in lane.right_neighbors]
+            for id_, edge_type in related:
+                j = self._lane_index.get(id_)
+                if j is None or j == i:
+                    continue
+                cost = self.lengths[j] if edge_type == self.SUCCESSOR else lane_change_cost
+                # avoid zero weights, which are regarded as missing edges by scipy
+                cost = max(cost, 1e-6)
+                if (i, j) not in edges or cost < edges[(i, j)][0]:
+                    edges[(i, j)] = (cost, edge_type)
+
+        sources = np.array([i for i, _ in edges], dtype=np.int64)
+        targets = np.array([j for _, j in edges], dtype=np.int64)
+        costs = np.array([cost for cost, _ in edges.values()], dtype=float)
+        edge_types = np.array([edge_type for _, edge_type in edges.values()], dtype=np.int8)
+
+        order = np.lexsort((targets, sources))
+        self.indices = targets[order]
+        self.costs = costs[order]
+        self.edge_types = edge_types[order]
+        self.indptr = np.zeros(n_lane + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n_lane), out=self.indptr[1:])
+
+        # Scale the Euclidean distance so that the heuristic of A* never exceeds the cost of an
+        # edge, which keeps the heuristic admissible and consistent.
+        if len(self.costs) > 0:
+            displacements = np.linalg.norm(
+                self._ends[self.indices] - self._ends[sources[order]], axis=1
+            )
+            with np.errstate(divide="ignore"):
+                ratios = np.where(displacements > 0, self.costs / displacements, np.inf)
+            self._heuristic_scale = float(min(1.0, np.min(ratios)))
+        else:
+            self._heuristic_scale = 0.0
+
+        self._matrix = csr_matrix((self.costs, self.indices, self.indptr), shape=(n_lane, n_lane))
+        # plain lists are faster than arrays for the element-wise access in the search loop
+        self._adjacency = [
+            list(zip(self.indices[start:stop].tolist(), self.costs[start:stop].tolist()))
+            for start, stop in zip(self.indptr[:-1].tolist(), self.indptr[1:].tolist())
+        ]
+        self._end_list = self._ends.tolist()
+
+    @property
+    def n_lane(self) -> int:
+        return len(self.lane_ids)
+
+    def _to_index(self, lane_id: str) -> int:
+        if lane_id not in self._lane_index:
+            raise KeyError(f"Lane {lane_id} is not in the lane graph.")
+        return self._lane_index[lane_id]
+
+    def _search(self, origin: int, destination: int, use_heuristic: bool) -> Tuple[list, float]:
+        end_x, end_y = self._end_list[destination]
+        scale = self._heuristic_scale if use_heuristic else 0.0
+        ends = self._end_list
+
+        costs = {origin: 0.0}
+        parents = {origin: -1}
+        heap = [(0.0, 0.0, origin)]
+        closed = set()
+
+        while heap:
+            _, cost, vertex = heapq.heappop(heap)
+            if vertex in closed:
+                continue
+            if vertex == destination:
+                path = []
+                while vertex != -1:
+                    path.append(vertex)
+                    vertex = parents[vertex]
+                return path[::-1], cost
+            closed.add(vertex)
+
+            for target, edge_cost in self._adjacency[vertex]:
+                new_cost = cost + edge_cost
+                if target not in closed and new_cost < costs.get(target, math.inf):
+                    costs[target] = new_cost
+                    parents[target] = vertex
+                    priority = new_cost
+                    if scale > 0:
+                        x, y = ends[target]
+                        priority += scale * math.hypot(x - end_x, y - end_y)
+                    heapq.heappush(heap, (priority, new_cost, target))
+
+        return None, math.inf
+
+    def shortest_path(
+        self, origin: str, destination: str, method: str = "astar"
+    ) -> Tuple[List[str], float]:
+        """This function finds the cheapest route between two lanes. The result is cached.
+
+        Args:
+            origin (str): The id of the origin lane.
+            destination (str): The id of the destination lane.
+            method (str, optional): The search algorithm. It can be "astar" or "dijkstra".
+
+        Returns:
+            route (List[str]): The ids of the lanes on the route, including the origin and destination. If the destination is unreachable, it is None.
+            cost (float): The cost of the route. If the destination is unreachable, it is inf.
+
+        Raises:
+            KeyError: If the origin or destination is not in the lane graph.
+            ValueError: If the method is not supported.
+        """
+        if method not in ["astar", "dijkstra"]:
+            raise ValueError(f"Method {method} is not supported.")
+
+        key = (origin, destination)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        path, cost = self._search(
+            self._to_index(origin), self._to_index(destination), method == "astar"
+        )
+        result = (None if path is None else [self.lane_ids[i] for i in path], float(cost))
+
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return result
+
+    def cost_matrix(self, origins: List[str], destinations: List[str] = None) -> np.ndarray:
+        """This function computes the route costs between many origins and destinations in a batch. The single-source searches from all the origins are run in compiled code.
+
+        Args:
+            origins (List[str]): The ids of the origin lanes.
+            destinations (List[str], optional): The ids of the destination lanes. If not specified, the costs to all the lanes in the order of `lane_ids` are returned.
+
+        Returns:
+            The route costs. The unreachable pairs are inf. The shape is (len(origins), len(destinations)).
+        """
+        origin_indices = [self._to_index(id_) for id_ in origins]
+        costs = dijkstra(self._matrix, directed=True, indices=origin_indices)
+        costs = costs.reshape(len(origin_indices), self.n_lane)
+        if destinations is None:
+            return costs
+
+        return costs[:, [self._to_index(id_) for id_ in destinations]]
+
+    def shortest_paths(
+        self, origins: List[str], destinations: List[str]
+    ) -> List[List[Tuple[List[str], float]]]:
+        """This function finds the cheapest routes between many origins and destinations in a batch.
+
+        Args:
+            origins (List[str]): The ids of the origin lanes.
+            destinations (List[str]): The ids of the destination lanes.
+
+        Returns:
+            The routes and their costs. The element [i][j] is the result of [shortest_path](#tactics2d.map.routing.LaneGraph.shortest_path) from `origins[i]` to `destinations[j]`.
+        """
+        origin_indices = [self._to_index(id_) for id_ in origins]
+        destination_indices = [self._to_index(id_) for id_ in destinations]
+        costs, predecessors = dijkstra(
+            self._matrix, directed=True, indices=origin_indices, return_predecessors=True
+        )
+        costs = costs.reshape(len(origin_indices), self.n_lane)
+        predecessors = predecessors.reshape(len(origin_indices), self.n_lane)
+
+        results = []
+        for i, origin in enumerate(origin_indices):
+            row = []
+            cost_row = costs[i].tolist()
+            predecessor_row = predecessors[i].tolist()
+            for destination in destination_indices:
+                if math.isinf(cost_row[destination]):
+                    row.append((None, math.inf))
+                    continue
+                path = [destination]
+                while path[-1] != origin:
+                    path.append(predecessor_row[path[-1]])
+                row.append(([self.lane_ids[j] for j in path[::-1]], cost_row[destination]))
+            results.append(row)
+
+        return results
+
+    def clear_cache(self):
+        """This function clears the cached routes."""
+        self._cache.clear()
@@ -5,7 +5,10 @@
 # @Author: Yueyuan Li
 # @Version: 1.0.0
 
+from .adaptive_sampler import AdaptiveSampler
 from .circle import Circle
+from .frenet import FrenetFrame
+from .obb import OBB
 from .vector import Vector
 
-__all__ = ["Circle", "Vector"]
+__all__ = ["AdaptiveSampler", "Circle", "FrenetFrame", "OBB", "Vector"]
@@ -0,0 +1,136 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: adaptive_sampler.py
+# @Description: This file implements an adaptive sampler of curves by the chord deviation.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+from typing import Callable
+
+import numpy as np
+
+
+class AdaptiveSampler:
+    """This class implements an adaptive sampler of curves. The samples are placed so that the chord between two adjacent samples deviates from the curve by no more than a tolerance. The straight and gentle parts of a curve get few samples, while the sharp turns get many.
+
+    The curves whose curvature changes linearly with the arc length, i.e., the lines, arcs, and clothoids, are sampled in closed form by [sample_by_curvature](#tactics2d.math.geometry.AdaptiveSampler.sample_by_curvature). The other parametric curves are sampled by [sample_by_subdivision](#tactics2d.math.geometry.AdaptiveSampler.sample_by_subdivision).
+    """
+
+    @staticmethod
+    def get_step(curvature: np.ndarray, tolerance: float, max_step: float = np.inf) -> np.ndarray:
+        r"""This function gets the longest arc length whose chord deviates from an arc with the curvature by no more than the tolerance. The deviation of the chord from an arc with the radius $r$ and the length $l$ is $r (1 - \cos(l / 2r))$.
+
+        Args:
+            curvature (np.ndarray): The curvature of the arc. The sign is ignored.
+            tolerance (float): The maximum distance from the arc to the chord.
+            max_step (float, optional): The upper bound of the arc length. Defaults to np.inf, which means that a straight line is not split.
+
+        Returns:
+            step (np.ndarray): The longest arc length. The shape is the same as the curvature.
+        """
+        curvature = np.abs(np.asarray(curvature, dtype=float))
+        # 2 arccos(1 - x) = 4 arcsin(sqrt(x / 2)), which keeps the precision for a gentle arc
+        angle = 4 * np.arcsin(np.sqrt(np.minimum(tolerance * curvature, 1) / 2))
+        step = np.divide(
+            angle, curvature, out=np.full(curvature.shape, np.inf), where=curvature > 0
+        )
+
+        return np.minimum(step, max_step)
+
+    @staticmethod
+    def sample_by_curvature(
+        length: float,
+        tolerance: float,
+        start_curvature: float,
+        end_curvature: float = None,
+        max_step: float = np.inf,
+        n_piece: int = 32,
+    ) -> np.ndarray:
+        """This function samples a curve whose curvature changes linearly with the arc length. The curve is cut into pieces, and the samples are spread in every piece by the step of its largest curvature, which is the curvature at one of its ends.
+
+        Args:
+            length (float): The length of the curve.
+            tolerance (float): The maximum distance from the curve to the chord between two adjacent samples.
+            start_curvature (float): The curvature at the start of the curve.
+            end_curvature (float, optional): The curvature at the end of the curve. Defaults to None, which means the curvature is constant.
+            max_step (float, optional): The upper bound of the arc length between two adjacent samples. Defaults to np.inf.
+            n_piece (int, optional): The number of pieces of a curve with changing curvature. Defaults to 32.
+
+        Returns:
+            s (np.ndarray): The arc lengths of the samples, including both ends of the curve. The shape is (n,).
+        """
+        if end_curvature is None or end_curvature == start_curvature:
+            n_piece = 1
+            end_curvature = start_curvature
+
+        edges = np.linspace(0, length, n_piece + 1)
+        curvatures = np.abs(np.linspace(start_curvature, end_curvature, n_piece + 1))
+        steps = AdaptiveSampler.get_step(
+            np.maximum(curvatures[:-1], curvatures[1:]), tolerance, max_step
+        )
+        # the number of steps needed by every piece, which is zero for a straight line without max_step
+        counts = np.concatenate([[0], np.cumsum(np.diff(edges) / steps)])
+
+        n_step = int(np.ceil(counts[-1] - 1e-9))
+        if n_step <= 1:
+            return np.array([0, length], dtype=float)
+
+        return np.interp(np.linspace(0, counts[-1], n_step + 1), counts, edges)
+
+    @staticmethod
+    def sample_by_subdivision(
+        function: Callable[[np.ndarray], np.ndarray],
+        start: float,
+        end: float,
+        tolerance: float,
+        n_init: int = 4,
+        max_depth: int = 16,
+    ) -> np.ndarray:
+        """This function samples a parametric curve by subdivision. An interval of the parameter is split at its middle until the points at its quarters are within the tolerance from its chord. All the intervals at the same depth are checked in one call of the function.
+
+        Args:
+            function (Callable[[np.ndarray], np.ndarray]): The function mapping the parameters in the shape of (m,) to the curve points in the shape of (m, 2).
+            start (float): The start of the parameter.
+            end (float): The end of the parameter.
+            tolerance (float): The maximum distance from the curve to the chord between two adjacent samples.
+            n_init (int, optional): The number of intervals to start with, which keeps the subdivision from missing a wiggle between two checked points. Defaults to 4.
+            max_depth (int, optional): The maximum number of splits of an interval. Defaults to 16.
+
+        Returns:
+            params (np.ndarray): The parameters of the samples in increasing order, including both ends. The shape is (n,).
+        """
+        edges = np.linspace(start, end, n_init + 1)
+        starts, ends = edges[:-1], edges[1:]
+        fractions = np.array([0, 0.25, 0.5, 0.75, 1])
+        done = []
+
+        for depth in range(max_depth + 1):
+            params = starts[:, None] + (ends - starts)[:, None] * fractions
+            points = np.asarray(function(params.ravel()), dtype=float).reshape(-1, 5, 2)
+
+            chords = points[:, -1] - points[:, 0]
+            offsets = points[:, 1:-1] - points[:, :1]
+            lengths = np.linalg.norm(chords, axis=1)
+            cross = np.abs(
+                chords[:, None, 0] * offsets[..., 1] - chords[:, None, 1] * offsets[..., 0]
+            )
+            distances = np.where(
+                lengths[:, None] > 0,
+                cross / np.where(lengths > 0, lengths, 1)[:, None],
+                np.linalg.norm(offsets, axis=-1),
+            )
+            flat = np.max(distances, axis=1) <= tolerance
+            if depth == max_depth:
+                flat[:] = True
+
+            done.append(starts[flat])
+            if np.all(flat):
+                break
+
+            middles = (starts[~flat] + ends[~flat]) / 2
+            starts, ends = (
+                np.concatenate([starts[~flat], middles]),
+                np.concatenate([middles, ends[~flat]]),
+            )
+
+        return np.append(np.sort(np.concatenate(done)), end)
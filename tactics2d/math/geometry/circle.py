@@ -10,6 +10,8 @@ from typing import Tuple, Union
 
 import numpy as np
 
+from .adaptive_sampler import AdaptiveSampler
+
 
 class Circle:
     """This class implement some frequently operations on circle.
@@ -74,6 +76,44 @@ class Circle:
 
         return center, radius
 
+    @staticmethod
+    def get_circle_by_three_points_batch(
+        pts1: np.ndarray, pts2: np.ndarray, pts3: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """This function gets the circles by a batch of point triples. The points are shifted to the first point of their triple before solving the circumcenter, which keeps the precision for the circles far from the origin.
+
+        Args:
+            pts1 (np.ndarray): The first points. The shape is (n, 2).
+            pts2 (np.ndarray): The second points. The shape is (n, 2).
+            pts3 (np.ndarray): The third points. The shape is (n, 2).
+
+        Returns:
+            centers (np.ndarray): The centers of the circles. It is nan if the three points are collinear. The shape is (n, 2).
+            radii (np.ndarray): The radii of the circles. It is inf if the three points are collinear. The shape is (n,).
+        """
+        pts1 = np.asarray(pts1, dtype=float).reshape(-1, 2)
+        b = np.asarray(pts2, dtype=float).reshape(-1, 2) - pts1
+        c = np.asarray(pts3, dtype=float).reshape(-1, 2) - pts1
+
+        d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+        b_norm = np.sum(b**2, axis=1)
+        c_norm = np.sum(c**2, axis=1)
+        offsets = np.column_stack(
+            [c[:, 1] * b_norm - b[:, 1] * c_norm, b[:, 0] * c_norm - c[:, 0] * b_norm]
+        )
+        collinear = d == 0
+        offsets = np.divide(
+            offsets,
+            d[:, None],
+            out=np.full(offsets.shape, np.nan),
+            where=~collinear[:, None],
+        )
+
+        centers = pts1 + offsets
+        radii = np.where(collinear, np.inf, np.linalg.norm(offsets, axis=1))
+
+        return centers, radii
+
     @staticmethod
     def get_circle_by_tangent_vector(
         tangent_point: Union[list, np.ndarray], heading: float, radius: float, side: str
@@ -96,6 +136,37 @@ class Circle:
             vec = np.array([np.cos(heading + np.pi / 2), np.sin(heading + np.pi / 2)]) * radius
         return tangent_point + vec, radius
 
+    @staticmethod
+    def get_circle_by_tangent_vector_batch(
+        tangent_points: np.ndarray,
+        headings: np.ndarray,
+        radii: Union[float, np.ndarray],
+        sides: Union[str, np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """This function gets the circles by a batch of tangent points, headings and radii.
+
+        Args:
+            tangent_points (np.ndarray): The tangent points on the circles. The shape is (n, 2).
+            headings (np.ndarray): The headings of the tangent points. The unit is radian. The shape is (n,).
+            radii (Union[float, np.ndarray]): The radii of the circles. The shape is (n,) or a scalar shared by all the circles.
+            sides (Union[str, np.ndarray]): The locations of the circle centers relative to the tangent points. "L" represents left. "R" represents right. The shape is (n,) or a scalar shared by all the circles.
+
+        Returns:
+            centers (np.ndarray): The centers of the circles. The shape is (n, 2).
+            radii (np.ndarray): The radii of the circles. The shape is (n,).
+        """
+        tangent_points = np.asarray(tangent_points, dtype=float).reshape(-1, 2)
+        headings = np.asarray(headings, dtype=float).reshape(-1)
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), headings.shape)
+        turns = np.where(np.asarray(sides) == "L", 1, -1)
+
+        # the center is on the left of the heading for a left turn, i.e., (-sin, cos)
+        centers = tangent_points + (turns * radii)[:, None] * np.column_stack(
+            [-np.sin(headings), np.cos(headings)]
+        )
+
+        return centers, np.array(radii)
+
     @staticmethod
     def get_circle(method: ConstructBy, *args: tuple):
         """This function gets a circle by different given conditions.
@@ -126,6 +197,7 @@ class Circle:
         start_angle: float,
         clockwise: bool = True,
         step_size: float = 0.1,
+        tolerance: float = None,
     ) -> np.ndarray:
         """This function gets the points on an arc curve line.
 
@@ -136,18 +208,77 @@ class Circle:
             start_angle (float): The start angle of the arc. The unit is radian.
             clockwise (bool): The direction of the arc. True represents clockwise. False represents counterclockwise.
             step_size (float): The step size of the arc. The unit is radian.
+            tolerance (float, optional): The maximum distance from the arc to the chord between two adjacent points. If it is given, the arc is sampled by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler) instead of the step size, and the end of the arc is included. Defaults to None.
 
         Returns:
             arc_points(np.ndarray): The points on the arc. The shape is (int(radius * delta / step_size), 2).
         """
-        if clockwise:
-            angles = np.array(
-                np.arange(start_angle, (start_angle - delta_angle), -step_size / radius)
-            )
-        else:
-            angles = np.array(
-                np.arange(start_angle, (start_angle + delta_angle), step_size / radius)
-            )
+        arc_points, _, _ = Circle.get_arc_batch(
+            center_point, radius, delta_angle, start_angle, clockwise, step_size, tolerance
+        )
 
-        arc_points = center_point + np.array([np.cos(angles), np.sin(angles)]).T * radius
         return arc_points
+
+    @staticmethod
+    def get_arc_batch(
+        center_points: np.ndarray,
+        radii: np.ndarray,
+        delta_angles: np.ndarray,
+        start_angles: np.ndarray,
+        clockwise: Union[bool, np.ndarray] = True,
+        step_size: float = 0.1,
+        tolerance: float = None,
+        n_points: Union[int, np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """This function gets the points on a batch of arcs in one call. The points of all the arcs are stored in one ragged array, where the points of the i-th arc are `arc_points[offsets[i]:offsets[i + 1]]`.
+
+        The arcs are sampled in the same way as [get_arc](#tactics2d.math.geometry.Circle.get_arc) by default. The arc length between two adjacent points is the step size, and the end of the arc is excluded. If the tolerance is given, the arcs are sampled by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler) and the ends are included. If the numbers of points are given, the arcs are evenly sampled by them, including both ends.
+
+        Args:
+            center_points (np.ndarray): The centers of the arcs. The shape is (n, 2).
+            radii (np.ndarray): The radii of the arcs. The shape is (n,).
+            delta_angles (np.ndarray): The angles of the arcs. These values are expected to be non-negative. The unit is radian. The shape is (n,).
+            start_angles (np.ndarray): The start angles of the arcs. The unit is radian. The shape is (n,).
+            clockwise (Union[bool, np.ndarray], optional): The directions of the arcs. True represents clockwise. The shape is (n,) or a scalar shared by all the arcs. Defaults to True.
+            step_size (float, optional): The arc length between two adjacent points. Defaults to 0.1.
+            tolerance (float, optional): The maximum distance from the arcs to the chord between two adjacent points. Defaults to None.
+            n_points (Union[int, np.ndarray], optional): The numbers of points on the arcs. It should be at least 2. The shape is (n,) or a scalar shared by all the arcs. Defaults to None.
+
+        Returns:
+            arc_points (np.ndarray): The points on the arcs. The shape is (m, 2).
+            angles (np.ndarray): The angles of the points around their centers, which are continuous along every arc. The shape is (m,).
+            offsets (np.ndarray): The start index of every arc in arc_points, followed by the total number of points. The shape is (n + 1,).
+        """
+        center_points = np.asarray(center_points, dtype=float).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=float).reshape(-1)
+        delta_angles = np.asarray(delta_angles, dtype=float).reshape(-1)
+        start_angles = np.asarray(start_angles, dtype=float).reshape(-1)
+        signs = np.where(np.broadcast_to(clockwise, radii.shape), -1.0, 1.0)
+
+        if n_points is not None:
+            counts = np.broadcast_to(np.asarray(n_points, dtype=np.int64), radii.shape)
+            angle_steps = delta_angles / (counts - 1)
+        elif tolerance is not None:
+            # the same as AdaptiveSampler.sample_by_curvature for a constant curvature
+            steps = AdaptiveSampler.get_step(1 / radii, tolerance)
+            n_steps = np.maximum(np.ceil(radii * delta_angles / steps - 1e-9), 1).astype(np.int64)
+            counts = n_steps + 1
+            angle_steps = delta_angles / n_steps
+        else:
+            # the same as the length of np.arange(0, delta_angle, step_size / radius)
+            angle_steps = step_size / radii
+            counts = np.maximum(np.ceil(delta_angles / angle_steps), 0).astype(np.int64)
+
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        arc_ids = np.repeat(np.arange(len(radii)), counts)
+        indices = np.arange(offsets[-1]) - offsets[arc_ids]
+        angles = start_angles[arc_ids] + signs[arc_ids] * indices * angle_steps[arc_ids]
+        if n_points is not None or tolerance is not None:
+            # avoid the rounding error at the end of every arc
+            angles[offsets[1:] - 1] = start_angles + signs * delta_angles
+
+        arc_points = center_points[arc_ids] + radii[arc_ids, None] * np.column_stack(
+            [np.cos(angles), np.sin(angles)]
+        )
+
+        return arc_points, angles, offsets
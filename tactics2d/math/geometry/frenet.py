@@ -0,0 +1,125 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: frenet.py
+# @Description: This file implements the Frenet frame along a polyline.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+from typing import Tuple
+
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+
+class FrenetFrame:
+    """This class implements the Frenet frame along a polyline, such as the centerline of a lane.
+
+    A point is expressed by its arc length `s` along the polyline and its signed lateral offset `d` from the polyline. The offset is positive on the left side of the polyline. The cumulative arc lengths of the vertices are precomputed, so that both the projection and the inverse mapping are vectorized. The segments are indexed by an STRtree at the first projection, so that a point is only compared with its nearest segments.
+
+    Attributes:
+        points (np.ndarray): The vertices of the polyline. The shape is (m, 2).
+        s (np.ndarray): The cumulative arc lengths at the vertices. The shape is (m,).
+        length (float): The total length of the polyline. This attribute is **read-only**.
+    """
+
+    def __init__(self, points: np.ndarray):
+        """Initialize an instance for the class.
+
+        Args:
+            points (np.ndarray): The vertices of the polyline. The shape is (m, 2). The duplicated consecutive vertices are removed.
+
+        Raises:
+            ValueError: If the polyline has less than two distinct vertices.
+        """
+        points = np.asarray(points, dtype=float)[:, :2]
+        if len(points) > 1:
+            keep = np.ones(len(points), dtype=bool)
+            keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)
+            points = points[keep]
+        if len(points) < 2:
+            raise ValueError("The polyline should have at least two distinct vertices.")
+
+        self.points = points
+        self._vectors = np.diff(points, axis=0)
+        self._lengths = np.linalg.norm(self._vectors, axis=1)
+        self._tangents = self._vectors / self._lengths[:, None]
+        self._headings = np.arctan2(self._tangents[:, 1], self._tangents[:, 0])
+        self.s = np.concatenate([[0], np.cumsum(self._lengths)])
+        self._segment_tree = None
+
+    @property
+    def length(self) -> float:
+        return float(self.s[-1])
+
+    def project(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """This function projects points onto the polyline.
+
+        Args:
+            points (np.ndarray): The points to project. The shape is (n, 2).
+
+        Returns:
+            s (np.ndarray): The arc lengths of the projections. The shape is (n,).
+            d (np.ndarray): The signed lateral offsets of the points. The shape is (n,).
+            heading (np.ndarray): The headings of the polyline at the projections. The shape is (n,).
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return np.empty(0), np.empty(0), np.empty(0)
+
+        if self._segment_tree is None:
+            self._segment_tree = STRtree(
+                shapely.linestrings(np.stack([self.points[:-1], self.points[1:]], axis=1))
+            )
+        # the candidates of a point are its nearest segments, which are more than one at the ties
+        point_ids, segment_ids = self._segment_tree.query_nearest(
+            shapely.points(points), all_matches=True
+        )
+
+        diffs = points[point_ids] - self.points[segment_ids]
+        tangents = self._tangents[segment_ids]
+        t = np.clip(np.einsum("ij,ij->i", diffs, tangents), 0, self._lengths[segment_ids])
+        offsets = diffs - t[:, None] * tangents
+        distances = np.einsum("ij,ij->i", offsets, offsets)
+
+        # keep the closest candidate of every point, and the first segment among the equal ones
+        order = np.lexsort((segment_ids, distances, point_ids))
+        order = order[np.unique(point_ids[order], return_index=True)[1]]
+        t, diffs, tangents, segment_ids = (
+            t[order],
+            diffs[order],
+            tangents[order],
+            segment_ids[order],
+        )
+
+        s = self.s[segment_ids] + t
+        cross = tangents[:, 0] * diffs[:, 1] - tangents[:, 1] * diffs[:, 0]
+        d = np.sign(cross) * np.sqrt(distances[order])
+
+        return s, d, self._headings[segment_ids]
+
+    def to_cartesian(self, s: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """This function maps Frenet coordinates back to Cartesian coordinates. The arc lengths out of the polyline are extrapolated along the first or last segment.
+
+        Args:
+            s (np.ndarray): The arc lengths. The shape is (n,).
+            d (np.ndarray): The signed lateral offsets. The shape is (n,).
+
+        Returns:
+            points (np.ndarray): The Cartesian coordinates. The shape is (n, 2).
+            heading (np.ndarray): The headings of the polyline at the arc lengths. The shape is (n,).
+        """
+        s = np.asarray(s, dtype=float).reshape(-1)
+        d = np.asarray(d, dtype=float).reshape(-1)
+        segment_ids = np.clip(
+            np.searchsorted(self.s, s, side="right") - 1, 0, len(self._lengths) - 1
+        )
+        tangents = self._tangents[segment_ids]
+        normals = np.stack([-tangents[:, 1], tangents[:, 0]], axis=1)
+        points = (
+            self.points[segment_ids]
+            + (s - self.s[segment_ids])[:, None] * tangents
+            + d[:, None] * normals
+        )
+
+        return points, self._headings[segment_ids]
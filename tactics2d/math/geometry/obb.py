@@ -0,0 +1,278 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: obb.py
+# @Description: This file implements some frequently operations on oriented bounding boxes.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+from typing import Tuple, Union
+
+import numpy as np
+import shapely
+
+
+class OBB:
+    """This class implement some frequently operations on oriented bounding boxes (OBB), i.e., rectangles that are not necessarily aligned with the axes.
+
+    An OBB is represented by its four vertices in an array with the shape of (4, 2). All the methods accept batches of OBBs with the shape of (..., 4, 2) and follow the broadcasting rules of NumPy. For example, the pairwise IoU between n agents and m targets can be obtained by `OBB.iou_batch(agents[:, None], targets[None])`, which returns an array with the shape of (n, m).
+    """
+
+    _tol = 1e-9
+
+    @staticmethod
+    def get_vertices(
+        center: np.ndarray,
+        heading: Union[float, np.ndarray],
+        length: Union[float, np.ndarray],
+        width: Union[float, np.ndarray],
+    ) -> np.ndarray:
+        """This function gets the vertices of OBBs from their centers, headings and sizes.
+
+        Args:
+            center (np.ndarray): The centers of the OBBs. The shape is (..., 2).
+            heading (Union[float, np.ndarray]): The headings of the OBBs. The unit is radian.
+            length (Union[float, np.ndarray]): The lengths of the OBBs along the heading.
+            width (Union[float, np.ndarray]): The widths of the OBBs.
+
+        Returns:
+            vertices (np.ndarray): The vertices of the OBBs in counterclockwise order. The shape is (..., 4, 2).
+        """
+        center = np.asarray(center, dtype=float)
+        heading = np.asarray(heading, dtype=float)[..., None]
+        half_length = np.asarray(length, dtype=float)[..., None] / 2
+        half_width = np.asarray(width, dtype=float)[..., None] / 2
+
+        local_x = np.array([1, 1, -1, -1]) * half_length
+        local_y = np.array([-1, 1, 1, -1]) * half_width
+        cos, sin = np.cos(heading), np.sin(heading)
+        x = cos * local_x - sin * local_y + center[..., 0:1]
+        y = sin * local_x + cos * local_y + center[..., 1:2]
+
+        return np.stack([x, y], axis=-1)
+
+    @staticmethod
+    def from_geometry(geometry) -> Tuple[np.ndarray, np.ndarray]:
+        """This function extracts the vertices of OBBs from shapely geometries.
+
+        Args:
+            geometry (Union[Polygon, LinearRing, np.ndarray]): A polygon or linear ring, or an array of them with the shape of (n,).
+
+        Returns:
+            vertices (np.ndarray): The vertices of the geometries. The shape is (4, 2) or (n, 4, 2). The values are meaningless where the geometry is not a rectangle.
+            is_rectangle (Union[bool, np.ndarray]): Whether the geometry is a rectangle. The shape is () or (n,).
+        """
+        single = isinstance(geometry, shapely.Geometry)
+        geometries = np.empty(1, dtype=object) if single else np.asarray(geometry, dtype=object)
+        if single:
+            geometries[0] = geometry
+
+        is_polygon = shapely.get_type_id(geometries) == 3
+        is_rectangle = ~is_polygon | (shapely.get_num_interior_rings(geometries) == 0)
+        geometries = np.where(is_polygon, shapely.get_exterior_ring(geometries), geometries)
+        is_rectangle &= shapely.get_num_coordinates(geometries) == 5
+        vertices = np.zeros((len(geometries), 4, 2))
+        if np.any(is_rectangle):
+            coords = shapely.get_coordinates(geometries[is_rectangle]).reshape(-1, 5, 2)
+            vertices[is_rectangle] = coords[:, :4]
+
+        is_rectangle &= OBB.is_rectangle(vertices)
+
+        if single:
+            return vertices[0], bool(is_rectangle[0])
+        return vertices, is_rectangle
+
+    @staticmethod
+    def is_rectangle(vertices: np.ndarray) -> np.ndarray:
+        """This function checks whether quadrilaterals are rectangles. A quadrilateral is a rectangle if its diagonals bisect each other and have equal lengths.
+
+        Args:
+            vertices (np.ndarray): The vertices of the quadrilaterals. The shape is (..., 4, 2).
+
+        Returns:
+            is_rectangle (np.ndarray): Whether each quadrilateral is a rectangle. The shape is (...,).
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        length1 = np.linalg.norm(vertices[..., 2, :] - vertices[..., 0, :], axis=-1)
+        length2 = np.linalg.norm(vertices[..., 3, :] - vertices[..., 1, :], axis=-1)
+        midpoint_diff = np.linalg.norm(
+            vertices[..., 0, :] + vertices[..., 2, :] - vertices[..., 1, :] - vertices[..., 3, :],
+            axis=-1,
+        )
+        tol = OBB._tol * np.maximum(length1, OBB._tol)
+
+        return (length1 > OBB._tol) & (np.abs(length1 - length2) <= tol) & (midpoint_diff <= tol)
+
+    @staticmethod
+    def area(vertices: np.ndarray) -> np.ndarray:
+        """This function computes the areas of OBBs.
+
+        Args:
+            vertices (np.ndarray): The vertices of the OBBs. The shape is (..., 4, 2).
+
+        Returns:
+            area (np.ndarray): The areas of the OBBs. The shape is (...,).
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        edge1 = vertices[..., 1, :] - vertices[..., 0, :]
+        edge2 = vertices[..., 3, :] - vertices[..., 0, :]
+        return np.abs(edge1[..., 0] * edge2[..., 1] - edge1[..., 1] * edge2[..., 0])
+
+    @staticmethod
+    def _clip(polygon: list, start: tuple, end: tuple) -> list:
+        # Sutherland-Hodgman clipping of a polygon by the half-plane on the left of an edge
+        x1, y1 = start
+        ex, ey = end[0] - x1, end[1] - y1
+        clipped = []
+        px, py = polygon[-1]
+        p_side = ex * (py - y1) - ey * (px - x1)
+        for qx, qy in polygon:
+            q_side = ex * (qy - y1) - ey * (qx - x1)
+            if (q_side >= 0) != (p_side >= 0):
+                t = p_side / (p_side - q_side)
+                clipped.append((px + t * (qx - px), py + t * (qy - py)))
+            if q_side >= 0:
+                clipped.append((qx, qy))
+            px, py, p_side = qx, qy, q_side
+
+        return clipped
+
+    @staticmethod
+    def intersection_area(vertices1: np.ndarray, vertices2: np.ndarray) -> float:
+        """This function computes the intersection area of two OBBs analytically by convex clipping. It is optimized for a single pair of OBBs. For batches of OBBs, use [intersection_area_batch](#tactics2d.math.geometry.OBB.intersection_area_batch) instead.
+
+        Args:
+            vertices1 (np.ndarray): The vertices of the first OBB. The shape is (4, 2). Any simple polygon with the shape of (k, 2) is also accepted.
+            vertices2 (np.ndarray): The vertices of the second OBB. The shape is (4, 2). Any convex polygon with the shape of (k, 2) is also accepted.
+
+        Returns:
+            area (float): The intersection area.
+        """
+        polygon = np.asarray(vertices1, dtype=float).tolist()
+        clipper = np.asarray(vertices2, dtype=float).tolist()
+
+        # the clipper is expected to be counterclockwise
+        signed_area = 0
+        (px, py) = clipper[-1]
+        for qx, qy in clipper:
+            signed_area += px * qy - py * qx
+            px, py = qx, qy
+        if signed_area < 0:
+            clipper.reverse()
+
+        start = clipper[-1]
+        for end in clipper:
+            polygon = OBB._clip(polygon, start, end)
+            if len(polygon) < 3:
+                return 0.0
+            start = end
+
+        area = 0
+        (px, py) = polygon[-1]
+        for qx, qy in polygon:
+            area += px * qy - py * qx
+            px, py = qx, qy
+
+        return abs(area) / 2
+
+    @staticmethod
+    def _clip_edges(
+        x1: np.ndarray, y1: np.ndarray, x2: np.ndarray, y2: np.ndarray, keep_same: bool
+    ) -> np.ndarray:
+        # The boundary of the intersection is made up of the parts of the edges of one box that
+        # are inside the other box. Every edge is clipped by the four half-planes of the other
+        # box (Cyrus-Beck), and its contribution to the shoelace formula is accumulated.
+        sx, sy = x1[..., :, None], y1[..., :, None]
+        dx = np.roll(x1, -1, axis=-1)[..., :, None] - sx
+        dy = np.roll(y1, -1, axis=-1)[..., :, None] - sy
+        cx, cy = x2[..., None, :], y2[..., None, :]
+        ex = np.roll(x2, -1, axis=-1)[..., None, :] - cx
+        ey = np.roll(y2, -1, axis=-1)[..., None, :] - cy
+
+        numerator = ex * (sy - cy) - ey * (sx - cx)
+        denominator = ex * dy - ey * dx
+        tol = OBB._tol * np.maximum(np.sqrt((ex**2 + ey**2) * (dx**2 + dy**2)), OBB._tol)
+        parallel = np.abs(denominator) <= tol
+        collinear = parallel & (np.abs(numerator) <= tol)
+        # Overlapping collinear edges are counted once if they share the same direction, and
+        # cancel each other out if they have opposite directions.
+        same_direction = ex * dx + ey * dy > 0
+        collinear_inside = same_direction if keep_same else ~same_direction
+        outside = parallel & np.where(collinear, ~collinear_inside, numerator < 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = -numerator / denominator
+        t_min = np.max(np.where(~parallel & (denominator > 0), t, 0), axis=-1)
+        t_max = np.min(np.where(~parallel & (denominator < 0), t, 1), axis=-1)
+        t_min = np.clip(t_min, 0, 1)
+        t_max = np.clip(t_max, 0, 1)
+        valid = ~np.any(outside, axis=-1) & (t_max > t_min)
+
+        sx, sy, dx, dy = sx[..., 0], sy[..., 0], dx[..., 0], dy[..., 0]
+        cross = (sx + t_min * dx) * (sy + t_max * dy) - (sy + t_min * dy) * (sx + t_max * dx)
+
+        return np.sum(np.where(valid, cross, 0), axis=-1) / 2
+
+    @staticmethod
+    def intersection_area_batch(vertices1: np.ndarray, vertices2: np.ndarray) -> np.ndarray:
+        """This function computes the intersection areas of two batches of OBBs analytically in a vectorized way.
+
+        Args:
+            vertices1 (np.ndarray): The vertices of the first batch of OBBs. The shape is (..., 4, 2).
+            vertices2 (np.ndarray): The vertices of the second batch of OBBs. The shape is (..., 4, 2). It should be broadcastable with `vertices1`.
+
+        Returns:
+            area (np.ndarray): The intersection areas. The shape is the broadcasted shape of the batches.
+        """
+        vertices1 = np.asarray(vertices1, dtype=float)
+        vertices2 = np.asarray(vertices2, dtype=float)
+
+        # translate the boxes to reduce the round-off error of the shoelace formula
+        origin = vertices1[..., :1, :]
+        x1, y1 = vertices1[..., 0] - origin[..., 0], vertices1[..., 1] - origin[..., 1]
+        x2, y2 = vertices2[..., 0] - origin[..., 0], vertices2[..., 1] - origin[..., 1]
+        x1, y1, x2, y2 = np.broadcast_arrays(x1, y1, x2, y2)
+
+        # make all the boxes counterclockwise
+        clockwise1 = (
+            (x1[..., 1] - x1[..., 0]) * (y1[..., 2] - y1[..., 1])
+            < (y1[..., 1] - y1[..., 0]) * (x1[..., 2] - x1[..., 1])
+        )[..., None]
+        clockwise2 = (
+            (x2[..., 1] - x2[..., 0]) * (y2[..., 2] - y2[..., 1])
+            < (y2[..., 1] - y2[..., 0]) * (x2[..., 2] - x2[..., 1])
+        )[..., None]
+        x1, y1 = np.where(clockwise1, x1[..., ::-1], x1), np.where(clockwise1, y1[..., ::-1], y1)
+        x2, y2 = np.where(clockwise2, x2[..., ::-1], x2), np.where(clockwise2, y2[..., ::-1], y2)
+
+        area = OBB._clip_edges(x1, y1, x2, y2, True) + OBB._clip_edges(x2, y2, x1, y1, False)
+        return np.maximum(area, 0)
+
+    @staticmethod
+    def iou(vertices1: np.ndarray, vertices2: np.ndarray) -> float:
+        """This function computes the intersection over union (IoU) of two OBBs analytically.
+
+        Args:
+            vertices1 (np.ndarray): The vertices of the first OBB. The shape is (4, 2).
+            vertices2 (np.ndarray): The vertices of the second OBB. The shape is (4, 2).
+
+        Returns:
+            iou (float): The IoU value.
+        """
+        intersection = OBB.intersection_area(vertices1, vertices2)
+        union = float(OBB.area(vertices1) + OBB.area(vertices2)) - intersection
+        return intersection / union
+
+    @staticmethod
+    def iou_batch(vertices1: np.ndarray, vertices2: np.ndarray) -> np.ndarray:
+        """This function computes the intersection over union (IoU) of two batches of OBBs analytically in a vectorized way.
+
+        Args:
+            vertices1 (np.ndarray): The vertices of the first batch of OBBs. The shape is (..., 4, 2).
+            vertices2 (np.ndarray): The vertices of the second batch of OBBs. The shape is (..., 4, 2). It should be broadcastable with `vertices1`.
+
+        Returns:
+            iou (np.ndarray): The IoU values. The shape is the broadcasted shape of the batches.
+        """
+        intersection = OBB.intersection_area_batch(vertices1, vertices2)
+        union = OBB.area(vertices1) + OBB.area(vertices2) - intersection
+        return intersection / union
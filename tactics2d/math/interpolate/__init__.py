@@ -8,8 +8,8 @@
 from .b_spline import BSpline
 from .bezier import Bezier
 from .cubic_spline import CubicSpline
-from .dubins import Dubins
+from .dubins import Dubins, DubinsTable
 from .reeds_shepp import ReedsShepp
 from .spiral import Spiral
 
-__all__ = ["BSpline", "Bezier", "CubicSpline", "Dubins", "ReedsShepp", "Spiral"]
+__all__ = ["BSpline", "Bezier", "CubicSpline", "Dubins", "DubinsTable", "ReedsShepp", "Spiral"]
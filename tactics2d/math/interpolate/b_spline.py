@@ -5,12 +5,19 @@
 # @Author: Yueyuan Li
 # @Version: 1.0.0
 
+from typing import Tuple
+
 import numpy as np
 
 
 class BSpline:
     """This class implements a B-spline curve interpolator.
 
+    The curve is evaluated by the de Boor triangle of the basis functions, which runs for all the parameter values at once. Only the $p + 1$ nonzero basis functions on the knot span of every parameter value are computed, so the cost grows linearly with the number of parameter values. A batch of curves sharing the same knot vector can be evaluated together by passing the control points in the shape of $(b, n + 1, 2)$.
+
+    !!! quote "Reference"
+        Piegl, Les, and Wayne Tiller. *The NURBS book*. Springer Science & Business Media, 2012.
+
     Attributes:
         degree (int): The degree of the B-spline curve. Usually denoted as $p$ in the literature. The degree of a B-spline curve is equal to the degree of the highest degree basis function. The order of a B-spline curve is equal to $p + 1$.
     """
@@ -29,13 +36,14 @@ class BSpline:
             raise ValueError("The degree of a B-spline curve must be non-negative.")
 
     def _check_validity(self, control_points: np.ndarray, knot_vectors: np.ndarray):
-        if len(control_points.shape) != 2 or control_points.shape[1] != 2:
+        if len(control_points.shape) not in [2, 3] or control_points.shape[-1] != 2:
             raise ValueError("The shape of control_points is expected to be (n, 2).")
 
         if len(knot_vectors.shape) != 1:
             raise ValueError("The shape of knots is expected to be (t, ).")
 
-        if len(knot_vectors) != len(control_points) + self.degree + 1:  # t + 1 = (n + 1) + p + 1
+        # t + 1 = (n + 1) + p + 1
+        if len(knot_vectors) != control_points.shape[-2] + self.degree + 1:
             raise ValueError(
                 "The number of knots must be equal to the number of control points plus the degree of the B-spline curve plus one."
             )
@@ -71,6 +79,209 @@ class BSpline:
 
         return N_i_p
 
+    def _get_knot_vectors(self, control_points: np.ndarray, knot_vectors: np.ndarray) -> np.ndarray:
+        n = control_points.shape[-2] - 1
+        knot_vectors = (
+            np.linspace(0, 1, n + 1 + self.degree + 1)
+            if knot_vectors is None
+            else np.asarray(knot_vectors, dtype=float)
+        )
+
+        self._check_validity(control_points, knot_vectors)
+
+        return knot_vectors
+
+    @staticmethod
+    def _get_spans(knot_vectors: np.ndarray, degree: int, us: np.ndarray) -> np.ndarray:
+        # Find the knot span [u_k, u_{k+1}) of every parameter value.
+        n = len(knot_vectors) - degree - 2
+        spans = np.clip(
+            np.searchsorted(knot_vectors, us, side="right") - 1, 0, len(knot_vectors) - 2
+        )
+
+        # the end of a nonempty domain belongs to its last nonempty span
+        nonempty = np.nonzero(knot_vectors[degree : n + 1] < knot_vectors[degree + 1 : n + 2])[0]
+        if len(nonempty) > 0:
+            spans = np.where(us == knot_vectors[n + 1], degree + nonempty[-1], spans)
+
+        return spans
+
+    @staticmethod
+    def _get_span_basis(
+        knot_vectors: np.ndarray, degree: int, spans: np.ndarray, us: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Compute the basis functions N_{k-p}, ..., N_k on the spans by the de Boor triangle (Algorithm A2.2 in The NURBS book). The terms with zero denominators are regarded as zero, which is the same as cox_deBoor. The basis functions out of N_0, ..., N_n are set to zero and their indices are clipped.
+        m = len(us)
+        n = len(knot_vectors) - degree - 2
+        # pad the knots so that the basis functions out of range can be computed and dropped
+        knots = np.concatenate(
+            [np.full(degree, knot_vectors[0]), knot_vectors, np.full(degree, knot_vectors[-1])]
+        )
+        padded_spans = spans + degree
+
+        basis = np.zeros((m, degree + 1))
+        basis[:, 0] = knots[padded_spans] < knots[padded_spans + 1]
+        left = np.zeros((m, degree + 1))
+        right = np.zeros((m, degree + 1))
+
+        for j in range(1, degree + 1):
+            left[:, j] = us - knots[padded_spans + 1 - j]
+            right[:, j] = knots[padded_spans + j] - us
+            saved = np.zeros(m)
+            for r in range(j):
+                denominator = right[:, r + 1] + left[:, j - r]
+                temp = np.divide(basis[:, r], denominator, out=np.zeros(m), where=denominator != 0)
+                basis[:, r] = saved + right[:, r + 1] * temp
+                saved = left[:, j - r] * temp
+            basis[:, j] = saved
+
+        indices = spans[:, None] - degree + np.arange(degree + 1)
+        out_of_range = (indices < 0) | (indices > n)
+        basis[out_of_range] = 0
+
+        return basis, np.clip(indices, 0, n)
+
+    def _evaluate(
+        self, control_points: np.ndarray, knot_vectors: np.ndarray, degree: int, us: np.ndarray
+    ) -> np.ndarray:
+        spans = self._get_spans(knot_vectors, degree, us)
+        basis, indices = self._get_span_basis(knot_vectors, degree, spans, us)
+
+        return np.einsum("mj,...mjk->...mk", basis, control_points[..., indices, :])
+
+    @staticmethod
+    def _differentiate(
+        control_points: np.ndarray, knot_vectors: np.ndarray, degree: int
+    ) -> Tuple[np.ndarray, np.ndarray, int]:
+        # The derivative of a B-spline curve is a B-spline curve of degree p - 1 with the control points Q_i = p (P_{i+1} - P_i) / (u_{i+p+1} - u_{i+1}) on the knot vector without the first and last knots.
+        denominator = knot_vectors[degree + 1 : -1] - knot_vectors[1 : -degree - 1]
+        scale = np.divide(
+            degree, denominator, out=np.zeros(len(denominator)), where=denominator != 0
+        )
+        derivative_points = np.diff(control_points, axis=-2) * scale[:, None]
+
+        return derivative_points, knot_vectors[1:-1], degree - 1
+
+    def get_basis(self, knot_vectors: np.ndarray, us: np.ndarray) -> np.ndarray:
+        r"""Get the values of all the basis functions $N_{i,p}(u)$ at the parameter values.
+
+        Args:
+            knot_vectors (np.ndarray): The knots of the curve. The shape is $(t + 1, )$.
+            us (np.ndarray): The parameter values. The shape is $(m, )$.
+
+        Returns:
+            basis (np.ndarray): The basis matrix, whose element $[j, i]$ is $N_{i,p}(u_j)$. The curve points are the product of this matrix and the control points. The shape is $(m, t - p)$.
+        """
+        knot_vectors = np.asarray(knot_vectors, dtype=float)
+        us = np.asarray(us, dtype=float).reshape(-1)
+        spans = self._get_spans(knot_vectors, self.degree, us)
+        span_basis, indices = self._get_span_basis(knot_vectors, self.degree, spans, us)
+
+        basis = np.zeros((len(us), len(knot_vectors) - self.degree - 1))
+        # the clipped indices of the dropped basis functions add zeros
+        np.add.at(basis, (np.arange(len(us))[:, None], indices), span_basis)
+
+        return basis
+
+    def evaluate(
+        self,
+        control_points: np.ndarray,
+        us: np.ndarray,
+        knot_vectors: np.ndarray = None,
+        derivative: int = 0,
+    ) -> np.ndarray:
+        r"""Evaluate the curve or its derivative at the parameter values.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is $(n + 1, 2)$, or $(b, n + 1, 2)$ for a batch of curves sharing the knot vector.
+            us (np.ndarray): The parameter values. The shape is $(m, )$.
+            knot_vectors (np.ndarray, optional): The knots of the curve. The shape is $(t + 1, )$. Defaults to a uniform knot vector in [0, 1].
+            derivative (int, optional): The order of the derivative with respect to the parameter. Defaults to 0, which evaluates the curve points.
+
+        Returns:
+            points (np.ndarray): The curve points or derivatives. The shape is $(m, 2)$, or $(b, m, 2)$ for a batch of curves.
+        """
+        control_points = np.asarray(control_points, dtype=float)
+        knot_vectors = self._get_knot_vectors(control_points, knot_vectors)
+        us = np.asarray(us, dtype=float).reshape(-1)
+
+        degree = self.degree
+        for _ in range(derivative):
+            if degree == 0:
+                return np.zeros(control_points.shape[:-2] + (len(us), 2))
+            control_points, knot_vectors, degree = self._differentiate(
+                control_points, knot_vectors, degree
+            )
+
+        return self._evaluate(control_points, knot_vectors, degree, us)
+
+    def get_curvature(
+        self, control_points: np.ndarray, us: np.ndarray, knot_vectors: np.ndarray = None
+    ) -> np.ndarray:
+        r"""Get the signed curvature of the curve at the parameter values. The curvature is positive when the curve turns left.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is $(n + 1, 2)$, or $(b, n + 1, 2)$ for a batch of curves sharing the knot vector.
+            us (np.ndarray): The parameter values. The shape is $(m, )$.
+            knot_vectors (np.ndarray, optional): The knots of the curve. The shape is $(t + 1, )$. Defaults to a uniform knot vector in [0, 1].
+
+        Returns:
+            curvature (np.ndarray): The curvature. It is zero where the first derivative vanishes. The shape is $(m, )$, or $(b, m)$ for a batch of curves.
+        """
+        first = self.evaluate(control_points, us, knot_vectors, derivative=1)
+        second = self.evaluate(control_points, us, knot_vectors, derivative=2)
+        cross = first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]
+        speed = np.linalg.norm(first, axis=-1)
+
+        return np.divide(cross, speed**3, out=np.zeros_like(cross), where=speed > 0)
+
+    def get_arc_length_table(
+        self, control_points: np.ndarray, knot_vectors: np.ndarray = None, n_sample: int = 1000
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        r"""Get the arc lengths of the curve at evenly spaced parameter values over the domain $[u_p, u_{n+1}]$. The arc lengths are integrated from the first derivative by the trapezoidal rule.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is $(n + 1, 2)$.
+            knot_vectors (np.ndarray, optional): The knots of the curve. The shape is $(t + 1, )$. Defaults to a uniform knot vector in [0, 1].
+            n_sample (int, optional): The number of sampled parameter values.
+
+        Returns:
+            us (np.ndarray): The sampled parameter values. The shape is (n_sample, ).
+            lengths (np.ndarray): The arc lengths from the start of the curve. The last one is the length of the curve. The shape is (n_sample, ).
+        """
+        control_points = np.asarray(control_points, dtype=float)
+        knot_vectors = self._get_knot_vectors(control_points, knot_vectors)
+
+        us = np.linspace(knot_vectors[self.degree], knot_vectors[-self.degree - 1], n_sample)
+        speeds = np.linalg.norm(
+            self.evaluate(control_points, us, knot_vectors, derivative=1), axis=-1
+        )
+        lengths = np.concatenate([[0], np.cumsum((speeds[1:] + speeds[:-1]) / 2 * np.diff(us))])
+
+        return us, lengths
+
+    def get_arc_length_parameters(
+        self,
+        control_points: np.ndarray,
+        s: np.ndarray,
+        knot_vectors: np.ndarray = None,
+        n_sample: int = 1000,
+    ) -> np.ndarray:
+        r"""Get the parameter values at the given arc lengths from the start of the curve, which reparametrizes the curve by its arc length. The arc length table from [get_arc_length_table](#tactics2d.math.interpolate.BSpline.get_arc_length_table) is inverted by linear interpolation.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is $(n + 1, 2)$.
+            s (np.ndarray): The arc lengths. The values out of the curve are clipped. The shape is $(m, )$.
+            knot_vectors (np.ndarray, optional): The knots of the curve. The shape is $(t + 1, )$. Defaults to a uniform knot vector in [0, 1].
+            n_sample (int, optional): The number of sampled parameter values for the arc length table.
+
+        Returns:
+            us (np.ndarray): The parameter values. The shape is $(m, )$.
+        """
+        us, lengths = self.get_arc_length_table(control_points, knot_vectors, n_sample)
+
+        return np.interp(s, lengths, us)
+
     def get_curve(
         self,
         control_points: np.ndarray,
@@ -80,21 +291,15 @@ class BSpline:
         r"""Get the interpolation points of a b-spline curve.
 
         Args:
-            control_points (np.ndarray): The control points of the curve. Usually denoted as $P_0, P_1, \dots, P_n$ in literature. The shape is $(n + 1, 2)$.
+            control_points (np.ndarray): The control points of the curve. Usually denoted as $P_0, P_1, \dots, P_n$ in literature. The shape is $(n + 1, 2)$, or $(b, n + 1, 2)$ for a batch of curves sharing the knot vector.
             knot_vectors (np.ndarray): The knots of the curve. Usually denoted as $u_0, u_1, \dots, u_t$ in literature. The shape is $(t + 1, )$.
             n_interpolation (int): The number of interpolation points.
 
         Returns:
-            curve_points (np.ndarray): The interpolation points of the curve. The shape is (n_interpolation, 2).
+            curve_points (np.ndarray): The interpolation points of the curve. The shape is (n_interpolation, 2), or (b, n_interpolation, 2) for a batch of curves.
         """
-        n = len(control_points) - 1
-        knot_vectors = (
-            np.linspace(0, 1, n + 1 + self.degree + 1) if knot_vectors is None else knot_vectors
-        )
-
-        self._check_validity(control_points, knot_vectors)
-
-        curve_points = []
+        control_points = np.asarray(control_points, dtype=float)
+        knot_vectors = self._get_knot_vectors(control_points, knot_vectors)
 
         us = np.linspace(
             knot_vectors[self.degree],
@@ -102,13 +307,5 @@ class BSpline:
             n_interpolation,
             endpoint=False,
         )
-        for u in us:
-            basis_functions = np.zeros((n + 1, 1))
-            for i in range(n + 1):
-                N_i_p = self.cox_deBoor(knot_vectors[i : i + self.degree + 2], self.degree, u)
-                basis_functions[i] = N_i_p
-
-            curve_point = np.sum(np.multiply(basis_functions, control_points), axis=0)
-            curve_points.append(curve_point)
 
-        return np.array(curve_points)
+        return self._evaluate(control_points, knot_vectors, self.degree, us)
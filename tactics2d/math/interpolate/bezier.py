@@ -5,11 +5,16 @@
 # @Author: Yueyuan Li
 # @Version: 1.0.0
 
+from typing import Tuple
+
 import numpy as np
+from scipy.special import comb
 
 
 class Bezier:
-    """This class implement a Bezier curve interpolator.
+    r"""This class implement a Bezier curve interpolator.
+
+    The curve points are computed in the closed form $B(t) = \sum_{i=0}^{n} b_{i,n}(t) P_i$, where $b_{i,n}$ are the Bernstein polynomials. The Bernstein matrix of the parameters is cached for every number of interpolations, so a curve is sampled by a single matrix product. A batch of curves of the same order can be sampled together by passing the control points in the shape of $(b, n + 1, 2)$.
 
     Attributes:
         order (int): The order of the Bezier curve. The order of a Bezier curve is equal to the number of control points minus one.
@@ -28,11 +33,13 @@ class Bezier:
         if self.order < 1:
             raise ValueError("The order of a Bezier curve must be greater than or equal to one.")
 
+        self._matrices = dict()
+
     def _check_validity(self, control_points: np.ndarray):
-        if len(control_points.shape) != 2 or control_points.shape[1] != 2:
+        if len(control_points.shape) not in [2, 3] or control_points.shape[-1] != 2:
             raise ValueError("The shape of control_points is expected to be (n, 2).")
 
-        if len(control_points) != self.order + 1:
+        if control_points.shape[-2] != self.order + 1:
             raise ValueError(
                 "The number of control points must be equal to the order of the Bezier curve plus one."
             )
@@ -51,26 +58,148 @@ class Bezier:
             new_points = points[:-1] * (1 - t) + points[1:] * t
             return self.de_casteljau(new_points, t, order - 1)
 
-    def get_curve(self, control_points: np.ndarray, n_interpolation: int) -> np.ndarray:
+    @staticmethod
+    def get_bernstein_matrix(order: int, ts: np.ndarray) -> np.ndarray:
+        r"""Get the values of the Bernstein polynomials $b_{i,n}(t) = \binom{n}{i} t^i (1 - t)^{n - i}$.
+
+        Args:
+            order (int): The order of the Bernstein polynomials.
+            ts (np.ndarray): The parameters in [0, 1]. The shape is (m,).
+
+        Returns:
+            matrix (np.ndarray): The Bernstein matrix, whose element [j, i] is $b_{i,n}(t_j)$. The shape is (m, order + 1).
         """
+        ts = np.asarray(ts, dtype=float).reshape(-1, 1)
+        i = np.arange(order + 1)
+
+        return comb(order, i) * ts**i * (1 - ts) ** (order - i)
+
+    def _get_matrix(self, n_interpolation: int) -> np.ndarray:
+        if n_interpolation not in self._matrices:
+            self._matrices[n_interpolation] = self.get_bernstein_matrix(
+                self.order, np.linspace(0, 1, n_interpolation)
+            )
+
+        return self._matrices[n_interpolation]
+
+    def evaluate(
+        self, control_points: np.ndarray, ts: np.ndarray, derivative: int = 0
+    ) -> np.ndarray:
+        """This function evaluates the curve or its derivative at the parameters.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (order + 1, 2), or (b, order + 1, 2) for a batch of curves.
+            ts (np.ndarray): The parameters in [0, 1]. The shape is (m,).
+            derivative (int, optional): The order of the derivative with respect to the parameter. Defaults to 0, which evaluates the curve points.
+
+        Returns:
+            points (np.ndarray): The curve points or derivatives. The shape is (m, 2), or (b, m, 2) for a batch of curves.
+        """
+        control_points = np.asarray(control_points, dtype=float)
+        self._check_validity(control_points)
+
+        # the derivative of a Bezier curve is a Bezier curve of one order lower with the control points n (P_{i+1} - P_i)
+        order = self.order
+        for _ in range(derivative):
+            if order == 0:
+                return np.zeros(control_points.shape[:-2] + (len(np.atleast_1d(ts)), 2))
+            control_points = order * np.diff(control_points, axis=-2)
+            order -= 1
+
+        return self.get_bernstein_matrix(order, ts) @ control_points
+
+    def get_curvature(self, control_points: np.ndarray, ts: np.ndarray) -> np.ndarray:
+        """This function computes the signed curvature of the curve at the parameters. The curvature is positive when the curve turns left.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (order + 1, 2), or (b, order + 1, 2) for a batch of curves.
+            ts (np.ndarray): The parameters in [0, 1]. The shape is (m,).
+
+        Returns:
+            curvature (np.ndarray): The curvature. It is zero where the first derivative vanishes. The shape is (m,), or (b, m) for a batch of curves.
+        """
+        first = self.evaluate(control_points, ts, derivative=1)
+        second = self.evaluate(control_points, ts, derivative=2)
+        cross = first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]
+        speed = np.linalg.norm(first, axis=-1)
+
+        return np.divide(cross, speed**3, out=np.zeros_like(cross), where=speed > 0)
+
+    def _split(self, control_points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Split a batch of curves at t = 0.5 by the de Casteljau algorithm. The shape of the control points is (k, order + 1, 2).
+        left = [control_points[:, 0]]
+        right = [control_points[:, -1]]
+        points = control_points
+        for _ in range(self.order):
+            points = (points[:, :-1] + points[:, 1:]) / 2
+            left.append(points[:, 0])
+            right.append(points[:, -1])
+
+        return np.stack(left, axis=1), np.stack(right[::-1], axis=1)
+
+    @staticmethod
+    def _get_flatness(control_points: np.ndarray) -> np.ndarray:
+        # The largest distance from the control points to the chord, which bounds the distance from the curve to the chord because the curve is in the convex hull of its control points.
+        start = control_points[:, :1]
+        chord = control_points[:, -1:] - start
+        offsets = control_points - start
+        length = np.linalg.norm(chord, axis=-1)
+        cross = np.abs(chord[..., 0] * offsets[..., 1] - chord[..., 1] * offsets[..., 0])
+        distances = np.where(
+            length > 0,
+            cross / np.where(length > 0, length, 1),
+            np.linalg.norm(offsets, axis=-1),
+        )
+
+        return np.max(distances, axis=1)
+
+    def get_curve_adaptive(
+        self, control_points: np.ndarray, tolerance: float, max_depth: int = 16
+    ) -> np.ndarray:
+        """This function samples the curve by adaptive subdivision. A piece of the curve is split at its middle until its control points are within the tolerance from its chord, so that the straight parts get few points and the sharp turns get many. All the pieces at the same depth are split together.
+
         Args:
             control_points (np.ndarray): The control points of the curve. The shape is (order + 1, 2).
-            n_interpolation (int): The number of interpolations.
+            tolerance (float): The maximum distance from the curve to the polyline of the sampled points.
+            max_depth (int, optional): The maximum number of splits of a piece.
 
         Returns:
-            curve_points (np.ndarray): The interpolated points of the curve. The shape is (n_interpolation, 2).
+            curve_points (np.ndarray): The sampled points of the curve, including both ends. The shape is (m, 2).
         """
+        control_points = np.asarray(control_points, dtype=float)
         self._check_validity(control_points)
 
-        curve_points = []
+        pieces = control_points[None]
+        starts = np.zeros(1)
+        done_pieces, done_starts = [], []
+        for depth in range(max_depth + 1):
+            flat = self._get_flatness(pieces) <= tolerance
+            if depth == max_depth:
+                flat[:] = True
+            done_pieces.append(pieces[flat])
+            done_starts.append(starts[flat])
+            if np.all(flat):
+                break
+
+            left, right = self._split(pieces[~flat])
+            pieces = np.concatenate([left, right])
+            starts = np.concatenate([starts[~flat], starts[~flat] + 0.5 ** (depth + 1)])
 
-        interpolates = np.linspace(control_points[:-1], control_points[1:], n_interpolation)
-        if self.order == 1:
-            return np.squeeze(interpolates)
+        pieces = np.concatenate(done_pieces)
+        order = np.argsort(np.concatenate(done_starts))
 
-        for n in range(n_interpolation):
-            t = n / (n_interpolation - 1)
-            point = self.de_casteljau(interpolates[n], t, self.order - 1)
-            curve_points.append(point)
+        return np.concatenate([pieces[order, 0], control_points[-1:]])
+
+    def get_curve(self, control_points: np.ndarray, n_interpolation: int) -> np.ndarray:
+        """
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (order + 1, 2), or (b, order + 1, 2) for a batch of curves.
+            n_interpolation (int): The number of interpolations.
+
+        Returns:
+            curve_points (np.ndarray): The interpolated points of the curve. The shape is (n_interpolation, 2), or (b, n_interpolation, 2) for a batch of curves.
+        """
+        control_points = np.asarray(control_points, dtype=float)
+        self._check_validity(control_points)
 
-        return np.array(curve_points)
+        return self._get_matrix(n_interpolation) @ control_points
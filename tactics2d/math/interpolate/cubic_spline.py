@@ -6,13 +6,17 @@
 # @Version: 1.0.0
 
 from enum import Enum
+from typing import Tuple
 
 import numpy as np
+from scipy.linalg import solve_banded
 
 
 class CubicSpline:
     """This class implement a cubic spline interpolator.
 
+    The second derivatives at the control points are solved from a banded linear system, which takes O(n) time for all the boundary conditions. The curve is sampled for all the cubic functions at once, and it can be evaluated at arbitrary x coordinates. For the control points whose x coordinates are not monotonic, such as the points of a recorded path or a road reference line, the parametric spline over the chord lengths can be sampled at equal arc length intervals.
+
     Attributes:
         boundary_type (int): Boundary condition type. The cubic spline interpolator offers three distinct boundary condition options: Natural (1), Clamped (2), and NotAKnot (3). By default, the not-a-knot boundary condition is applied, serving as a wise choice when specific boundary condition information is unavailable.
     """
@@ -58,6 +62,81 @@ class CubicSpline:
         if np.any((control_points[1:, 0] - control_points[:-1, 0]) < 0):
             raise ValueError("The x coordinates of the control points must be non-decreasing.")
 
+    def _get_second_derivatives(self, x: np.ndarray, y: np.ndarray, xx) -> np.ndarray:
+        # Solve the second derivatives m at the knots. Every row of the system only involves the neighboring knots, so the matrix is stored in the banded form and solved in O(n). The values y can be (n + 1, ) or (n + 1, k) to solve k curves over the same knots at once.
+        n = len(x) - 1
+        h = x[1:] - x[:-1]
+        h_ = h.reshape((-1,) + (1,) * (y.ndim - 1))
+        slopes = (y[1:] - y[:-1]) / h_
+
+        # ab[u + i - j, j] = A[i, j], where u is the number of upper diagonals
+        ab = np.zeros((5, n + 1))
+        ab[1, 2:] = h[1:]
+        ab[2, 1:-1] = 2 * (h[:-1] + h[1:])
+        ab[3, :-2] = h[:-1]
+        B = np.zeros((n + 1,) + y.shape[1:])
+        B[1:-1] = 6 * (slopes[1:] - slopes[:-1])
+
+        if self.boundary_type == self.BoundaryType.Natural:
+            ab[2, 0] = 1
+            ab[2, -1] = 1
+        elif self.boundary_type == self.BoundaryType.Clamped:
+            ab[2, 0] = 2 * h[0]
+            ab[1, 1] = h[0]
+            ab[2, -1] = 2 * h[-1]
+            ab[3, -2] = h[-1]
+            B[0] = 6 * (slopes[0] - np.asarray(xx[0]))
+            B[-1] = 6 * (np.asarray(xx[1]) - slopes[-1])
+        elif self.boundary_type == self.BoundaryType.NotAKnot:
+            ab[2, 0] = -h[1]
+            ab[1, 1] = h[0] + h[1]
+            ab[0, 2] = -h[0]
+            if n == 2:
+                # the two not-a-knot conditions are the same for three control points, the curve is then a parabola
+                ab[4, -3] = 0
+                ab[3, -2] = 1
+                ab[2, -1] = -1
+            else:
+                ab[4, -3] = -h[-1]
+                ab[3, -2] = h[-2] + h[-1]
+                ab[2, -1] = -h[-2]
+
+        return solve_banded((2, 2), ab, B)
+
+    def _get_coefficients(
+        self, x: np.ndarray, y: np.ndarray, xx
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        h = (x[1:] - x[:-1]).reshape((-1,) + (1,) * (y.ndim - 1))
+        m = self._get_second_derivatives(x, y, xx)
+
+        a = y[:-1]
+        b = (y[1:] - y[:-1]) / h - h * m[:-1] / 2 - h * (m[1:] - m[:-1]) / 6
+        c = m[:-1] / 2
+        d = (m[1:] - m[:-1]) / (6 * h)
+
+        return a, b, c, d
+
+    @staticmethod
+    def _evaluate_coefficients(
+        knots: np.ndarray, coefficients: tuple, x: np.ndarray, derivative: int
+    ) -> np.ndarray:
+        # The values out of the knots are extrapolated by the first and the last cubic functions.
+        a, b, c, d = coefficients
+        indices = np.clip(np.searchsorted(knots, x, side="right") - 1, 0, len(knots) - 2)
+        dx = (x - knots[indices]).reshape((-1,) + (1,) * (a.ndim - 1))
+        a, b, c, d = a[indices], b[indices], c[indices], d[indices]
+
+        if derivative == 0:
+            return a + dx * (b + dx * (c + dx * d))
+        elif derivative == 1:
+            return b + dx * (2 * c + dx * 3 * d)
+        elif derivative == 2:
+            return 2 * c + 6 * d * dx
+        elif derivative == 3:
+            return 6 * d
+
+        return np.zeros_like(a)
+
     def get_parameters(self, control_points: np.ndarray, xx: tuple = (0, 0)):
         """Get the parameters of the cubic functions
 
@@ -73,50 +152,34 @@ class CubicSpline:
         """
         self._check_validity(control_points)
 
-        n = control_points.shape[0] - 1
-        x = control_points[:, 0]
-        y = control_points[:, 1]
+        return self._get_coefficients(control_points[:, 0], control_points[:, 1], xx)
 
-        h = x[1:] - x[:-1]  # shape=(n, 1), h_i = x_i+1 - x_i
-        b = (y[1:] - y[:-1]) / h  # shape=(n, 1), b_i = (y_i+1 - y_i) / h_i
-
-        # Construct the matrix A
-        A = np.zeros((n + 1, n + 1))
-        for i in range(1, n):
-            A[i, i - 1] = h[i - 1]
-            A[i, i] = 2 * (h[i - 1] + h[i])
-            A[i, i + 1] = h[i]
+    def evaluate(
+        self,
+        control_points: np.ndarray,
+        x: np.ndarray,
+        xx: tuple = (0, 0),
+        derivative: int = 0,
+        parameters: tuple = None,
+    ) -> np.ndarray:
+        """Evaluate the cubic spline curve or its derivative at arbitrary x coordinates. The cubic function of every x coordinate is found by a binary search over the control points.
 
-        # construct the vector B
-        B = 6 * np.array([0] + list(b[1:] - b[:-1]) + [0])  # shape=(n+1, 1)
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (n + 1, 2).
+            x (np.ndarray): The x coordinates to evaluate. The values out of the control points are extrapolated by the first and the last cubic functions. The shape is (m, ).
+            xx (float): The first derivative of the curve at the first and the last control points. These conditions will be used when the boundary condition is "clamped". Defaults to (0, 0).
+            derivative (int, optional): The order of the derivative with respect to x. Defaults to 0, which evaluates the y coordinates.
+            parameters (tuple, optional): The parameters from [get_parameters](#tactics2d.math.interpolate.CubicSpline.get_parameters). They are solved from the control points if not given, so pass them to evaluate the same curve many times.
 
-        # Set the boundary conditions
-        if self.boundary_type == self.BoundaryType.Natural:
-            A[0, 0] = 1
-            A[-1, -1] = 1
-        elif self.boundary_type == self.BoundaryType.Clamped:
-            A[0, 0] = 2 * h[0]
-            A[0, 1] = h[0]
-            A[-1, -1] = 2 * h[-1]
-            A[-1, -2] = h[-1]
-            B[0] = 6 * (b[0] - xx[0])
-            B[-1] = 6 * (xx[1] - b[-1])
-        elif self.boundary_type == self.BoundaryType.NotAKnot:
-            A[0, 0] = -h[1]
-            A[0, 1] = h[0] + h[1]
-            A[0, 2] = -h[0]
-            A[-1, -3] = -h[-1]
-            A[-1, -2] = h[-2] + h[-1]
-            A[-1, -1] = -h[-2]
+        Returns:
+            y (np.ndarray): The y coordinates or the derivatives. The shape is (m, ).
+        """
+        if parameters is None:
+            parameters = self.get_parameters(control_points, xx)
 
-        m = np.linalg.solve(A, B)  # shape=(n+1, 1)
+        x = np.asarray(x, dtype=float).reshape(-1)
 
-        a = y[:-1]
-        b = b - h * m[:-1] / 2 - h * (m[1:] - m[:-1]) / 6
-        c = m[:-1] / 2
-        d = (m[1:] - m[:-1]) / (6 * h)
-
-        return a, b, c, d
+        return self._evaluate_coefficients(control_points[:, 0], parameters, x, derivative)
 
     def get_curve(
         self, control_points: np.ndarray, xx: tuple = (0, 0), n_interpolation: int = 100
@@ -133,20 +196,86 @@ class CubicSpline:
         """
         self._check_validity(control_points)
         a, b, c, d = self.get_parameters(control_points, xx)
-        n = control_points.shape[0] - 1
 
-        curve_points = []
+        # every row holds the interpolations of a cubic function, including both of its ends
+        x = np.linspace(control_points[:-1, 0], control_points[1:, 0], n_interpolation).T
+        dx = x - control_points[:-1, 0:1]
+        y = a[:, None] + dx * (b[:, None] + dx * (c[:, None] + dx * d[:, None]))
+
+        curve_points = np.concatenate(
+            [np.stack([x.ravel(), y.ravel()], axis=1), control_points[-1:]], axis=0
+        )
+
+        return curve_points
+
+    def _check_parametric_validity(self, control_points: np.ndarray):
+        if len(control_points.shape) != 2 or control_points.shape[1] != 2:
+            raise ValueError("The shape of control_points is expected to be (n, 2).")
 
-        for i in range(n):
-            x = np.linspace(control_points[i, 0], control_points[i + 1, 0], n_interpolation)
-            y = (
-                a[i]
-                + b[i] * (x - control_points[i, 0])
-                + c[i] * (x - control_points[i, 0]) ** 2
-                + d[i] * (x - control_points[i, 0]) ** 3
+        if len(control_points) < 3:
+            raise ValueError(
+                "There is not enough control points to interpolate a cubic spline curve."
             )
-            curve_points += list(zip(x, y))
 
-        curve_points.append(control_points[-1])
+        if np.any(np.all(control_points[1:] == control_points[:-1], axis=1)):
+            raise ValueError("The adjacent control points must be different.")
+
+    def get_parametric_parameters(
+        self, control_points: np.ndarray, xx: tuple = ((0, 0), (0, 0))
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Get the parameters of a parametric cubic spline curve $(x(s), y(s))$, where $s$ is the cumulative chord length of the control points. The control points can go in any direction, so that the curve can fold back or be closed. The x and y coordinates are solved together.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (n + 1, 2).
+            xx (tuple): The first derivatives $(x'(s), y'(s))$ at the first and the last control points. These conditions will be used when the boundary condition is "clamped". Use the unit tangent vectors to keep the parameter close to the arc length. Defaults to ((0, 0), (0, 0)).
+
+        Returns:
+            s (np.ndarray): The cumulative chord lengths at the control points. The shape is (n + 1, ).
+            a (np.ndarray): The constant parameters of the cubic functions. The shape is (n, 2).
+            b (np.ndarray): The linear parameters of the cubic functions. The shape is (n, 2).
+            c (np.ndarray): The quadratic parameters of the cubic functions. The shape is (n, 2).
+            d (np.ndarray): The cubic parameters of the cubic functions. The shape is (n, 2).
+        """
+        control_points = np.asarray(control_points, dtype=float)
+        self._check_parametric_validity(control_points)
+
+        s = np.concatenate(
+            [[0], np.cumsum(np.linalg.norm(control_points[1:] - control_points[:-1], axis=1))]
+        )
+        a, b, c, d = self._get_coefficients(s, control_points, xx)
+
+        return s, a, b, c, d
+
+    def get_parametric_curve(
+        self,
+        control_points: np.ndarray,
+        step: float = 0.1,
+        xx: tuple = ((0, 0), (0, 0)),
+        n_sample: int = 10,
+    ) -> np.ndarray:
+        """Get the interpolation points of a parametric cubic spline curve at equal arc length intervals. The arc lengths are integrated from the first derivatives by the trapezoidal rule on n_sample points per cubic function, and inverted by linear interpolation.
+
+        Args:
+            control_points (np.ndarray): The control points of the curve. The shape is (n + 1, 2).
+            step (float, optional): The arc length between two adjacent interpolation points. Defaults to 0.1.
+            xx (tuple): The first derivatives $(x'(s), y'(s))$ at the first and the last control points. These conditions will be used when the boundary condition is "clamped". Defaults to ((0, 0), (0, 0)).
+            n_sample (int, optional): The number of sampled points per cubic function to compute the arc lengths. Defaults to 10.
+
+        Returns:
+            curve_points (np.ndarray): The interpolation points of the curve, from the first to the last control point. The shape is (m, 2).
+        """
+        s, a, b, c, d = self.get_parametric_parameters(control_points, xx)
+
+        params = np.concatenate(
+            [np.linspace(s[:-1], s[1:], n_sample, endpoint=False).T.ravel(), s[-1:]]
+        )
+        speeds = np.linalg.norm(self._evaluate_coefficients(s, (a, b, c, d), params, 1), axis=1)
+        lengths = np.concatenate([[0], np.cumsum((speeds[1:] + speeds[:-1]) / 2 * np.diff(params))])
+
+        arc_lengths = np.arange(0, lengths[-1], step)
+        if lengths[-1] - arc_lengths[-1] < step * 1e-6:
+            arc_lengths = arc_lengths[:-1]
+        arc_lengths = np.append(arc_lengths, lengths[-1])
+        params = np.interp(arc_lengths, lengths, params)
 
-        return np.array(curve_points)
+        return self._evaluate_coefficients(s, (a, b, c, d), params, 0)
@@ -1,3 +1,4 @@
+import json
 from typing import Tuple
 
 import numpy as np
@@ -20,7 +21,12 @@ class DubinsPath:
         self.length = np.abs(segments).sum() * radius
 
     def get_curve_line(
-        self, start_point: np.ndarray, start_heading: float, radius: float, step_size: float = 0.1
+        self,
+        start_point: np.ndarray,
+        start_heading: float,
+        radius: float,
+        step_size: float = 0.1,
+        tolerance: float = None,
     ):
         """This function generates the curve line and the yaw of the Dubins path.
 
@@ -29,51 +35,64 @@ class DubinsPath:
             start_heading (float): The heading of the start point. The unit is radian.
             radius (float): The minimum turning radius.
             step_size (float, optional): The interpolation step size. Defaults to 0.1.
+            tolerance (float, optional): The maximum distance from the curve to the chord between two adjacent points. If it is given, the arcs are sampled by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler) and the straight lines only keep their ends, instead of using the step size. Defaults to None.
         """
 
-        def get_arc(point, heading, radius, radian, action):
-            circle_center, _ = Circle.get_circle(
-                Circle.ConstructBy.TangentVector, point, heading, radius, action
-            )
-            clockwise = action == "R"
-            start_angle = (heading + np.pi / 2) if action == "R" else (heading - np.pi / 2)
-            arc_curve = Circle.get_arc(
-                circle_center, radius, radian, start_angle, clockwise, step_size
-            )
-
-            end_angle = (start_angle - radian) if clockwise else (start_angle + radian)
-            end_point = circle_center + np.array([np.cos(end_angle), np.sin(end_angle)]) * radius
-            end_heading = (start_heading - radian) if clockwise else (start_heading + radian)
-            yaw = np.linspace(heading, end_heading, arc_curve.shape[0])
-
-            return arc_curve, yaw, end_point, end_heading
-
-        def get_straight_line(point, heading, radius, length):
-            end_point = point + np.array([np.cos(heading), np.sin(heading)]) * radius * length
-            total_length = np.linalg.norm(end_point - point)
-            step_num = int(np.ceil(total_length / step_size))
-            x = np.linspace(point[0], end_point[0], step_num)
-            y = np.linspace(point[1], end_point[1], step_num)
-            straight_line = np.vstack((x, y)).T
-            yaw = np.ones_like(x) * heading
+        actions = np.array(list(self.curve_type))
+        lengths = np.abs(np.asarray(self.segments, dtype=float))
+        is_arc = actions != "S"
+        turns = np.where(actions == "L", 1.0, np.where(actions == "R", -1.0, 0.0))
+
+        # The end poses of the segments are found in closed form, so that all the arcs are sampled
+        # by one call of Circle.get_arc_batch.
+        headings = start_heading + np.concatenate([[0], np.cumsum(turns * lengths)])
+        displacements = np.where(
+            is_arc[:, None],
+            turns[:, None]
+            * radius
+            * np.column_stack(
+                [
+                    np.sin(headings[1:]) - np.sin(headings[:-1]),
+                    np.cos(headings[:-1]) - np.cos(headings[1:]),
+                ]
+            ),
+            radius
+            * lengths[:, None]
+            * np.column_stack([np.cos(headings[:-1]), np.sin(headings[:-1])]),
+        )
+        points = np.asarray(start_point, dtype=float) + np.concatenate(
+            [np.zeros((1, 2)), np.cumsum(displacements, axis=0)]
+        )
 
-            return straight_line, yaw, end_point, heading
+        centers, _ = Circle.get_circle_by_tangent_vector_batch(
+            points[:-1][is_arc], headings[:-1][is_arc], radius, actions[is_arc]
+        )
+        arc_points, angles, offsets = Circle.get_arc_batch(
+            centers,
+            np.full(len(centers), radius),
+            lengths[is_arc],
+            headings[:-1][is_arc] - turns[is_arc] * np.pi / 2,
+            turns[is_arc] < 0,
+            step_size,
+            tolerance,
+        )
+        arc_yaws = angles + np.repeat(turns[is_arc], np.diff(offsets)) * np.pi / 2
 
-        next_point = start_point
-        next_heading = start_heading
         curves = []
         yaws = []
-        for i, action in enumerate(self.curve_type):
-            if action == "S":
-                curve, yaw, next_point, next_heading = get_straight_line(
-                    next_point, next_heading, radius, abs(self.segments[i])
-                )
+        n_arc = 0
+        for i in range(len(actions)):
+            if is_arc[i]:
+                start, end = offsets[n_arc], offsets[n_arc + 1]
+                curves.append(arc_points[start:end])
+                yaws.append(arc_yaws[start:end])
+                n_arc += 1
             else:
-                curve, yaw, next_point, next_heading = get_arc(
-                    next_point, next_heading, radius, abs(self.segments[i]), action
-                )
-            curves.append(curve)
-            yaws.append(yaw)
+                step_num = int(np.ceil(radius * lengths[i] / step_size))
+                if tolerance is not None:
+                    step_num = min(step_num, 2)
+                curves.append(np.linspace(points[i], points[i + 1], step_num))
+                yaws.append(np.full(step_num, headings[i]))
 
         self.curve = np.concatenate(curves)
         self.yaw = np.concatenate(yaws)
@@ -85,10 +104,15 @@ class Dubins:
 
     The curve comprises a sequence of three segments: RSR, RSL, LSL, LSR, RLR, and LRL. R stands for the right turn, L for the left turn, and S for the straight line. A Dubins path planner operates within the constraints of forward actions exclusively.
 
+    The six curve types are solved with arrays, so that [get_path_batch](#tactics2d.math.interpolate.Dubins.get_path_batch) finds the shortest paths for many start and goal pairs at once without creating path objects.
+
     Attributes:
         radius (float): The minimum turning radius.
+        curve_types (List[str]): The curve types in the order of the paths returned by [get_all_path](#tactics2d.math.interpolate.Dubins.get_all_path). The type ids returned by [get_path_batch](#tactics2d.math.interpolate.Dubins.get_path_batch) are the indices in this list.
     """
 
+    curve_types = ["LRL", "RLR", "LSL", "RSL", "RSR", "LSR"]
+
     def __init__(self, radius: float) -> None:
         """Initialize the Dubins curve interpolator.
 
@@ -107,26 +131,20 @@ class Dubins:
             2 + dist**2 - 2 * np.cos(alpha - beta) + 2 * dist * (-np.sin(alpha) + np.sin(beta))
         )
 
-        if discriminant < 0:
-            return None
-
         tmp = np.arctan2(np.cos(alpha) - np.cos(beta), dist - np.sin(alpha) + np.sin(beta))
 
         t = np.mod(alpha - tmp, 2 * np.pi)
-        p = np.sqrt(discriminant)
+        p = np.sqrt(np.maximum(discriminant, 0))
         q = np.mod(-(beta - tmp), 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, discriminant >= 0
 
     def _RSL(self, alpha, beta, dist):
         discriminant = (
             -2 + dist**2 + 2 * np.cos(alpha - beta) - 2 * dist * (np.sin(alpha) + np.sin(beta))
         )
 
-        if discriminant < 0:
-            return None
-
-        p = np.sqrt(discriminant)
+        p = np.sqrt(np.maximum(discriminant, 0))
 
         tmp = np.arctan2(
             np.cos(alpha) + np.cos(beta), dist - np.sin(alpha) - np.sin(beta)
@@ -135,33 +153,27 @@ class Dubins:
         t = np.mod(alpha - tmp, 2 * np.pi)
         q = np.mod(beta - tmp, 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, discriminant >= 0
 
     def _LSL(self, alpha, beta, dist):
         discriminant = (
             2 + dist**2 - 2 * np.cos(alpha - beta) + 2 * dist * (np.sin(alpha) - np.sin(beta))
         )
 
-        if discriminant < 0:
-            return None
-
         tmp = np.arctan2(-np.cos(alpha) + np.cos(beta), dist + np.sin(alpha) - np.sin(beta))
 
         t = np.mod(-(alpha - tmp), 2 * np.pi)
-        p = np.sqrt(discriminant)
+        p = np.sqrt(np.maximum(discriminant, 0))
         q = np.mod(beta - tmp, 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, discriminant >= 0
 
     def _LSR(self, alpha, beta, dist):
         discriminant = (
             -2 + dist**2 + 2 * np.cos(alpha - beta) + 2 * dist * (np.sin(alpha) + np.sin(beta))
         )
 
-        if discriminant < 0:
-            return None
-
-        p = np.sqrt(discriminant)
+        p = np.sqrt(np.maximum(discriminant, 0))
 
         tmp = -np.arctan2(
             np.cos(alpha) + np.cos(beta), dist + np.sin(alpha) + np.sin(beta)
@@ -170,47 +182,109 @@ class Dubins:
         t = np.mod(-alpha + tmp, 2 * np.pi)
         q = np.mod(-beta + tmp, 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, discriminant >= 0
 
     def _RLR(self, alpha, beta, dist):
         discriminant = (
             6 - dist**2 + 2 * np.cos(alpha - beta) + 2 * dist * (np.sin(alpha) - np.sin(beta))
         ) / 8
 
-        if abs(discriminant) > 1:
-            return None
-
         tmp = np.arctan2(np.cos(alpha) - np.cos(beta), dist - np.sin(alpha) + np.sin(beta))
 
-        p = np.mod(2 * np.pi - np.arccos(discriminant), 2 * np.pi)
+        p = np.mod(2 * np.pi - np.arccos(np.clip(discriminant, -1, 1)), 2 * np.pi)
         t = np.mod(alpha - tmp + p / 2, 2 * np.pi)
         q = np.mod(alpha - beta - t + p, 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, np.abs(discriminant) <= 1
 
     def _LRL(self, alpha, beta, dist):
         discriminant = (
             6 - dist**2 + 2 * np.cos(alpha - beta) + 2 * dist * (-np.sin(alpha) + np.sin(beta))
         ) / 8
 
-        if abs(discriminant) > 1:
-            return None
-
-        p = np.mod(2 * np.pi - np.arccos(discriminant), 2 * np.pi)
+        p = np.mod(2 * np.pi - np.arccos(np.clip(discriminant, -1, 1)), 2 * np.pi)
 
         tmp = np.arctan2(np.cos(alpha) - np.cos(beta), dist + np.sin(alpha) - np.sin(beta))
 
-        t = np.mod(-alpha + tmp + p / 2, 2 * np.pi)
+        t = np.mod(-alpha - tmp + p / 2, 2 * np.pi)
         q = np.mod(beta - alpha - t + p, 2 * np.pi)
 
-        return t, p, q
+        return t, p, q, np.abs(discriminant) <= 1
 
-    def _set_path(self, segments, curve_type):
-        if segments is None:
-            return None
+    def _solve(
+        self,
+        start_points: np.ndarray,
+        start_headings: np.ndarray,
+        end_points: np.ndarray,
+        end_headings: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Solve all the curve types. The segments (t, p, q) normalized by the radius are in the shape of (6, n, 3), and the validity is in the shape of (6, n).
+        start_points = np.asarray(start_points, dtype=float).reshape(-1, 2)
+        end_points = np.asarray(end_points, dtype=float).reshape(-1, 2)
+        start_headings = np.asarray(start_headings, dtype=float).reshape(-1)
+        end_headings = np.asarray(end_headings, dtype=float).reshape(-1)
 
-        path = DubinsPath(segments, curve_type, self.radius)
-        return path
+        # create a new coordinate system with the start point as the origin
+        diff = end_points - start_points
+        theta = np.arctan2(diff[:, 1], diff[:, 0])
+        d = np.linalg.norm(diff, axis=1) / self.radius
+        alpha = np.mod(start_headings - theta, 2 * np.pi)
+        beta = np.mod(end_headings - theta, 2 * np.pi)
+
+        solutions = [
+            getattr(self, "_" + curve_type)(alpha, beta, d) for curve_type in self.curve_types
+        ]
+        segments = np.array([solution[:3] for solution in solutions]).transpose(0, 2, 1)
+        valid = np.array([solution[3] for solution in solutions])
+
+        return segments, valid
+
+    def get_path_batch(
+        self,
+        start_points: np.ndarray,
+        start_headings: np.ndarray,
+        end_points: np.ndarray,
+        end_headings: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """This function finds the shortest Dubins paths for a batch of start and goal poses. All the curve types are evaluated with arrays and no path object is created.
+
+        Args:
+            start_points (np.ndarray): The start points. The shape is (n, 2).
+            start_headings (np.ndarray): The start headings. The shape is (n,).
+            end_points (np.ndarray): The end points. The shape is (n, 2).
+            end_headings (np.ndarray): The end headings. The shape is (n,).
+
+        Returns:
+            lengths (np.ndarray): The lengths of the shortest paths. The shape is (n,).
+            segments (np.ndarray): The lengths of the three segments. The shape is (n, 3).
+            types (np.ndarray): The ids of the curve types in `curve_types`. The shape is (n,).
+        """
+        segments, valid = self._solve(start_points, start_headings, end_points, end_headings)
+        lengths = np.where(valid, np.sum(segments, axis=-1), np.inf)
+
+        # keep the last curve type on ties, which is the same as get_path
+        types = len(self.curve_types) - 1 - np.argmin(lengths[::-1], axis=0)
+        columns = np.arange(lengths.shape[1])
+
+        return (
+            lengths[types, columns] * self.radius,
+            segments[types, columns] * self.radius,
+            types,
+        )
+
+    def build_path(self, curve_type: int, segments: np.ndarray) -> DubinsPath:
+        """This function creates a Dubins path from the result of [get_path_batch](#tactics2d.math.interpolate.Dubins.get_path_batch).
+
+        Args:
+            curve_type (int): The id of the curve type in `curve_types`.
+            segments (np.ndarray): The lengths of the three segments. The shape is (3,).
+
+        Returns:
+            path (DubinsPath): The Dubins path.
+        """
+        return DubinsPath(
+            np.asarray(segments) / self.radius, self.curve_types[curve_type], self.radius
+        )
 
     def get_all_path(
         self,
@@ -230,19 +304,11 @@ class Dubins:
         Returns:
             paths (list): A list of Dubins paths.
         """
-        # create a new coordinate system with the start point as the origin
-        theta = np.arctan2(end_point[1] - start_point[1], end_point[0] - start_point[0])
-        d = np.linalg.norm(end_point - start_point) / self.radius
-        alpha = np.mod(start_heading - theta, 2 * np.pi)
-        beta = np.mod(end_heading - theta, 2 * np.pi)
+        segments, valid = self._solve(start_point, start_heading, end_point, end_heading)
 
         paths = [
-            self._set_path(self._LRL(alpha, beta, d), "LRL"),
-            self._set_path(self._RLR(alpha, beta, d), "RLR"),
-            self._set_path(self._LSL(alpha, beta, d), "LSL"),
-            self._set_path(self._RSL(alpha, beta, d), "RSL"),
-            self._set_path(self._RSR(alpha, beta, d), "RSR"),
-            self._set_path(self._LSR(alpha, beta, d), "LSR"),
+            DubinsPath(tuple(segments[i, 0]), curve_type, self.radius) if valid[i, 0] else None
+            for i, curve_type in enumerate(self.curve_types)
         ]
 
         return paths
@@ -265,18 +331,9 @@ class Dubins:
         Returns:
             shortest_path (DubinsPath): The shortest Dubins path.
         """
-        candidate_paths = self.get_all_path(start_point, start_heading, end_point, end_heading)
-
-        shortest_path = None
-        shortest_length = np.inf
-        for path in candidate_paths:
-            if path is None or path.length > shortest_length:
-                continue
-            else:
-                shortest_length = path.length
-                shortest_path = path
+        _, segments, types = self.get_path_batch(start_point, start_heading, end_point, end_heading)
 
-        return shortest_path
+        return self.build_path(types[0], segments[0])
 
     def get_curve(
         self,
@@ -285,6 +342,7 @@ class Dubins:
         end_point: np.ndarray,
         end_heading: float,
         step_size: float = 0.1,
+        tolerance: float = None,
     ) -> DubinsPath:
         """Get the shortest Dubins curve connecting two points.
 
@@ -294,6 +352,7 @@ class Dubins:
             end_point (np.ndarray): The end point of the curve. The shape is (2,).
             end_heading (float): The heading of the end point. The unit is radian.
             step_size (float, optional): The step size of the curve. Defaults to 0.1.
+            tolerance (float, optional): The maximum distance from the curve to the chord between two adjacent points. If it is given, the curve is sampled adaptively instead of by the step size. Defaults to None.
 
         Returns:
             shortest_path (DubinsPath): The shortest Dubins path connecting two points.
@@ -301,6 +360,180 @@ class Dubins:
 
         shortest_path = self.get_path(start_point, start_heading, end_point, end_heading)
         if shortest_path is not None:
-            shortest_path.get_curve_line(start_point, start_heading, self.radius, step_size)
+            shortest_path.get_curve_line(
+                start_point, start_heading, self.radius, step_size, tolerance
+            )
 
         return shortest_path
+
+
+class DubinsTable:
+    """This class implements a lookup table of the Dubins path lengths, which serves as a cheap heuristic in search-based planners.
+
+    The length of a Dubins path only depends on the goal pose relative to the start pose. The table discretizes the relative pose (x, y, heading) into a regular grid and stores the path lengths as float32. A table can be saved to a file and loaded as a memory map, so that it is built once and shared by processes.
+
+    Attributes:
+        radius (float): The minimum turning radius.
+        x_range (Tuple[float, float]): The range of the relative x coordinates covered by the table.
+        y_range (Tuple[float, float]): The range of the relative y coordinates covered by the table.
+        resolution (float): The grid size of the relative coordinates.
+        n_heading (int): The number of discretized relative headings in [0, 2 * pi).
+        lengths (np.ndarray): The path lengths. The shape is (n_x, n_y, n_heading).
+    """
+
+    _magic = b"TACTICS2D-DUBINS"
+
+    def __init__(
+        self,
+        radius: float,
+        x_range: Tuple[float, float],
+        y_range: Tuple[float, float],
+        resolution: float,
+        n_heading: int,
+        lengths: np.ndarray = None,
+    ):
+        """Initialize the lookup table. The path lengths are computed if they are not given.
+
+        Args:
+            radius (float): The minimum turning radius.
+            x_range (Tuple[float, float]): The range of the relative x coordinates.
+            y_range (Tuple[float, float]): The range of the relative y coordinates.
+            resolution (float): The grid size of the relative coordinates.
+            n_heading (int): The number of discretized relative headings.
+            lengths (np.ndarray, optional): The precomputed path lengths. The shape is (n_x, n_y, n_heading).
+        """
+        self.radius = radius
+        self.x_range = tuple(x_range)
+        self.y_range = tuple(y_range)
+        self.resolution = resolution
+        self.n_heading = n_heading
+        self._dubins = Dubins(radius)
+
+        self._shape = self._get_shape(self.x_range, self.y_range, resolution, n_heading)
+
+        if lengths is None:
+            xs = self.x_range[0] + np.arange(self._shape[0]) * resolution
+            ys = self.y_range[0] + np.arange(self._shape[1]) * resolution
+            headings = np.arange(n_heading) * 2 * np.pi / n_heading
+            grid = np.stack(np.meshgrid(xs, ys, headings, indexing="ij"), axis=-1).reshape(-1, 3)
+            lengths, _, _ = self._dubins.get_path_batch(
+                np.zeros((len(grid), 2)), np.zeros(len(grid)), grid[:, :2], grid[:, 2]
+            )
+            lengths = lengths.astype(np.float32).reshape(self._shape)
+        elif lengths.shape != self._shape:
+            raise ValueError(f"The shape of the lengths should be {self._shape}.")
+
+        self.lengths = lengths
+
+    @staticmethod
+    def _get_shape(x_range: tuple, y_range: tuple, resolution: float, n_heading: int) -> tuple:
+        return (
+            int(round((x_range[1] - x_range[0]) / resolution)) + 1,
+            int(round((y_range[1] - y_range[0]) / resolution)) + 1,
+            n_heading,
+        )
+
+    def lookup(
+        self,
+        start_points: np.ndarray,
+        start_headings: np.ndarray,
+        end_points: np.ndarray,
+        end_headings: np.ndarray,
+    ) -> np.ndarray:
+        """This function looks up the Dubins path lengths of a batch of start and goal poses at the nearest grid cells. The poses out of the table are solved exactly.
+
+        Args:
+            start_points (np.ndarray): The start points. The shape is (n, 2).
+            start_headings (np.ndarray): The start headings. The shape is (n,).
+            end_points (np.ndarray): The end points. The shape is (n, 2).
+            end_headings (np.ndarray): The end headings. The shape is (n,).
+
+        Returns:
+            lengths (np.ndarray): The path lengths. The shape is (n,).
+        """
+        start_points = np.asarray(start_points, dtype=float).reshape(-1, 2)
+        end_points = np.asarray(end_points, dtype=float).reshape(-1, 2)
+        start_headings = np.broadcast_to(
+            np.asarray(start_headings, dtype=float).reshape(-1), len(start_points)
+        )
+        end_headings = np.broadcast_to(
+            np.asarray(end_headings, dtype=float).reshape(-1), len(end_points)
+        )
+
+        diff = end_points - start_points
+        cos, sin = np.cos(start_headings), np.sin(start_headings)
+        x = diff[:, 0] * cos + diff[:, 1] * sin
+        y = -diff[:, 0] * sin + diff[:, 1] * cos
+        heading = np.mod(end_headings - start_headings, 2 * np.pi)
+
+        i = np.round((x - self.x_range[0]) / self.resolution).astype(np.int64)
+        j = np.round((y - self.y_range[0]) / self.resolution).astype(np.int64)
+        k = np.round(heading / (2 * np.pi) * self.n_heading).astype(np.int64) % self.n_heading
+        inside = (i >= 0) & (i < self._shape[0]) & (j >= 0) & (j < self._shape[1])
+
+        lengths = np.empty(len(x))
+        lengths[inside] = self.lengths[i[inside], j[inside], k[inside]]
+        if not np.all(inside):
+            lengths[~inside], _, _ = self._dubins.get_path_batch(
+                start_points[~inside],
+                start_headings[~inside],
+                end_points[~inside],
+                end_headings[~inside],
+            )
+
+        return lengths
+
+    def save(self, file_path: str):
+        """This function saves the lookup table to a file.
+
+        Args:
+            file_path (str): The path to the file.
+        """
+        header = json.dumps(
+            {
+                "radius": self.radius,
+                "x_range": self.x_range,
+                "y_range": self.y_range,
+                "resolution": self.resolution,
+                "n_heading": self.n_heading,
+            }
+        ).encode()
+        # align the table to 64 bytes for the memory map
+        header += b" " * (-(len(self._magic) + 8 + len(header)) % 64)
+
+        with open(file_path, "wb") as f:
+            f.write(self._magic)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            f.write(np.ascontiguousarray(self.lengths, dtype=np.float32).tobytes())
+
+    @staticmethod
+    def load(file_path: str, mmap: bool = True) -> "DubinsTable":
+        """This function loads a lookup table saved by [save](#tactics2d.math.interpolate.DubinsTable.save).
+
+        Args:
+            file_path (str): The path to the file.
+            mmap (bool, optional): Whether to memory-map the table instead of reading it into memory.
+
+        Returns:
+            The loaded lookup table.
+
+        Raises:
+            ValueError: If the file is not a Dubins lookup table.
+        """
+        with open(file_path, "rb") as f:
+            if f.read(len(DubinsTable._magic)) != DubinsTable._magic:
+                raise ValueError(f"{file_path} is not a Dubins lookup table.")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            metadata = json.loads(f.read(header_size))
+
+        offset = len(DubinsTable._magic) + 8 + header_size
+        shape = DubinsTable._get_shape(
+            metadata["x_range"], metadata["y_range"], metadata["resolution"], metadata["n_heading"]
+        )
+        if mmap:
+            lengths = np.memmap(file_path, dtype=np.float32, mode="r", offset=offset, shape=shape)
+        else:
+            lengths = np.fromfile(file_path, dtype=np.float32, offset=offset).reshape(shape)
+
+        return DubinsTable(**metadata, lengths=lengths)
@@ -5,6 +5,8 @@
 # @Author: Yueyuan Li
 # @Version: 1.0.0
 
+from typing import Tuple
+
 import numpy as np
 
 from tactics2d.math.geometry import Circle
@@ -24,7 +26,7 @@ class ReedsSheppPath:
 
         Args:
             segments (tuple): The segment lengths of the Reeds-Shepp path.
-            matrix (np.array): The transformation matrix to decide the shape of the segments.
+            matrix (np.array): The transformation matrix to decide the shape of the segments. If it is None, `segments` are the signed segment lengths normalized by the radius, with one value for each action. The negative values mean driving backward.
             actions (str): The actions of the Reeds-Shepp path. The string is composed of "S", "L", and "R".
             curve_type (str): The type of the Reeds-Shepp path. The string is composed of "C", "S", and "C".
             radius (float): The minimal turning radius.
@@ -32,20 +34,33 @@ class ReedsSheppPath:
         self.actions = actions
         self.curve_type = curve_type
 
-        t, u, v = segments
-        self.segments = np.abs(
-            np.dot(
-                np.array([t, u, v, 1]) if curve_type in ["CCSC", "CCSCC"] else np.array([t, u, v]),
-                matrix,
+        if matrix is None:
+            segments = np.asarray(segments, dtype=float)[: len(actions)]
+            self.segments = np.abs(segments)
+            self.signs = np.where(segments < 0, -1, 1)
+        else:
+            t, u, v = segments
+            self.segments = np.abs(
+                np.dot(
+                    (
+                        np.array([t, u, v, 1])
+                        if curve_type in ["CCSC", "CCSCC"]
+                        else np.array([t, u, v])
+                    ),
+                    matrix,
+                )
             )
-        )
-
-        self.signs = np.sign(np.sum(matrix, axis=0))
+            self.signs = np.sign(np.sum(matrix, axis=0))
 
         self.length = np.abs(self.segments).sum() * radius
 
     def get_curve_line(
-        self, start_point: np.ndarray, start_heading: float, radius: float, step_size: float = 0.01
+        self,
+        start_point: np.ndarray,
+        start_heading: float,
+        radius: float,
+        step_size: float = 0.01,
+        tolerance: float = None,
     ):
         """This function returns the curve and yaw of the Reeds-Shepp path.
 
@@ -54,6 +69,7 @@ class ReedsSheppPath:
             start_heading (float): The start heading of the curve.
             radius (float): The radius of the vehicle.
             step_size (float, optional): The step size of the curve. Defaults to 0.01.
+            tolerance (float, optional): The maximum distance from the curve to the chord between two adjacent points. If it is given, the arcs are sampled by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler) and the straight lines only keep their ends, instead of using the step size. Defaults to None.
 
         Returns:
             arc_curve (np.ndarray): The curve of the Reeds-Shepp path. The shape is (n, 2).
@@ -62,52 +78,62 @@ class ReedsSheppPath:
             end_heading (float): The end heading of the curve.
         """
 
-        def get_arc(point, heading, radius, radian, forward, action):
-            circle_center, _ = Circle.get_circle(
-                Circle.ConstructBy.TangentVector, point, heading, radius, action
-            )
-            start_angle = (heading + np.pi / 2) if action == "R" else (heading - np.pi / 2)
-            clockwise = (action == "R" and forward > 0) or (action == "L" and forward < 0)
-            arc_curve = Circle.get_arc(
-                circle_center, radius, radian, start_angle, clockwise, step_size
-            )
-
-            end_angle = (start_angle - radian) if clockwise else (start_angle + radian)
-            end_point = circle_center + np.array([np.cos(end_angle), np.sin(end_angle)]) * radius
-            end_heading = (heading - radian) if clockwise else (heading + radian)
-            yaw = np.linspace(heading, end_heading, arc_curve.shape[0])
-
-            return arc_curve, yaw, end_point, end_heading
-
-        def get_straight_line(point, heading, radius, length, forward):
-            end_point = (
-                point + np.array([np.cos(heading), np.sin(heading)]) * radius * length * forward
-            )
-            total_length = np.linalg.norm(end_point - point)
-            num_points = int(np.ceil(total_length / step_size))
-            x = np.linspace(point[0], end_point[0], num_points)
-            y = np.linspace(point[1], end_point[1], num_points)
-            straight_line = np.array([x, y]).T
-            yaw = np.ones_like(x) * heading
+        actions = np.array(list(self.actions))
+        lengths = np.abs(np.asarray(self.segments, dtype=float))
+        signs = np.asarray(self.signs, dtype=float)
+        is_arc = actions != "S"
+        turns = np.where(actions == "L", 1.0, np.where(actions == "R", -1.0, 0.0))
+
+        # The end poses of the segments are found in closed form, so that all the arcs are sampled
+        # by one call of Circle.get_arc_batch.
+        headings = start_heading + np.concatenate([[0], np.cumsum(turns * signs * lengths)])
+        displacements = np.where(
+            is_arc[:, None],
+            turns[:, None]
+            * radius
+            * np.column_stack(
+                [
+                    np.sin(headings[1:]) - np.sin(headings[:-1]),
+                    np.cos(headings[:-1]) - np.cos(headings[1:]),
+                ]
+            ),
+            radius
+            * (signs * lengths)[:, None]
+            * np.column_stack([np.cos(headings[:-1]), np.sin(headings[:-1])]),
+        )
+        points = np.asarray(start_point, dtype=float) + np.concatenate(
+            [np.zeros((1, 2)), np.cumsum(displacements, axis=0)]
+        )
 
-            return straight_line, yaw, end_point, heading
+        centers, _ = Circle.get_circle_by_tangent_vector_batch(
+            points[:-1][is_arc], headings[:-1][is_arc], radius, actions[is_arc]
+        )
+        arc_points, angles, offsets = Circle.get_arc_batch(
+            centers,
+            np.full(len(centers), radius),
+            lengths[is_arc],
+            headings[:-1][is_arc] - turns[is_arc] * np.pi / 2,
+            turns[is_arc] * signs[is_arc] < 0,
+            step_size,
+            tolerance,
+        )
+        arc_yaws = angles + np.repeat(turns[is_arc], np.diff(offsets)) * np.pi / 2
 
-        next_point = start_point
-        next_heading = start_heading
         curves = []
         yaws = []
-        for i, action in enumerate(self.actions):
-            if action == "S":
-                curve, yaw, next_point, next_heading = get_straight_line(
-                    next_point, next_heading, radius, self.segments[i], self.signs[i]
-                )
+        n_arc = 0
+        for i in range(len(actions)):
+            if is_arc[i]:
+                start, end = offsets[n_arc], offsets[n_arc + 1]
+                curves.append(arc_points[start:end])
+                yaws.append(arc_yaws[start:end])
+                n_arc += 1
             else:
-                curve, yaw, next_point, next_heading = get_arc(
-                    next_point, next_heading, radius, abs(self.segments[i]), self.signs[i], action
-                )
-
-            curves.append(curve)
-            yaws.append(yaw)
+                step_num = int(np.ceil(radius * lengths[i] / step_size))
+                if tolerance is not None:
+                    step_num = min(step_num, 2)
+                curves.append(np.linspace(points[i], points[i + 1], step_num))
+                yaws.append(np.full(step_num, headings[i]))
 
         self.curve = np.concatenate(curves)
         self.yaw = np.concatenate(yaws)
@@ -116,6 +142,8 @@ class ReedsSheppPath:
 class ReedsShepp:
     """This class implements a Reeds-Shepp curve interpolator.
 
+    The 48 path families in the paper are solved by 10 formulas applied to the goal pose after time flip, reflection, and backward transformations. All the formulas are evaluated with arrays, so that [get_path_batch](#tactics2d.math.interpolate.ReedsShepp.get_path_batch) solves many start and goal pairs at once, which suits the analytic expansions in search-based planners. The path objects are only created by [get_path](#tactics2d.math.interpolate.ReedsShepp.get_path) and [build_path](#tactics2d.math.interpolate.ReedsShepp.build_path).
+
     !!! quote "Reference"
         Reeds, James, and Lawrence Shepp. "Optimal paths for a car that goes both forwards
         and backwards." *Pacific journal of mathematics* 145.2 (1990): 367-393.
@@ -124,11 +152,86 @@ class ReedsShepp:
         radius (float): The minimum turning radius of the vehicle.
     """
 
+    _families = None
+    _family_arrays = None
+
     def __init__(self, radius: float) -> None:
         self.radius = radius
         if self.radius <= 0:
             raise ValueError("The minimum turning radius must be positive.")
 
+        if ReedsShepp._families is None:
+            ReedsShepp._families = self._get_families()
+            ReedsShepp._family_arrays = self._get_family_arrays(ReedsShepp._families)
+
+    @staticmethod
+    def _get_families() -> list:
+        # Every family is (formula id, transformation id, matrix, actions, curve type). The order is the same as the paths returned by get_all_path. The formulas are listed in _solve_formulas. The transformations are 0: none, 1: time flip, 2: reflect, 3: time flip and reflect, 4: backward, 5: time flip and backward, 6: reflect and backward, 7: time flip, reflect, and backward.
+        matrix_csc = np.diag([1, 1, 1])
+        matrices_ccc = [
+            np.array([[1, 0, 0], [0, -1, 0], [0, 0, 1]]),
+            np.array([[1, 0, 0], [0, -1, 0], [0, 0, -1]]),
+            np.array([[-1, 0, 0], [0, -1, 0], [0, 0, 1]]),
+        ]
+        matrices_cccc = [
+            np.array([[1, 0, 0, 0], [0, 1, -1, 0], [0, 0, 0, -1]]),
+            np.array([[1, 0, 0, 0], [0, -1, -1, 0], [0, 0, 0, 1]]),
+        ]
+        matrix_ccsc1 = np.array([[1, 0, 0, 0], [0, 0, -1, 0], [0, 0, 0, -1], [0, -np.pi / 2, 0, 0]])
+        matrix_ccsc2 = np.array([[0, 0, 0, 1], [0, -1, 0, 0], [-1, 0, 0, 0], [0, 0, -np.pi / 2, 0]])
+        matrix_ccscc = np.array(
+            [[1, 0, 0, 0, 0], [0, 0, 1, 0, 0], [0, 0, 0, 0, 1], [0, -np.pi / 2, 0, -np.pi / 2, 0]]
+        )
+
+        def get_group(formula, matrix, actions, curve_type):
+            # the four paths solved by a formula with the transformations 0-3
+            reflected = actions.translate(str.maketrans("LR", "RL"))
+            return [
+                (formula, 0, matrix, actions, curve_type),
+                (formula, 1, -matrix, actions, curve_type),
+                (formula, 2, matrix, reflected, curve_type),
+                (formula, 3, -matrix, reflected, curve_type),
+            ]
+
+        families = []
+        # L+S+L+, L-S-L-, R+S+R+, R-S-R-, L+S+R+, L-S-R-, R+S+L+, R-S-L-
+        families += get_group(0, matrix_csc, "LSL", "CSC")
+        families += get_group(1, matrix_csc, "LSR", "CSC")
+        # L+R-L+, L-R+L-, R+L-R+, R-L+R-, L+R-L-, L-R+L+, R+L-R-, R-L+R+,
+        # L-R-L+, L+R+L-, R-L-R+, R+L+R-
+        for i, matrix in enumerate(matrices_ccc):
+            families += get_group(2 + i, matrix, "LRL", "CCC")
+        # L+R+L-R-, L-R-L+R+, R+L+R-L-, R-L-R+L+, L+R-L+R-, L-R+L-R+, R+L-R-L-, R-L+R-L+
+        for i, matrix in enumerate(matrices_cccc):
+            families += get_group(5 + i, matrix, "LRLR", "CCCC")
+        # L+R-S-L-, L-R+S+L+, R+L-S-R-, R-L+S+R+, L-S-R-L+, L+S+R+L-, R-S-L-R+, R+S+L+R-
+        # L+R-S-R-, L-R+S+R+, R+L-S-L-, R-L+S+L+, R-S-R-L+, R+S+R+L-, L-S-L-R-, L+S+L+R-
+        for formula, actions, backward_actions in [(7, "LRSL", "LSRL"), (8, "LRSR", "RSRL")]:
+            families += get_group(formula, matrix_ccsc1, actions, "CCSC")
+            families += [
+                (formula, 4 + transform, matrix, actions, curve_type)
+                for _, transform, matrix, actions, curve_type in get_group(
+                    formula, matrix_ccsc2, backward_actions, "CCSC"
+                )
+            ]
+        # L+R-S-L-R+, L-R+S+L+R-, R+L-S-R-L+, R-L+S+R+L-
+        families += get_group(9, matrix_ccscc, "LRSLR", "CCSCC")
+
+        return families
+
+    @staticmethod
+    def _get_family_arrays(families: list) -> tuple:
+        # Stack the matrices into the shape of (48, 4, 5), so that the segments of all the families are computed by one matrix multiplication with (t, u, v, 1).
+        formulas = np.array([family[0] for family in families])
+        transforms = np.array([family[1] for family in families])
+        matrices = np.zeros((len(families), 4, 5))
+        signs = np.zeros((len(families), 5))
+        for i, (_, _, matrix, _, _) in enumerate(families):
+            matrices[i, : matrix.shape[0], : matrix.shape[1]] = matrix
+            signs[i, : matrix.shape[1]] = np.sign(np.sum(matrix, axis=0))
+
+        return formulas, transforms, matrices, signs
+
     def _R(self, x, y):
         # Convert cartesian coordinates to polar coordinates.
         r = np.sqrt(x**2 + y**2)
@@ -138,13 +241,7 @@ class ReedsShepp:
     def _M(self, theta):
         # Regulate a given angle to the range of [-pi, pi].
         phi = np.mod(theta, 2 * np.pi)
-
-        if phi > np.pi:
-            phi -= 2 * np.pi
-        if phi < -np.pi:
-            phi += 2 * np.pi
-
-        return phi
+        return np.where(phi > np.pi, phi - 2 * np.pi, phi)
 
     def _tau_omega(self, u, v, xi, eta, phi):
         # This function follows Equation 8.5 and 8.6 in the paper.
@@ -155,7 +252,7 @@ class ReedsShepp:
         _, t1 = self._R(xi * A + eta * B, eta * A - xi * B)
         t2 = 2 * (np.cos(delta) - np.cos(v) - np.cos(u)) + 3
 
-        tau = self._M(t1 + np.pi) if t2 < 0 else self._M(t1)
+        tau = np.where(t2 < 0, self._M(t1 + np.pi), self._M(t1))
         omega = self._M(tau - u + v - phi)
 
         return tau, omega
@@ -171,301 +268,230 @@ class ReedsShepp:
         y_ = x * np.sin(phi) - y * np.cos(phi)
         return (x_, y_, phi)
 
-    def _set_path(self, segments, matrix, actions, curve_type) -> ReedsSheppPath:
-        if segments is None:
-            return None
-
-        path = ReedsSheppPath(segments, matrix, actions, curve_type, self.radius)
-        return path
-
-    def _CSC(self, x, y, phi):
-        def LpSpLp(x, y, phi):
-            # This function follows Equation 8.1 in the paper. It implements the L+S+L+ path, which can be converted to L-S-L-, R+S+R+, and R-S-R- by proper transformation.
-            u, t = self._R(x - np.sin(phi), y - 1 + np.cos(phi))
-
-            if t < 0:
-                return None
-
-            v = self._M(phi - t)
-            if v < 0:
-                return None
-
-            return (t, u, v)
-
-        def LpSpRp(x, y, phi):
-            # This function follows Equation 8.2 in the paper. It implements the L+S+R+ path, which can be converted to L-S-R-, R+S+L+, and R-S-L+ by proper transformation.
-            u1, t1 = self._R(x + np.sin(phi), y - 1 - np.cos(phi))
-
-            if u1**2 < 4:
-                return None
-
-            u = np.sqrt(u1**2 - 4)
-            _, theta = self._R(u, 2)
-            t = self._M(t1 + theta)
-            v = self._M(t - phi)
-
-            if t < 0 or v < 0:
-                return None
-
-            return (t, u, v)
-
-        inputs = [
-            (x, y, phi),
-            self._time_flip(*(x, y, phi)),
-            self._reflect(*(x, y, phi)),
-            self._time_flip(*(self._reflect(*(x, y, phi)))),
-        ]
-
-        # L+S+L+, L-S-L-, R+S+R+, R-S-R-, L+S+R+, L-S-R-, R+S+L+, R-S-L-
-        paths = [
-            self._set_path(LpSpLp(*inputs[0]), np.diag([1, 1, 1]), "LSL", "CSC"),
-            self._set_path(LpSpLp(*inputs[1]), np.diag([-1, -1, -1]), "LSL", "CSC"),
-            self._set_path(LpSpLp(*inputs[2]), np.diag([1, 1, 1]), "RSR", "CSC"),
-            self._set_path(LpSpLp(*inputs[3]), np.diag([-1, -1, -1]), "RSR", "CSC"),
-            self._set_path(LpSpRp(*inputs[0]), np.diag([1, 1, 1]), "LSR", "CSC"),
-            self._set_path(LpSpRp(*inputs[1]), np.diag([-1, -1, -1]), "LSR", "CSC"),
-            self._set_path(LpSpRp(*inputs[2]), np.diag([1, 1, 1]), "RSL", "CSC"),
-            self._set_path(LpSpRp(*inputs[3]), np.diag([-1, -1, -1]), "RSL", "CSC"),
-        ]
-
-        return paths
-
-    def _CCC(self, x, y, phi):
-        def LRL(signs, x, y, phi):
-            # This function is related to Equation 8.3 and Equation 8.4. It implements the L+R-L+ path, which can be converted to L-R+L-, R+L-R+, and R-L+R-, L+R-L-, L-R+L+, R+L-R-, R-L+R+, L-R-L+, L+R+L-, R-L-R+, and R+L+R- by proper transformation.
-            # There are typos in the original paper. The implementation has corrected the equations.
-            xi = x - np.sin(phi)
-            eta = y - 1 + np.cos(phi)
-            u1, theta = self._R(xi, eta)
-
-            if u1 > 4:
-                return None
-
-            A = np.pi - np.arcsin(u1 / 4)
-            t = self._M(theta + A)
-            u = self._M(2 * A)
-            v = self._M(phi - t + u)
-
-            if t * signs[0] < 0 or u * signs[1] < 0 or v * signs[2] < 0:
-                return None
-
-            return (t, u, v)
-
-        inputs = [
-            (x, y, phi),
-            self._time_flip(*(x, y, phi)),
-            self._reflect(*(x, y, phi)),
-            self._time_flip(*(self._reflect(*(x, y, phi)))),
-        ]
-
-        matrix1 = np.array([[1, 0, 0], [0, -1, 0], [0, 0, 1]])
-        signs1 = np.sign(np.sum(matrix1, axis=0))
-        matrix2 = np.array([[1, 0, 0], [0, -1, 0], [0, 0, -1]])
-        signs2 = np.sign(np.sum(matrix2, axis=0))
-        matrix3 = np.array([[-1, 0, 0], [0, -1, 0], [0, 0, 1]])
-        signs3 = np.sign(np.sum(matrix3, axis=0))
-
-        # paths 0-3: L+R-L+, L-R+L-, R+L-R+, R-L+R-
-        # paths 4-7: L+R-L-, L-R+L+, R+L-R-, R-L+R+
-        # paths 8-11: L-R-L+, L+R+L-, R-L-R+, R+L+R-
-        paths = [
-            self._set_path(LRL(signs1, *inputs[0]), matrix1, "LRL", "CCC"),
-            self._set_path(LRL(signs1, *inputs[1]), -matrix1, "LRL", "CCC"),
-            self._set_path(LRL(signs1, *inputs[2]), matrix1, "RLR", "CCC"),
-            self._set_path(LRL(signs1, *inputs[3]), -matrix1, "RLR", "CCC"),
-            self._set_path(LRL(signs2, *inputs[0]), matrix2, "LRL", "CCC"),
-            self._set_path(LRL(signs2, *inputs[1]), -matrix2, "LRL", "CCC"),
-            self._set_path(LRL(signs2, *inputs[2]), matrix2, "RLR", "CCC"),
-            self._set_path(LRL(signs2, *inputs[3]), -matrix2, "RLR", "CCC"),
-            self._set_path(LRL(signs3, *inputs[0]), matrix3, "LRL", "CCC"),
-            self._set_path(LRL(signs3, *inputs[1]), -matrix3, "LRL", "CCC"),
-            self._set_path(LRL(signs3, *inputs[2]), matrix3, "RLR", "CCC"),
-            self._set_path(LRL(signs3, *inputs[3]), -matrix3, "RLR", "CCC"),
-        ]
-
-        return paths
-
-    def _CCCC(self, x, y, phi):
-        def LpRpLnRn(x, y, phi):
-            # This function follows Equation 8.7. It implements the L+R+L-R- path, which can be converted to L-R-L+R+, R+L+R-L-, and R-L-R+L+ by proper transformation.
-            xi = x + np.sin(phi)
-            eta = y - 1 - np.cos(phi)
-            rho = (2 + np.sqrt(xi**2 + eta**2)) / 4
-
-            if rho > 1 or rho < 0:
-                return None
-
-            u = np.arccos(rho)
-            t, v = self._tau_omega(u, -u, xi, eta, phi)
-
-            if t < 0 or v > 0:
-                return None
-
-            return (t, u, v)
-
-        def LpRnLnRp(x, y, phi):
-            # This function follows Equation 8.8. It implements the L+R-L-R+ path, which can be converted to L-R+L+R-, R+L-R-L+, and R-L+R-L+ by proper transformation.
-            xi = x + np.sin(phi)
-            eta = y - 1 - np.cos(phi)
-            rho = (20 - xi**2 - eta**2) / 16
-
-            if rho > 1 or rho < 0:
-                return None
-
-            u = -np.arccos(rho)
-            if u < -np.pi / 2:
-                return None
-
-            t, v = self._tau_omega(u, u, xi, eta, phi)
-
-            if t < 0 or v < 0:
-                return None
-
-            return (t, u, v)
+    def _LpSpLp(self, x, y, phi):
+        # This function follows Equation 8.1 in the paper. It implements the L+S+L+ path.
+        u, t = self._R(x - np.sin(phi), y - 1 + np.cos(phi))
+        v = self._M(phi - t)
+        return t, u, v, (t >= 0) & (v >= 0)
+
+    def _LpSpRp(self, x, y, phi):
+        # This function follows Equation 8.2 in the paper. It implements the L+S+R+ path.
+        u1, t1 = self._R(x + np.sin(phi), y - 1 - np.cos(phi))
+        valid = u1**2 >= 4
+        u = np.sqrt(np.maximum(u1**2 - 4, 0))
+        _, theta = self._R(u, 2)
+        t = self._M(t1 + theta)
+        v = self._M(t - phi)
+        return t, u, v, valid & (t >= 0) & (v >= 0)
+
+    def _LpRnLp(self, x, y, phi):
+        # This function is related to Equation 8.3 and Equation 8.4. It implements the L+R-L+ path. The signs of the segments are checked by the caller.
+        # There are typos in the original paper. The implementation has corrected the equations.
+        xi = x - np.sin(phi)
+        eta = y - 1 + np.cos(phi)
+        u1, theta = self._R(xi, eta)
+        valid = u1 <= 4
+
+        A = np.pi - np.arcsin(np.minimum(u1 / 4, 1))
+        t = self._M(theta + A)
+        u = self._M(2 * A)
+        v = self._M(phi - t + u)
+        return t, u, v, valid
+
+    def _LpRpLnRn(self, x, y, phi):
+        # This function follows Equation 8.7. It implements the L+R+L-R- path.
+        xi = x + np.sin(phi)
+        eta = y - 1 - np.cos(phi)
+        rho = (2 + np.sqrt(xi**2 + eta**2)) / 4
+        valid = (rho <= 1) & (rho >= 0)
+
+        u = np.arccos(np.clip(rho, -1, 1))
+        t, v = self._tau_omega(u, -u, xi, eta, phi)
+        return t, u, v, valid & (t >= 0) & (v <= 0)
+
+    def _LpRnLnRp(self, x, y, phi):
+        # This function follows Equation 8.8. It implements the L+R-L-R+ path.
+        xi = x + np.sin(phi)
+        eta = y - 1 - np.cos(phi)
+        rho = (20 - xi**2 - eta**2) / 16
+        valid = (rho <= 1) & (rho >= 0)
+
+        u = -np.arccos(np.clip(rho, -1, 1))
+        t, v = self._tau_omega(u, u, xi, eta, phi)
+        return t, u, v, valid & (u >= -np.pi / 2) & (t >= 0) & (v >= 0)
+
+    def _LpRnSnLn(self, x, y, phi):
+        # This function follows Equation 8.9. It implements the L+R-S-L- path.
+        xi = x - np.sin(phi)
+        eta = y - 1 + np.cos(phi)
+        rho, theta = self._R(xi, eta)
+        valid = rho >= 2
+
+        r = np.sqrt(np.maximum(rho**2 - 4, 0))
+        u = 2 - r
+        t = self._M(theta + np.arctan2(r, -2))
+        v = self._M(phi - np.pi / 2 - t)
+        return t, u, v, valid & (t >= 0) & (u <= 0) & (v <= 0)
+
+    def _LpRnSnRn(self, x, y, phi):
+        # This function follows Equation 8.10. It implements the L+R-S-R- path.
+        xi = x + np.sin(phi)
+        eta = y - 1 - np.cos(phi)
+        rho, theta = self._R(-eta, xi)
+        valid = rho >= 2
+
+        t = theta
+        u = 2 - rho
+        v = self._M(t + np.pi / 2 - phi)
+        return t, u, v, valid & (t >= 0) & (u <= 0) & (v <= 0)
+
+    def _LpRnSnLnRp(self, x, y, phi):
+        # This function follows Equation 8.11. It implements the L+R-S-L-R+ path.
+        xi = x + np.sin(phi)
+        eta = y - 1 - np.cos(phi)
+        rho, theta = self._R(xi, eta)
+        valid = rho >= 2
+
+        t = self._M(theta - np.arccos(-2 / np.maximum(rho, 2)))
+        valid &= t > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = 4 - (xi + 2 * np.cos(t)) / np.sin(t)
+        v = self._M(t - phi)
+        return t, u, v, valid & (u <= 0) & (v >= 0)
 
-        inputs = [
+    def _solve_formulas(self, x: np.ndarray, y: np.ndarray, phi: np.ndarray) -> tuple:
+        # Evaluate every formula on the transformed goal poses. The parameters (t, u, v) are in the shape of (n_formula, n_transformation, n, 3) and the validity is in the shape of (n_formula, n_transformation, n). The formulas not using the backward transformations are not evaluated on them.
+        xs, ys, phis = zip(
             (x, y, phi),
-            self._time_flip(*(x, y, phi)),
-            self._reflect(*(x, y, phi)),
-            self._time_flip(*(self._reflect(*(x, y, phi)))),
-        ]
-
-        matrix1 = np.array([[1, 0, 0, 0], [0, 1, -1, 0], [0, 0, 0, -1]])
-        matrix2 = np.array([[1, 0, 0, 0], [0, -1, -1, 0], [0, 0, 0, 1]])
-
-        # L+R+L-R-, L-R-L+R+, R+L+R-L-, R-L-R+L+, L+R-L+R-, L-R+L-R+, R+L-R-L-, R-L+R-L+
-        paths = [
-            self._set_path(LpRpLnRn(*inputs[0]), matrix1, "LRLR", "CCCC"),
-            self._set_path(LpRpLnRn(*inputs[1]), -matrix1, "LRLR", "CCCC"),
-            self._set_path(LpRpLnRn(*inputs[2]), matrix1, "RLRL", "CCCC"),
-            self._set_path(LpRpLnRn(*inputs[3]), -matrix1, "RLRL", "CCCC"),
-            self._set_path(LpRnLnRp(*inputs[0]), matrix2, "LRLR", "CCCC"),
-            self._set_path(LpRnLnRp(*inputs[1]), -matrix2, "LRLR", "CCCC"),
-            self._set_path(LpRnLnRp(*inputs[2]), matrix2, "RLRL", "CCCC"),
-            self._set_path(LpRnLnRp(*inputs[3]), -matrix2, "RLRL", "CCCC"),
-        ]
-
-        return paths
-
-    def _CCSC(self, x, y, phi):
-        def LpRnSnLn(x, y, phi):
-            # This function follows Equation 8.9. It implements the L+R-S-L- path, which can be converted to L-R+S+L+, R+L-S-R-, R-L+S+R+, L-S-R-L+, L+S+R+L-, R-S-L-R+, and R+S+L+R- by proper transformation.
-            xi = x - np.sin(phi)
-            eta = y - 1 + np.cos(phi)
-            rho, theta = self._R(xi, eta)
-
-            if rho < 2:
-                return None
-
-            r = np.sqrt(rho**2 - 4)
-            u = 2 - r
-            t = self._M(theta + np.arctan2(r, -2))
-            v = self._M(phi - np.pi / 2 - t)
-
-            if t < 0 or u > 0 or v > 0:
-                return None
-
-            return (t, u, v)
-
-        def LpRnSnRn(x, y, phi):
-            # This function follows Equation 8.10. It implements the L+R-S-R- path, which can be converted to L-R+S+R+, R+L-S-L-, R-L+S+L+, R-S-R-L+, R+S+R+L-, L-S-L-R+, and L+S+L+R- by proper transformation.
-            xi = x + np.sin(phi)
-            eta = y - 1 - np.cos(phi)
-            rho, theta = self._R(-eta, xi)
-
-            if rho < 2:
-                return None
-
-            t = theta
-            u = 2 - rho
-            v = self._M(t + np.pi / 2 - phi)
-
-            if t < 0 or u > 0 or v > 0:
-                return None
-
-            return (t, u, v)
+            self._time_flip(x, y, phi),
+            self._reflect(x, y, phi),
+            self._time_flip(*self._reflect(x, y, phi)),
+            self._backward(x, y, phi),
+            self._time_flip(*self._backward(x, y, phi)),
+            self._reflect(*self._backward(x, y, phi)),
+            self._time_flip(*self._reflect(*self._backward(x, y, phi))),
+        )
+        xs, ys, phis = np.array(xs), np.array(ys), np.array(phis)
+        inputs = (xs[:4], ys[:4], phis[:4])
 
-        inputs = [
-            (x, y, phi),
-            self._time_flip(*(x, y, phi)),
-            self._reflect(*(x, y, phi)),
-            self._time_flip(*(self._reflect(*(x, y, phi)))),
-            self._backward(*(x, y, phi)),
-            self._time_flip(*(self._backward(*(x, y, phi)))),
-            self._reflect(*(self._backward(*(x, y, phi)))),
-            self._time_flip(*(self._reflect(*(self._backward(*(x, y, phi)))))),
+        t, u, v, valid = self._LpRnLp(*inputs)
+        lrl = [
+            (t, u, v, valid & (t * signs[0] >= 0) & (u * signs[1] >= 0) & (v * signs[2] >= 0))
+            for signs in [(1, -1, 1), (1, -1, -1), (-1, -1, 1)]
         ]
-
-        matrix1 = np.array([[1, 0, 0, 0], [0, 0, -1, 0], [0, 0, 0, -1], [0, -np.pi / 2, 0, 0]])
-        matrix2 = np.array([[0, 0, 0, 1], [0, -1, 0, 0], [-1, 0, 0, 0], [0, 0, -np.pi / 2, 0]])
-
-        # L+R-S-L-, L-R+S+L+, R+L-S-R-, R-L+S+R+, L-S-R-L+, L+S+R+L-, R-S-L-R+, R+S+L+R-
-        # L+R-S-R-, L-R+S+R+, R+L-S-L-, R-L+S+L+, R-S-R-L+, R+S+R+L-, L-S-L-R-, L+S+L+R-,
-        paths = [
-            self._set_path(LpRnSnLn(*inputs[0]), matrix1, "LRSL", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[1]), -matrix1, "LRSL", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[2]), matrix1, "RLSR", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[3]), -matrix1, "RLSR", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[4]), matrix2, "LSRL", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[5]), -matrix2, "LSRL", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[6]), matrix2, "RSLR", "CCSC"),
-            self._set_path(LpRnSnLn(*inputs[7]), -matrix2, "RSLR", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[0]), matrix1, "LRSR", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[1]), -matrix1, "LRSR", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[2]), matrix1, "RLSL", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[3]), -matrix1, "RLSL", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[4]), matrix2, "RSRL", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[5]), -matrix2, "RSRL", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[6]), matrix2, "LSLR", "CCSC"),
-            self._set_path(LpRnSnRn(*inputs[7]), -matrix2, "LSLR", "CCSC"),
+        solutions = [
+            self._LpSpLp(*inputs),
+            self._LpSpRp(*inputs),
+            *lrl,
+            self._LpRpLnRn(*inputs),
+            self._LpRnLnRp(*inputs),
+            self._LpRnSnLn(xs, ys, phis),
+            self._LpRnSnRn(xs, ys, phis),
+            self._LpRnSnLnRp(*inputs),
         ]
 
-        return paths
-
-    def _CCSCC(self, x, y, phi):
-        def LpRnSnLnRp(x, y, phi):
-            # This function follows Equation 8.11. It implements the L+R-S-L-R+ path, which can be converted to L-R+S+L+R-, R+L-S-R-L+, and R-L+S+R+L- by proper transformation.
-            xi = x + np.sin(phi)
-            eta = y - 1 - np.cos(phi)
-            rho, theta = self._R(xi, eta)
-
-            if rho < 2:
-                return None
+        parameters = np.zeros((len(solutions), 8, len(x), 3))
+        valids = np.zeros((len(solutions), 8, len(x)), dtype=bool)
+        for i, (t, u, v, valid) in enumerate(solutions):
+            parameters[i, : len(t)] = np.stack([t, u, v], axis=-1)
+            valids[i, : len(t)] = valid
+
+        return parameters, valids
+
+    def _normalize(self, start_points, start_headings, end_points, end_headings):
+        # Express the goal poses in the frames of the start poses, scaled by the radius.
+        start_points = np.asarray(start_points, dtype=float).reshape(-1, 2)
+        end_points = np.asarray(end_points, dtype=float).reshape(-1, 2)
+        start_headings = np.asarray(start_headings, dtype=float).reshape(-1)
+        end_headings = np.asarray(end_headings, dtype=float).reshape(-1)
+
+        dx = (end_points[:, 0] - start_points[:, 0]) / self.radius
+        dy = (end_points[:, 1] - start_points[:, 1]) / self.radius
+        cos, sin = np.cos(start_headings), np.sin(start_headings)
+        x = dx * cos + dy * sin
+        y = -dx * sin + dy * cos
+        phi = end_headings - start_headings
+
+        return np.broadcast_arrays(x, y, phi)
+
+    def _solve_families(self, x: np.ndarray, y: np.ndarray, phi: np.ndarray) -> tuple:
+        # Solve all the families at once. The parameters (t, u, v) are in the shape of (48, n, 3), the signed normalized segment lengths padded to 5 segments are in the shape of (48, n, 5), and the validity is in the shape of (48, n).
+        formulas, transforms, matrices, signs = self._family_arrays
+        with np.errstate(invalid="ignore"):
+            parameters, valid = self._solve_formulas(x, y, phi)
+        parameters = parameters[formulas, transforms]
+        valid = valid[formulas, transforms] & np.all(np.isfinite(parameters), axis=-1)
+        # the invalid families can have NaN or inf parameters, which would warn in the product
+        parameters = np.where(valid[..., None], parameters, 0.0)
+
+        homogeneous = np.concatenate([parameters, np.ones(parameters.shape[:2] + (1,))], axis=-1)
+        segments = np.abs(np.matmul(homogeneous, matrices)) * signs[:, None, :]
+
+        return parameters, segments, valid
+
+    def get_path_batch(
+        self,
+        start_points: np.ndarray,
+        start_headings: np.ndarray,
+        end_points: np.ndarray,
+        end_headings: np.ndarray,
+        chunk_size: int = 4096,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """This function finds the shortest Reeds-Shepp paths for a batch of start and goal poses. All the path families are evaluated with arrays and no path object is created.
 
-            t = self._M(theta - np.arccos(-2 / rho))
+        Args:
+            start_points (np.ndarray): The start points. The shape is (n, 2).
+            start_headings (np.ndarray): The start headings. The shape is (n,).
+            end_points (np.ndarray): The end points. The shape is (n, 2).
+            end_headings (np.ndarray): The end headings. The shape is (n,).
+            chunk_size (int, optional): The number of poses solved together, which bounds the size of the intermediate arrays.
 
-            if t <= 0:
-                return None
+        Returns:
+            lengths (np.ndarray): The lengths of the shortest paths. It is inf if no path is found. The shape is (n,).
+            segments (np.ndarray): The signed lengths of the segments. The negative values mean driving backward. The unused segments are zero. The shape is (n, 5).
+            families (np.ndarray): The ids of the path families, which are the indices in the list returned by [get_all_path](#tactics2d.math.interpolate.ReedsShepp.get_all_path). It is -1 if no path is found. The shape is (n,).
+        """
+        x, y, phi = self._normalize(start_points, start_headings, end_points, end_headings)
+        n = len(x)
+        n_family = len(self._families)
+
+        lengths = np.full(n, np.inf)
+        segments = np.zeros((n, 5))
+        families = np.full(n, -1, dtype=np.int64)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            _, chunk_segments, valid = self._solve_families(
+                x[start:stop], y[start:stop], phi[start:stop]
+            )
+            chunk_lengths = np.where(valid, np.sum(np.abs(chunk_segments), axis=-1), np.inf)
+            # keep the last family on ties, which is the same as get_path
+            best = n_family - 1 - np.argmin(chunk_lengths[::-1], axis=0)
+            columns = np.arange(stop - start)
+            found = np.isfinite(chunk_lengths[best, columns])
+            lengths[start:stop] = chunk_lengths[best, columns]
+            segments[start:stop] = np.where(found[:, None], chunk_segments[best, columns], 0)
+            families[start:stop] = np.where(found, best, -1)
 
-            u = 4 - (xi + 2 * np.cos(t)) / np.sin(t)
-            v = self._M(t - phi)
+        return lengths * self.radius, segments * self.radius, families
 
-            if u > 0 or v < 0:
-                return None
+    def build_path(self, family: int, segments: np.ndarray) -> ReedsSheppPath:
+        """This function creates a Reeds-Shepp path from the result of [get_path_batch](#tactics2d.math.interpolate.ReedsShepp.get_path_batch).
 
-            return (t, u, v)
+        Args:
+            family (int): The id of the path family.
+            segments (np.ndarray): The signed lengths of the segments. The shape is (5,).
 
-        inputs = [
-            (x, y, phi),
-            self._time_flip(*(x, y, phi)),
-            self._reflect(*(x, y, phi)),
-            self._time_flip(*(self._reflect(*(x, y, phi)))),
-        ]
+        Returns:
+            path (ReedsSheppPath): The Reeds-Shepp path. If the family id is -1, it is None.
+        """
+        if family < 0:
+            return None
 
-        matrix = np.array(
-            [[1, 0, 0, 0, 0], [0, 0, 1, 0, 0], [0, 0, 0, 0, 1], [0, -np.pi / 2, 0, -np.pi / 2, 0]]
+        _, _, _, actions, curve_type = self._families[family]
+        return ReedsSheppPath(
+            np.asarray(segments) / self.radius, None, actions, curve_type, self.radius
         )
 
-        # L+R-S-L-R+, L-R+S+L+R-, R+L-S-R-L+, R-L+S+R+L-
-        paths = [
-            self._set_path(LpRnSnLnRp(*inputs[0]), matrix, "LRSLR", "CCSCC"),
-            self._set_path(LpRnSnLnRp(*inputs[1]), -matrix, "LRSLR", "CCSCC"),
-            self._set_path(LpRnSnLnRp(*inputs[2]), matrix, "RLSRL", "CCSCC"),
-            self._set_path(LpRnSnLnRp(*inputs[3]), -matrix, "RLSRL", "CCSCC"),
-        ]
-
-        return paths
-
     def get_all_path(
         self,
         start_point: np.ndarray,
@@ -482,21 +508,20 @@ class ReedsShepp:
             end_heading (float): The end heading of the curve.
 
         Returns:
-            paths (list): A list of Reeds-Shepp paths.
+            paths (list): A list of 48 Reeds-Shepp paths. The path is None if its family cannot connect the two points.
         """
-        dx = (end_point[0] - start_point[0]) / self.radius
-        dy = (end_point[1] - start_point[1]) / self.radius
-        x = dx * np.cos(start_heading) + dy * np.sin(start_heading)
-        y = -dx * np.sin(start_heading) + dy * np.cos(start_heading)
-        phi = end_heading - start_heading
-
-        paths = (
-            self._CSC(x, y, phi)
-            + self._CCC(x, y, phi)
-            + self._CCCC(x, y, phi)
-            + self._CCSC(x, y, phi)
-            + self._CCSCC(x, y, phi)
-        )
+        x, y, phi = self._normalize(start_point, start_heading, end_point, end_heading)
+
+        parameters, _, valid = self._solve_families(x, y, phi)
+
+        paths = []
+        for i, (_, _, matrix, actions, curve_type) in enumerate(self._families):
+            if valid[i, 0]:
+                paths.append(
+                    ReedsSheppPath(parameters[i, 0], matrix, actions, curve_type, self.radius)
+                )
+            else:
+                paths.append(None)
 
         return paths
 
@@ -518,18 +543,11 @@ class ReedsShepp:
         Returns:
             shortest_path (ReedsSheppPath): The shortest Reeds-Shepp path connecting two points.
         """
-        candidate_paths = self.get_all_path(start_point, start_heading, end_point, end_heading)
-
-        shortest_path = None
-        shortest_length = np.inf
-        for path in candidate_paths:
-            if path is None or path.length > shortest_length:
-                continue
-            else:
-                shortest_path = path
-                shortest_length = path.length
+        _, segments, families = self.get_path_batch(
+            start_point, start_heading, end_point, end_heading
+        )
 
-        return shortest_path
+        return self.build_path(families[0], segments[0])
 
     def get_curve(
         self,
@@ -538,6 +556,7 @@ class ReedsShepp:
         end_point: np.ndarray,
         end_heading: float,
         step_size: float = 0.01,
+        tolerance: float = None,
     ) -> ReedsSheppPath:
         """Get the shortest Reeds-Shepp curve connecting two points.
 
@@ -546,12 +565,16 @@ class ReedsShepp:
             start_heading (float): The start heading of the curve.
             end_point (np.ndarray): The end point of the curve. The shape is (2,).
             end_heading (float): The end heading of the curve.
+            step_size (float, optional): The step size of the curve. Defaults to 0.01.
+            tolerance (float, optional): The maximum distance from the curve to the chord between two adjacent points. If it is given, the curve is sampled adaptively instead of by the step size. Defaults to None.
 
         Returns:
             shortest_path (ReedsSheppPath): The shortest Reeds-Shepp curve connecting two points.
         """
         shortest_path = self.get_path(start_point, start_heading, end_point, end_heading)
         if shortest_path is not None:
-            shortest_path.get_curve_line(start_point, start_heading, self.radius, step_size)
+            shortest_path.get_curve_line(
+                start_point, start_heading, self.radius, step_size, tolerance
+            )
 
         return shortest_path
@@ -8,31 +8,34 @@
 import numpy as np
 from scipy.special import fresnel
 
+from tactics2d.math.geometry import AdaptiveSampler
+
 
 class Spiral:
     """This class implements a spiral interpolation."""
 
     @staticmethod
-    def get_spiral(
-        length: float, start_point: np.ndarray, heading: float, start_curvature: float, gamma: float
+    def evaluate(
+        s: np.ndarray,
+        start_point: np.ndarray,
+        heading: float,
+        start_curvature: float,
+        gamma: float,
     ) -> np.ndarray:
-        """This function gets the points on a spiral curve line.
+        """This function gets the points on a spiral curve line at the given arc lengths.
 
         Args:
-            length (float): The length of the spiral.
+            s (np.ndarray): The arc lengths from the start point. The shape is (n,).
             start_point (np.ndarray): The start point of the spiral. The shape is (2,).
             heading (float): The heading of the start point. The unit is radian.
             start_curvature (float): The curvature of the start point.
             gamma (float): The rate of change of curvature
 
         Returns:
-            np.ndarray: The points on the spiral curve line. The shape is (n_interpolate, 2).
+            np.ndarray: The points on the spiral curve line. The shape is (n, 2).
         """
-
-        # Start
         x_start, y_start = start_point
-        # Interpolation
-        interpolations = np.linspace(0, length, int(length / 0.01) if length < 100 else 10000)
+        interpolations = np.asarray(s, dtype=float)
 
         if gamma == 0 and start_curvature == 0:
             # Straight line
@@ -66,3 +69,34 @@ class Spiral:
             y_interpolated = y_start + delta_C.imag
 
         return np.array([x_interpolated, y_interpolated]).T
+
+    @staticmethod
+    def get_spiral(
+        length: float,
+        start_point: np.ndarray,
+        heading: float,
+        start_curvature: float,
+        gamma: float,
+        tolerance: float = None,
+    ) -> np.ndarray:
+        """This function gets the points on a spiral curve line.
+
+        Args:
+            length (float): The length of the spiral.
+            start_point (np.ndarray): The start point of the spiral. The shape is (2,).
+            heading (float): The heading of the start point. The unit is radian.
+            start_curvature (float): The curvature of the start point.
+            gamma (float): The rate of change of curvature
+            tolerance (float, optional): The maximum distance from the spiral to the chord between two adjacent points. If it is given, the points are placed by [AdaptiveSampler](#tactics2d.math.geometry.AdaptiveSampler), so that a gentle spiral gets much fewer points. Otherwise, the points are placed every 0.01 meter, and at most 10000 points are sampled. Defaults to None.
+
+        Returns:
+            np.ndarray: The points on the spiral curve line. The shape is (n_interpolate, 2).
+        """
+        if tolerance is None:
+            interpolations = np.linspace(0, length, int(length / 0.01) if length < 100 else 10000)
+        else:
+            interpolations = AdaptiveSampler.sample_by_curvature(
+                length, tolerance, start_curvature, start_curvature + gamma * length
+            )
+
+        return Spiral.evaluate(interpolations, start_point, heading, start_curvature, gamma)
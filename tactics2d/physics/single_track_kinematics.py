@@ -124,7 +124,9 @@ class SingleTrackKinematics(PhysicsModelBase):
             if self.interval is not None:
                 self.delta_t = min(self.delta_t, self.interval)
 
-    def _step(self, state: State, accel: float, delta: float, interval: int) -> State:
+    def _step(
+        self, state: State, accel: float, delta: float, interval: int, path: list = None
+    ) -> State:
         beta = np.arctan(self.lr / self.wheel_base * np.tan(delta))  # slip angle
         dts = [float(self.delta_t) / 1000] * int(interval // self.delta_t)
         dts.append(float(interval % self.delta_t) / 1000)
@@ -133,6 +135,9 @@ class SingleTrackKinematics(PhysicsModelBase):
         phi = state.heading
         v = state.speed
 
+        if path is not None:
+            path.append((x, y, phi))
+
         for dt in dts:
             dx = v * np.cos(phi + beta)
             dy = v * np.sin(phi + beta)
@@ -146,6 +151,9 @@ class SingleTrackKinematics(PhysicsModelBase):
 
             v = np.clip(v, *self.speed_range) if not self.speed_range is None else v
 
+            if path is not None and dt > 0:
+                path.append((x, y, phi))
+
         state = State(
             frame=state.frame + interval,
             x=x,
@@ -181,6 +189,32 @@ class SingleTrackKinematics(PhysicsModelBase):
 
         return next_state, accel, delta
 
+    def step_with_path(
+        self, state: State, accel: float, delta: float, interval: int = None
+    ) -> Tuple[State, np.ndarray, float, float]:
+        """This function updates the state of the traffic participant in the same way as `step`, and additionally returns the poses at every simulation substep. The poses can be used to check the swept volume of the traffic participant between two states, for example, by the continuous collision detection.
+
+        Args:
+            state (State): The current state of the traffic participant.
+            accel (float): The acceleration of the traffic participant. The unit is meter per second squared (m/s$^2$).
+            delta (float): The steering angle of the traffic participant. The unit is radian.
+            interval (int): The time interval between the current state and the new state. The unit is millisecond.
+
+        Returns:
+            next_state (State): The new state of the traffic participant.
+            path (np.ndarray): The poses (x, y, heading) of the traffic participant from the current state to the new state. The shape is (n, 3), where n-1 is the number of substeps.
+            accel (float): The acceleration that is applied to the traffic participant.
+            delta (float): The steering angle that is applied to the traffic participant.
+        """
+        accel = np.clip(accel, *self.accel_range) if not self.accel_range is None else accel
+        delta = np.clip(delta, *self.steer_range) if not self.steer_range is None else delta
+        interval = interval if interval is not None else self.interval
+
+        path = []
+        next_state = self._step(state, accel, delta, interval, path)
+
+        return next_state, np.array(path), accel, delta
+
     def verify_state(self, state: State, last_state: State, interval: int = None) -> bool:
         """This function provides a very rough check for the state transition.
 
@@ -0,0 +1,473 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: hybrid_astar.py
+# @Description: This file implements a Hybrid A* path planner for the parking scenarios.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+import heapq
+from typing import List, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from tactics2d.map.element import Area, Map
+from tactics2d.map.occupancy import OccupancyGrid
+from tactics2d.math.interpolate import ReedsShepp
+from tactics2d.physics import SingleTrackKinematics
+
+
+class HybridAStar:
+    r"""This class implements a Hybrid A* path planner for a vehicle driven by the kinematic single-track model.
+
+    The search runs on the rear axle center, which moves along the heading of the vehicle with the curvature $\tan \delta / L$, so that the Reeds-Shepp curves are exact for the model. The poses are discretized into an SE(2) grid of cells and heading bins, and every cell keeps the cheapest continuous pose reaching it. The motion primitives, which drive forward and backward by every sampled steering angle, are computed once in the local frame and only rotated and translated during the search.
+
+    The obstacles are rasterized into an [OccupancyGrid](#tactics2d.map.occupancy.OccupancyGrid) when the planner is reset with a map. A pose is free if the distance field is larger than a clearance at the points sampled along the boundary of the vehicle footprint. The cost-to-go is the larger one of two heuristics:
+
+    1. The non-holonomic heuristic ignores the obstacles. It is the Reeds-Shepp length looked up from a table in the frame of the start pose, which is shared by the planners with the same turning radius.
+    2. The holonomic heuristic ignores the kinematics. It is the shortest 8-connected path to the goal on a coarse grid of the free cells, which is computed once per plan.
+
+    Every few expansions, the planner tries to connect the expanded pose to the goal by the shortest Reeds-Shepp curve, and stops when the curve is free. The try is skipped if the holonomic heuristic is much larger than the Reeds-Shepp length, because the curve must then cross an obstacle.
+
+    !!! quote "Reference"
+        Dolgov, Dmitri, et al. "Practical search techniques in path planning for autonomous driving." *Ann Arbor* 1001.48105 (2008): 18-80.
+
+    Attributes:
+        wheel_base (float): The wheel base of the vehicle. The unit is meter.
+        lr (float): The distance from the geometry center to the rear axle center. The unit is meter.
+        radius (float): The minimal turning radius of the rear axle center. The unit is meter.
+        vehicle_size (Tuple[float, float]): The length and the width of the vehicle. The unit is meter.
+        xy_resolution (float): The size of the cells in the SE(2) grid and the holonomic heuristic grid. The unit is meter.
+        n_heading (int): The number of heading bins in the SE(2) grid.
+        step_length (float): The arc length of a motion primitive. It should be longer than the diagonal of a cell. The unit is meter.
+        grid_resolution (float): The size of the cells in the distance field. The unit is meter.
+        occupancy_grid (OccupancyGrid): The occupancy grid and the distance field of the obstacles in the map.
+        analytic_interval (int): The number of expansions between two tries of the Reeds-Shepp analytic expansion.
+        max_expansion (int): The maximum number of expansions before the search gives up.
+    """
+
+    # the non-holonomic heuristic tables, keyed by the turning radius and the table layout
+    _heuristic_tables = dict()
+
+    def __init__(
+        self,
+        physics_model: SingleTrackKinematics,
+        vehicle_size: Tuple[float, float],
+        xy_resolution: float = 0.5,
+        n_heading: int = 72,
+        step_length: float = 1.0,
+        n_steer: int = 5,
+        grid_resolution: float = 0.1,
+        margin: float = 0.1,
+        reverse_cost: float = 2.0,
+        switch_cost: float = 5.0,
+        steer_cost: float = 0.2,
+        steer_change_cost: float = 0.2,
+        heuristic_range: float = 20.0,
+        heuristic_resolution: float = 1.0,
+        analytic_interval: int = 5,
+        max_expansion: int = 20000,
+    ):
+        """Initialize an instance for the class.
+
+        Args:
+            physics_model (SingleTrackKinematics): The physics model of the vehicle. Its steering range is required.
+            vehicle_size (Tuple[float, float]): The length and the width of the vehicle. The unit is meter.
+            xy_resolution (float, optional): The size of the cells in the SE(2) grid. The unit is meter.
+            n_heading (int, optional): The number of heading bins in the SE(2) grid.
+            step_length (float, optional): The arc length of a motion primitive. The unit is meter.
+            n_steer (int, optional): The number of sampled steering angles. It should be odd to include driving straight.
+            grid_resolution (float, optional): The size of the cells in the distance field. The unit is meter.
+            margin (float, optional): The safe distance kept from the obstacles. The unit is meter.
+            reverse_cost (float, optional): The cost multiplier of driving backward.
+            switch_cost (float, optional): The cost of switching between driving forward and backward.
+            steer_cost (float, optional): The cost multiplier of steering. It is scaled by the ratio of the steering angle to the maximum one.
+            steer_change_cost (float, optional): The cost multiplier of changing the steering angle between two primitives.
+            heuristic_range (float, optional): The half size of the non-holonomic heuristic table. Out of it, the Euclidean distance is used. The unit is meter.
+            heuristic_resolution (float, optional): The size of the cells in the non-holonomic heuristic table. The unit is meter.
+            analytic_interval (int, optional): The number of expansions between two tries of the analytic expansion.
+            max_expansion (int, optional): The maximum number of expansions before the search gives up.
+
+        Raises:
+            ValueError: If the steering range of the physics model is not set.
+        """
+        if physics_model.steer_range is None:
+            raise ValueError("The steering range of the physics model is required to plan a path.")
+
+        self.wheel_base = physics_model.wheel_base
+        self.lr = physics_model.lr
+        self.vehicle_size = vehicle_size
+        self.xy_resolution = xy_resolution
+        self.n_heading = n_heading
+        self.step_length = step_length
+        self.grid_resolution = grid_resolution
+        self.analytic_interval = analytic_interval
+        self.max_expansion = max_expansion
+
+        self._reverse_cost = reverse_cost
+        self._switch_cost = switch_cost
+        self._steer_change_cost = steer_change_cost
+        self._analytic_slack = 2 * xy_resolution
+
+        min_steer, max_steer = physics_model.steer_range
+        self.radius = self.wheel_base / np.tan(min(abs(min_steer), abs(max_steer)))
+        self._rs = ReedsShepp(self.radius)
+
+        # The footprint is sampled along its boundary in the frame of the rear axle center. A pose
+        # is free if every sample is farther from the obstacles than half the sample spacing plus
+        # the margin, so that the edges between the samples are also free.
+        length, width = vehicle_size
+        spacing = self.grid_resolution * 2
+        n_length = int(np.ceil(length / spacing))
+        n_width = int(np.ceil(width / spacing))
+        rear, front = self.lr - length / 2, self.lr + length / 2
+        xs = np.linspace(rear, front, n_length + 1)
+        ys = np.linspace(-width / 2, width / 2, n_width + 1)[1:-1]
+        self._footprint = np.concatenate(
+            [
+                np.column_stack([xs, np.full_like(xs, -width / 2)]),
+                np.column_stack([xs, np.full_like(xs, width / 2)]),
+                np.column_stack([np.full_like(ys, rear), ys]),
+                np.column_stack([np.full_like(ys, front), ys]),
+            ]
+        )
+        self._clearance = max(length / n_length, width / n_width) / 2 + margin
+
+        self._build_primitives(
+            np.linspace(min_steer, max_steer, n_steer),
+            max(abs(min_steer), abs(max_steer)),
+            steer_cost,
+        )
+        self._build_heuristic_table(heuristic_range, heuristic_resolution)
+
+        self.occupancy_grid = OccupancyGrid(grid_resolution)
+
+    def _build_primitives(self, steers: np.ndarray, max_steer: float, steer_cost: float):
+        # Every primitive is sampled as densely as the footprint, and the last sample is its end.
+        n_sample = int(
+            np.ceil(self.step_length / min(self.grid_resolution * 2, self.xy_resolution))
+        )
+        directions = np.repeat([1, -1], len(steers))
+        steers = np.tile(steers, 2)
+        curvatures = np.tan(steers) / self.wheel_base
+
+        s = directions[:, None] * np.linspace(0, self.step_length, n_sample + 1)[1:]
+        angles = curvatures[:, None] * s
+        is_straight = np.abs(curvatures) < 1e-9
+        safe_curvatures = np.where(is_straight, 1, curvatures)[:, None]
+        xs = np.where(is_straight[:, None], s, np.sin(angles) / safe_curvatures)
+        ys = np.where(is_straight[:, None], 0, (1 - np.cos(angles)) / safe_curvatures)
+
+        self._primitives = np.stack([xs, ys, angles], axis=-1)
+        self._primitive_directions = directions
+        self._primitive_steers = steers / max_steer
+        self._primitive_costs = self.step_length * (
+            np.where(directions > 0, 1, self._reverse_cost)
+            + steer_cost * np.abs(steers) / max_steer
+        )
+
+    def _build_heuristic_table(self, heuristic_range: float, heuristic_resolution: float):
+        # The Reeds-Shepp length is the same after reflecting the goal about the x-axis, so the
+        # table only keeps the goals with a non-negative y coordinate.
+        key = (self.radius, heuristic_range, heuristic_resolution, self.n_heading)
+        if key not in self._heuristic_tables:
+            xs = np.arange(-heuristic_range, heuristic_range + 1e-9, heuristic_resolution)
+            ys = np.arange(0, heuristic_range + 1e-9, heuristic_resolution)
+            headings = np.arange(self.n_heading) * 2 * np.pi / self.n_heading
+            x, y, heading = np.meshgrid(xs, ys, headings, indexing="ij")
+            n = x.size
+            lengths, _, _ = self._rs.get_path_batch(
+                np.zeros((n, 2)),
+                np.zeros(n),
+                np.stack([x.ravel(), y.ravel()], axis=1),
+                heading.ravel(),
+            )
+            self._heuristic_tables[key] = lengths.reshape(x.shape)
+
+        self._heuristic_table = self._heuristic_tables[key]
+        self._heuristic_range = heuristic_range
+        self._heuristic_resolution = heuristic_resolution
+
+    def reset(self, map_: Map, obstacles: List[Area] = None):
+        """This function rasterizes the obstacles in a map into the occupancy grid of the planner. It should be called when the map changes. The region out of the map boundary is regarded as occupied.
+
+        Args:
+            map_ (Map): The map to plan in.
+            obstacles (List[Area], optional): The obstacles in the map. Defaults to None, which uses the areas whose type is "obstacle".
+        """
+        self.occupancy_grid.reset(map_, obstacles)
+
+    def is_free(self, poses: np.ndarray) -> np.ndarray:
+        """This function checks whether the vehicle at the rear axle poses keeps clear of the obstacles.
+
+        Args:
+            poses (np.ndarray): The poses of the rear axle center in the form of (x, y, heading). The shape is (..., 3).
+
+        Returns:
+            is_free (np.ndarray): Whether the vehicle is free at every pose. The shape is (...).
+        """
+        cos, sin = np.cos(poses[..., 2:]), np.sin(poses[..., 2:])
+        x, y = self._footprint[:, 0], self._footprint[:, 1]
+        points = np.stack(
+            [poses[..., :1] + cos * x - sin * y, poses[..., 1:2] + sin * x + cos * y], axis=-1
+        )
+
+        return np.all(self.occupancy_grid.get_distance(points) > self._clearance, axis=-1)
+
+    def _get_keys(self, poses: np.ndarray) -> np.ndarray:
+        cells = np.floor((poses[..., :2] - self._origin) / self.xy_resolution).astype(np.int64)
+        headings = np.floor(np.mod(poses[..., 2], 2 * np.pi) / (2 * np.pi) * self.n_heading).astype(
+            np.int64
+        )
+
+        return (cells[..., 1] * self._n_column + cells[..., 0]) * self.n_heading + np.mod(
+            headings, self.n_heading
+        )
+
+    def _get_holonomic_costs(self, goal: np.ndarray) -> np.ndarray:
+        # The cells are blocked if the rear axle center cannot be in them without a collision.
+        resolution = self.xy_resolution
+        min_x, min_y = self._origin
+        n_y, n_x = np.ceil(np.array(self.occupancy_grid.shape) * self.grid_resolution / resolution)
+        n_x, n_y = int(n_x), int(n_y)
+        self._n_column = n_x
+
+        x, y = np.meshgrid(
+            min_x + (np.arange(n_x) + 0.5) * resolution, min_y + (np.arange(n_y) + 0.5) * resolution
+        )
+        distances = self.occupancy_grid.get_distance(np.stack([x, y], axis=-1))
+        free = distances > self.vehicle_size[1] / 2 - resolution
+        goal_cell = np.floor((goal[:2] - self._origin) / resolution).astype(int)
+        goal_index = goal_cell[1] * n_x + goal_cell[0]
+        free = free.ravel()
+        free[goal_index] = True
+
+        index = np.arange(n_x * n_y).reshape(n_y, n_x)
+        sources, targets, weights = [], [], []
+        for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            source = index[: n_y - di, max(0, -dj) : n_x - max(0, dj)].ravel()
+            target = index[di:, max(0, dj) : n_x - max(0, -dj)].ravel()
+            valid = free[source] & free[target]
+            sources.append(source[valid])
+            targets.append(target[valid])
+            weights.append(np.full(np.sum(valid), np.hypot(di, dj) * resolution))
+
+        matrix = csr_matrix(
+            (np.concatenate(weights), (np.concatenate(sources), np.concatenate(targets))),
+            shape=(n_x * n_y, n_x * n_y),
+        )
+
+        return dijkstra(matrix, directed=False, indices=goal_index)
+
+    def _get_heuristics(self, poses: np.ndarray, goal: np.ndarray) -> np.ndarray:
+        # the goal pose in the frame of every pose
+        dx = goal[0] - poses[:, 0]
+        dy = goal[1] - poses[:, 1]
+        cos, sin = np.cos(poses[:, 2]), np.sin(poses[:, 2])
+        x = cos * dx + sin * dy
+        y = -sin * dx + cos * dy
+        heading = np.where(y < 0, poses[:, 2] - goal[2], goal[2] - poses[:, 2])
+
+        resolution = self._heuristic_resolution
+        n_x, n_y, _ = self._heuristic_table.shape
+        i = np.round((x + self._heuristic_range) / resolution).astype(int)
+        j = np.round(np.abs(y) / resolution).astype(int)
+        k = np.round(np.mod(heading, 2 * np.pi) / (2 * np.pi) * self.n_heading).astype(int)
+        inside = (i >= 0) & (i < n_x) & (j < n_y)
+        lengths = np.where(
+            inside,
+            self._heuristic_table[
+                np.clip(i, 0, n_x - 1), np.clip(j, 0, n_y - 1), k % self.n_heading
+            ],
+            np.hypot(x, y),
+        )
+
+        cells = np.floor((poses[:, :2] - self._origin) / self.xy_resolution).astype(int)
+        n_row = len(self._holonomic_costs) // self._n_column
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < self._n_column)
+        inside &= (cells[:, 1] >= 0) & (cells[:, 1] < n_row)
+        holonomic = np.where(
+            inside,
+            self._holonomic_costs[
+                np.clip(cells[:, 1], 0, n_row - 1) * self._n_column
+                + np.clip(cells[:, 0], 0, self._n_column - 1)
+            ],
+            np.inf,
+        )
+
+        return lengths, holonomic
+
+    def _get_analytic_path(
+        self, pose: np.ndarray, goal: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        _, segments, families = self._rs.get_path_batch(pose[:2], pose[2], goal[:2], goal[2])
+        path = self._rs.build_path(families[0], segments[0])
+        if path is None:
+            return None, None
+
+        path.get_curve_line(pose[:2], pose[2], self.radius, self.grid_resolution * 2)
+        poses = np.concatenate([np.column_stack([path.curve, path.yaw]), goal[None]])
+        if not np.all(self.is_free(poses)):
+            return None, None
+
+        # the direction of a point is the direction of the step reaching it
+        steps = np.diff(poses[:, :2], axis=0)
+        dots = steps[:, 0] * np.cos(poses[1:, 2]) + steps[:, 1] * np.sin(poses[1:, 2])
+        directions = np.where(dots < 0, -1, 1)
+
+        return poses[1:], directions
+
+    def _to_rear(self, pose: np.ndarray) -> np.ndarray:
+        x, y, heading = pose
+        return np.array([x - self.lr * np.cos(heading), y - self.lr * np.sin(heading), heading])
+
+    def _to_center(self, poses: np.ndarray) -> np.ndarray:
+        return np.column_stack(
+            [
+                poses[:, 0] + self.lr * np.cos(poses[:, 2]),
+                poses[:, 1] + self.lr * np.sin(poses[:, 2]),
+                poses[:, 2],
+            ]
+        )
+
+    def _transform(self, pose: np.ndarray, local_poses: np.ndarray) -> np.ndarray:
+        cos, sin = np.cos(pose[2]), np.sin(pose[2])
+        x, y, heading = local_poses[..., 0], local_poses[..., 1], local_poses[..., 2]
+
+        return np.stack(
+            [pose[0] + cos * x - sin * y, pose[1] + sin * x + cos * y, pose[2] + heading], axis=-1
+        )
+
+    def plan(
+        self, start_pose: Tuple[float, float, float], goal_pose: Tuple[float, float, float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """This function plans a collision-free path from the start pose to the goal pose in the map given to [reset](#tactics2d.planner.HybridAStar.reset).
+
+        Args:
+            start_pose (Tuple[float, float, float]): The start pose of the geometry center in the form of (x, y, heading).
+            goal_pose (Tuple[float, float, float]): The goal pose of the geometry center in the form of (x, y, heading).
+
+        Returns:
+            poses (np.ndarray): The poses of the geometry center along the path in the form of (x, y, heading), from the start pose to the goal pose. The shape is (n, 3). If no path is found, it is None.
+            directions (np.ndarray): The driving direction reaching every pose. 1 means forward and -1 means backward. The first pose is marked by the direction leaving it. The shape is (n,). If no path is found, it is None.
+
+        Raises:
+            RuntimeError: If the planner has not been reset with a map.
+        """
+        if self.occupancy_grid.shape is None:
+            raise RuntimeError("The planner should be reset with a map before planning.")
+
+        start = self._to_rear(np.asarray(start_pose, dtype=float))
+        goal = self._to_rear(np.asarray(goal_pose, dtype=float))
+        if not self.is_free(start) or not self.is_free(goal):
+            return None, None
+
+        self._origin = self.occupancy_grid.origin
+        self._holonomic_costs = self._get_holonomic_costs(goal)
+
+        # the search tree is kept in lists, indexed by the order of the pushed nodes
+        poses = [start]
+        parents = [-1]
+        primitives = [-1]
+        costs = [0.0]
+        keys = [int(self._get_keys(start))]
+        best_costs = {keys[0]: 0.0}
+        closed = set()
+        lengths, holonomic = self._get_heuristics(start[None], goal)
+        heap = [(float(max(lengths[0], holonomic[0])), 0)]
+        # The analytic expansion is only tried if the shortest path around the obstacles is not
+        # much longer than the Reeds-Shepp curve, otherwise the curve must cross an obstacle.
+        is_open = [bool(holonomic[0] <= lengths[0] + self._analytic_slack)]
+
+        n_expansion = 0
+        while heap and n_expansion < self.max_expansion:
+            _, node = heapq.heappop(heap)
+            if keys[node] in closed:
+                continue
+            closed.add(keys[node])
+            pose = poses[node]
+
+            if is_open[node] and n_expansion % self.analytic_interval == 0:
+                analytic_poses, analytic_directions = self._get_analytic_path(pose, goal)
+                if analytic_poses is not None:
+                    return self._get_path(
+                        node, poses, parents, primitives, analytic_poses, analytic_directions
+                    )
+            n_expansion += 1
+
+            samples = self._transform(pose, self._primitives)
+            valid = np.all(self.is_free(samples), axis=1)
+            if not np.any(valid):
+                continue
+
+            children = samples[valid, -1]
+            indices = np.nonzero(valid)[0]
+            child_costs = costs[node] + self._primitive_costs[indices]
+            if primitives[node] >= 0:
+                parent = primitives[node]
+                child_costs += self._switch_cost * (
+                    self._primitive_directions[indices] != self._primitive_directions[parent]
+                )
+                child_costs += self._steer_change_cost * np.abs(
+                    self._primitive_steers[indices] - self._primitive_steers[parent]
+                )
+            child_keys = self._get_keys(children)
+            lengths, holonomic = self._get_heuristics(children, goal)
+            priorities = child_costs + np.maximum(lengths, holonomic)
+            child_open = holonomic <= lengths + self._analytic_slack
+
+            for child, index, cost, key, priority, open_ in zip(
+                children,
+                indices.tolist(),
+                child_costs.tolist(),
+                child_keys.tolist(),
+                priorities.tolist(),
+                child_open.tolist(),
+            ):
+                if key in closed or cost >= best_costs.get(key, np.inf) or np.isinf(priority):
+                    continue
+                best_costs[key] = cost
+                poses.append(child)
+                parents.append(node)
+                primitives.append(index)
+                costs.append(cost)
+                keys.append(key)
+                is_open.append(open_)
+                heapq.heappush(heap, (priority, len(poses) - 1))
+
+        return None, None
+
+    def _get_path(
+        self,
+        node: int,
+        poses: list,
+        parents: list,
+        primitives: list,
+        analytic_poses: np.ndarray,
+        analytic_directions: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        chain = []
+        while node >= 0:
+            chain.append(node)
+            node = parents[node]
+        chain = chain[::-1]
+
+        path_poses = [poses[chain[0]][None]]
+        path_directions = [np.zeros(1, dtype=int)]
+        for node in chain[1:]:
+            primitive = primitives[node]
+            path_poses.append(self._transform(poses[parents[node]], self._primitives[primitive]))
+            path_directions.append(
+                np.full(self._primitives.shape[1], self._primitive_directions[primitive])
+            )
+        path_poses.append(analytic_poses)
+        path_directions.append(analytic_directions)
+
+        path_poses = np.concatenate(path_poses)
+        path_directions = np.concatenate(path_directions)
+        if len(path_directions) > 1:
+            path_directions[0] = path_directions[1]
+        path_poses[:, 2] = np.mod(path_poses[:, 2] + np.pi, 2 * np.pi) - np.pi
+
+        return self._to_center(path_poses), path_directions
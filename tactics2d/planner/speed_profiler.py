@@ -0,0 +1,338 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: speed_profiler.py
+# @Description: This file implements a minimum-time speed profiler for the geometric paths.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+from typing import Tuple, Union
+
+import numpy as np
+
+from tactics2d.math.geometry import Circle
+from tactics2d.participant.trajectory import State, Trajectory
+from tactics2d.physics import PointMass, SingleTrackKinematics
+
+
+class SpeedProfiler:
+    r"""This class implements a minimum-time speed profiler, which turns a geometric path into a trajectory under the speed and acceleration limits of a physics model.
+
+    The speed at every point of the path is first bounded by the speed range and by the lateral acceleration $v^2 |\kappa| \leq a_{lat}$. Then a forward pass bounds the speed by accelerating from the start, and a backward pass bounds it by braking to the end. With a constant acceleration bound, the speed square is piecewise linear in the arc length $s$, so that the forward pass is a running minimum:
+
+    $$v_i^2 = 2 a s_i + \min_{j \leq i} (\bar{v}_j^2 - 2 a s_j)$$
+
+    where $\bar{v}_j$ is the bound at the j-th point. The backward pass is the same running minimum from the end. Both passes are computed by `np.minimum.accumulate` without a loop over the points, and the leading axes of the inputs are profiled as a batch of paths.
+
+    The path can be driven backward, e.g., a Reeds-Shepp curve or a path found by [HybridAStar](#tactics2d.planner.HybridAStar). The vehicle stops at every point where the driving direction switches. The acceleration bound applies to the change of the speed magnitude in both directions. The longitudinal and lateral accelerations are bounded separately, instead of by a friction circle.
+
+    Attributes:
+        speed_range (Tuple[float, float]): The speed range from the physics model. The negative minimum speed is the limit of driving backward. The unit is meter per second (m/s).
+        accel_range (Tuple[float, float]): The acceleration range from the physics model. The unit is meter per second squared (m/s$^2$).
+        max_accel (float): The maximum rate to speed up. The unit is meter per second squared (m/s$^2$).
+        max_decel (float): The maximum rate to slow down. The unit is meter per second squared (m/s$^2$).
+        max_lateral_accel (float): The maximum lateral acceleration. The unit is meter per second squared (m/s$^2$).
+        step_size (float): The maximum arc length between two adjacent points when a trajectory is generated. The longer segments of the path are split. The unit is meter.
+    """
+
+    def __init__(
+        self,
+        physics_model: Union[SingleTrackKinematics, PointMass],
+        max_lateral_accel: float = None,
+        step_size: float = 0.5,
+    ):
+        """Initialize an instance for the class.
+
+        Args:
+            physics_model (Union[SingleTrackKinematics, PointMass]): The physics model of the traffic participant. Its acceleration range is required.
+            max_lateral_accel (float, optional): The maximum lateral acceleration. The unit is meter per second squared (m/s$^2$). Defaults to None, which uses the largest magnitude in the acceleration range.
+            step_size (float, optional): The maximum arc length between two adjacent points when a trajectory is generated. The unit is meter.
+
+        Raises:
+            ValueError: If the acceleration range of the physics model is not set.
+        """
+        if physics_model.accel_range is None:
+            raise ValueError("The acceleration range of the physics model is required.")
+
+        self.speed_range = physics_model.speed_range
+        self.accel_range = physics_model.accel_range
+        self.step_size = step_size
+
+        min_accel, max_accel = self.accel_range
+        self.max_accel = max_accel
+        # the acceleration range of a point mass bounds the magnitude, so it brakes by the maximum
+        self.max_decel = -min_accel if min_accel < 0 else max_accel
+        if self.max_accel <= 0 or self.max_decel <= 0:
+            raise ValueError("The physics model should be able to speed up and slow down.")
+
+        self.max_lateral_accel = (
+            max(abs(min_accel), abs(max_accel)) if max_lateral_accel is None else max_lateral_accel
+        )
+
+        if self.speed_range is None:
+            self._max_speed, self._max_reverse_speed = np.inf, np.inf
+        else:
+            self._max_speed = self.speed_range[1]
+            self._max_reverse_speed = max(-self.speed_range[0], 0)
+
+    def get_speed_profile(
+        self,
+        distances: np.ndarray,
+        curvatures: np.ndarray,
+        directions: np.ndarray = None,
+        start_speed: Union[float, np.ndarray] = 0.0,
+        end_speed: Union[float, np.ndarray] = 0.0,
+    ) -> np.ndarray:
+        """This function gets the minimum-time speeds at the points of the paths. The paths with the same number of points can be profiled in one call by stacking them along the leading axes.
+
+        Args:
+            distances (np.ndarray): The arc lengths of the points from the start of the path, which should be non-decreasing. The shape is (..., n).
+            curvatures (np.ndarray): The curvatures at the points. The sign is ignored. The shape is (..., n).
+            directions (np.ndarray, optional): The driving direction reaching every point. 1 means forward and -1 means backward. The first point is marked by the direction leaving it. The shape is (..., n). Defaults to None, which means driving forward.
+            start_speed (Union[float, np.ndarray], optional): The speed magnitude at the start of the paths. It is lowered to the limit at the start if it is too high. The shape is (...) or a scalar.
+            end_speed (Union[float, np.ndarray], optional): The speed magnitude at the end of the paths. It is lowered to the limit at the end if it is too high. The shape is (...) or a scalar.
+
+        Returns:
+            speeds (np.ndarray): The speeds at the points, which are negative when driving backward. The unit is meter per second (m/s). The shape is (..., n).
+
+        Raises:
+            ValueError: If the path is driven backward but the physics model cannot do it.
+        """
+        distances = np.asarray(distances, dtype=float)
+        curvatures = np.abs(np.asarray(curvatures, dtype=float))
+
+        # the bounds of the speed square at the points
+        bounds = np.divide(
+            self.max_lateral_accel,
+            curvatures,
+            out=np.full(curvatures.shape, np.inf),
+            where=curvatures > 0,
+        )
+        if directions is None:
+            bounds = np.minimum(bounds, self._max_speed**2)
+        else:
+            directions = np.broadcast_to(directions, distances.shape)
+            if self._max_reverse_speed <= 0 and np.any(directions < 0):
+                raise ValueError("The physics model cannot drive backward.")
+            bounds = np.minimum(
+                bounds, np.where(directions < 0, self._max_reverse_speed, self._max_speed) ** 2
+            )
+            # the vehicle stops where the direction switches
+            bounds[..., :-1][directions[..., 1:] != directions[..., :-1]] = 0
+
+        bounds[..., 0] = np.minimum(bounds[..., 0], np.square(start_speed))
+        bounds[..., -1] = np.minimum(bounds[..., -1], np.square(end_speed))
+
+        # forward pass by the acceleration and backward pass by the deceleration
+        offsets = 2 * self.max_accel * distances
+        bounds = np.minimum.accumulate(bounds - offsets, axis=-1) + offsets
+        offsets = 2 * self.max_decel * distances
+        bounds = np.flip(
+            np.minimum.accumulate(np.flip(bounds + offsets, axis=-1), axis=-1), axis=-1
+        )
+        bounds -= offsets
+
+        speeds = np.sqrt(np.maximum(bounds, 0))
+        if directions is not None:
+            speeds = np.where(directions < 0, -speeds, speeds)
+
+        return speeds
+
+    @staticmethod
+    def _get_curvatures(points: np.ndarray) -> np.ndarray:
+        # the curvature of the circle through every point and its neighbors
+        curvatures = np.zeros(len(points))
+        if len(points) < 3:
+            return curvatures
+
+        _, radii = Circle.get_circle_by_three_points_batch(points[:-2], points[1:-1], points[2:])
+        curvatures[1:-1] = 1 / radii
+        curvatures[0], curvatures[-1] = curvatures[1], curvatures[-2]
+
+        return curvatures
+
+    @staticmethod
+    def _fill(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        # the invalid values are replaced by the last valid one, or the first valid one at the start
+        valid_ids = np.flatnonzero(valid)
+        if len(valid_ids) == 0:
+            return values
+        ids = np.maximum.accumulate(np.where(valid, np.arange(len(values)), valid_ids[0]))
+
+        return values[ids]
+
+    @staticmethod
+    def _get_directions(points: np.ndarray, headings: np.ndarray) -> np.ndarray:
+        # a step is backward if it is against the heading, and a repeated point keeps the direction
+        displacements = np.diff(points, axis=0)
+        dots = displacements[:, 0] * np.cos(headings[:-1]) + displacements[:, 1] * np.sin(
+            headings[:-1]
+        )
+        directions = SpeedProfiler._fill(np.where(dots < 0, -1, 1), dots != 0)
+
+        return np.concatenate([directions[:1], directions]) if len(directions) > 0 else np.ones(1)
+
+    @staticmethod
+    def _get_headings(points: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        # the heading follows the step leaving a point, and turns around when driving backward
+        displacements = np.diff(points, axis=0)
+        if len(displacements) == 0:
+            return np.zeros(1)
+        headings = np.arctan2(displacements[:, 1], displacements[:, 0])
+        headings = SpeedProfiler._fill(headings, np.any(displacements != 0, axis=1))
+        headings = headings + np.where(directions[1:] < 0, np.pi, 0)
+
+        return np.concatenate([headings, headings[-1:]])
+
+    def _split(
+        self,
+        points: np.ndarray,
+        headings: np.ndarray,
+        curvatures: np.ndarray,
+        directions: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Split the segments longer than the step size. Every moving segment gets at least two
+        # pieces, so that the vehicle can speed up and slow down in a segment between two stops.
+        lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        counts = np.where(lengths > 0, np.maximum(np.ceil(lengths / self.step_size), 2), 1)
+        counts = counts.astype(int)
+
+        segment_ids = np.repeat(np.arange(len(lengths)), counts)
+        piece_ids = np.arange(len(segment_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        ratios = (piece_ids / np.repeat(counts, counts))[:, None]
+
+        def interpolate(values):
+            values = values.reshape(len(values), -1)
+            start = values[segment_ids]
+            new_values = start + ratios * (values[segment_ids + 1] - start)
+            return np.concatenate([new_values, values[-1:]])
+
+        new_points = interpolate(points)
+        new_headings = interpolate(np.unwrap(headings))[:, 0]
+        new_curvatures = interpolate(curvatures)[:, 0]
+        new_directions = np.concatenate([directions[:1], np.repeat(directions[1:], counts)])
+
+        return new_points, new_headings, new_curvatures, new_directions
+
+    def get_trajectory(
+        self,
+        points: np.ndarray,
+        headings: np.ndarray = None,
+        curvatures: np.ndarray = None,
+        directions: np.ndarray = None,
+        start_speed: float = 0.0,
+        end_speed: float = 0.0,
+        fps: float = 10,
+        id_: int = 0,
+        start_frame: int = 0,
+    ) -> Trajectory:
+        """This function generates the minimum-time trajectory along a path. The segments of the path are split by the step size, the speeds are profiled at the points, and the states are sampled at the given frequency. The acceleration is constant between two adjacent points.
+
+        Args:
+            points (np.ndarray): The points of the path. The shape is (n, 2).
+            headings (np.ndarray, optional): The headings at the points. The unit is radian. The shape is (n,). Defaults to None, which uses the direction of the path and reverses it when driving backward.
+            curvatures (np.ndarray, optional): The curvatures at the points. The shape is (n,). Defaults to None, which estimates them by the circles through every three adjacent points.
+            directions (np.ndarray, optional): The driving direction reaching every point. 1 means forward and -1 means backward. The first point is marked by the direction leaving it. The shape is (n,). Defaults to None, which finds the directions by the headings if they are given, otherwise drives forward.
+            start_speed (float, optional): The speed magnitude at the start of the path. The unit is meter per second (m/s).
+            end_speed (float, optional): The speed magnitude at the end of the path. The unit is meter per second (m/s).
+            fps (float, optional): The frequency of the trajectory.
+            id_ (int, optional): The id of the trajectory.
+            start_frame (int, optional): The time stamp of the first state. The unit is millisecond (ms).
+
+        Returns:
+            trajectory (Trajectory): The trajectory along the path. The last state is at the end of the path.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if directions is None:
+            directions = (
+                np.ones(len(points), dtype=int)
+                if headings is None
+                else self._get_directions(points, np.asarray(headings, dtype=float))
+            )
+        directions = np.asarray(directions)
+
+        if headings is None:
+            headings = self._get_headings(points, directions)
+        headings = np.asarray(headings, dtype=float)
+
+        # the repeated points, e.g., at the joints of the segments, are dropped
+        kept = np.concatenate([[True], np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-9])
+        points, headings, directions = points[kept], headings[kept], directions[kept]
+        if curvatures is None:
+            curvatures = self._get_curvatures(points)
+        else:
+            curvatures = np.asarray(curvatures, dtype=float)[kept]
+
+        if len(points) > 1:
+            points, headings, curvatures, directions = self._split(
+                points, headings, curvatures, directions
+            )
+
+        lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        distances = np.concatenate([[0], np.cumsum(lengths)])
+        speeds = np.abs(
+            self.get_speed_profile(distances, curvatures, directions, start_speed, end_speed)
+        )
+
+        # the time of every segment under a constant acceleration
+        speed_sums = speeds[1:] + speeds[:-1]
+        durations = np.divide(
+            2 * lengths, speed_sums, out=np.zeros(len(lengths)), where=speed_sums > 0
+        )
+        times = np.concatenate([[0], np.cumsum(durations)])
+        accels = np.divide(
+            np.diff(speeds**2),
+            2 * lengths,
+            out=np.zeros(len(lengths)),
+            where=lengths > 0,
+        )
+
+        # the states are sampled at the frames, and the last frame holds the end of the path
+        interval = int(round(1000 / fps))
+        n_frame = int(np.ceil(times[-1] * 1000 / interval - 1e-9)) + 1
+        frame_times = np.minimum(np.arange(n_frame) * interval / 1000, times[-1])
+        segment_ids = np.clip(
+            np.searchsorted(times, frame_times, side="right") - 1, 0, max(len(lengths) - 1, 0)
+        )
+
+        if len(lengths) > 0:
+            taus = np.minimum(frame_times - times[segment_ids], durations[segment_ids])
+            frame_speeds = speeds[segment_ids] + accels[segment_ids] * taus
+            ratios = np.divide(
+                (speeds[segment_ids] + frame_speeds) / 2 * taus,
+                lengths[segment_ids],
+                out=np.zeros(n_frame),
+                where=lengths[segment_ids] > 0,
+            )
+            ratios = np.clip(ratios, 0, 1)
+            frame_points = points[segment_ids] + ratios[:, None] * (
+                points[segment_ids + 1] - points[segment_ids]
+            )
+            frame_headings = headings[segment_ids] + ratios * (
+                headings[segment_ids + 1] - headings[segment_ids]
+            )
+            frame_directions = directions[segment_ids + 1]
+            frame_accels = accels[segment_ids]
+            # the last frame is at the end of the path
+            frame_speeds[-1], frame_accels[-1] = speeds[-1], 0
+        else:
+            frame_points, frame_headings = points, headings
+            frame_speeds, frame_accels, frame_directions = speeds, np.zeros(1), directions
+
+        frame_headings = np.mod(frame_headings + np.pi, 2 * np.pi) - np.pi
+        frame_speeds = frame_directions * frame_speeds
+        frame_accels = frame_directions * frame_accels
+
+        trajectory = Trajectory(id_=id_, fps=fps)
+        for i in range(n_frame):
+            trajectory.add_state(
+                State(
+                    frame=start_frame + i * interval,
+                    x=frame_points[i, 0],
+                    y=frame_points[i, 1],
+                    heading=frame_headings[i],
+                    speed=frame_speeds[i],
+                    accel=frame_accels[i],
+                )
+            )
+
+        return trajectory
@@ -8,6 +8,7 @@
 from .arrival import Arrival
 from .collision import DynamicCollision, StaticCollision
 from .event_base import EventBase
+from .event_context import EventContext, EventPipeline
 from .no_action import NoAction
 from .off_lane import OffLane
 from .off_route import OffRoute
@@ -19,6 +20,8 @@ __all__ = [
     "StaticCollision",
     "Arrival",
     "EventBase",
+    "EventContext",
+    "EventPipeline",
     "NoAction",
     "OffLane",
     "OffRoute",
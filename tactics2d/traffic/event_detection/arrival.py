@@ -6,10 +6,13 @@
 # @Version: 1.0.0
 
 
-from tactics2d.map.element import Area
 from shapely.geometry import Polygon
 
+from tactics2d.map.element import Area
+from tactics2d.math.geometry import OBB
+
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class Arrival(EventBase):
@@ -27,8 +30,8 @@ class Arrival(EventBase):
             target_area (Area): The target area that the agent needs to reach.
             threshold (float, optional): The threshold of the intersection over union (IoU) to determine whether the agent has completed the task.
         """
-        self.target_area = target_area
         self.threshold = threshold
+        self.reset(target_area)
 
     def update(self, agent_pose: Polygon):
         """This function updates the status of the task completion.
@@ -40,9 +43,21 @@ class Arrival(EventBase):
             is_completed (bool): Whether the agent has completed the task.
             iou (float): The intersection over union (IoU) of the agent's pose and the target area.
         """
-        intersection = agent_pose.intersection(self.target_area.geometry)
-        union = agent_pose.union(self.target_area.geometry)
-        iou = intersection.area / union.area
+        is_completed, iou = self.evaluate(EventContext(agent_pose))
+
+        return bool(is_completed[0]), float(iou[0])
+
+    def evaluate(self, context: EventContext):
+        """This function updates the status of the task completion for all the agents in the context.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            is_completed (np.ndarray): Whether each agent has completed the task. The shape is (n,).
+            iou (np.ndarray): The IoU of each agent's pose and the target area. The shape is (n,).
+        """
+        iou = context.iou(self.target_area.geometry, self._target_vertices)
         is_completed = iou >= self.threshold
 
         return is_completed, iou
@@ -50,3 +65,10 @@ class Arrival(EventBase):
     def reset(self, target_area: Area = None):
         """This function resets the target area of the task."""
         self.target_area = target_area
+        self._target_vertices = None
+
+        # Most of the target areas are parking slots, whose IoU can be computed analytically
+        if target_area is not None:
+            vertices, is_rectangle = OBB.from_geometry(target_area.geometry)
+            if is_rectangle:
+                self._target_vertices = vertices
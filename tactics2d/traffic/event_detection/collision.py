@@ -6,9 +6,13 @@
 # @Version: 1.0.0
 
 
+import numpy as np
+import shapely
 from shapely.geometry import Polygon
+from shapely.strtree import STRtree
 
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class DynamicCollision(EventBase):
@@ -18,31 +22,118 @@ class DynamicCollision(EventBase):
         super().__init__()
 
     def update(self, agent_pose: Polygon, other_agents) -> bool:
+        """This function checks whether the agent collides into any other agent.
+
+        Args:
+            agent_pose (Polygon): The current pose of the agent.
+            other_agents (list): The other traffic participants.
+
+        Returns:
+            If the agent collides into any other agent, return True; otherwise, return False.
+        """
         collide = False
         for other_agent in other_agents:
-            other_agent_pose = other_agent.get_pose()
-            if agent_pose.geometry.intersects(other_agent_pose.geometry):
+            other_agent_pose = Polygon(other_agent.get_pose())
+            if agent_pose.intersects(other_agent_pose):
                 collide = True
                 break
         return collide
 
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function checks whether the agents in the context collide into each other.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether each agent collides into any other agent in the context. The shape is (n,).
+        """
+        tree = context.get("agent_tree", lambda: STRtree(context.poses), shapely_calls=1)
+        pairs = context.query(tree, "intersects")
+        pairs = pairs[:, pairs[0] != pairs[1]]
+
+        collide = np.zeros(context.n_agent, dtype=bool)
+        collide[pairs[0]] = True
+        return collide
+
     def reset(self):
         return
 
 
 class StaticCollision(EventBase):
-    """This class defines a detector to check whether the agent collides into static objects."""
+    """This class defines a detector to check whether the agent collides into static objects.
 
-    def __init__(self, static_objects: list = None):
-        self.static_objects = static_objects
+    The static objects are indexed by an STRtree when the detector is reset. In the continuous mode, the detector also checks the volume swept by the agent between the sub-sampled poses of a physics step, so that a thin obstacle cannot be tunnelled through when the agent moves fast or the step size is large.
+
+    Attributes:
+        static_objects (list): The static objects in the scenario. Each object should have a `geometry` attribute.
+        continuous (bool): Whether to check the swept volume of the agent. Defaults to False.
+    """
+
+    def __init__(self, static_objects: list = None, continuous: bool = False):
+        """Initialize an instance for the class.
+
+        Args:
+            static_objects (list, optional): The static objects in the scenario.
+            continuous (bool, optional): Whether to check the swept volume of the agent.
+        """
+        self.continuous = continuous
+        self.reset(static_objects)
+
+    def update(self, agent_pose: Polygon, swept_poses: np.ndarray = None) -> bool:
+        """This function checks whether the agent collides into any static object.
+
+        Args:
+            agent_pose (Polygon): The current pose of the agent.
+            swept_poses (np.ndarray, optional): The bounding box vertices of the agent at the sub-sampled poses from the last state to the current state. The shape is (k, 4, 2). It is only used in the continuous mode.
+
+        Returns:
+            If the agent collides into any static object, return True; otherwise, return False.
+        """
+        if self._tree is None:
+            return False
+        return bool(self.evaluate(EventContext(agent_pose, swept_poses))[0])
+
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function checks whether the agents in the context collide into any static object.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether each agent collides into any static object. The shape is (n,).
+        """
+        collide = np.zeros(context.n_agent, dtype=bool)
+        if self._tree is None:
+            return collide
+
+        agent_indices, _ = context.query(self._tree, "intersects")
+        collide[agent_indices] = True
+
+        swept_poses = context.swept_poses
+        if self.continuous and swept_poses is not None and swept_poses.shape[1] > 1:
+            # The convex hull of two consecutive poses approximates the volume swept in between.
+            n_agent, n_pose = swept_poses.shape[:2]
+            vertices = np.concatenate([swept_poses[:, :-1], swept_poses[:, 1:]], axis=2)
+            swept_volumes = shapely.convex_hull(shapely.multipoints(vertices.reshape(-1, 8, 2)))
+            volume_indices, _ = self._tree.query(swept_volumes, predicate="intersects")
+            context.count("shapely_calls", 3)
+            collide[volume_indices // (n_pose - 1)] = True
 
-    def update(self, agent_pose: Polygon) -> bool:
-        collide = False
-        for static_object in self.static_objects:
-            if agent_pose.intersects(static_object.geometry):
-                collide = True
-                break
         return collide
 
-    def reset(self, static_objects=None):
+    def reset(self, static_objects: list = None, continuous: bool = None):
+        """This function resets the static objects and rebuilds the spatial index.
+
+        Args:
+            static_objects (list, optional): The static objects in the scenario.
+            continuous (bool, optional): Whether to check the swept volume of the agent. If not specified, the current mode is kept.
+        """
         self.static_objects = static_objects
+        if continuous is not None:
+            self.continuous = continuous
+
+        if static_objects is None or len(static_objects) == 0:
+            self._tree = None
+        else:
+            self._tree = STRtree([static_object.geometry for static_object in static_objects])
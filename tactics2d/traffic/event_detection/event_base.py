@@ -19,3 +19,16 @@ class EventBase(ABC):
     @abstractmethod
     def reset(self):
         """This function resets the event detector."""
+
+    def evaluate(self, context):
+        """This function updates the event detector with the geometric facts shared in an [EventContext](#tactics2d.traffic.event_detection.EventContext). It is expected to be overridden to support the batch evaluation of agents.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            The detection results of the agents. The first dimension is the number of agents.
+        """
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support the evaluation by an event context."
+        )
@@ -0,0 +1,221 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: event_context.py
+# @Description: This script defines the shared geometric context and the pipeline for the event detection.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import shapely
+from shapely.geometry import LinearRing, Polygon
+from shapely.strtree import STRtree
+
+from tactics2d.math.geometry import OBB
+
+
+class EventContext:
+    """This class collects the geometric facts of the agents at a time step.
+
+    The facts are computed lazily at the first request and cached, so that all the event detectors evaluated on the same context share a single geometry pass. A context can hold one or a batch of agents. All the per-agent facts are arrays whose first dimension is the number of agents.
+
+    Attributes:
+        poses (np.ndarray): The pose polygons of the agents. The shape is (n,).
+        swept_poses (np.ndarray): The bounding box vertices of the agents at the sub-sampled poses of the last physics step. The shape is (n, k, 4, 2) or (k, 4, 2) for a single agent. Defaults to None.
+        n_agent (int): The number of agents in the context. This attribute is **read-only**.
+        bounds (np.ndarray): The axis-aligned bounding boxes of the agents in the form of (min_x, min_y, max_x, max_y). The shape is (n, 4). This attribute is **read-only**.
+        areas (np.ndarray): The areas of the agents. The shape is (n,). This attribute is **read-only**.
+        centroids (np.ndarray): The centroids of the agents. The shape is (n,). This attribute is **read-only**.
+        vertices (np.ndarray): The vertices of the agents as oriented bounding boxes. The shape is (n, 4, 2). If any agent pose is not a rectangle, it is None. This attribute is **read-only**.
+    """
+
+    def __init__(
+        self,
+        agent_poses: Union[Polygon, LinearRing, List[Polygon]],
+        swept_poses: np.ndarray = None,
+        profiler=None,
+    ):
+        """Initialize an instance for the class.
+
+        Args:
+            agent_poses (Union[Polygon, LinearRing, List[Polygon]]): The pose of an agent or the poses of a batch of agents.
+            swept_poses (np.ndarray, optional): The bounding box vertices of the agents at the sub-sampled poses of the last physics step.
+            profiler (StepProfiler, optional): The profiler to count the geometric facts and the shapely calls in the context.
+        """
+        if isinstance(agent_poses, (Polygon, LinearRing)):
+            agent_poses = [agent_poses]
+            if swept_poses is not None:
+                swept_poses = np.asarray(swept_poses)[None]
+
+        poses = np.empty(len(agent_poses), dtype=object)
+        for i, pose in enumerate(agent_poses):
+            poses[i] = Polygon(pose) if isinstance(pose, LinearRing) else pose
+
+        self.poses = poses
+        self.swept_poses = swept_poses
+        self.profiler = profiler
+        self._cache = dict()
+
+    @property
+    def n_agent(self) -> int:
+        return len(self.poses)
+
+    @property
+    def bounds(self) -> np.ndarray:
+        return self.get("bounds", lambda: shapely.bounds(self.poses), shapely_calls=1)
+
+    @property
+    def areas(self) -> np.ndarray:
+        return self.get("areas", lambda: shapely.area(self.poses), shapely_calls=1)
+
+    @property
+    def centroids(self) -> np.ndarray:
+        return self.get("centroids", lambda: shapely.centroid(self.poses), shapely_calls=1)
+
+    @property
+    def vertices(self) -> np.ndarray:
+        def _vertices():
+            vertices, is_rectangle = OBB.from_geometry(self.poses)
+            return vertices if np.all(is_rectangle) else None
+
+        return self.get("vertices", _vertices)
+
+    def count(self, name: str, value: int = 1):
+        """This function increases a counter of the profiler of the context. Nothing happens if the context has no profiler.
+
+        Args:
+            name (str): The name of the counter, such as "shapely_calls".
+            value (int, optional): The increment of the counter.
+        """
+        if self.profiler is not None:
+            self.profiler.count(name, value)
+
+    def get(self, key, func: Callable, shapely_calls: int = 0):
+        """This function returns a cached fact of the context. If the fact is not computed yet, it is computed by the given function and cached.
+
+        Args:
+            key (Hashable): The key of the fact.
+            func (Callable): The function to compute the fact. It takes no argument.
+            shapely_calls (int, optional): The number of shapely calls in the function, which is counted when the fact is computed.
+
+        Returns:
+            The value of the fact.
+        """
+        if key not in self._cache:
+            self._cache[key] = func()
+            self.count("geometry_facts")
+            if shapely_calls > 0:
+                self.count("shapely_calls", shapely_calls)
+        return self._cache[key]
+
+    def query(self, tree: STRtree, predicate: str = None) -> np.ndarray:
+        """This function queries the geometries in a spatial index that interact with the agents.
+
+        Args:
+            tree (STRtree): The spatial index of the geometries to query.
+            predicate (str, optional): The predicate of the query. If not specified, the geometries whose bounding boxes intersect with the bounding boxes of the agents are returned.
+
+        Returns:
+            The indices of the interacting pairs. The shape is (2, m). The first row is the index of the agent, and the second row is the index of the geometry in the tree.
+        """
+        return self.get(
+            ("query", id(tree), predicate),
+            lambda: tree.query(self.poses, predicate=predicate),
+            shapely_calls=1,
+        )
+
+    def nearest(self, tree: STRtree):
+        """This function finds the nearest geometry in a spatial index for every agent.
+
+        Args:
+            tree (STRtree): The spatial index of the geometries to query.
+
+        Returns:
+            indices (np.ndarray): The index of the nearest geometry in the tree for every agent. The shape is (n,).
+            distances (np.ndarray): The distance to the nearest geometry for every agent. The shape is (n,).
+        """
+
+        def _nearest():
+            (agent_indices, tree_indices), distances = tree.query_nearest(
+                self.poses, return_distance=True, all_matches=False
+            )
+            nearest_indices = np.full(self.n_agent, -1, dtype=int)
+            nearest_distances = np.full(self.n_agent, np.inf)
+            nearest_indices[agent_indices] = tree_indices
+            nearest_distances[agent_indices] = distances
+            return nearest_indices, nearest_distances
+
+        return self.get(("nearest", id(tree)), _nearest, shapely_calls=1)
+
+    def iou(self, geometry: Polygon, vertices: np.ndarray = None) -> np.ndarray:
+        """This function computes the intersection over union (IoU) between the agents and a geometry.
+
+        If the geometry is an oriented bounding box whose vertices are provided, and all the agent poses are rectangles, the IoU is computed analytically by [OBB](#tactics2d.math.geometry.OBB). Otherwise, it falls back to the polygon overlay of shapely.
+
+        Args:
+            geometry (Polygon): The geometry to compare with, such as a target area.
+            vertices (np.ndarray, optional): The vertices of the geometry if it is a rectangle. The shape is (4, 2).
+
+        Returns:
+            The IoU of every agent. The shape is (n,).
+        """
+
+        def _iou():
+            agent_vertices = None if vertices is None else self.vertices
+            if agent_vertices is None:
+                intersection = shapely.area(shapely.intersection(self.poses, geometry))
+                self.count("shapely_calls", 2)
+            elif self.n_agent == 1:
+                intersection = np.array([OBB.intersection_area(agent_vertices[0], vertices)])
+            else:
+                intersection = OBB.intersection_area_batch(agent_vertices, vertices)
+
+            union = self.areas + geometry.area - intersection
+            return intersection / union
+
+        return self.get(("iou", id(geometry)), _iou)
+
+
+class EventPipeline:
+    """This class evaluates a group of event detectors on a shared [EventContext](#tactics2d.traffic.event_detection.EventContext).
+
+    Attributes:
+        events (Dict[str, EventBase]): The event detectors in the order of evaluation.
+    """
+
+    def __init__(self, events: dict = None):
+        """Initialize an instance for the class.
+
+        Args:
+            events (dict, optional): The event detectors in the order of evaluation. The key is the name of the event.
+        """
+        self.events = dict() if events is None else dict(events)
+
+    def __getitem__(self, name: str):
+        return self.events[name]
+
+    def add_event(self, name: str, event):
+        """This function adds an event detector to the end of the pipeline.
+
+        Args:
+            name (str): The name of the event.
+            event (EventBase): The event detector.
+        """
+        self.events[name] = event
+
+    def update(
+        self, agent_poses: Union[Polygon, List[Polygon]], swept_poses: np.ndarray = None
+    ) -> Dict[str, np.ndarray]:
+        """This function evaluates all the event detectors for the given agents.
+
+        Args:
+            agent_poses (Union[Polygon, List[Polygon]]): The pose of an agent or the poses of a batch of agents.
+            swept_poses (np.ndarray, optional): The bounding box vertices of the agents at the sub-sampled poses of the last physics step.
+
+        Returns:
+            The detection results. The key is the name of the event, and the value is returned by the `evaluate` function of the event detector.
+        """
+        context = EventContext(agent_poses, swept_poses)
+        return {name: event.evaluate(context) for name, event in self.events.items()}
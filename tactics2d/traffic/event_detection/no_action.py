@@ -7,17 +7,19 @@
 
 
 import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class NoAction(EventBase):
     """This class defines a detector to check whether the agent has no action for a long time.
 
     Attributes:
-        last_action (Union[int, float, np.ndarray]): The last action of the agent.
-        cnt_no_action (int): The counter of the no-action time period.
+        last_pose (np.ndarray): The last poses of the agents.
+        cnt_no_action (Union[int, np.ndarray]): The counters of the no-action time period of the agents.
         max_step (int): The maximum tolerant time step for no action. Defaults to 100.
     """
 
@@ -28,6 +30,7 @@ class NoAction(EventBase):
             max_no_action (int, optional): The maximum tolerant time step for no action.
         """
         self.last_pose = None
+        self.last_area = None
         self.cnt_no_action = 0
         self.max_step = max_step
 
@@ -40,21 +43,32 @@ class NoAction(EventBase):
         Returns:
             If the no-action counter exceeds the maximum time step, return True; otherwise, return False.
         """
-        if self.last_pose is None:
-            self.last_pose = agent_pose
+        return bool(self.evaluate(EventContext(agent_pose))[0])
+
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function updates the no-action counters of all the agents in the context.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether the no-action counter of each agent exceeds the maximum time step. The shape is (n,).
+        """
+        if self.last_pose is None or len(self.last_pose) != context.n_agent:
+            self.last_pose = context.poses
+            self.last_area = context.areas
+            self.cnt_no_action = np.zeros(context.n_agent, dtype=int)
         else:
-            intersection = agent_pose.intersection(self.last_pose)
-            union = agent_pose.union(self.last_pose)
-            iou = intersection.area / union.area
-            if iou > 0.999:
-                self.cnt_no_action += 1
-            else:
-                self.cnt_no_action = 0
-            self.last_pose = agent_pose
+            intersection = shapely.area(shapely.intersection(context.poses, self.last_pose))
+            iou = intersection / (context.areas + self.last_area - intersection)
+            self.cnt_no_action = np.where(iou > 0.999, self.cnt_no_action + 1, 0)
+            self.last_pose = context.poses
+            self.last_area = context.areas
 
         return self.cnt_no_action > self.max_step
 
     def reset(self):
         """This function resets the no-action counter."""
-        self.last_action = None
+        self.last_pose = None
+        self.last_area = None
         self.cnt_no_action = 0
@@ -6,17 +6,106 @@
 # @Version: 1.0.0
 
 
+from collections.abc import Mapping
+from typing import Union
+
+import numpy as np
+from shapely.geometry import Polygon
+from shapely.strtree import STRtree
+
+from tactics2d.map.element import Map
+
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class OffLane(EventBase):
-    """This class defines a detector to check whether the agent is off the road."""
+    """This class defines a detector to check whether the agent is off the road.
+
+    An agent is regarded as off the road if its center is not covered by any lane. The lane polygons are indexed by an STRtree when the detector is reset, so that the check only costs a spatial query at every step. If a map is given, the lane index of the map is reused.
+
+    Attributes:
+        lanes (list): The lanes that the agents are allowed to drive on.
+        lane_ids (list): The ids of the indexed lanes. The order is the same as the indices in the STRtree.
+    """
+
+    def __init__(self, lanes: Union[Map, dict, list] = None):
+        """Initialize an instance for the class.
+
+        Args:
+            lanes (Union[Map, dict, list], optional): The lanes that the agents are allowed to drive on. It can be a map, a dictionary of lanes, or a list of lanes.
+        """
+        self.reset(lanes)
+
+    def update(self, agent_pose: Polygon) -> bool:
+        """This function checks whether the agent is off the road.
+
+        Args:
+            agent_pose (Polygon): The current pose of the agent.
+
+        Returns:
+            is_off_lane (bool): Whether the center of the agent is out of all the lanes.
+        """
+        return bool(self.evaluate(EventContext(agent_pose))[0])
 
-    def __init__(self) -> None:
-        self.lanes = None
+    def locate(self, context: EventContext) -> np.ndarray:
+        """This function finds the lanes covering the centers of the agents in the context.
 
-    def update(self, *args, **kwargs):
-        return False
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            The indices of the agent-lane pairs. The shape is (2, m). The first row is the index of the agent, and the second row is the index of the lane in `lane_ids`.
+        """
+        if self._tree is None:
+            raise ValueError("The lanes should be set before the event detection.")
+
+        return context.get(
+            ("locate", id(self._tree)),
+            lambda: self._tree.query(context.centroids, predicate="covered_by"),
+            shapely_calls=1,
+        )
+
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function checks whether the agents in the context are off the road.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether each agent is off the road. The shape is (n,).
+        """
+        agent_indices, _ = self.locate(context)
+        is_off_lane = np.ones(context.n_agent, dtype=bool)
+        is_off_lane[agent_indices] = False
+        return is_off_lane
+
+    def reset(self, lanes: Union[Map, dict, list] = None):
+        """This function resets the lanes and rebuilds the spatial index.
+
+        Args:
+            lanes (Union[Map, dict, list], optional): The lanes that the agents are allowed to drive on. It can be a map, a dictionary of lanes, or a list of lanes.
+        """
+        if isinstance(lanes, Map):
+            # share the lane index maintained by the map
+            self.lane_ids, self._tree = lanes.get_spatial_index("lane")
+            self.lanes = [lanes.lanes[id_] for id_ in self.lane_ids]
+            return
+        if isinstance(lanes, Mapping):
+            lanes = list(lanes.values())
 
-    def reset(self, lanes):
         self.lanes = lanes
+        self.lane_ids = []
+        self._tree = None
+
+        if lanes is None:
+            return
+
+        polygons = []
+        for lane in lanes:
+            if lane.geometry is None:
+                continue
+            self.lane_ids.append(lane.id_)
+            polygons.append(Polygon(lane.geometry))
+
+        self._tree = STRtree(polygons)
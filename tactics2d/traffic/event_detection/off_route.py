@@ -6,34 +6,109 @@
 # @Version: 1.0.0
 
 
+import numpy as np
+import shapely
 from shapely.geometry import LineString, Point
+from shapely.strtree import STRtree
 
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class OffRoute(EventBase):
     """This class defines a detector to check whether the agent is off the route.
 
+    The route is split into segments, which are indexed by an STRtree when the detector is reset. At every step, the agents are first projected onto a window of segments around the segments they were projected onto at the last step. Only the agents that seem to be off the route are projected again with the spatial index, so the decision is always exact even if the local search stops at a segment near the nearest one.
+
     Attributes:
         threshold (float): The threshold to determine whether the agent is off the route. The unit is the same as the route.
         route (LineString): The route for the agent to follow.
+        window (int): The number of segments to search before and after the last projected segment. Defaults to 5.
     """
 
-    def __init__(self, threshold) -> None:
+    def __init__(self, threshold: float, route: LineString = None, window: int = 5) -> None:
+        """Initialize an instance for the class.
+
+        Args:
+            threshold (float): The threshold to determine whether the agent is off the route.
+            route (LineString, optional): The route for the agent to follow.
+            window (int, optional): The number of segments to search before and after the last projected segment.
+        """
         self.threshold = threshold
+        self.window = window
         self.route = None
+        self._hints = None
 
-    def update(self, location: Point):
-        """This function will check whether the location of the agent is deviated from the route over the threshold.
+        if route is not None:
+            self.reset(route)
+
+    def _get_distances(self, locations: np.ndarray, segment_ids: np.ndarray) -> np.ndarray:
+        starts = self._starts[segment_ids]
+        vectors = self._vectors[segment_ids]
+        diffs = locations[:, None] - starts
+        t = np.clip(np.sum(diffs * vectors, axis=-1) / self._sq_lengths[segment_ids], 0, 1)
+        return np.linalg.norm(diffs - t[..., None] * vectors, axis=-1)
+
+    def project(self, locations: np.ndarray):
+        """This function projects the locations of the agents onto the route.
+
+        The projected segments are cached as the hints for the next call. The hints are dropped if the number of agents changes.
 
         Args:
-            location (Point): The location of the agent's center.
+            locations (np.ndarray): The locations of the agents. The shape is (n, 2).
+
+        Returns:
+            distances (np.ndarray): The distances from the agents to the route. For the agents within the threshold, it is the distance to the nearest segment in the search window. The shape is (n,).
+            segment_ids (np.ndarray): The indices of the nearest segments of the route. The shape is (n,).
         """
         if self.route is None:
             raise ValueError("The route should be set before the event detection.")
 
-        distance = self.route.distance(location)
-        return distance > self.threshold
+        locations = np.asarray(locations, dtype=float).reshape(-1, 2)
+        n_agent = len(locations)
+        distances = np.full(n_agent, np.inf)
+        segment_ids = np.zeros(n_agent, dtype=int)
+
+        if self._hints is not None and len(self._hints) == n_agent:
+            window = self._hints[:, None] + np.arange(-self.window, self.window + 1)
+            window = np.clip(window, 0, len(self._starts) - 1)
+            window_distances = self._get_distances(locations, window)
+            best = np.argmin(window_distances, axis=1)
+            distances = window_distances[np.arange(n_agent), best]
+            segment_ids = window[np.arange(n_agent), best]
+
+        # the local search can miss the nearest segment, so it is only trusted for the agents on the route
+        to_search = np.where(distances > self.threshold)[0]
+        if len(to_search) > 0:
+            (agent_ids, tree_ids), tree_distances = self._tree.query_nearest(
+                shapely.points(locations[to_search]), return_distance=True, all_matches=False
+            )
+            distances[to_search[agent_ids]] = tree_distances
+            segment_ids[to_search[agent_ids]] = tree_ids
+
+        self._hints = segment_ids
+        return distances, segment_ids
+
+    def update(self, location: Point) -> bool:
+        """This function will check whether the location of the agent is deviated from the route over the threshold.
+
+        Args:
+            location (Point): The location of the agent's center.
+        """
+        distances, _ = self.project(shapely.get_coordinates(location))
+        return bool(distances[0] > self.threshold)
+
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function checks whether the centers of the agents in the context are deviated from the route over the threshold.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether each agent is off the route. The shape is (n,).
+        """
+        distances, _ = self.project(shapely.get_coordinates(context.centroids))
+        return distances > self.threshold
 
     def reset(self, route: LineString):
         """This function resets the event detector with the given route.
@@ -51,3 +126,11 @@ class OffRoute(EventBase):
                 raise TypeError("The route should be a LineString or a list of points.")
 
         self.route = route
+        self._hints = None
+
+        coords = np.asarray(route.coords)[:, :2]
+        self._starts = coords[:-1]
+        self._vectors = coords[1:] - coords[:-1]
+        # avoid dividing by zero for the degenerate segments
+        self._sq_lengths = np.maximum(np.sum(self._vectors**2, axis=1), np.finfo(float).tiny)
+        self._tree = STRtree(shapely.linestrings(np.stack([coords[:-1], coords[1:]], axis=1)))
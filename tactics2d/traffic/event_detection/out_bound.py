@@ -6,9 +6,11 @@
 # @Version: 1.0.0
 
 
+import numpy as np
 from shapely.geometry import Polygon
 
 from .event_base import EventBase
+from .event_context import EventContext
 
 
 class OutBound(EventBase):
@@ -47,7 +49,28 @@ class OutBound(EventBase):
         """
         if self.map_boundary is None:
             return False
-        return not self.map_boundary.contains(agent_pose)
+        return bool(self.evaluate(EventContext(agent_pose))[0])
+
+    def evaluate(self, context: EventContext) -> np.ndarray:
+        """This function checks whether the agents in the context are out of the map boundary. Because the map boundary is an axis-aligned rectangle, an agent is inside the boundary if and only if its bounding box is inside the boundary.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether each agent is out of the map boundary. The shape is (n,).
+        """
+        if self.map_boundary is None:
+            return np.zeros(context.n_agent, dtype=bool)
+
+        min_x, min_y, max_x, max_y = self.map_boundary.bounds
+        bounds = context.bounds
+        return (
+            (bounds[:, 0] < min_x)
+            | (bounds[:, 1] < min_y)
+            | (bounds[:, 2] > max_x)
+            | (bounds[:, 3] > max_y)
+        )
 
     def reset(self, boundary: tuple = None):
         """This function reset the instance by updating the map boundary.
@@ -6,6 +6,8 @@
 # @Version: 1.0.0
 
 
+import numpy as np
+
 from .event_base import EventBase
 
 
@@ -34,6 +36,17 @@ class TimeExceed(EventBase):
         self.cnt_step += 1
         return self.cnt_step > self.max_step
 
+    def evaluate(self, context) -> np.ndarray:
+        """This function updates the time step counter for all the agents in the context.
+
+        Args:
+            context (EventContext): The shared geometric context of the agents at the current step.
+
+        Returns:
+            Whether the time step counter exceeds the maximum time step. The shape is (n,).
+        """
+        return np.full(context.n_agent, self.update())
+
     def reset(self):
         """This function resets the time step counter to 0."""
         self.cnt_step = 0
@@ -11,6 +11,7 @@ import sys
 sys.path.append(".")
 sys.path.append("..")
 
+import json
 import logging
 import os
 import random
@@ -22,7 +23,7 @@ logging.basicConfig(level=logging.INFO)
 
 import numpy as np
 
-from tactics2d.envs import ParkingEnv, RacingEnv
+from tactics2d.envs import ParkingEnv, RacingEnv, StepProfiler
 
 
 @pytest.mark.env
@@ -59,6 +60,58 @@ def test_parking_env():
     logging.info(f"The average fps is {n_iter / (t2 - t1): .2f} Hz.")
 
 
+@pytest.mark.env
+@pytest.mark.parametrize("env_class", [RacingEnv, ParkingEnv])
+def test_env_profiler(env_class):
+    env = env_class(render_mode="rgb_array", max_step=2000, profile=True)
+    env.reset(42)
+
+    n_iter = 20
+    for _ in range(n_iter):
+        _ = env.step(action=env.action_space.sample())
+
+    summary = env.profiler.summary()
+    assert summary["n_step"] == n_iter
+    for phase in ["step", "physics", "render_update", "observation", "check_status", "reward"]:
+        assert summary["phases"][phase]["count"] == n_iter
+    assert summary["phases"]["physics"]["total"] <= summary["phases"]["step"]["total"]
+    assert summary["counters"]["states"]["total"] == n_iter
+    assert summary["counters"]["shapely_calls"]["total"] > 0
+    logging.info(json.dumps(summary["phases"], indent=2))
+
+    content = json.loads(env.profiler.to_json())
+    assert len(content["steps"]) == n_iter
+    assert sum(content["histograms"]["step"]["counts"]) == n_iter
+    trace = env.profiler.to_chrome_trace()
+    assert all(event["ph"] in ["X", "C"] for event in trace["traceEvents"])
+
+    env.profiler.reset()
+    env.profiler.enabled = False
+    _ = env.step(action=env.action_space.sample())
+    assert env.profiler.summary()["n_step"] == 0
+
+
+@pytest.mark.env
+def test_step_profiler_bounded():
+    # a long-running profiler only keeps the records of the latest steps
+    profiler = StepProfiler(enabled=True, max_steps=5)
+    for _ in range(20):
+        with profiler.step():
+            with profiler.phase("physics"):
+                profiler.count("states")
+            with profiler.phase("reward"):
+                pass
+
+    assert profiler.n_step == 20 and len(profiler.steps) == 5
+    assert [step["step"] for step in profiler.steps] == list(range(15, 20))
+    summary = profiler.summary()
+    assert summary["n_step"] == 20 and summary["n_kept_step"] == 5
+    assert summary["phases"]["physics"]["count"] == 5
+    assert summary["counters"]["states"]["total"] == 5
+    trace = profiler.to_chrome_trace()
+    assert len([event for event in trace["traceEvents"] if event["ph"] == "X"]) == 5 * 3
+
+
 @pytest.mark.env
 @pytest.mark.skip(reason="Terminal only")
 def test_manual_control(env):
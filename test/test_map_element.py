@@ -7,8 +7,11 @@
 
 
 import logging
+import time
 
+import numpy as np
 import pytest
+import shapely
 from shapely.geometry import LineString, Polygon
 
 import tactics2d.map.element as map_element
@@ -109,3 +112,309 @@ def test_map():
     logging.info(f"map boundary: {map_.boundary}")
     _ = map_.get_by_id(0)
     map_.reset()
+
+
+@pytest.mark.map_element
+def test_map_spatial_index():
+    map_ = map_element.Map(name="test_map")
+    for i in range(4):
+        map_.add_lane(
+            map_element.Lane(
+                id_=str(i),
+                left_side=LineString([(0, 4 * i + 4), (100, 4 * i + 4)]),
+                right_side=LineString([(0, 4 * i), (100, 4 * i)]),
+            )
+        )
+
+    assert map_.locate([50, 6]) == ["1"]
+    assert sorted(map_.locate([50, 4])) == ["0", "1"]
+    assert map_.locate(np.array([[50, 2], [50, -2]])) == [["0"], []]
+    assert map_.query_nearest([50, -2]) == "0"
+    assert map_.query_nearest(np.array([[50, 30], [50, 30]]), max_distance=5) == [None, None]
+    assert sorted(map_.query_bbox((10, 20, 5, 9))) == ["1", "2"]
+    assert sorted(map_.query_radius([50, 17], 2)) == ["3"]
+
+    # the index is rebuilt after a new element is added
+    map_.add_lane(
+        map_element.Lane(
+            id_="4",
+            left_side=LineString([(0, 20), (100, 20)]),
+            right_side=LineString([(0, 16), (100, 16)]),
+        )
+    )
+    assert sorted(map_.query_radius([50, 17], 2)) == ["3", "4"]
+
+    map_.add_node(map_element.Node("n0", 50, 30))
+    assert map_.query_nearest([50, 25], element_type="node") == "n0"
+
+    map_.reset()
+    assert map_.locate([50, 6]) == []
+
+
+@pytest.mark.map_element
+def test_map_boundary():
+    map_ = map_element.Map(name="test_map")
+    rng = np.random.default_rng(0)
+    for i, (x, y) in enumerate(rng.uniform(-50, 50, (20, 2))):
+        map_.add_area(
+            map_element.Area(id_=str(i), geometry=Polygon([(x, y), (x + 3, y), (x + 3, y + 2)]))
+        )
+    map_.add_roadline(map_element.RoadLine(id_="line", geometry=LineString([(0, 0), (60, 70)])))
+
+    # compare the incremental boundary with the extent of all the elements
+    geometries = [area.geometry for area in map_.areas.values()]
+    geometries += [roadline.geometry for roadline in map_.roadlines.values()]
+    x_min, y_min, x_max, y_max = shapely.total_bounds(geometries)
+    assert np.allclose(map_.boundary, (x_min - 10, x_max + 10, y_min - 10, y_max + 10))
+
+    map_.add_node(map_element.Node("far", x_max + 100, y_max + 50))
+    assert np.allclose(map_.boundary[1], x_max + 110)
+    assert np.allclose(map_.boundary[3], y_max + 60)
+
+    map_.set_boundary((0, 1, 0, 1))
+    map_.add_node(map_element.Node("farther", x_max + 200, y_max))
+    assert map_.boundary == (0, 1, 0, 1)
+
+    map_.reset()
+    map_.add_node(map_element.Node("0", 1, 2))
+    assert map_.boundary == (-9, 11, -8, 12)
+
+
+@pytest.mark.map_element
+def test_lane_frenet():
+    map_ = map_element.Map(name="test_map")
+    x = np.linspace(0, 60, 41)
+    for i in range(2):
+        # the right side has a different number of vertices from the left side
+        map_.add_lane(
+            map_element.Lane(
+                id_=str(i),
+                left_side=LineString(np.stack([x, np.sin(x / 10) * 5 + 4 * i + 4], axis=1)),
+                right_side=LineString(np.stack([x[::2], np.sin(x[::2] / 10) * 5 + 4 * i], axis=1)),
+            )
+        )
+
+    lane = map_.lanes["0"]
+    assert np.allclose(np.array(lane.centerline.coords)[[0, -1]], [[0, 2], [60, 5 * np.sin(6) + 2]])
+    assert lane.frenet_frame is lane.frenet_frame
+
+    rng = np.random.default_rng(0)
+    lane_ids = [str(i) for i in rng.integers(0, 2, 100)]
+    s = rng.uniform(5, 50, 100)
+    d = rng.uniform(-1, 1, 100)
+    points, headings = map_.from_frenet(lane_ids, s, d)
+
+    lane_ids_, s_, d_, heading_error = map_.project_frenet(points, headings + 0.1)
+    assert lane_ids_ == lane_ids
+    assert np.allclose(s_, s, atol=1e-2) and np.allclose(d_, d, atol=1e-2)
+    assert np.allclose(heading_error, 0.1, atol=1e-2)
+
+    lane_ids_, s_, d_, heading_error = map_.project_frenet(points[0])
+    assert lane_ids_ == lane_ids[:1] and np.isnan(heading_error[0])
+
+
+@pytest.mark.map_element
+@pytest.mark.parametrize("n_lane", [10, 20000])
+def test_map_file(tmp_path, n_lane: int):
+    map_ = map_element.Map(name="test_map", scenario_type="test_scenario", country="test_country")
+    for i in range(n_lane):
+        x0, x1 = 10 * (i // 4), 10 * (i // 4 + 1)
+        lane = map_element.Lane(
+            id_=i,
+            left_side=LineString(
+                [(x0, 4 * (i % 4) + 4), ((x0 + x1) / 2, 4 * (i % 4) + 4.5), (x1, 4 * (i % 4) + 4)]
+            ),
+            right_side=LineString([(x0, 4 * (i % 4)), (x1, 4 * (i % 4))]),
+            subtype="road",
+            speed_limit=50 if i % 2 == 0 else None,
+            line_ids={"left": [f"l{i}"], "right": [f"r{i}"]},
+            regulatory_ids={"speed"},
+            custom_tags={"index": i, "pair": (i, i + 1)},
+        )
+        if i + 4 < n_lane:
+            lane.add_related_lane(i + 4, map_element.LaneRelationship.SUCCESSOR)
+        lane.add_related_lane("out_of_map", map_element.LaneRelationship.PREDECESSOR)
+        map_.add_lane(lane)
+    for i in range(3):
+        map_.add_node(map_element.Node(f"n{i}", i, -i))
+        map_.add_roadline(
+            map_element.RoadLine(
+                f"line{i}", LineString([(0, i), (5, i), (5, i + 3)]), lane_change=(True, False)
+            )
+        )
+    map_.add_area(
+        map_element.Area(
+            "area", Polygon([(0, -10), (10, -10), (10, -5)], [[(6, -9), (8, -9), (8, -8)]])
+        )
+    )
+    map_.add_regulatory(
+        map_element.Regulatory("speed", ways={"line0": "refers"}, subtype="speed_limit")
+    )
+    junction = map_element.Junction("junction")
+    junction.add_connection(map_element.Connection("c0", "0", "4", lane_links=[("1", "2")]))
+    map_.add_junction(junction)
+
+    file_path = str(tmp_path / "test.t2dmap")
+    t1 = time.time()
+    map_.save(file_path)
+    t2 = time.time()
+    loaded = map_element.Map.load(file_path)
+    t3 = time.time()
+    points = np.random.default_rng(0).uniform(0, 10 * n_lane / 4, (1000, 2))
+    located = loaded.locate(points)
+    t4 = time.time()
+    logging.info(
+        "Map with %d lanes: saved in %.2fms, loaded in %.2fms, and indexed in %.2fms."
+        % (n_lane, (t2 - t1) * 1e3, (t3 - t2) * 1e3, (t4 - t3) * 1e3)
+    )
+
+    # the spatial queries do not create the elements
+    assert located == map_.locate(points)
+    assert loaded.query_nearest([1, -1.2], element_type="node") == "n1"
+    assert loaded.lanes.n_created == 0
+    assert (loaded.name, loaded.scenario_type, loaded.country) == (
+        "test_map",
+        "test_scenario",
+        "test_country",
+    )
+    assert loaded.boundary == map_.boundary
+    assert loaded.ids == map_.ids
+    assert list(loaded.lanes) == list(map_.lanes)
+
+    for id_ in [0, n_lane - 1]:
+        lane, loaded_lane = map_.lanes[id_], loaded.lanes[id_]
+        assert loaded_lane.geometry.equals(lane.geometry)
+        assert loaded_lane.left_side.equals(lane.left_side)
+        for attr in ["subtype", "speed_limit", "line_ids", "regulatory_ids", "custom_tags"]:
+            assert getattr(loaded_lane, attr) == getattr(lane, attr)
+        assert loaded_lane.successors == lane.successors
+        assert loaded_lane.predecessors == {"out_of_map"}
+        assert np.allclose(loaded_lane.centerline.coords, lane.centerline.coords)
+    assert loaded.lanes.n_created == 2
+
+    assert loaded.nodes["n2"].location.equals(map_.nodes["n2"].location)
+    assert loaded.roadlines["line1"].geometry.equals(map_.roadlines["line1"].geometry)
+    assert loaded.roadlines["line1"].lane_change == (True, False)
+    assert loaded.areas["area"].geometry.equals(map_.areas["area"].geometry)
+    assert loaded.regulations["speed"].ways == {"line0": "refers"}
+    assert loaded.junctions["junction"].connections["c0"].lane_links == [("1", "2")]
+
+    # the loaded map can be edited as usual
+    loaded.add_lane(
+        map_element.Lane(
+            id_="new",
+            left_side=LineString([(0, -16), (10, -16)]),
+            right_side=LineString([(0, -20), (10, -20)]),
+        )
+    )
+    assert loaded.locate([5, -18]) == ["new"]
+    loaded.reset()
+    assert len(loaded.lanes) == 0
+
+
+@pytest.mark.map_element
+@pytest.mark.parametrize("n_section", [20, 2000])
+def test_tiled_map(tmp_path, n_section: int):
+    # a straight four-lane highway along +x with a speed limit referring to its first lane
+    map_ = map_element.Map(name="highway")
+    for i in range(n_section):
+        for j in range(4):
+            x0, x1 = 50 * i, 50 * (i + 1)
+            lane = map_element.Lane(
+                id_=f"{i}-{j}",
+                left_side=LineString([(x0, 4 * j + 4), (x1, 4 * j + 4)]),
+                right_side=LineString([(x0, 4 * j), (x1, 4 * j)]),
+            )
+            if i + 1 < n_section:
+                lane.add_related_lane(f"{i + 1}-{j}", map_element.LaneRelationship.SUCCESSOR)
+            map_.add_lane(lane)
+        map_.add_area(
+            map_element.Area(
+                f"shoulder{i}", Polygon([(50 * i, -3), (50 * i + 50, -3), (50 * i, 0)])
+            )
+        )
+    map_.add_regulatory(
+        map_element.Regulatory("speed", ways={"0-0": "refers"}, subtype="speed_limit")
+    )
+
+    t1 = time.time()
+    tiles = map_element.TiledMap.build(map_, str(tmp_path), tile_size=200)
+    t2 = time.time()
+    tiled_map = map_element.TiledMap(str(tmp_path), cache_size=4)
+    assert len(tiled_map.lanes) == 0
+    assert set(tiled_map.tiles) == set(tiles)
+    assert tiled_map.regulations["speed"].ways == {"0-0": "refers"}
+    assert tiled_map.boundary == map_.boundary
+
+    # an agent drives along the highway and senses the lanes within 100 meters
+    rng = np.random.default_rng(0)
+    max_lanes = 0
+    t3 = time.time()
+    for x in np.arange(0, 50 * n_section, 25):
+        required = tiled_map.update([x, 8], radius=100)
+        assert set(required) <= set(tiled_map.loaded_tiles)
+        assert len(tiled_map.loaded_tiles) <= max(4, len(required))
+        max_lanes = max(max_lanes, len(tiled_map.lanes))
+
+        points = np.stack([x + rng.uniform(-100, 100, 20), rng.uniform(-2, 16, 20)], axis=1)
+        assert tiled_map.locate(points) == map_.locate(points)
+        areas = tiled_map.query_radius([x, 8], 100, element_type="area")
+        assert sorted(areas) == sorted(map_.query_radius([x, 8], 100, element_type="area"))
+    t4 = time.time()
+    logging.info(
+        "Tiled map with %d lanes: built in %.2fms, drove through in %.2fms with at most %d lanes loaded."
+        % (len(map_.lanes), (t2 - t1) * 1e3, (t4 - t3) * 1e3, max_lanes)
+    )
+
+    # the loaded elements are bounded by the cache size, not by the size of the map
+    assert max_lanes <= 4 * 4 * 200 / 50
+    assert len(tiled_map.ids) == len(tiled_map.lanes) + len(tiled_map.areas) + 1
+
+    # the least recently used tiles are unloaded first
+    tiled_map.update([0, 8])
+    assert tiled_map.loaded_tiles[-1] == (0, 0)
+    assert "0-0" in tiled_map.lanes
+    with pytest.raises(KeyError):
+        tiled_map.load_tile((-1, -1))
+
+    tiled_map.reset()
+    assert len(tiled_map.lanes) == 0 and len(tiled_map.loaded_tiles) == 0
+    assert "speed" in tiled_map.regulations
+    assert tiled_map.boundary == map_.boundary
+
+
+@pytest.mark.map_element
+def test_tiled_map_long_lane(tmp_path):
+    # a lane crossing several tiles is loaded with any of them
+    map_ = map_element.Map(name="long")
+    map_.add_lane(
+        map_element.Lane(
+            id_="long",
+            left_side=LineString([(0, 4), (1000, 8)]),
+            right_side=LineString([(0, 0), (1000, 4)]),
+        )
+    )
+    map_.add_lane(
+        map_element.Lane(
+            id_="short",
+            left_side=LineString([(10, 14), (30, 14)]),
+            right_side=LineString([(10, 10), (30, 10)]),
+        )
+    )
+    tiles = map_element.TiledMap.build(map_, str(tmp_path), tile_size=200)
+    assert sorted(tiles) == [(i, 0) for i in range(5)]
+
+    tiled_map = map_element.TiledMap(str(tmp_path), cache_size=1)
+    for x in [50, 250, 450, 650, 950]:
+        tiled_map.update([x, 2 + x / 250])
+        assert tiled_map.locate([x, 2 + x / 250]) == map_.locate([x, 2 + x / 250]) == ["long"]
+
+    # the lane is kept until the last tile holding it is unloaded
+    tiled_map.cache_size = 2
+    tiled_map.update([20, 12])
+    tiled_map.update([250, 3])
+    tiled_map.unload_tile((0, 0))
+    assert "long" in tiled_map.lanes and "short" not in tiled_map.lanes
+    assert tiled_map.locate([250, 3]) == ["long"]
+    tiled_map.unload_tile((1, 0))
+    assert len(tiled_map.lanes) == 0 and len(tiled_map.ids) == 0
@@ -44,6 +44,8 @@ def test_parking_lot_generator():
     assert isinstance(start_state, State), "start_state should be a State object."
     assert isinstance(target_area, Area), "target_area should be a Area object."
     assert isinstance(target_heading, float), "target_heading should be a float."
+    assert map_.get_by_id(target_area.id_) is target_area, "target_area should be added to the map."
+    assert [area.subtype for area in map_.areas.values()].count("target_area") == 1
 
 
 @pytest.mark.map_generator
@@ -63,6 +65,8 @@ def test_racing_track_generator():
     fig.savefig("./test/runtime/racing_track.png")
 
     assert isinstance(map_.customs["start_state"], State), "start_state should be a State object."
+    for id_ in ["start_line", "end_line", "center_line"]:
+        assert map_.get_by_id(id_) is map_.roadlines[id_], f"{id_} should be added to the map."
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,100 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: test_map_occupancy.py
+# @Description: This script is used to test the occupancy grid in the map module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+import sys
+
+sys.path.append(".")
+sys.path.append("..")
+
+import logging
+import time
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString
+
+from tactics2d.map.element import Lane, Map
+from tactics2d.map.generator import ParkingLotGenerator
+from tactics2d.map.occupancy import OccupancyGrid
+
+
+@pytest.mark.map_occupancy
+@pytest.mark.parametrize("resolution, n_point", [(0.1, 1000), (0.2, 100000)])
+def test_occupancy_grid(resolution: float, n_point: int):
+    np.random.seed(0)
+    map_ = Map(name="parking_lot", scenario_type="parking")
+    ParkingLotGenerator().generate(map_)
+    occupancy_grid = OccupancyGrid(resolution)
+
+    t1 = time.time()
+    occupancy_grid.reset(map_)
+    t2 = time.time()
+    logging.info(
+        f"Rasterizing a {occupancy_grid.shape} grid with the distance field takes {t2 - t1:.4f}s."
+    )
+
+    min_x, max_x, min_y, max_y = map_.boundary
+    points = np.random.uniform((min_x, min_y), (max_x, max_y), (n_point, 2))
+    t1 = time.time()
+    distances = occupancy_grid.get_distance(points)
+    t2 = time.time()
+    logging.info(f"Looking up the distances of {n_point} points takes {t2 - t1:.4f}s.")
+
+    obstacles = shapely.union_all(
+        [area.geometry for area in map_.areas.values() if area.type_ == "obstacle"]
+    )
+    edges = shapely.box(min_x, min_y, max_x, max_y).exterior
+    n_exact = min(n_point, 1000)
+    t1 = time.time()
+    exact_distances = np.array(
+        [
+            min(obstacles.distance(shapely.Point(point)), edges.distance(shapely.Point(point)))
+            for point in points[:n_exact]
+        ]
+    )
+    t2 = time.time()
+    logging.info(f"Computing the distances of {n_exact} points by shapely takes {t2 - t1:.4f}s.")
+
+    inside = shapely.contains_xy(obstacles, points[:n_exact, 0], points[:n_exact, 1])
+    assert np.all(distances[:n_exact][inside] <= resolution)
+    assert np.all(occupancy_grid.is_occupied(points[:n_exact][inside]))
+    assert np.allclose(distances[:n_exact][~inside], exact_distances[~inside], atol=2 * resolution)
+
+    outside = np.array([[min_x - 1, min_y], [max_x + 1, max_y + 1], [min_x - 100, max_y + 100]])
+    assert np.all(occupancy_grid.get_distance(outside) == 0)
+    assert np.all(occupancy_grid.is_occupied(outside))
+    assert occupancy_grid.get_distance(points.reshape(-1, 10, 2)).shape == (n_point // 10, 10)
+
+
+@pytest.mark.map_occupancy
+def test_occupancy_grid_lanes():
+    map_ = Map(name="straight_road")
+    for i in range(2):
+        lane = Lane(
+            id_=str(i),
+            left_side=LineString([(0, 3.5 * (i + 1)), (50, 3.5 * (i + 1))]),
+            right_side=LineString([(0, 3.5 * i), (50, 3.5 * i)]),
+        )
+        map_.add_lane(lane)
+
+    occupancy_grid = OccupancyGrid(0.1)
+    occupancy_grid.reset(map_, boundary=(-10, 60, -10, 20))
+    assert not np.any(occupancy_grid.occupied)
+    assert np.isclose(occupancy_grid.get_distance([25, 3.5]), 13.5, atol=0.1)
+
+    occupancy_grid = OccupancyGrid(0.1, include_lanes=True)
+    occupancy_grid.reset(map_, boundary=(-10, 60, -10, 20))
+    distances = occupancy_grid.get_distance([[25, 3.5], [25, 1], [25, 10], [-5, 3]])
+    assert np.allclose(distances[:2], [3.5, 1], atol=0.2)
+    assert np.all(distances[2:] == 0)
+    assert np.all(occupancy_grid.is_occupied([[25, 10], [-5, 3]]))
+    assert not np.any(occupancy_grid.is_occupied([[25, 3.5], [25, 1]]))
+
+    with pytest.raises(ValueError):
+        OccupancyGrid(0)
@@ -13,10 +13,14 @@ sys.path.append("..")
 
 import json
 import logging
+import time
 import xml.etree.ElementTree as ET
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pytest
+import shapely
+from pyproj import Proj
 
 from tactics2d.map.parser import OSMParser, XODRParser
 from tactics2d.traffic import ScenarioDisplay
@@ -93,6 +97,119 @@ def test_lanelet2_parser():
             raise err
 
 
+def write_lanelet2_map(file_path: str, n_lane: int, lane_length: float = 1e-4):
+    # a straight road of n_lane consecutive lanelets near (8.0, 49.0), where the sides of the
+    # neighboring lanelets share nodes
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+    lines.append('  <bounds minlat="49.0" minlon="8.0" maxlat="49.1" maxlon="8.1"/>')
+    for i in range(n_lane + 1):
+        for j, lat in enumerate([49.0, 49.00003]):
+            node_id = 2 * i + j + 1
+            lon = 8.0 + i * lane_length
+            lines.append(f'  <node id="{node_id}" visible="true" lat="{lat}" lon="{lon}"/>')
+    lines.append('  <node id="-1" action="delete" lat="49.0" lon="8.0"/>')
+    way_id = 2 * (n_lane + 1) + 1
+    for i in range(n_lane):
+        for j in range(2):
+            lines.append(f'  <way id="{way_id + 2 * i + j}">')
+            lines.append(f'    <nd ref="{2 * i + j + 1}"/>')
+            lines.append(f'    <nd ref="{2 * i + j + 3}"/>')
+            lines.append('    <tag k="type" v="line_thin"/>')
+            lines.append('    <tag k="subtype" v="solid"/>')
+            lines.append("  </way>")
+    relation_id = way_id + 2 * n_lane
+    for i in range(n_lane):
+        lines.append(f'  <relation id="{relation_id + i}">')
+        lines.append(f'    <member type="way" ref="{way_id + 2 * i + 1}" role="left"/>')
+        lines.append(f'    <member type="way" ref="{way_id + 2 * i}" role="right"/>')
+        lines.append('    <tag k="type" v="lanelet"/>')
+        lines.append('    <tag k="subtype" v="road"/>')
+        lines.append("  </relation>")
+    lines.append(f'  <relation id="{relation_id + n_lane}">')
+    lines.append(f'    <member type="way" ref="{way_id}" role="refers"/>')
+    lines.append('    <tag k="type" v="regulatory_element"/>')
+    lines.append('    <tag k="subtype" v="speed_limit"/>')
+    lines.append("  </relation>")
+    lines.append("</osm>")
+
+    with open(file_path, "w") as f:
+        f.write("\n".join(lines))
+
+
+@pytest.mark.map_parser
+@pytest.mark.parametrize("n_lane", [10, 5000])
+def test_lanelet2_parser_stream(tmp_path, n_lane: int):
+    map_path = str(tmp_path / "stream.osm")
+    write_lanelet2_map(map_path, n_lane)
+    project_rule = {"proj": "utm", "ellps": "WGS84", "zone": 32, "datum": "WGS84"}
+    gps_origin = (8.0, 49.0)
+    map_parser = OSMParser(lanelet2=True)
+
+    t1 = time.time()
+    map_tree = map_parser.parse(ET.parse(map_path).getroot(), project_rule, gps_origin)
+    t2 = time.time()
+    map_stream = map_parser.parse_file(map_path, project_rule, gps_origin)
+    t3 = time.time()
+    logging.info(
+        "Parsing %d lanelets: %.2fms with the XML tree, %.2fms with streaming."
+        % (n_lane, (t2 - t1) * 1e3, (t3 - t2) * 1e3)
+    )
+
+    for map_ in [map_tree, map_stream]:
+        assert len(map_.nodes) == 2 * (n_lane + 1)
+        assert len(map_.roadlines) == 2 * n_lane
+        assert len(map_.lanes) == n_lane
+        assert len(map_.regulations) == 1
+        assert np.isclose(map_.nodes["1"].x, 0) and np.isclose(map_.nodes["1"].y, 0)
+
+    for id_, roadline in map_stream.roadlines.items():
+        assert roadline.subtype == "solid"
+        assert roadline.geometry.equals(map_tree.roadlines[id_].geometry)
+    # the resolved coordinates are the same as the nodes in the map
+    roadline = map_stream.roadlines[str(2 * (n_lane + 1) + 2)]
+    assert roadline.geometry.coords[0] == (map_stream.nodes["2"].x, map_stream.nodes["2"].y)
+    assert roadline.geometry.coords[1] == (map_stream.nodes["4"].x, map_stream.nodes["4"].y)
+    for id_, lane in map_stream.lanes.items():
+        assert lane.geometry.equals(map_tree.lanes[id_].geometry)
+        assert lane.left_side.coords[0][1] > lane.right_side.coords[0][1]
+
+    # the node lookup falls back to the map out of the parsing
+    xml_way = ET.fromstring('<way id="0"><nd ref="1"/><nd ref="3"/></way>')
+    roadline = map_parser.load_roadline_lanelet2(xml_way, map_stream)
+    assert roadline.geometry.equals(map_stream.roadlines[str(2 * (n_lane + 1) + 1)].geometry)
+
+
+@pytest.mark.map_parser
+def test_osm_projection(tmp_path):
+    map_path = str(tmp_path / "projection.osm")
+    write_lanelet2_map(map_path, 20)
+    project_rule = {"proj": "utm", "ellps": "WGS84", "zone": 32, "datum": "WGS84"}
+    gps_origin = (8.0, 49.0)
+    map_parser = OSMParser(lanelet2=True)
+    map_ = map_parser.parse_file(map_path, project_rule, gps_origin)
+
+    # the transformer is cached by the projection rule
+    transformer = map_parser.get_transformer(project_rule)
+    assert transformer is map_parser.get_transformer(dict(reversed(project_rule.items())))
+
+    # the batch projection is the same as projecting the nodes one by one with Proj
+    projector = Proj(**project_rule)
+    origin = projector(*gps_origin)
+    for xml_node in ET.parse(map_path).getroot().findall("node"):
+        if xml_node.get("action") == "delete":
+            continue
+        x, y = projector(float(xml_node.attrib["lon"]), float(xml_node.attrib["lat"]))
+        node = map_.nodes[xml_node.attrib["id"]]
+        assert np.isclose(node.x, x - origin[0]) and np.isclose(node.y, y - origin[1])
+        node = map_parser.load_nodes(xml_node, projector, origin)
+        assert np.isclose(node.x, x - origin[0]) and np.isclose(node.y, y - origin[1])
+
+    min_x, min_y = projector(8.0, 49.0)
+    max_x, max_y = projector(8.1, 49.1)
+    expected = (min_x - origin[0], max_x - origin[0], min_y - origin[1], max_y - origin[1])
+    assert np.allclose(map_.boundary, expected)
+
+
 @pytest.mark.map_parser
 @pytest.mark.parametrize(
     "map_path, img_path",
@@ -123,3 +240,180 @@ def test_xodr_parser(map_path, img_path):
     ax.plot()
     fig.savefig(img_path, facecolor="black")
     plt.close(fig)
+
+
+@pytest.mark.map_parser
+def test_xodr_sampling():
+    xml_road = ET.fromstring(
+        """
+        <road name="" length="82.83185307179586" id="0" junction="-1">
+            <type s="0.0" type="town"/>
+            <planView>
+                <geometry s="0.0" x="0.0" y="0.0" hdg="0.0" length="20.0"><line/></geometry>
+                <geometry s="20.0" x="20.0" y="0.0" hdg="0.0" length="62.83185307179586">
+                    <arc curvature="0.05"/>
+                </geometry>
+            </planView>
+            <lanes>
+                <laneSection s="0.0">
+                    <left>
+                        <lane id="2" type="driving" level="false">
+                            <width sOffset="0.0" a="2.0" b="0.0" c="0.0" d="0.0"/>
+                        </lane>
+                        <lane id="1" type="driving" level="false">
+                            <width sOffset="0.0" a="3.0" b="0.0" c="0.0" d="0.0"/>
+                        </lane>
+                    </left>
+                    <center>
+                        <lane id="0" type="none" level="false">
+                            <roadMark sOffset="0.0" type="solid" weight="standard" color="standard" width="0.13" laneChange="none"/>
+                        </lane>
+                    </center>
+                    <right>
+                        <lane id="-1" type="driving" level="false">
+                            <width sOffset="0.0" a="3.0" b="0.0" c="0.0" d="0.0"/>
+                            <width sOffset="20.0" a="3.0" b="0.02" c="0.0" d="0.0"/>
+                        </lane>
+                    </right>
+                </laneSection>
+            </lanes>
+        </road>
+        """
+    )
+    map_parser = XODRParser()
+    points, s_points, headings, normals = map_parser._get_reference_line(xml_road)
+
+    # the reference line is a line followed by a half circle with radius 20 centered at (20, 20)
+    assert points.shape == (len(s_points), 2) and np.all(np.diff(s_points) > 0)
+    assert np.isclose(s_points[-1], 20 + 20 * np.pi, atol=1e-2)
+    on_arc = points[:, 0] > 20
+    assert np.allclose(np.linalg.norm(points[on_arc] - [20, 20], axis=1), 20)
+    assert np.allclose(points[-1], [20, 40])
+    assert np.isclose(headings[0], 0) and np.isclose(abs(headings[-1]), np.pi, atol=1e-2)
+
+    lanes, roadlines, _ = map_parser.load_road(xml_road)
+    assert len(lanes) == 3
+    left_inner, left_outer, right = lanes
+    # the left lanes are stacked outward from the center line in the order of their ids
+    assert np.allclose(left_inner.left_side.coords[0], [0, 3])
+    assert np.allclose(left_outer.left_side.coords[0], [0, 5])
+    assert left_outer.right_side.equals(left_inner.left_side)
+    # the outer side of an arc is parallel to the reference line
+    outer = np.asarray(left_outer.left_side.coords)
+    assert np.allclose(np.linalg.norm(outer[on_arc] - [20, 20], axis=1), 15, atol=1e-3)
+    # the width polynomial starts over at its offset
+    right_side = np.asarray(right.right_side.coords)
+    expected = 20 + 3 + 0.02 * (s_points[on_arc] - 20)
+    assert np.allclose(np.linalg.norm(right_side[on_arc] - [20, 20], axis=1), expected, atol=1e-3)
+
+
+@pytest.mark.map_parser
+def test_xodr_poly3():
+    # the local v axis points to the left of the heading, and the polynomials start from a
+    poly3 = ET.fromstring(
+        """
+        <geometry s="0.0" x="1.0" y="2.0" hdg="1.5707963267948966" length="10.0">
+            <poly3 a="1.0" b="0.0" c="0.02" d="0.0"/>
+        </geometry>
+        """
+    )
+    param_poly3 = ET.fromstring(
+        """
+        <geometry s="0.0" x="1.0" y="2.0" hdg="0.0" length="10.0">
+            <paramPoly3 aU="0.0" bU="10.0" cU="0.0" dU="0.0" aV="0.0" bV="0.0" cV="2.0" dV="1.0" pRange="normalized"/>
+        </geometry>
+        """
+    )
+    param_poly3_arc_length = ET.fromstring(
+        """
+        <geometry s="0.0" x="1.0" y="2.0" hdg="0.0" length="10.0">
+            <paramPoly3 aU="0.0" bU="1.0" cU="0.0" dU="0.0" aV="0.0" bV="0.0" cV="0.02" dV="0.001" pRange="arcLength"/>
+        </geometry>
+        """
+    )
+
+    for tolerance in [None, 0.01]:
+        map_parser = XODRParser(tolerance)
+        points = map_parser._get_poly3(poly3, np.empty(0))
+        assert np.allclose(points[0], [0, 2]) and np.allclose(points[-1], [-2, 12])
+        points = map_parser._get_param_poly3(param_poly3, np.empty(0))
+        assert np.allclose(points[0], [1, 2]) and np.allclose(points[-1], [11, 5])
+        points = map_parser._get_param_poly3(param_poly3_arc_length, np.empty(0))
+        assert np.allclose(points[0], [1, 2]) and np.allclose(points[-1], [11, 5])
+
+
+@pytest.mark.map_parser
+@pytest.mark.parametrize(
+    ("map_path", "continuous"),
+    [
+        ("./test/cases/XodrSamples/ring.xodr", True),
+        ("./test/cases/XodrSamples/cross.xodr", True),
+        ("./test/cases/XodrSamples/SanAntonio.xodr", False),
+    ],
+)
+def test_xodr_adaptive_sampling(map_path, continuous):
+    map_root = ET.parse(map_path).getroot()
+    tolerance = 0.01
+
+    t1 = time.time()
+    map_ = XODRParser().parse(map_root)
+    t2 = time.time()
+    map_adaptive = XODRParser(tolerance).parse(map_root)
+    t3 = time.time()
+
+    assert map_.ids == map_adaptive.ids
+    n_point, n_point_adaptive = 0, 0
+    distances = []
+    for id_, lane in map_.lanes.items():
+        for side in ["left_side", "right_side"]:
+            line = getattr(lane, side)
+            line_adaptive = getattr(map_adaptive.lanes[id_], side)
+            n_point += len(line.coords)
+            n_point_adaptive += len(line_adaptive.coords)
+            # the ends of the lanes are cut by the sampled points, which the fixed steps can miss
+            distances.append(line_adaptive.distance(shapely.points(np.asarray(line.coords)[1:-1])))
+
+    logging.info(
+        "Parsing %s: %d lane points in %.2fms with fixed steps, %d lane points in %.2fms with the tolerance %.2f."
+        % (map_path, n_point, (t2 - t1) * 1e3, n_point_adaptive, (t3 - t2) * 1e3, tolerance)
+    )
+    assert n_point_adaptive * 5 < n_point
+    distances = np.concatenate(distances)
+    if continuous:
+        # the tolerance holds on the lane sides because the arcs and spirals are sampled by the curvature of the outermost lane side
+        assert np.max(distances) <= tolerance
+    else:
+        # the adjacent geometries of this map do not meet exactly, and the lanes jump at the gaps
+        assert np.percentile(distances, 99) <= tolerance
+
+
+@pytest.mark.map_parser
+@pytest.mark.parametrize(
+    "map_path",
+    ["./test/cases/XodrSamples/cross.xodr", "./test/cases/XodrSamples/SanAntonio.xodr"],
+)
+def test_xodr_parser_parallel(map_path):
+    map_root = ET.parse(map_path).getroot()
+    map_parser = XODRParser()
+
+    t1 = time.time()
+    map_ = map_parser.parse(map_root)
+    t2 = time.time()
+    map_parallel = map_parser.parse(map_root, n_workers=2)
+    t3 = time.time()
+    logging.info(
+        "Parsing %s: %.2fms sequentially, %.2fms with 2 workers."
+        % (map_path, (t2 - t1) * 1e3, (t3 - t2) * 1e3)
+    )
+
+    # the ids are assigned by blocks of roads, regardless of the number of workers
+    assert map_.ids == map_parallel.ids
+    assert set(map_.junctions) == set(map_parallel.junctions)
+    for id_, lane in map_.lanes.items():
+        assert lane.geometry.equals(map_parallel.lanes[id_].geometry)
+    for id_, roadline in map_.roadlines.items():
+        assert roadline.geometry.equals(map_parallel.roadlines[id_].geometry)
+
+    block_sizes = [map_parser.get_id_block_size(road) for road in map_root.findall("road")]
+    road_ids = list(map_.lanes) + list(map_.roadlines) + list(map_.areas)
+    assert max(road_ids) < sum(block_sizes) <= min(map_.junctions)
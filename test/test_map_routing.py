@@ -0,0 +1,126 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: test_map_routing.py
+# @Description: This script is used to test the routing module in the map module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+import sys
+
+sys.path.append(".")
+sys.path.append("..")
+
+import logging
+import time
+
+import numpy as np
+import pytest
+from shapely.geometry import LineString
+
+from tactics2d.map.element import Lane, LaneRelationship, Map
+from tactics2d.map.routing import LaneGraph
+
+
+def build_grid_map(n_row: int, n_col: int, lane_length: float = 20, lane_width: float = 3.5):
+    # n_row parallel lanes split into n_col consecutive sections, all heading to +x
+    map_ = Map(name="grid")
+    for row in range(n_row):
+        for col in range(n_col):
+            x0, x1 = col * lane_length, (col + 1) * lane_length
+            y0, y1 = row * lane_width, (row + 1) * lane_width
+            lane = Lane(
+                id_=f"{row}-{col}",
+                left_side=LineString([(x0, y1), (x1, y1)]),
+                right_side=LineString([(x0, y0), (x1, y0)]),
+            )
+            if col < n_col - 1:
+                lane.add_related_lane(f"{row}-{col + 1}", LaneRelationship.SUCCESSOR)
+            if row < n_row - 1:
+                lane.add_related_lane(f"{row + 1}-{col}", LaneRelationship.LEFT_NEIGHBOR)
+            if row > 0:
+                lane.add_related_lane(f"{row - 1}-{col}", LaneRelationship.RIGHT_NEIGHBOR)
+            map_.add_lane(lane)
+
+    return map_
+
+
+def get_route_cost(lane_graph: LaneGraph, route: list) -> float:
+    cost = 0
+    for origin, target in zip(route[:-1], route[1:]):
+        i, j = lane_graph.lane_ids.index(origin), lane_graph.lane_ids.index(target)
+        edges = lane_graph.indices[lane_graph.indptr[i] : lane_graph.indptr[i + 1]]
+        assert j in edges
+        cost += lane_graph.costs[lane_graph.indptr[i] + np.where(edges == j)[0][0]]
+    return cost
+
+
+@pytest.mark.map_routing
+def test_lane_graph():
+    map_ = build_grid_map(3, 10)
+    lane_graph = LaneGraph(map_, lane_change_cost=5)
+
+    assert lane_graph.n_lane == 30
+    assert len(lane_graph.indptr) == 31
+    assert len(lane_graph.indices) == 3 * 9 + 2 * 2 * 10
+
+    route, cost = lane_graph.shortest_path("0-0", "2-9")
+    assert route[0] == "0-0" and route[-1] == "2-9"
+    assert np.isclose(cost, 9 * 20 + 2 * 5)
+    assert np.isclose(get_route_cost(lane_graph, route), cost)
+
+    route, cost = lane_graph.shortest_path("0-5", "0-2", method="dijkstra")
+    assert route is None and np.isinf(cost)
+
+    with pytest.raises(KeyError):
+        lane_graph.shortest_path("0-0", "9-9")
+
+
+@pytest.mark.map_routing
+@pytest.mark.parametrize("n_row, n_col", [(4, 50), (6, 500)])
+def test_routing_batch(n_row: int, n_col: int):
+    map_ = build_grid_map(n_row, n_col)
+    lane_graph = LaneGraph(map_, lane_change_cost=5, cache_size=16)
+
+    rng = np.random.default_rng(0)
+    origins = [f"{rng.integers(n_row)}-{rng.integers(n_col // 2)}" for _ in range(10)]
+    destinations = [f"{rng.integers(n_row)}-{rng.integers(n_col)}" for _ in range(10)]
+
+    t1 = time.time()
+    costs = lane_graph.cost_matrix(origins, destinations)
+    t2 = time.time()
+    routes = lane_graph.shortest_paths(origins, destinations)
+    t3 = time.time()
+
+    for i, origin in enumerate(origins):
+        for j, destination in enumerate(destinations):
+            route, cost = lane_graph.shortest_path(origin, destination)
+            _, cost_dijkstra = lane_graph.shortest_path(origin, destination, method="dijkstra")
+            assert np.isclose(cost, costs[i, j]) or (np.isinf(cost) and np.isinf(costs[i, j]))
+            assert np.isclose(cost_dijkstra, costs[i, j]) or np.isinf(costs[i, j])
+            assert np.isclose(routes[i][j][1], costs[i, j]) or np.isinf(costs[i, j])
+            if route is not None:
+                assert np.isclose(get_route_cost(lane_graph, routes[i][j][0]), cost)
+    t4 = time.time()
+
+    assert len(lane_graph._cache) <= 16
+    logging.info(
+        "Lane graph with %d lanes: %d x %d cost matrix in %.2fms, routes in %.2fms, %d single queries in %.2fms."
+        % (
+            lane_graph.n_lane,
+            len(origins),
+            len(destinations),
+            (t2 - t1) * 1e3,
+            (t3 - t2) * 1e3,
+            2 * len(origins) * len(destinations),
+            (t4 - t3) * 1e3,
+        )
+    )
+
+    # the cached route is returned without searching again
+    route, _ = lane_graph.shortest_path(origins[-1], destinations[-1])
+    t1 = time.time()
+    cached_route, _ = lane_graph.shortest_path(origins[-1], destinations[-1])
+    t2 = time.time()
+    assert cached_route is route
+    assert t2 - t1 < 1e-3
@@ -0,0 +1,300 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: test_math_geometry.py
+# @Description: This script is used to test the geometry module in the math module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+import sys
+
+sys.path.append(".")
+sys.path.append("..")
+
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString, Polygon
+
+from tactics2d.math.geometry import OBB, AdaptiveSampler, Circle, FrenetFrame
+from tactics2d.math.interpolate import Spiral
+
+
+def random_obbs(n: int, rng: np.random.Generator) -> np.ndarray:
+    return OBB.get_vertices(
+        rng.uniform(-3, 3, (n, 2)),
+        rng.uniform(-np.pi, np.pi, n),
+        rng.uniform(1, 5, n),
+        rng.uniform(1, 3, n),
+    )
+
+
+@pytest.mark.math
+@pytest.mark.parametrize(
+    "vertices1, vertices2",
+    [
+        # identical boxes
+        ([[0, 0], [4, 0], [4, 2], [0, 2]], [[0, 0], [4, 0], [4, 2], [0, 2]]),
+        # boxes sharing an edge in opposite orientations
+        ([[0, 0], [4, 0], [4, 2], [0, 2]], [[4, 0], [4, 2], [8, 2], [8, 0]]),
+        # one box contains the other
+        ([[0, 0], [4, 0], [4, 2], [0, 2]], [[1, 0.5], [2, 0.5], [2, 1.5], [1, 1.5]]),
+        # disjoint boxes
+        ([[0, 0], [4, 0], [4, 2], [0, 2]], [[10, 0], [14, 0], [14, 2], [10, 2]]),
+        # rotated boxes
+        ([[0, 0], [4, 0], [4, 2], [0, 2]], [[2, -1], [4, 1], [2, 3], [0, 1]]),
+    ],
+)
+def test_obb_cases(vertices1, vertices2):
+    vertices1 = np.array(vertices1, dtype=float)
+    vertices2 = np.array(vertices2, dtype=float)
+    polygon1, polygon2 = Polygon(vertices1), Polygon(vertices2)
+    expected = polygon1.intersection(polygon2).area
+
+    assert np.isclose(OBB.intersection_area(vertices1, vertices2), expected)
+    assert np.isclose(OBB.intersection_area_batch(vertices1, vertices2), expected)
+    assert np.isclose(OBB.iou(vertices1, vertices2), expected / polygon1.union(polygon2).area)
+
+    vertices, is_rectangle = OBB.from_geometry(polygon2)
+    assert is_rectangle
+    assert np.allclose(vertices, vertices2)
+
+
+@pytest.mark.math
+def test_obb_from_geometry():
+    geometries = [
+        Polygon([(0, 0), (4, 0), (4, 2), (0, 2)]),
+        Polygon([(0, 0), (4, 0), (5, 2), (1, 2)]),
+        Polygon([(0, 0), (4, 0), (4, 2), (2, 3), (0, 2)]),
+        Polygon([(0, 0), (4, 0), (4, 2), (0, 2)], [[(1, 1), (2, 1), (2, 1.5)]]),
+    ]
+    _, is_rectangle = OBB.from_geometry(geometries)
+    assert is_rectangle.tolist() == [True, False, False, False]
+
+
+@pytest.mark.math
+@pytest.mark.parametrize("n_pair", [1000, 20000])
+def test_obb_batch(n_pair: int):
+    rng = np.random.default_rng(0)
+    vertices1 = random_obbs(n_pair, rng)
+    vertices2 = random_obbs(n_pair, rng)
+    polygons1 = shapely.polygons(vertices1)
+    polygons2 = shapely.polygons(vertices2)
+
+    t1 = time.time()
+    areas = OBB.intersection_area_batch(vertices1, vertices2)
+    t2 = time.time()
+    expected = shapely.area(shapely.intersection(polygons1, polygons2))
+    t3 = time.time()
+
+    assert np.allclose(areas, expected, atol=1e-9)
+
+    if t2 - t1 > t3 - t2:
+        logging.warning(
+            "The batched OBB intersection is %.2f times slower than shapely. The efficiency needs further improvement."
+            % ((t2 - t1) / (t3 + 1e-6 - t2))
+        )
+
+    t1 = time.time()
+    areas = [OBB.intersection_area(v1, v2) for v1, v2 in zip(vertices1[:1000], vertices2[:1000])]
+    t2 = time.time()
+    expected = [p1.intersection(p2).area for p1, p2 in zip(polygons1[:1000], polygons2[:1000])]
+    t3 = time.time()
+
+    assert np.allclose(areas, expected, atol=1e-9)
+
+    if t2 - t1 > t3 - t2:
+        logging.warning(
+            "The single-pair OBB intersection is %.2f times slower than shapely. The efficiency needs further improvement."
+            % ((t2 - t1) / (t3 + 1e-6 - t2))
+        )
+
+    iou = OBB.iou_batch(vertices1[:50, None], vertices2[None, :30])
+    assert iou.shape == (50, 30)
+    assert np.all((iou >= 0) & (iou <= 1 + 1e-9))
+
+
+@pytest.mark.math
+@pytest.mark.parametrize("n", [100, 10000])
+def test_circle_batch(n: int):
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-1000, 1000, (n, 2))
+    radii = rng.uniform(0.5, 50, n)
+    angles = np.sort(rng.uniform(-np.pi, np.pi, (n, 3)), axis=1)
+    points = centers[:, None] + radii[:, None, None] * np.stack(
+        [np.cos(angles), np.sin(angles)], axis=-1
+    )
+
+    centers_, radii_ = Circle.get_circle_by_three_points_batch(
+        points[:, 0], points[:, 1], points[:, 2]
+    )
+    assert np.allclose(centers_, centers, atol=1e-6) and np.allclose(radii_, radii)
+    for i in range(min(n, 100)):
+        center, radius = Circle.get_circle_by_three_points(*points[i])
+        assert np.allclose(center, centers_[i]) and np.isclose(radius, radii_[i])
+    centers_, radii_ = Circle.get_circle_by_three_points_batch([0, 0], [1, 1], [2, 2])
+    assert np.all(np.isnan(centers_)) and np.isinf(radii_[0])
+
+    headings = rng.uniform(-np.pi, np.pi, n)
+    sides = np.where(rng.random(n) > 0.5, "L", "R")
+    centers_, radii_ = Circle.get_circle_by_tangent_vector_batch(
+        points[:, 0], headings, radii, sides
+    )
+    for i in range(min(n, 100)):
+        center, radius = Circle.get_circle_by_tangent_vector(
+            points[i, 0], headings[i], radii[i], sides[i]
+        )
+        assert np.allclose(center, centers_[i]) and np.isclose(radius, radii_[i])
+
+    # the ragged arcs match the arcs sampled one by one
+    delta_angles = rng.uniform(0, 2 * np.pi, n)
+    start_angles = rng.uniform(-np.pi, np.pi, n)
+    clockwise = rng.random(n) > 0.5
+    for kwargs in [{"step_size": 0.5}, {"tolerance": 0.01}]:
+        t1 = time.time()
+        arc_points, arc_angles, offsets = Circle.get_arc_batch(
+            centers, radii, delta_angles, start_angles, clockwise, **kwargs
+        )
+        t2 = time.time()
+        for i in range(n):
+            arc = Circle.get_arc(
+                centers[i], radii[i], delta_angles[i], start_angles[i], clockwise[i], **kwargs
+            )
+            assert np.allclose(arc_points[offsets[i] : offsets[i + 1]], arc, atol=1e-8)
+        t3 = time.time()
+        assert np.allclose(
+            np.linalg.norm(arc_points - np.repeat(centers, np.diff(offsets), axis=0), axis=1),
+            np.repeat(radii, np.diff(offsets)),
+        )
+        logging.info(
+            "%d arcs with %s: %d points in a batch in %.2fms, one by one in %.2fms."
+            % (n, kwargs, offsets[-1], (t2 - t1) * 1e3, (t3 - t2) * 1e3)
+        )
+
+    arc_points, arc_angles, offsets = Circle.get_arc_batch(
+        centers, radii, delta_angles, start_angles, clockwise, n_points=5
+    )
+    assert np.all(np.diff(offsets) == 5)
+    signs = np.where(clockwise, -1, 1)
+    assert np.allclose(arc_angles[offsets[:-1]], start_angles)
+    assert np.allclose(arc_angles[offsets[1:] - 1], start_angles + signs * delta_angles)
+
+
+@pytest.mark.math
+def test_frenet_frame():
+    x = np.linspace(0, 50, 200)
+    polyline = np.stack([x, 5 * np.sin(x / 8)], axis=1)
+    frenet_frame = FrenetFrame(polyline)
+    line = LineString(polyline)
+    assert np.isclose(frenet_frame.length, line.length)
+
+    rng = np.random.default_rng(0)
+    s = rng.uniform(1, frenet_frame.length - 1, 1000)
+    d = rng.uniform(-1.5, 1.5, 1000)
+    points, headings = frenet_frame.to_cartesian(s, d)
+
+    t1 = time.time()
+    s_, d_, headings_ = frenet_frame.project(points)
+    t2 = time.time()
+    s_shapely = line.project(shapely.points(points))
+    distance_shapely = line.distance(shapely.points(points))
+    t3 = time.time()
+
+    assert np.allclose(s_, s_shapely, atol=1e-6)
+    assert np.allclose(np.abs(d_), distance_shapely, atol=1e-6)
+    # a point offset to the concave side near a vertex can be projected onto the next segment
+    assert np.allclose(s_, s, atol=0.05) and np.allclose(d_, d, atol=1e-3)
+    assert np.allclose(headings_, headings, atol=0.05)
+
+    if t2 - t1 > t3 - t2:
+        logging.warning(
+            "The Frenet projection is %.2f times slower than shapely. The efficiency needs further improvement."
+            % ((t2 - t1) / (t3 + 1e-6 - t2))
+        )
+
+
+@pytest.mark.math
+def test_frenet_frame_long():
+    x = np.linspace(0, 2000, 4000)
+    polyline = np.stack([x, 50 * np.sin(x / 40)], axis=1)
+    frenet_frame = FrenetFrame(polyline)
+    line = LineString(polyline)
+
+    rng = np.random.default_rng(0)
+    points, _ = frenet_frame.to_cartesian(
+        rng.uniform(0, frenet_frame.length, 20000), rng.uniform(-3, 3, 20000)
+    )
+
+    tracemalloc.start()
+    t1 = time.time()
+    s, d, _ = frenet_frame.project(points)
+    t2 = time.time()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logging.info(
+        "Projecting %d points onto %d vertices takes %.2fms with the peak memory %.2fMB."
+        % (len(points), len(polyline), (t2 - t1) * 1e3, peak / 1e6)
+    )
+
+    assert np.allclose(s, line.project(shapely.points(points)), atol=1e-6)
+    assert np.allclose(np.abs(d), line.distance(shapely.points(points)), atol=1e-6)
+    # the memory grows with the number of points, not with the points times the segments
+    assert peak < 100e6
+
+
+@pytest.mark.math
+@pytest.mark.parametrize("tolerance", [0.001, 0.05])
+def test_adaptive_sampler(tolerance: float):
+    def get_deviation(samples, dense):
+        return np.max(LineString(samples).distance(shapely.points(dense)))
+
+    # the chord of the longest step deviates from the arc by the tolerance
+    curvature = np.array([0.0, 0.01, 0.2, 1 / tolerance, 10 / tolerance])
+    steps = AdaptiveSampler.get_step(curvature, tolerance)
+    assert np.isinf(steps[0])
+    radius = 1 / curvature[1:4]
+    assert np.allclose(radius * (1 - np.cos(steps[1:4] * curvature[1:4] / 2)), tolerance)
+    assert np.isclose(steps[-1], np.pi / curvature[-1])
+
+    # an arc
+    center = np.array([1.0, 2.0])
+    arc = Circle.get_arc(center, 10, np.pi, 0.5, clockwise=True, tolerance=tolerance)
+    dense = Circle.get_arc(center, 10, np.pi, 0.5, clockwise=True, step_size=0.001)
+    assert np.allclose(np.linalg.norm(arc - center, axis=1), 10)
+    assert np.allclose(arc[-1], center + 10 * np.array([np.cos(0.5 - np.pi), np.sin(0.5 - np.pi)]))
+    assert get_deviation(arc, dense) <= tolerance * (1 + 1e-6)
+    logging.info(
+        "Arc with tolerance %.3f: %d points instead of %d." % (tolerance, len(arc), len(dense))
+    )
+
+    # a clothoid whose curvature changes sign
+    length, start_curvature, gamma = 80, -0.2, 0.005
+    s = AdaptiveSampler.sample_by_curvature(
+        length, tolerance, start_curvature, start_curvature + gamma * length
+    )
+    assert np.isclose(s[0], 0) and np.isclose(s[-1], length) and np.all(np.diff(s) > 0)
+    clothoid = Spiral.evaluate(s, [0, 0], 0.3, start_curvature, gamma)
+    dense = Spiral.evaluate(np.linspace(0, length, 100000), [0, 0], 0.3, start_curvature, gamma)
+    assert get_deviation(clothoid, dense) <= tolerance * (1 + 1e-6)
+    assert np.allclose(
+        Spiral.get_spiral(length, [0, 0], 0.3, start_curvature, gamma, tolerance), clothoid
+    )
+    logging.info(
+        "Clothoid with tolerance %.3f: %d points instead of %d."
+        % (tolerance, len(s), len(Spiral.get_spiral(length, [0, 0], 0.3, start_curvature, gamma)))
+    )
+
+    # a straight line only keeps its ends unless the step is bounded
+    assert np.allclose(AdaptiveSampler.sample_by_curvature(100, tolerance, 0), [0, 100])
+    assert len(AdaptiveSampler.sample_by_curvature(100, tolerance, 0, max_step=3)) == 35
+
+    # a general parametric curve
+    function = lambda t: np.column_stack([t, np.sin(t) * np.exp(-t / 10)])
+    params = AdaptiveSampler.sample_by_subdivision(function, 0, 30, tolerance)
+    assert np.isclose(params[0], 0) and np.isclose(params[-1], 30) and np.all(np.diff(params) > 0)
+    # only the quarters of the intervals are checked, so the deviation can slightly exceed the tolerance
+    assert get_deviation(function(params), function(np.linspace(0, 30, 100000))) <= tolerance * 1.1
@@ -13,6 +13,7 @@ sys.path.append("..")
 
 import logging
 import time
+import warnings
 
 # import dubins
 import numpy as np
@@ -109,6 +110,56 @@ def test_bezier(order: int, control_points: np.ndarray, n_interpolation: int):
         )
 
 
+@pytest.mark.math
+@pytest.mark.parametrize("order, n_curve", [(2, 10), (5, 10000)])
+def test_bezier_batch(order: int, n_curve: int):
+    rng = np.random.default_rng(0)
+    control_points = rng.uniform(-10, 10, (n_curve, order + 1, 2))
+    bezier = Bezier(order)
+
+    ts = np.linspace(0, 1, 50)
+    t1 = time.time()
+    curves = bezier.get_curve(control_points, 50)
+    t2 = time.time()
+    for i in range(min(n_curve, 100)):
+        curves[i] = [bezier.de_casteljau(control_points[i], t, order) for t in ts]
+    t3 = time.time()
+    assert np.allclose(curves, bezier.get_curve(control_points, 50))
+    logging.info(
+        "Bezier curves of order %d: %d curves interpolated in %.2fms in a batch, %d curves in %.2fms one by one."
+        % (order, n_curve, (t2 - t1) * 1e3, min(n_curve, 100), (t3 - t2) * 1e3)
+    )
+
+    # the derivatives and curvature compared with the finite differences
+    ts = np.linspace(0.1, 0.9, 9)
+    h = 1e-5
+    first = (bezier.evaluate(control_points, ts + h) - bezier.evaluate(control_points, ts - h)) / (
+        2 * h
+    )
+    assert np.allclose(bezier.evaluate(control_points, ts, 1), first, rtol=1e-4, atol=1e-4)
+    second = (
+        bezier.evaluate(control_points, ts + h, 1) - bezier.evaluate(control_points, ts - h, 1)
+    ) / (2 * h)
+    assert np.allclose(bezier.evaluate(control_points, ts, 2), second, rtol=1e-4, atol=1e-4)
+    curvature = (first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]) / np.linalg.norm(
+        first, axis=-1
+    ) ** 3
+    assert np.allclose(bezier.get_curvature(control_points, ts), curvature, rtol=1e-3, atol=1e-3)
+    assert np.allclose(bezier.evaluate(control_points, ts, order + 1), 0)
+
+    # the adaptive samples keep the curve within the tolerance from the polyline
+    tolerance = 0.01
+    for i in range(min(n_curve, 10)):
+        points = bezier.get_curve_adaptive(control_points[i], tolerance)
+        assert np.allclose(points[[0, -1]], control_points[i, [0, -1]])
+        dense = bezier.get_curve(control_points[i], 5000)
+        segments = points[1:] - points[:-1]
+        offsets = dense[:, None] - points[None, :-1]
+        ratios = np.clip(np.sum(offsets * segments, axis=-1) / np.sum(segments**2, axis=-1), 0, 1)
+        distances = np.linalg.norm(offsets - ratios[..., None] * segments, axis=-1)
+        assert np.max(np.min(distances, axis=1)) <= tolerance + 1e-9
+
+
 @pytest.mark.math
 @pytest.mark.parametrize(
     "degree, control_points, knots, n_interpolation",
@@ -202,6 +253,66 @@ def test_b_spline(degree: int, control_points: np.ndarray, knots: np.ndarray, n_
         )
 
 
+@pytest.mark.math
+@pytest.mark.parametrize("degree, n_control_point", [(2, 10), (3, 2000)])
+def test_b_spline_derivatives(degree: int, n_control_point: int):
+    rng = np.random.default_rng(0)
+    control_points = np.stack(
+        [np.cumsum(rng.uniform(0.5, 1, n_control_point)), rng.uniform(-1, 1, n_control_point)],
+        axis=1,
+    )
+    # a clamped knot vector so that the curve passes the first and last control points
+    knots = np.concatenate(
+        [
+            np.zeros(degree),
+            np.linspace(0, 1, n_control_point - degree + 1),
+            np.ones(degree),
+        ]
+    )
+    bspline = BSpline(degree)
+    sci_bspline = SciBSpline(knots, control_points, degree)
+    us = np.linspace(0, 1, 10 * n_control_point)
+
+    t1 = time.time()
+    points = bspline.evaluate(control_points, us, knots)
+    t2 = time.time()
+    assert np.allclose(points, sci_bspline(us))
+    assert np.allclose(points[[0, -1]], control_points[[0, -1]])
+    for derivative in [1, 2]:
+        assert np.allclose(
+            bspline.evaluate(control_points, us, knots, derivative),
+            sci_bspline.derivative(derivative)(us),
+        )
+    assert np.allclose(bspline.get_basis(knots, us) @ control_points, points)
+    logging.info(
+        "B-spline with %d control points: %d points evaluated in %.2fms."
+        % (n_control_point, len(us), (t2 - t1) * 1e3)
+    )
+
+    first = sci_bspline.derivative(1)(us)
+    second = sci_bspline.derivative(2)(us)
+    curvature = (first[:, 0] * second[:, 1] - first[:, 1] * second[:, 0]) / np.linalg.norm(
+        first, axis=1
+    ) ** 3
+    assert np.allclose(bspline.get_curvature(control_points, us, knots), curvature)
+
+    # the batch of curves sharing the knot vector
+    batch = control_points + rng.uniform(-0.1, 0.1, (4, n_control_point, 2))
+    curves = bspline.get_curve(batch, knots, n_interpolation=100)
+    assert curves.shape == (4, 100, 2)
+    for i in range(4):
+        assert np.allclose(curves[i], bspline.get_curve(batch[i], knots, n_interpolation=100))
+
+    # the arc lengths at the parameters match a much denser arc length table
+    _, lengths = bspline.get_arc_length_table(control_points, knots, n_sample=20 * n_control_point)
+    s = np.linspace(0, lengths[-1], 1000)
+    us = bspline.get_arc_length_parameters(control_points, s, knots, n_sample=20 * n_control_point)
+    dense_us, dense_lengths = bspline.get_arc_length_table(
+        control_points, knots, n_sample=500 * n_control_point
+    )
+    assert np.allclose(np.interp(us, dense_us, dense_lengths), s, atol=1e-3 * lengths[-1])
+
+
 @pytest.mark.math
 @pytest.mark.parametrize(
     "boundary_type, n, control_points, n_interpolation",
@@ -275,6 +386,81 @@ def test_cubic_spline(boundary_type: str, n: int, control_points: np.ndarray, n_
         )
 
 
+@pytest.mark.math
+@pytest.mark.parametrize("boundary_type", ["natural", "clamped", "not-a-knot"])
+@pytest.mark.parametrize("n", [3, 100000])
+def test_cubic_spline_evaluate(boundary_type: str, n: int):
+    rng = np.random.default_rng(0)
+    control_points = np.stack([np.cumsum(rng.uniform(0.1, 1, n)), rng.uniform(-1, 1, n)], axis=1)
+    xx = (0.5, -0.5)
+    if boundary_type == "natural":
+        cubic_spline = CubicSpline(CubicSpline.BoundaryType.Natural)
+        sci_cubic = SciCubic(control_points[:, 0], control_points[:, 1], bc_type="natural")
+    elif boundary_type == "clamped":
+        cubic_spline = CubicSpline(CubicSpline.BoundaryType.Clamped)
+        sci_cubic = SciCubic(
+            control_points[:, 0], control_points[:, 1], bc_type=((1, xx[0]), (1, xx[1]))
+        )
+    else:
+        cubic_spline = CubicSpline(CubicSpline.BoundaryType.NotAKnot)
+        sci_cubic = SciCubic(control_points[:, 0], control_points[:, 1], bc_type="not-a-knot")
+
+    t1 = time.time()
+    curve = cubic_spline.get_curve(control_points, xx, n_interpolation=10)
+    t2 = time.time()
+    assert curve.shape == (10 * (n - 1) + 1, 2)
+    assert np.allclose(curve[:, 1], sci_cubic(curve[:, 0]))
+    logging.info(
+        "Cubic spline with %d control points: %d points interpolated in %.2fms."
+        % (n, len(curve), (t2 - t1) * 1e3)
+    )
+
+    # the query at arbitrary x coordinates, including the extrapolation out of the control points
+    x = rng.uniform(control_points[0, 0] - 1, control_points[-1, 0] + 1, 1000)
+    parameters = cubic_spline.get_parameters(control_points, xx)
+    for derivative in range(4):
+        assert np.allclose(
+            cubic_spline.evaluate(control_points, x, xx, derivative, parameters),
+            sci_cubic(x, derivative),
+        )
+
+
+@pytest.mark.math
+@pytest.mark.parametrize("n, step, tolerance", [(10, 0.5, 0.1), (10000, 0.1, 1e-3)])
+def test_cubic_spline_parametric(n: int, step: float, tolerance: float):
+    # the control points on a circle, which are not monotonic in x
+    radius = 10
+    theta = np.linspace(0, 2 * np.pi, n)
+    control_points = np.stack([radius * np.cos(theta), radius * np.sin(theta)], axis=1)
+    cubic_spline = CubicSpline(CubicSpline.BoundaryType.NotAKnot)
+
+    s, a, _, _, _ = cubic_spline.get_parametric_parameters(control_points)
+    assert np.allclose(a, control_points[:-1])
+    sci_cubic = SciCubic(s, control_points, bc_type="not-a-knot")
+
+    t1 = time.time()
+    curve = cubic_spline.get_parametric_curve(control_points, step)
+    t2 = time.time()
+    assert np.allclose(curve[[0, -1]], control_points[[0, -1]])
+    distances = np.linalg.norm(curve[1:] - curve[:-1], axis=1)
+    assert np.allclose(distances[:-1], step, rtol=1e-2)
+    assert np.all(distances[-1] <= step * (1 + 1e-2))
+    assert np.allclose(np.linalg.norm(curve, axis=1), radius, atol=tolerance)
+    s_dense = np.linspace(0, s[-1], 100000)
+    assert np.allclose(
+        np.sum(np.linalg.norm(np.diff(sci_cubic(s_dense), axis=0), axis=1)),
+        np.sum(distances),
+        rtol=1e-3,
+    )
+    logging.info(
+        "Parametric cubic spline with %d control points: %d points at equal arc lengths interpolated in %.2fms."
+        % (n, len(curve), (t2 - t1) * 1e3)
+    )
+
+    with pytest.raises(ValueError, match="The adjacent control points must be different."):
+        cubic_spline.get_parametric_curve(np.array([[0, 0], [1, 1], [1, 1], [2, 0]]))
+
+
 @pytest.mark.math
 @pytest.mark.parametrize(
     "radius, start_point, start_heading, end_point, end_heading, step_size",
@@ -330,6 +516,119 @@ def test_dubins(radius, start_point, start_heading, end_point, end_heading, step
     #     )
 
 
+@pytest.mark.math
+@pytest.mark.parametrize("n", [100, 10000])
+def test_dubins_batch(n):
+    rng = np.random.default_rng(0)
+    start_points = rng.uniform(-20, 20, (n, 2))
+    end_points = rng.uniform(-20, 20, (n, 2))
+    start_headings = rng.uniform(-np.pi, np.pi, n)
+    end_headings = rng.uniform(-np.pi, np.pi, n)
+    dubins = Dubins(3)
+
+    t1 = time.time()
+    lengths, segments, types = dubins.get_path_batch(
+        start_points, start_headings, end_points, end_headings
+    )
+    t2 = time.time()
+    n_single = min(n, 100)
+    for i in range(n_single):
+        paths = dubins.get_all_path(
+            start_points[i], start_headings[i], end_points[i], end_headings[i]
+        )
+        path = dubins.get_path(start_points[i], start_headings[i], end_points[i], end_headings[i])
+        assert np.isclose(path.length, min(p.length for p in paths if p is not None))
+        assert np.isclose(path.length, lengths[i])
+        assert path.curve_type == dubins.curve_types[types[i]]
+    t3 = time.time()
+    logging.info(
+        "Dubins: %d paths in a batch in %.2fms, %d single paths in %.2fms."
+        % (n, (t2 - t1) * 1e3, n_single, (t3 - t2) * 1e3)
+    )
+
+    assert np.allclose(segments.sum(axis=1), lengths)
+    path = dubins.build_path(types[0], segments[0])
+    path.get_curve_line(start_points[0], start_headings[0], dubins.radius, 0.01)
+    assert np.linalg.norm(path.curve[-1] - end_points[0]) < 0.05
+
+
+@pytest.mark.math
+def test_curve_end_pose():
+    # every candidate path, not only the shortest one, should reach the goal pose, which is kept
+    # when the arcs are sampled by the tolerance
+    rng = np.random.default_rng(0)
+    dubins = Dubins(3)
+    rs = ReedsShepp(3)
+    n_checked = {"dubins": 0, "reeds_shepp": 0}
+
+    for _ in range(20):
+        start_point, end_point = rng.uniform(-15, 15, (2, 2))
+        start_heading, end_heading = rng.uniform(-np.pi, np.pi, 2)
+        for name, interpolator in [("dubins", dubins), ("reeds_shepp", rs)]:
+            paths = interpolator.get_all_path(start_point, start_heading, end_point, end_heading)
+            for path in paths:
+                if path is None:
+                    continue
+                path.get_curve_line(start_point, start_heading, interpolator.radius, tolerance=0.01)
+                assert np.linalg.norm(path.curve[-1] - end_point) < 1e-6
+                heading_error = np.mod(path.yaw[-1] - end_heading + np.pi, 2 * np.pi) - np.pi
+                assert abs(heading_error) < 1e-6
+                n_checked[name] += 1
+
+    assert n_checked["dubins"] > 0 and n_checked["reeds_shepp"] > 0
+
+
+@pytest.mark.math
+def test_dubins_table(tmp_path):
+    t1 = time.time()
+    table = DubinsTable(3, (-15, 15), (-15, 15), 0.5, 36)
+    t2 = time.time()
+    assert table.lengths.shape == (61, 61, 36)
+
+    file_path = str(tmp_path / "dubins.bin")
+    table.save(file_path)
+    loaded = DubinsTable.load(file_path)
+    assert isinstance(loaded.lengths, np.memmap)
+    assert np.array_equal(loaded.lengths, table.lengths)
+    assert loaded.radius == 3 and loaded.x_range == (-15, 15)
+
+    # the poses on the grid are looked up exactly
+    dubins = Dubins(3)
+    rng = np.random.default_rng(0)
+    n = 10000
+    start_points = rng.uniform(-50, 50, (n, 2))
+    start_headings = rng.uniform(-np.pi, np.pi, n)
+    cells = rng.integers(0, [61, 61, 36], (n, 3))
+    offsets = cells[:, :2] * 0.5 - 15
+    cos, sin = np.cos(start_headings), np.sin(start_headings)
+    end_points = start_points + np.stack(
+        [offsets[:, 0] * cos - offsets[:, 1] * sin, offsets[:, 0] * sin + offsets[:, 1] * cos],
+        axis=1,
+    )
+    end_headings = start_headings + cells[:, 2] * 2 * np.pi / 36
+    exact, _, _ = dubins.get_path_batch(start_points, start_headings, end_points, end_headings)
+    t3 = time.time()
+    lengths = loaded.lookup(start_points, start_headings, end_points, end_headings)
+    t4 = time.time()
+    # the length is discontinuous when the start and goal points coincide
+    on_start = np.all(offsets == 0, axis=1)
+    assert np.allclose(lengths[~on_start], exact[~on_start], atol=1e-3)
+    logging.info(
+        "Dubins table with %d cells built in %.2fms, %d lookups in %.2fms."
+        % (table.lengths.size, (t2 - t1) * 1e3, n, (t4 - t3) * 1e3)
+    )
+
+    # the poses out of the table are solved exactly
+    far = np.array([[40.0, 0.0]])
+    assert np.isclose(
+        loaded.lookup([[0, 0]], [0], far, [0])[0],
+        dubins.get_path_batch([[0, 0]], [0], far, [0])[0][0],
+    )
+
+    with pytest.raises(ValueError):
+        DubinsTable(3, (-15, 15), (-15, 15), 0.5, 36, lengths=np.zeros((2, 2, 2)))
+
+
 @pytest.mark.math
 @pytest.mark.parametrize(
     "radius, start_point, start_heading, end_point, end_heading, step_size",
@@ -362,6 +661,69 @@ def test_reeds_shepp(radius, start_point, start_heading, end_point, end_heading,
     assert abs(path.length - curve_length) / min(path.length, curve_length) < 0.01
 
 
+@pytest.mark.math
+@pytest.mark.parametrize("n", [100, 10000])
+def test_reeds_shepp_batch(n):
+    rng = np.random.default_rng(0)
+    start_points = rng.uniform(-20, 20, (n, 2))
+    end_points = rng.uniform(-20, 20, (n, 2))
+    start_headings = rng.uniform(-np.pi, np.pi, n)
+    end_headings = rng.uniform(-np.pi, np.pi, n)
+    rs = ReedsShepp(3)
+
+    t1 = time.time()
+    lengths, segments, families = rs.get_path_batch(
+        start_points, start_headings, end_points, end_headings
+    )
+    t2 = time.time()
+    n_single = min(n, 100)
+    for i in range(n_single):
+        paths = rs.get_all_path(start_points[i], start_headings[i], end_points[i], end_headings[i])
+        path = rs.get_path(start_points[i], start_headings[i], end_points[i], end_headings[i])
+        assert np.isclose(path.length, min(p.length for p in paths if p is not None))
+        assert np.isclose(path.length, lengths[i])
+        assert path.actions == paths[families[i]].actions
+    t3 = time.time()
+    logging.info(
+        "Reeds-Shepp: %d paths in a batch in %.2fms, %d single paths in %.2fms."
+        % (n, (t2 - t1) * 1e3, n_single, (t3 - t2) * 1e3)
+    )
+
+    assert np.all(families >= 0)
+    assert np.allclose(np.abs(segments).sum(axis=1), lengths)
+
+    # the curve built from the batch result reaches the goal pose
+    for i in range(5):
+        path = rs.build_path(families[i], segments[i])
+        path.get_curve_line(start_points[i], start_headings[i], rs.radius, 0.01)
+        assert np.isclose(path.length, lengths[i])
+        assert np.linalg.norm(path.curve[-1] - end_points[i]) < 0.05
+        heading_error = np.mod(path.yaw[-1] - end_headings[i] + np.pi, 2 * np.pi) - np.pi
+        assert abs(heading_error) < 1e-2
+    assert rs.build_path(-1, np.zeros(5)) is None
+
+
+@pytest.mark.math
+def test_reeds_shepp_no_warning():
+    rng = np.random.default_rng(0)
+    # the goals behind the start with the opposite heading make some invalid families divide by zero
+    end_points = np.concatenate([[[-9, 0], [-10, 0]], rng.uniform(-20, 20, (1000, 2))])
+    end_headings = np.concatenate([[np.pi, np.pi], rng.uniform(-np.pi, np.pi, 1000)])
+    start_points = np.zeros_like(end_points)
+    start_headings = np.zeros_like(end_headings)
+    rs = ReedsShepp(5)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        lengths, _, families = rs.get_path_batch(
+            start_points, start_headings, end_points, end_headings
+        )
+        path = rs.get_path(start_points[0], start_headings[0], end_points[0], end_headings[0])
+
+    assert np.all(np.isfinite(lengths)) and np.all(families >= 0)
+    assert np.isclose(path.length, lengths[0])
+
+
 @pytest.mark.math
 @pytest.mark.parametrize("length, n_interpolation", [(5, 500), (10, 1000), (105, 10000)])
 def test_spiral(length, n_interpolation):
@@ -0,0 +1,176 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: test_planner.py
+# @Description: This script is used to test the planner module.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+import sys
+
+sys.path.append(".")
+sys.path.append("..")
+
+import logging
+import time
+
+import numpy as np
+import pytest
+from shapely.affinity import affine_transform
+from shapely.geometry import Polygon
+
+from tactics2d.map.element import Map
+from tactics2d.map.generator import ParkingLotGenerator
+from tactics2d.math.interpolate import ReedsShepp
+from tactics2d.participant.element import Vehicle
+from tactics2d.physics import PointMass, SingleTrackKinematics
+from tactics2d.planner import HybridAStar, SpeedProfiler
+
+
+def get_bbox(pose: np.ndarray, length: float, width: float) -> Polygon:
+    bbox = Polygon(
+        [
+            [0.5 * length, -0.5 * width],
+            [0.5 * length, 0.5 * width],
+            [-0.5 * length, 0.5 * width],
+            [-0.5 * length, -0.5 * width],
+        ]
+    )
+    x, y, heading = pose
+    return affine_transform(
+        bbox, [np.cos(heading), -np.sin(heading), np.sin(heading), np.cos(heading), x, y]
+    )
+
+
+@pytest.mark.planner
+@pytest.mark.parametrize("n_lot", [20])
+def test_hybrid_astar(n_lot: int):
+    """Plan in the generated parking lots. Increase n_lot to a few thousand to benchmark the planning speed."""
+    vehicle = Vehicle(id_=0)
+    vehicle.load_from_template("medium_car")
+    physics_model = SingleTrackKinematics(
+        lf=vehicle.length / 2 - vehicle.front_overhang,
+        lr=vehicle.length / 2 - vehicle.rear_overhang,
+        steer_range=(-0.524, 0.524),
+        speed_range=(-0.5, 0.5),
+    )
+    vehicle_size = (vehicle.length, vehicle.width)
+
+    t1 = time.time()
+    planner = HybridAStar(physics_model, vehicle_size)
+    t2 = time.time()
+    logging.info(f"Building the primitives and the heuristic table takes {t2 - t1:.4f}s.")
+
+    np.random.seed(0)
+    map_generator = ParkingLotGenerator(vehicle_size, 0.5)
+    n_success = 0
+    time_cost = 0
+    for _ in range(n_lot):
+        map_ = Map(name="parking_lot", scenario_type="parking")
+        start_state, target_area, target_heading = map_generator.generate(map_)
+        target_center = np.mean(np.array(target_area.geometry.exterior.coords[:-1]), axis=0)
+        start_pose = (start_state.x, start_state.y, start_state.heading)
+        goal_pose = (target_center[0], target_center[1], target_heading)
+
+        t1 = time.time()
+        planner.reset(map_)
+        poses, directions = planner.plan(start_pose, goal_pose)
+        time_cost += time.time() - t1
+
+        if poses is None:
+            continue
+        n_success += 1
+
+        assert len(poses) == len(directions)
+        assert np.all(np.isin(directions, [-1, 1]))
+        assert np.allclose(poses[0, :2], start_pose[:2])
+        assert np.isclose(np.cos(poses[0, 2] - start_pose[2]), 1)
+        assert np.allclose(poses[-1, :2], goal_pose[:2])
+        assert np.isclose(np.cos(poses[-1, 2] - goal_pose[2]), 1)
+        assert np.all(np.linalg.norm(np.diff(poses[:, :2], axis=0), axis=1) < 0.5)
+
+        obstacles = [area.geometry for area in map_.areas.values() if area.type_ == "obstacle"]
+        for pose in poses:
+            bbox = get_bbox(pose, *vehicle_size)
+            assert not any(bbox.intersects(obstacle) for obstacle in obstacles)
+
+    logging.info(
+        f"The planner finds {n_success} paths in {n_lot} parking lots. It plans {n_lot / time_cost:.2f} times per second."
+    )
+    assert n_success >= 0.9 * n_lot
+
+
+def get_speed_profile_by_loop(distances, bounds, max_accel, max_decel):
+    speeds = np.array(bounds, dtype=float)
+    for i in range(1, len(speeds)):
+        ds = distances[i] - distances[i - 1]
+        speeds[i] = min(speeds[i], np.sqrt(speeds[i - 1] ** 2 + 2 * max_accel * ds))
+    for i in range(len(speeds) - 2, -1, -1):
+        ds = distances[i + 1] - distances[i]
+        speeds[i] = min(speeds[i], np.sqrt(speeds[i + 1] ** 2 + 2 * max_decel * ds))
+    return speeds
+
+
+@pytest.mark.planner
+@pytest.mark.parametrize("n_path", [10, 10000])
+def test_speed_profiler(n_path: int):
+    physics_model = SingleTrackKinematics(
+        1.3, 1.3, steer_range=0.6, speed_range=(-3.0, 10.0), accel_range=(-6.0, 3.0)
+    )
+    profiler = SpeedProfiler(physics_model, max_lateral_accel=4.0)
+
+    # the batched passes match the sequential ones
+    rng = np.random.default_rng(0)
+    distances = np.cumsum(rng.uniform(0, 1, (n_path, 200)), axis=1)
+    curvatures = rng.uniform(-0.2, 0.2, (n_path, 200))
+    t1 = time.time()
+    speeds = profiler.get_speed_profile(distances, curvatures, start_speed=2.0)
+    t2 = time.time()
+    logging.info(f"Profiling {n_path} paths in a batch takes {(t2 - t1) * 1e3:.2f}ms.")
+    for i in range(min(n_path, 10)):
+        bounds = np.minimum(np.sqrt(4.0 / np.abs(curvatures[i])), 10.0)
+        bounds[0], bounds[-1] = min(bounds[0], 2.0), 0
+        assert np.allclose(speeds[i], get_speed_profile_by_loop(distances[i], bounds, 3.0, 6.0))
+
+    # a Reeds-Shepp path with the reverse segments
+    rs = ReedsShepp(physics_model.wheel_base / np.tan(0.6))
+    n_trajectory = 0
+    t1 = time.time()
+    for _ in range(min(n_path, 100)):
+        start_point, end_point = rng.uniform(-10, 10, (2, 2))
+        start_heading, end_heading = rng.uniform(-np.pi, np.pi, 2)
+        path = rs.get_path(start_point, start_heading, end_point, end_heading)
+        path.get_curve_line(start_point, start_heading, rs.radius, tolerance=0.01)
+        trajectory = profiler.get_trajectory(path.curve, path.yaw, fps=20)
+        n_trajectory += 1
+
+        states = [trajectory.get_state(frame) for frame in trajectory.frames]
+        locations = np.array([state.location for state in states])
+        headings = np.array([state.heading for state in states])
+        speeds = np.array([state.speed for state in states])
+
+        assert trajectory.stable_freq and np.all(np.diff(trajectory.frames) == 50)
+        assert np.allclose(locations[0], start_point) and np.allclose(locations[-1], end_point)
+        assert np.isclose(np.cos(headings[0] - start_heading), 1)
+        assert np.isclose(np.cos(headings[-1] - end_heading), 1)
+        assert np.isclose(speeds[0], 0) and np.isclose(speeds[-1], 0)
+        assert np.all((speeds >= -3 - 1e-9) & (speeds <= 10 + 1e-9))
+        assert np.all(np.abs(np.diff(speeds)) <= 6.0 * 0.05 + 1e-9)
+        # the vehicle moves along its heading
+        steps = np.diff(locations, axis=0)
+        dots = steps[:, 0] * np.cos(headings[:-1]) + steps[:, 1] * np.sin(headings[:-1])
+        moving = np.abs(speeds[:-1] + speeds[1:]) > 0.1
+        assert np.all(np.sign(dots[moving]) == np.sign(speeds[:-1] + speeds[1:])[moving])
+    t2 = time.time()
+    logging.info(f"The profiler generates {n_trajectory / (t2 - t1):.2f} trajectories per second.")
+
+    # a circle driven by a point mass is bounded by the lateral acceleration
+    point_mass = PointMass(speed_range=(0, 20.0), accel_range=(0, 2.0))
+    profiler = SpeedProfiler(point_mass)
+    angles = np.linspace(0, 2 * np.pi, 500)
+    circle = 10 * np.column_stack([np.cos(angles), np.sin(angles)])
+    trajectory = profiler.get_trajectory(circle, start_speed=5.0, end_speed=5.0)
+    speeds = np.array([trajectory.get_state(frame).speed for frame in trajectory.frames])
+    assert np.isclose(speeds[0], np.sqrt(20.0)) and np.max(speeds) <= np.sqrt(20.0) + 1e-3
+    with pytest.raises(ValueError):
+        profiler.get_speed_profile(np.arange(3.0), np.zeros(3), directions=[1, 1, -1])
@@ -0,0 +1,168 @@
+##! python3
+# Copyright (C) 2024, Tactics2D Authors. Released under the GNU GPLv3.
+# @File: test_traffic.py
+# @Description: This file implements the test cases for the traffic event detection.
+# @Author: Yueyuan Li
+# @Version: 1.0.0
+
+
+import sys
+
+sys.path.append(".")
+sys.path.append("..")
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString, Polygon
+
+from tactics2d.map.element import Area, Lane, Map
+from tactics2d.participant.element import Vehicle
+from tactics2d.participant.trajectory import State
+from tactics2d.physics import SingleTrackKinematics
+from tactics2d.traffic.event_detection import (
+    Arrival,
+    EventContext,
+    EventPipeline,
+    NoAction,
+    OffLane,
+    OffRoute,
+    OutBound,
+    StaticCollision,
+    TimeExceed,
+)
+
+
+@pytest.mark.traffic
+@pytest.mark.parametrize("continuous, expected", [(False, False), (True, True)])
+def test_continuous_collision(continuous, expected):
+    vehicle = Vehicle(0)
+    vehicle.load_from_template("medium_car")
+    physics_model = SingleTrackKinematics(
+        lf=vehicle.length / 2 - vehicle.front_overhang,
+        lr=vehicle.length / 2 - vehicle.rear_overhang,
+        interval=500,
+    )
+
+    # a thin wall that the vehicle jumps over within one step at 30 m/s
+    wall = Area(id_="0", geometry=Polygon([(10, -5), (10.1, -5), (10.1, 5), (10, 5)]))
+    detector = StaticCollision([wall], continuous)
+
+    state = State(frame=0, x=0, y=0, heading=0, speed=30)
+    next_state, path, _, _ = physics_model.step_with_path(state, 0, 0)
+    assert next_state.x > 15
+    assert np.allclose(path[0], [0, 0, 0])
+    assert np.allclose(path[-1, :2], next_state.location)
+
+    bbox = np.array(vehicle.geometry.coords)[:4]
+    swept_poses = bbox[None, :, :] + path[:, None, :2]
+    agent_pose = Polygon(swept_poses[-1])
+
+    assert detector.update(agent_pose, swept_poses) == expected
+
+
+@pytest.mark.traffic
+def test_event_pipeline():
+    n_agent = 50
+    rng = np.random.default_rng(0)
+    locations = rng.uniform(-30, 30, (n_agent, 2))
+    headings = rng.uniform(0, 2 * np.pi, n_agent)
+    bbox = np.array([[2.4, -0.9], [2.4, 0.9], [-2.4, 0.9], [-2.4, -0.9]])
+    agent_poses = []
+    for (x, y), heading in zip(locations, headings):
+        rotation = np.array(
+            [[np.cos(heading), -np.sin(heading)], [np.sin(heading), np.cos(heading)]]
+        )
+        agent_poses.append(Polygon(bbox @ rotation.T + [x, y]))
+
+    walls = [
+        Area(id_=str(i), geometry=Polygon([(x, -30), (x + 0.2, -30), (x + 0.2, 30), (x, 30)]))
+        for i, x in enumerate([-20, 0, 20])
+    ]
+    target_area = Area(id_="target", geometry=Polygon([(5, 5), (10, 5), (10, 8), (5, 8)]))
+
+    pipeline = EventPipeline(
+        {
+            "time_exceed": TimeExceed(10),
+            "no_action": NoAction(),
+            "out_bound": OutBound((-25, 25, -25, 25)),
+            "collision": StaticCollision(walls),
+            "completed": Arrival(target_area),
+        }
+    )
+    results = pipeline.update(agent_poses)
+
+    for i, agent_pose in enumerate(agent_poses):
+        assert results["out_bound"][i] == (
+            not Polygon([(-25, -25), (-25, 25), (25, 25), (25, -25)]).contains(agent_pose)
+        )
+        assert results["collision"][i] == any(
+            agent_pose.intersects(wall.geometry) for wall in walls
+        )
+        iou = (
+            agent_pose.intersection(target_area.geometry).area
+            / agent_pose.union(target_area.geometry).area
+        )
+        assert np.isclose(results["completed"][1][i], iou)
+
+    assert not np.any(results["time_exceed"])
+    assert not np.any(results["no_action"])
+    assert pipeline["collision"].update(agent_poses[0]) == results["collision"][0]
+
+
+@pytest.mark.traffic
+def test_off_lane():
+    map_ = Map()
+    for i in range(4):
+        map_.add_lane(
+            Lane(
+                id_=str(i),
+                left_side=LineString([(0, 4 * i + 4), (100, 4 * i + 4)]),
+                right_side=LineString([(0, 4 * i), (100, 4 * i)]),
+            )
+        )
+    detector = OffLane(map_)
+    road = shapely.union_all([Polygon(lane.geometry) for lane in map_.lanes.values()])
+
+    rng = np.random.default_rng(0)
+    locations = rng.uniform(-10, 110, (200, 2))
+    agent_poses = [
+        Polygon(location + [[-1, -1], [1, -1], [1, 1], [-1, 1]]) for location in locations
+    ]
+    context = EventContext(agent_poses)
+    is_off_lane = detector.evaluate(context)
+
+    for i, location in enumerate(locations):
+        assert is_off_lane[i] == (not road.covers(shapely.Point(location)))
+    assert detector.update(agent_poses[0]) == is_off_lane[0]
+
+
+@pytest.mark.traffic
+def test_off_route():
+    x = np.linspace(0, 100, 500)
+    route = LineString(np.stack([x, 10 * np.sin(x / 10)], axis=1))
+    detector = OffRoute(threshold=1.0, route=route)
+
+    n_agent = 100
+    rng = np.random.default_rng(0)
+    offsets = rng.uniform(-2, 2, n_agent)
+    speeds = rng.uniform(0.5, 3, n_agent)
+    for step in range(30):
+        s = (speeds * step) % route.length
+        points = shapely.line_interpolate_point(route, s)
+        locations = shapely.get_coordinates(points) + np.stack([np.zeros(n_agent), offsets], axis=1)
+        distances, _ = detector.project(locations)
+        expected = shapely.distance(route, shapely.points(locations))
+
+        # the local search may stop at a nearby segment, but the decision is always exact
+        off_route = expected > detector.threshold
+        assert np.array_equal(distances > detector.threshold, off_route)
+        assert np.all(distances >= expected - 1e-9)
+        assert np.allclose(distances[off_route], expected[off_route])
+
+    assert detector.update(shapely.Point(0, 5))
+    assert not detector.update(shapely.Point(50, 10 * np.sin(5)))